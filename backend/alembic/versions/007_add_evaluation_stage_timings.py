@@ -0,0 +1,24 @@
+"""Add stage timings to evaluation jobs
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('evaluation_jobs', sa.Column('stage_timings', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('evaluation_jobs') as batch_op:
+        batch_op.drop_column('stage_timings')
@@ -0,0 +1,29 @@
+"""Add base_model_result to evaluation jobs
+
+The column already exists in databases that were patched by hand; it is only
+added where missing so the ORM model and the schema agree.
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = [column['name'] for column in sa.inspect(op.get_bind()).get_columns('evaluation_jobs')]
+    if 'base_model_result' not in columns:
+        op.add_column('evaluation_jobs', sa.Column('base_model_result', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('evaluation_jobs') as batch_op:
+        batch_op.drop_column('base_model_result')
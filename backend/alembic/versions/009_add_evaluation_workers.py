@@ -0,0 +1,50 @@
+"""Add evaluation workers and job leases
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'evaluation_workers',
+        sa.Column('worker_id', sa.String(length=255), nullable=False),
+        sa.Column('hostname', sa.String(length=255), nullable=False),
+        sa.Column('pid', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='online'),
+        sa.Column('capacity', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('active_jobs', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('labels', sa.Text(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('last_heartbeat_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('worker_id')
+    )
+    op.create_index('ix_evaluation_workers_worker_id', 'evaluation_workers', ['worker_id'])
+    op.create_index('ix_evaluation_workers_last_heartbeat_at', 'evaluation_workers', ['last_heartbeat_at'])
+
+    op.add_column('evaluation_jobs', sa.Column('claimed_by_worker_id', sa.String(length=255), nullable=True))
+    op.add_column('evaluation_jobs', sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_evaluation_jobs_claimed_by_worker_id', 'evaluation_jobs', ['claimed_by_worker_id'])
+    op.create_index('ix_evaluation_jobs_lease_expires_at', 'evaluation_jobs', ['lease_expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_evaluation_jobs_lease_expires_at', table_name='evaluation_jobs')
+    op.drop_index('ix_evaluation_jobs_claimed_by_worker_id', table_name='evaluation_jobs')
+    with op.batch_alter_table('evaluation_jobs') as batch_op:
+        batch_op.drop_column('lease_expires_at')
+        batch_op.drop_column('claimed_by_worker_id')
+
+    op.drop_index('ix_evaluation_workers_last_heartbeat_at', table_name='evaluation_workers')
+    op.drop_index('ix_evaluation_workers_worker_id', table_name='evaluation_workers')
+    op.drop_table('evaluation_workers')
@@ -0,0 +1,28 @@
+"""Add priority and claim time to evaluation jobs
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('evaluation_jobs', sa.Column('priority', sa.String(length=20), nullable=False, server_default='interactive'))
+    op.add_column('evaluation_jobs', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_evaluation_jobs_priority', 'evaluation_jobs', ['priority'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_evaluation_jobs_priority', table_name='evaluation_jobs')
+    with op.batch_alter_table('evaluation_jobs') as batch_op:
+        batch_op.drop_column('claimed_at')
+        batch_op.drop_column('priority')
@@ -0,0 +1,49 @@
+"""Add evaluation matrix runs
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'evaluation_matrix_runs',
+        sa.Column('matrix_id', sa.Integer(), nullable=False),
+        sa.Column('requested_by_user_id', sa.Integer(), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('priority', sa.String(length=20), nullable=False, server_default='batch'),
+        sa.Column('evaluation_model_type', sa.String(length=20), nullable=True),
+        sa.Column('request', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['requested_by_user_id'], ['users.user_id']),
+        sa.PrimaryKeyConstraint('matrix_id')
+    )
+    op.create_index('ix_evaluation_matrix_runs_matrix_id', 'evaluation_matrix_runs', ['matrix_id'])
+
+    with op.batch_alter_table('evaluation_jobs') as batch_op:
+        batch_op.add_column(sa.Column('matrix_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_evaluation_jobs_matrix_id', 'evaluation_matrix_runs',
+            ['matrix_id'], ['matrix_id'], ondelete='SET NULL'
+        )
+        batch_op.create_index('ix_evaluation_jobs_matrix_id', ['matrix_id'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('evaluation_jobs') as batch_op:
+        batch_op.drop_index('ix_evaluation_jobs_matrix_id')
+        batch_op.drop_constraint('fk_evaluation_jobs_matrix_id', type_='foreignkey')
+        batch_op.drop_column('matrix_id')
+
+    op.drop_index('ix_evaluation_matrix_runs_matrix_id', table_name='evaluation_matrix_runs')
+    op.drop_table('evaluation_matrix_runs')
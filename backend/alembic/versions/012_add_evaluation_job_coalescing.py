@@ -0,0 +1,32 @@
+"""Add coalesced_into_job_id to evaluation jobs
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('evaluation_jobs') as batch_op:
+        batch_op.add_column(sa.Column('coalesced_into_job_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_evaluation_jobs_coalesced_into_job_id', 'evaluation_jobs',
+            ['coalesced_into_job_id'], ['job_id'], ondelete='SET NULL'
+        )
+        batch_op.create_index('ix_evaluation_jobs_coalesced_into_job_id', ['coalesced_into_job_id'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('evaluation_jobs') as batch_op:
+        batch_op.drop_index('ix_evaluation_jobs_coalesced_into_job_id')
+        batch_op.drop_constraint('fk_evaluation_jobs_coalesced_into_job_id', type_='foreignkey')
+        batch_op.drop_column('coalesced_into_job_id')
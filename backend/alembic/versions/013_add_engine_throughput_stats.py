@@ -0,0 +1,43 @@
+"""Add engine throughput statistics and predicted job durations
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'engine_throughput_stats',
+        sa.Column('stat_id', sa.Integer(), nullable=False),
+        sa.Column('lang_pair_id', sa.Integer(), nullable=False),
+        sa.Column('mode_key', sa.String(length=255), nullable=False, server_default='/'),
+        sa.Column('model_size_class', sa.Integer(), nullable=False, server_default='-1'),
+        sa.Column('samples', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('segments_per_second', sa.Float(), nullable=False),
+        sa.Column('overhead_seconds', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['lang_pair_id'], ['language_pairs.lang_pair_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('stat_id'),
+        sa.UniqueConstraint('lang_pair_id', 'mode_key', 'model_size_class', name='uq_engine_throughput_stat_key')
+    )
+    op.create_index('ix_engine_throughput_stats_stat_id', 'engine_throughput_stats', ['stat_id'])
+
+    op.add_column('evaluation_jobs', sa.Column('predicted_duration_seconds', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('evaluation_jobs') as batch_op:
+        batch_op.drop_column('predicted_duration_seconds')
+
+    op.drop_index('ix_engine_throughput_stats_stat_id', table_name='engine_throughput_stats')
+    op.drop_table('engine_throughput_stats')
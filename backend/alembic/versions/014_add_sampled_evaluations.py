@@ -0,0 +1,36 @@
+"""Add sampled evaluation runs and translation reuse to evaluation jobs
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('evaluation_jobs') as batch_op:
+        batch_op.add_column(sa.Column('sample_size', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('sample_result', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('reuse_translations_from_job_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_evaluation_jobs_reuse_translations_from_job_id', 'evaluation_jobs',
+            ['reuse_translations_from_job_id'], ['job_id'], ondelete='SET NULL'
+        )
+        batch_op.create_index('ix_evaluation_jobs_reuse_translations_from_job_id', ['reuse_translations_from_job_id'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('evaluation_jobs') as batch_op:
+        batch_op.drop_index('ix_evaluation_jobs_reuse_translations_from_job_id')
+        batch_op.drop_constraint('fk_evaluation_jobs_reuse_translations_from_job_id', type_='foreignkey')
+        batch_op.drop_column('reuse_translations_from_job_id')
+        batch_op.drop_column('sample_result')
+        batch_op.drop_column('sample_size')
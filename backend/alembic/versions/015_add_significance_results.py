@@ -0,0 +1,27 @@
+"""Add significance test results to evaluation jobs and training results
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('evaluation_jobs', sa.Column('significance', sa.Text(), nullable=True))
+    op.add_column('training_results', sa.Column('significance', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('training_results') as batch_op:
+        batch_op.drop_column('significance')
+    with op.batch_alter_table('evaluation_jobs') as batch_op:
+        batch_op.drop_column('significance')
@@ -0,0 +1,50 @@
+"""Add segment-level regressions between consecutive model versions
+
+Revision ID: 016
+Revises: 015
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '016'
+down_revision = '015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'segment_regressions',
+        sa.Column('regression_id', sa.Integer(), nullable=False),
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('previous_job_id', sa.Integer(), nullable=True),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('segment_index', sa.Integer(), nullable=False),
+        sa.Column('metric', sa.String(length=20), nullable=False),
+        sa.Column('delta', sa.Float(), nullable=False),
+        sa.Column('chrf', sa.Float(), nullable=False),
+        sa.Column('previous_chrf', sa.Float(), nullable=False),
+        sa.Column('comet', sa.Float(), nullable=True),
+        sa.Column('previous_comet', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['job_id'], ['evaluation_jobs.job_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['previous_job_id'], ['evaluation_jobs.job_id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('regression_id')
+    )
+    op.create_index('ix_segment_regressions_regression_id', 'segment_regressions', ['regression_id'])
+    op.create_index('ix_segment_regressions_job_kind_rank', 'segment_regressions', ['job_id', 'kind', 'rank'])
+
+    op.add_column('evaluation_jobs', sa.Column('segment_regression_summary', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('evaluation_jobs') as batch_op:
+        batch_op.drop_column('segment_regression_summary')
+
+    op.drop_index('ix_segment_regressions_job_kind_rank', table_name='segment_regressions')
+    op.drop_index('ix_segment_regressions_regression_id', table_name='segment_regressions')
+    op.drop_table('segment_regressions')
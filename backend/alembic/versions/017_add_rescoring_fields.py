@@ -0,0 +1,26 @@
+"""Add chrF scores and rescoring timestamps to evaluation jobs
+
+Revision ID: 017
+Revises: 016
+Create Date: 2026-10-20 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '017'
+down_revision = '016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('evaluation_jobs', sa.Column('chrf_score', sa.Float(), nullable=True))
+    op.add_column('evaluation_jobs', sa.Column('rescored_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('evaluation_jobs') as batch_op:
+        batch_op.drop_column('rescored_at')
+        batch_op.drop_column('chrf_score')
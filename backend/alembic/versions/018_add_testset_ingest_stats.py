@@ -0,0 +1,26 @@
+"""Add ingest statistics to testsets
+
+Revision ID: 018
+Revises: 017
+Create Date: 2026-10-20 01:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '018'
+down_revision = '017'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('testsets', sa.Column('segments', sa.Integer(), nullable=True))
+    op.add_column('testsets', sa.Column('ingest_stats', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('testsets') as batch_op:
+        batch_op.drop_column('ingest_stats')
+        batch_op.drop_column('segments')
@@ -0,0 +1,47 @@
+"""Add the global testset segment hash and near-duplicate bucket index
+
+Revision ID: 019
+Revises: 018
+Create Date: 2026-10-20 02:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '019'
+down_revision = '018'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'testset_segment_hashes',
+        sa.Column('testset_id', sa.Integer(), nullable=False),
+        sa.Column('file_type', sa.String(length=10), nullable=False),
+        sa.Column('segment_index', sa.Integer(), nullable=False),
+        sa.Column('segment_hash', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['testset_id'], ['testsets.testset_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('testset_id', 'file_type', 'segment_index')
+    )
+    op.create_index('ix_testset_segment_hashes_hash', 'testset_segment_hashes', ['segment_hash', 'file_type', 'testset_id'])
+
+    op.create_table(
+        'testset_segment_buckets',
+        sa.Column('testset_id', sa.Integer(), nullable=False),
+        sa.Column('file_type', sa.String(length=10), nullable=False),
+        sa.Column('segment_index', sa.Integer(), nullable=False),
+        sa.Column('band', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['testset_id'], ['testsets.testset_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('testset_id', 'file_type', 'segment_index', 'band')
+    )
+    op.create_index('ix_testset_segment_buckets_bucket', 'testset_segment_buckets', ['bucket', 'file_type', 'testset_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_testset_segment_buckets_bucket', table_name='testset_segment_buckets')
+    op.drop_table('testset_segment_buckets')
+    op.drop_index('ix_testset_segment_hashes_hash', table_name='testset_segment_hashes')
+    op.drop_table('testset_segment_hashes')
@@ -0,0 +1,61 @@
+"""Add translation batches for queued file-based direct translation
+
+Revision ID: 020
+Revises: 019
+Create Date: 2026-10-20 04:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '020'
+down_revision = '019'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'translation_batches',
+        sa.Column('batch_id', sa.Integer(), nullable=False),
+        sa.Column('version_id', sa.Integer(), nullable=False),
+        sa.Column('requested_by_user_id', sa.Integer(), nullable=True),
+        sa.Column('model_type', sa.String(length=20), nullable=False),
+        sa.Column('mode_type', sa.String(length=100), nullable=True),
+        sa.Column('sub_mode_type', sa.String(length=100), nullable=True),
+        sa.Column('custom_params', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('original_filename', sa.String(length=255), nullable=True),
+        sa.Column('source_file_path', sa.String(length=500), nullable=False),
+        sa.Column('output_file_path', sa.String(length=500), nullable=False),
+        sa.Column('segments', sa.Integer(), nullable=False),
+        sa.Column('translated_segments', sa.Integer(), nullable=False),
+        sa.Column('cached_segments', sa.Integer(), nullable=False),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('requested_at', sa.DateTime(), nullable=True),
+        sa.Column('processing_started_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('claimed_by_worker_id', sa.String(length=255), nullable=True),
+        sa.Column('claimed_at', sa.DateTime(), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['version_id'], ['model_versions.version_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['requested_by_user_id'], ['users.user_id']),
+        sa.PrimaryKeyConstraint('batch_id')
+    )
+    op.create_index('ix_translation_batches_batch_id', 'translation_batches', ['batch_id'])
+    op.create_index('ix_translation_batches_version_id', 'translation_batches', ['version_id'])
+    op.create_index('ix_translation_batches_requested_by_user_id', 'translation_batches', ['requested_by_user_id'])
+    op.create_index('ix_translation_batches_status', 'translation_batches', ['status'])
+    op.create_index('ix_translation_batches_claimed_by_worker_id', 'translation_batches', ['claimed_by_worker_id'])
+    op.create_index('ix_translation_batches_lease_expires_at', 'translation_batches', ['lease_expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_translation_batches_lease_expires_at', table_name='translation_batches')
+    op.drop_index('ix_translation_batches_claimed_by_worker_id', table_name='translation_batches')
+    op.drop_index('ix_translation_batches_status', table_name='translation_batches')
+    op.drop_index('ix_translation_batches_requested_by_user_id', table_name='translation_batches')
+    op.drop_index('ix_translation_batches_version_id', table_name='translation_batches')
+    op.drop_index('ix_translation_batches_batch_id', table_name='translation_batches')
+    op.drop_table('translation_batches')
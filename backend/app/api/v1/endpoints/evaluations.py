@@ -1,18 +1,20 @@
-from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Query
-from fastapi.responses import FileResponse
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form, Header
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
 import os
 import logging
 from datetime import datetime
 import json
 import math
-import shutil
 
 from app.core.deps import get_db, get_current_release_manager_user, get_current_active_user, get_current_admin_user
-from app.db.models import User
-from app.core.evaluation import run_evaluation, translate_text
-from app.crud import crud_evaluation, crud_model_version, crud_testset
+from app.db.models import User, SegmentRegression
+from app.core import scheduler, coalescing, throughput, significance, segment_store, segment_regressions, rescoring, file_gc, output_files, retention, segment_index, translation_cache, batch_translation, engine_logs
+from app.core import worker as evaluation_worker
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.crud import crud_evaluation, crud_model_version, crud_testset, crud_translation_batch
 from app.schemas.evaluation import (
     EvaluationJobCreate, 
     EvaluationJobStatus, 
@@ -21,10 +23,20 @@ from app.schemas.evaluation import (
     EvaluationResultData,
     DirectTranslationRequest,
     DirectTranslationResponse,
+    TranslationBatchStatus,
     PaginatedEvaluationJobs,
     BulkDeleteRequest,
     DateRangeDeleteRequest,
-    DeleteResponse
+    DeleteResponse,
+    EvaluationMode,
+    EvaluationMatrixCreate,
+    EvaluationMatrixJob,
+    EvaluationMatrixStatus,
+    SegmentSubsetRequest,
+    SegmentSubsetMetrics,
+    SegmentRegressionItem,
+    PaginatedSegmentRegressions,
+    RescoringRequest
 )
 
 # Khởi tạo logger cho module này
@@ -32,18 +44,43 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def parse_json_column(raw: Optional[str], column: str) -> Optional[dict]:
+    """
+    Parse a JSON text column of a job (stage_timings, sample_result, significance, ...), tolerating
+    missing or malformed values
+    """
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        logger.warning(f"Failed to parse {column} JSON")
+        return None
+
 @router.post("/run", response_model=EvaluationJobStatus)
 def run_evaluation_job(
     evaluation_in: EvaluationJobCreate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_release_manager_user)
 ) -> Any:
     """
-    Start an evaluation job for a model version using a specific testset
+    Start an evaluation job for a model version using a specific testset. With sample_size only a
+    stratified sample of the testset is translated and scores come with bootstrap confidence
+    intervals; POST /{job_id}/upgrade turns such a quick look into a full run.
     """
-    logger.info(f"Request to start evaluation job received: version_id={evaluation_in.version_id}, testset_id={evaluation_in.testset_id}, user_id={current_user.user_id}")
-    
+    logger.info(f"Request to start evaluation job received: version_id={evaluation_in.version_id}, testset_id={evaluation_in.testset_id}, sample_size={evaluation_in.sample_size}, user_id={current_user.user_id}")
+    return submit_evaluation_job(evaluation_in, db, current_user)
+
+def submit_evaluation_job(
+    evaluation_in: EvaluationJobCreate,
+    db: Session,
+    current_user: User,
+    reuse_translations_from_job_id: Optional[int] = None,
+    reused_segments: int = 0
+) -> EvaluationJobStatus:
+    """
+    Validate and queue an evaluation job, or attach it to an identical queued, running or recent job
+    """    
     # Validate that model version exists
     model_version = crud_model_version.get(db, version_id=evaluation_in.version_id)
     if not model_version:
@@ -80,12 +117,54 @@ def run_evaluation_job(
             detail="Testset must have both source and target file paths defined"
         )
     
+    # Single-flight: share an identical queued/running job, or serve an identical recent result
+    coalesced_into_job_id = None
+    reused_job = None
+    if settings.EVALUATION_COALESCING_ENABLED and evaluation_in.allow_coalescing:
+        identity = dict(
+            version_id=evaluation_in.version_id,
+            testset_id=evaluation_in.testset_id,
+            mode_type=evaluation_in.mode_type,
+            sub_mode_type=evaluation_in.sub_mode_type,
+            custom_params=evaluation_in.custom_params,
+            evaluation_model_type=evaluation_in.evaluation_model_type,
+            sample_size=evaluation_in.sample_size
+        )
+        leader = coalescing.find_in_flight(db, **identity)
+        if not leader:
+            reused_job = coalescing.find_reusable(db, **identity)
+            leader = reused_job
+        if leader:
+            coalesced_into_job_id = leader.job_id
+            logger.info(f"Evaluation request coalesced into job {leader.job_id} ({'completed' if reused_job else leader.status})")
+    
+    predicted_duration_seconds = None
+    if coalesced_into_job_id is None:
+        # Sampled and upgraded runs only translate part of the testset
+        segments = None
+        if evaluation_in.sample_size or reused_segments:
+            segments = testset.segments or throughput.count_segments(testset.source_file_path_on_server)
+            if segments is not None:
+                segments = min(segments, evaluation_in.sample_size) if evaluation_in.sample_size else max(segments - reused_segments, 0)
+        predicted_duration_seconds = throughput.predict_duration_seconds(
+            db,
+            version_id=evaluation_in.version_id,
+            testset_id=evaluation_in.testset_id,
+            mode_type=evaluation_in.mode_type,
+            sub_mode_type=evaluation_in.sub_mode_type,
+            evaluation_model_type=evaluation_in.evaluation_model_type,
+            segments=segments
+        )
+    
     # Create evaluation job
     try:
         job = crud_evaluation.create(
             db=db,
             obj_in=evaluation_in,
-            user_id=current_user.user_id
+            user_id=current_user.user_id,
+            coalesced_into_job_id=coalesced_into_job_id,
+            predicted_duration_seconds=predicted_duration_seconds,
+            reuse_translations_from_job_id=reuse_translations_from_job_id
         )
         logger.info(f"Evaluation job created successfully: job_id={job.job_id}")
     except Exception as e:
@@ -96,16 +175,40 @@ def run_evaluation_job(
             detail="Failed to create evaluation job"
         )
     
-    # Start background task
-    logger.info(f"Starting background task for job_id={job.job_id}")
-    background_tasks.add_task(run_evaluation, job.job_id)
+    if coalesced_into_job_id is None and settings.EVALUATION_COALESCING_ENABLED and evaluation_in.allow_coalescing:
+        coalesced_into_job_id = coalescing.attach_to_earlier_duplicate(db, job)
+    
+    if coalesced_into_job_id is not None:
+        # The follower waits on the leader, so the leader must not wait at a lower priority
+        coalescing.raise_leader_priority(db, coalesced_into_job_id, job.priority)
+        # The leader may have finished between the lookup and the insert (always the case for history reuse)
+        coalescing.resolve_followers(db, coalesced_into_job_id)
+        response = get_evaluation_status(job_id=job.job_id, db=db, current_user=current_user)
+        response.reused_from_history = reused_job is not None
+        return response
+    
+    # Queued: the first free worker capable of this language pair claims it
+    queue_position, estimated_start_at = scheduler.queue_status(db, job.job_id)
+    estimated_completion_at = scheduler.estimate_completion(
+        db, {"status": job.status, "predicted_duration_seconds": predicted_duration_seconds}, estimated_start_at
+    )
+    logger.info(f"Evaluation job queued for workers: job_id={job.job_id}, priority={job.priority}, queue_position={queue_position}, predicted_duration={predicted_duration_seconds}s")
+    scheduler.notify_job_submitted()
     
     # Return job status
     return EvaluationJobStatus(
         job_id=job.job_id,
         status=job.status,
         progress_percentage=0,
-        requested_at=job.requested_at
+        requested_at=job.requested_at,
+        evaluation_model_type=job.evaluation_model_type,
+        priority=job.priority,
+        queue_position=queue_position,
+        estimated_start_at=estimated_start_at,
+        predicted_duration_seconds=predicted_duration_seconds,
+        estimated_completion_at=estimated_completion_at,
+        sample_size=job.sample_size,
+        reuse_translations_from_job_id=job.reuse_translations_from_job_id
     )
 
 @router.post("/translate", response_model=DirectTranslationResponse)
@@ -159,7 +262,7 @@ def translate_text_direct(
         # Perform direct translation
         logger.info("Calling translation function")
         start_time = datetime.now()
-        translated_text = translate_text(
+        translation = translation_cache.translate(
             source_text=request.source_text,
             model_file_path=model_file_path,
             hparams_file_path=hparams_file_path,
@@ -169,12 +272,14 @@ def translate_text_direct(
         )
         end_time = datetime.now()
         execution_time = (end_time - start_time).total_seconds()
-        logger.info(f"Translation completed in {execution_time:.2f} seconds")
-        logger.debug(f"Input length: {len(request.source_text)} chars, Output length: {len(translated_text)} chars")
+        logger.info(f"Translation completed in {execution_time:.2f} seconds ({translation.cached_segments}/{translation.segments} segments cached)")
+        logger.debug(f"Input length: {len(request.source_text)} chars, Output length: {len(translation.translated_text)} chars")
         
         return DirectTranslationResponse(
-            translated_text=translated_text,
-            status="success"
+            translated_text=translation.translated_text,
+            status="success",
+            segments=translation.segments,
+            cached_segments=translation.cached_segments
         )
     except Exception as e:
         logger.error(f"Direct translation failed: {str(e)}")
@@ -184,6 +289,215 @@ def translate_text_direct(
             detail=f"Translation failed: {str(e)}"
         )
 
+def translation_batch_status(db: Session, batch) -> TranslationBatchStatus:
+    return TranslationBatchStatus(
+        batch_id=batch.batch_id,
+        version_id=batch.version_id,
+        model_type=batch.model_type,
+        mode_type=batch.mode_type,
+        sub_mode_type=batch.sub_mode_type,
+        status=batch.status,
+        original_filename=batch.original_filename,
+        segments=batch.segments,
+        translated_segments=batch.translated_segments,
+        cached_segments=batch.cached_segments,
+        progress_percentage=int(100 * batch.translated_segments / batch.segments) if batch.segments else 0,
+        queue_position=scheduler.batch_queue_position(db, batch),
+        error_message=batch.error_message,
+        requested_at=batch.requested_at,
+        processing_started_at=batch.processing_started_at,
+        completed_at=batch.completed_at
+    )
+
+def get_own_translation_batch(db: Session, batch_id: int, current_user: User):
+    """
+    The batch if it exists and belongs to the user (admins see every batch), else 404
+    """
+    batch = crud_translation_batch.get(db, batch_id=batch_id)
+    if not batch or (batch.requested_by_user_id != current_user.user_id and current_user.role != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Translation batch not found"
+        )
+    return batch
+
+@router.post("/translate/batches", response_model=TranslationBatchStatus, status_code=status.HTTP_202_ACCEPTED)
+async def create_translation_batch(
+    file: UploadFile = File(...),
+    version_id: int = Form(...),
+    model_type: str = Form("finetuned"),
+    mode_type: Optional[str] = Form(None),
+    sub_mode_type: Optional[str] = Form(None),
+    custom_params: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Queue a text file (one segment per line) for translation by the evaluation workers. Translated
+    segments can be streamed from /translate/batches/{batch_id}/stream while the batch runs and the
+    complete output downloaded once it is COMPLETED. No testset or evaluation job is created.
+    """
+    logger.info(f"Translation batch request: version_id={version_id}, model_type={model_type}, file={file.filename}, user_id={current_user.user_id}")
+    if model_type not in ("base", "finetuned"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="model_type must be 'base' or 'finetuned'"
+        )
+    model_version = crud_model_version.get(db, version_id=version_id)
+    if not model_version:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Model version not found"
+        )
+    if not batch_translation.model_files(model_version, model_type):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{model_type.capitalize()} model files not uploaded for this version"
+        )
+
+    batch = crud_translation_batch.create(
+        db,
+        version_id=version_id,
+        user_id=current_user.user_id,
+        model_type=model_type,
+        mode_type=mode_type,
+        sub_mode_type=sub_mode_type,
+        custom_params=custom_params,
+        original_filename=file.filename
+    )
+    try:
+        segments = await batch_translation.save_upload(file, batch.source_file_path)
+    except Exception as e:
+        directory = crud_translation_batch.delete(db, batch)
+        file_gc.submit([directory])
+        if isinstance(e, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        logger.error(f"Storing translation batch upload failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to store uploaded file: {str(e)}"
+        )
+    batch = crud_translation_batch.queue(db, batch, segments)
+    logger.info(f"Translation batch {batch.batch_id} queued with {segments} segments")
+    scheduler.notify_job_submitted()
+    return translation_batch_status(db, batch)
+
+@router.get("/translate/batches", response_model=List[TranslationBatchStatus])
+def list_translation_batches(
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    The user's most recent translation batches
+    """
+    batches = crud_translation_batch.get_multi(db, user_id=current_user.user_id, limit=limit)
+    return [translation_batch_status(db, batch) for batch in batches]
+
+@router.get("/translate/batches/{batch_id}", response_model=TranslationBatchStatus)
+def get_translation_batch(
+    batch_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Status and progress of a translation batch
+    """
+    return translation_batch_status(db, get_own_translation_batch(db, batch_id, current_user))
+
+@router.get("/translate/batches/{batch_id}/stream")
+def stream_translation_batch(
+    batch_id: int,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    from_segment: int = Query(0, ge=0, description="First segment to send (0-based)"),
+    last_event_id: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Stream translated segments as they become final: NDJSON lines {"index", "translation"} or SSE
+    "segment" events (id = segment index, so EventSource reconnects resume), then an "end" record
+    with the final status. Queued batches are waited for.
+    """
+    get_own_translation_batch(db, batch_id, current_user)
+    # The request session would otherwise hold a pooled connection for as long as the client keeps reading
+    db.close()
+    sse = format == "sse"
+    if sse and last_event_id and last_event_id.isdigit():
+        from_segment = max(from_segment, int(last_event_id) + 1)
+    return StreamingResponse(
+        batch_translation.stream(batch_id, from_segment, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/translate/batches/{batch_id}/download")
+def download_translation_batch(
+    batch_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Translated file of a COMPLETED batch, one line per source line
+    """
+    batch = get_own_translation_batch(db, batch_id, current_user)
+    if batch.status != EvaluationStatus.COMPLETED.value:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Translation batch is {batch.status}; stream it for partial results"
+        )
+    if not os.path.exists(batch.output_file_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Output file not found"
+        )
+    name, _ = os.path.splitext(os.path.basename(batch.original_filename or f"batch_{batch_id}"))
+    return FileResponse(
+        path=batch.output_file_path,
+        filename=f"{name}.translated.txt",
+        media_type="text/plain; charset=utf-8"
+    )
+
+@router.post("/translate/batches/{batch_id}/cancel", response_model=TranslationBatchStatus)
+def cancel_translation_batch(
+    batch_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Cancel a queued or running translation batch; segments already translated stay streamable
+    """
+    batch = get_own_translation_batch(db, batch_id, current_user)
+    if not crud_translation_batch.cancel(db, batch_id=batch_id, error_message=f"Cancelled by {current_user.username}"):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Translation batch already finished with status {batch.status}"
+        )
+    logger.info(f"Translation batch {batch_id} cancelled by user {current_user.user_id}")
+    if evaluation_worker.local_worker:
+        evaluation_worker.local_worker.check_cancellations()
+    return translation_batch_status(db, crud_translation_batch.get(db, batch_id=batch_id))
+
+@router.delete("/translate/batches/{batch_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_translation_batch(
+    batch_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> None:
+    """
+    Delete a finished translation batch and its files
+    """
+    batch = get_own_translation_batch(db, batch_id, current_user)
+    if batch.status not in scheduler.TERMINAL_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Cancel the translation batch before deleting it"
+        )
+    file_gc.submit([crud_translation_batch.delete(db, batch)])
+
 @router.get("/status/{job_id}", response_model=EvaluationJobStatus)
 def get_evaluation_status(
     job_id: int,
@@ -205,6 +519,20 @@ def get_evaluation_status(
     
     logger.info(f"Job status: {job['status']}")
     
+    # A coalesced job waiting on the job it shares reports that job's progress
+    tracked_job_id = job_id
+    if job.get("coalesced_into_job_id") and job["status"] not in (EvaluationStatus.COMPLETED, EvaluationStatus.FAILED, EvaluationStatus.CANCELLED):
+        leader = crud_evaluation.get(db, job_id=job["coalesced_into_job_id"])
+        if leader and leader.status != EvaluationStatus.CANCELLED.value:
+            tracked_job_id = leader.job_id
+            job = {
+                **job,
+                "status": leader.status,
+                "claimed_by_worker_id": leader.claimed_by_worker_id,
+                "claimed_at": leader.claimed_at,
+                "predicted_duration_seconds": leader.predicted_duration_seconds
+            }
+    
     # Calculate progress percentage based on status
     progress_percentage = 0
     if job["status"] == EvaluationStatus.PENDING:
@@ -219,7 +547,7 @@ def get_evaluation_status(
         progress_percentage = 80
     elif job["status"] == EvaluationStatus.COMPLETED:
         progress_percentage = 100
-    elif job["status"] == EvaluationStatus.FAILED:
+    elif job["status"] in (EvaluationStatus.FAILED, EvaluationStatus.CANCELLED):
         progress_percentage = 100
     
     # Create response
@@ -229,19 +557,34 @@ def get_evaluation_status(
         progress_percentage=progress_percentage,
         requested_at=job["requested_at"],
         completed_at=job["completed_at"],
-        error_message=job["log_message"] if job["status"] == EvaluationStatus.FAILED else None,
+        error_message=job["log_message"] if job["status"] in (EvaluationStatus.FAILED, EvaluationStatus.CANCELLED) else None,
         mode_type=job["mode_type"],
         sub_mode_type=job["sub_mode_type"],
         custom_params=job["custom_params"],
-        evaluation_model_type=job["evaluation_model_type"]
+        evaluation_model_type=job["evaluation_model_type"],
+        stage_timings=parse_json_column(job.get("stage_timings"), "stage_timings"),
+        priority=job.get("priority"),
+        worker_id=job.get("claimed_by_worker_id"),
+        coalesced_into_job_id=job.get("coalesced_into_job_id"),
+        predicted_duration_seconds=job.get("predicted_duration_seconds"),
+        sample_size=job.get("sample_size"),
+        sample_result=parse_json_column(job.get("sample_result"), "sample_result"),
+        reuse_translations_from_job_id=job.get("reuse_translations_from_job_id"),
+        segment_regression_summary=parse_json_column(job.get("segment_regression_summary"), "segment_regression_summary")
     )
     
+    # Queue position and estimated start while waiting for a worker, ETA until finished
+    if job["status"] == EvaluationStatus.PENDING:
+        response.queue_position, response.estimated_start_at = scheduler.queue_status(db, tracked_job_id)
+    response.estimated_completion_at = scheduler.estimate_completion(db, job, response.estimated_start_at)
+    
     # Add result data if completed
     if job["status"] == EvaluationStatus.COMPLETED:
         logger.info(f"Job {job_id} is completed with scores: BLEU={job['bleu_score']}, COMET={job['comet_score']}")
         response_data = {
             "bleu_score": job["bleu_score"],
             "comet_score": job["comet_score"],
+            "chrf_score": job.get("chrf_score"),
             "output_file_generated_path": os.path.basename(job["output_file_path"]) if job["output_file_path"] else None,
             "added_to_details": bool(job["details_added_successfully"])
         }
@@ -255,6 +598,7 @@ def get_evaluation_status(
                 logger.info(f"Job {job_id}: Including base model result in response")
             except (json.JSONDecodeError, TypeError) as e:
                 logger.warning(f"Job {job_id}: Failed to parse base_model_result JSON: {str(e)}")
+        response_data["significance"] = parse_json_column(job.get("significance"), "significance")
             
         response.result = EvaluationResultData(**response_data)
     elif job["status"] == EvaluationStatus.FAILED:
@@ -262,6 +606,416 @@ def get_evaluation_status(
     
     return response
 
+@router.get("/queue")
+def get_evaluation_queue(
+    limit: int = Query(100, ge=1, le=1000, description="Number of queued jobs to return"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    PENDING evaluation jobs in scheduling order with their estimated start times
+    """
+    ordered = scheduler.queue_order(db)
+    estimates = scheduler.estimate_start_times(db, ordered[:limit])
+    return {
+        "total": len(ordered),
+        "items": [
+            {
+                "job_id": job.job_id,
+                "queue_position": index + 1,
+                "priority": job.priority,
+                "requested_by_user_id": job.requested_by_user_id,
+                "lang_pair_id": job.lang_pair_id,
+                "requested_at": job.requested_at,
+                "predicted_duration_seconds": job.predicted_duration_seconds,
+                "estimated_start_at": estimates.get(job.job_id)
+            }
+            for index, job in enumerate(ordered[:limit])
+        ]
+    }
+
+@router.get("/throughput")
+def get_engine_throughput(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Historical engine throughput per (language pair, mode, model size class), used for engine
+    timeouts, ETAs and shortest-job-first scheduling
+    """
+    return {"items": throughput.stats_summary(db)}
+
+@router.post("/matrix", response_model=EvaluationMatrixStatus)
+def run_evaluation_matrix(
+    matrix_in: EvaluationMatrixCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_release_manager_user)
+) -> Any:
+    """
+    Queue an evaluation job for every (model version, testset, mode) combination in one request.
+    Jobs of the same version and mode run through a single engine session on the worker that claims them.
+    """
+    logger.info(f"Request to start evaluation matrix received: version_ids={matrix_in.version_ids}, testset_ids={matrix_in.testset_ids}, user_id={current_user.user_id}")
+    
+    if not matrix_in.version_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one model version is required"
+        )
+    
+    modes = matrix_in.modes or [EvaluationMode()]
+    explicit_testsets = []
+    for testset_id in dict.fromkeys(matrix_in.testset_ids or []):
+        testset = crud_testset.get_testset(db, testset_id=testset_id)
+        if not testset:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Testset {testset_id} not found"
+            )
+        if not testset.source_file_path or not testset.target_file_path:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Testset {testset_id} must have both source and target file paths defined"
+            )
+        explicit_testsets.append(testset)
+    
+    cells = []
+    for version_id in dict.fromkeys(matrix_in.version_ids):
+        model_version = crud_model_version.get(db, version_id=version_id)
+        if not model_version:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Model version {version_id} not found"
+            )
+        if not model_version.model_file_path_on_server or not model_version.hparams_file_path_on_server:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Model files not uploaded for version {version_id}"
+            )
+        
+        if matrix_in.testset_ids:
+            mismatched = [t.testset_id for t in explicit_testsets if t.lang_pair_id != model_version.lang_pair_id]
+            if mismatched:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Testsets {mismatched} do not belong to the language pair of version {version_id}"
+                )
+            testsets = explicit_testsets
+        else:
+            testsets = [
+                t for t in crud_testset.get_testsets(db, lang_pair_id=model_version.lang_pair_id, limit=10000)
+                if t.source_file_path and t.target_file_path
+            ]
+        
+        for testset in testsets:
+            for mode in modes:
+                predicted_duration_seconds = throughput.predict_duration_seconds(
+                    db,
+                    version_id=version_id,
+                    testset_id=testset.testset_id,
+                    mode_type=mode.mode_type,
+                    sub_mode_type=mode.sub_mode_type,
+                    evaluation_model_type=matrix_in.evaluation_model_type
+                )
+                cells.append((version_id, testset.testset_id, mode, predicted_duration_seconds))
+    
+    if not cells:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No testsets to evaluate for the selected model versions"
+        )
+    
+    try:
+        matrix = crud_evaluation.create_matrix(db=db, obj_in=matrix_in, cells=cells, user_id=current_user.user_id)
+    except Exception as e:
+        logger.error(f"Failed to create evaluation matrix: {str(e)}")
+        logger.exception("Exception details:")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to create evaluation matrix"
+        )
+    
+    logger.info(f"Evaluation matrix {matrix.matrix_id} queued with {len(cells)} job(s)")
+    scheduler.notify_job_submitted()
+    return get_evaluation_matrix(matrix_id=matrix.matrix_id, db=db, current_user=current_user)
+
+@router.get("/matrix/{matrix_id}", response_model=EvaluationMatrixStatus)
+def get_evaluation_matrix(
+    matrix_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Progress and per-cell results of an evaluation matrix run
+    """
+    matrix = crud_evaluation.get_matrix(db, matrix_id=matrix_id)
+    if not matrix:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Evaluation matrix not found"
+        )
+    
+    jobs = crud_evaluation.get_matrix_jobs(db, matrix_id=matrix_id)
+    status_counts = {}
+    for job in jobs:
+        status_counts[job.status] = status_counts.get(job.status, 0) + 1
+    engine_groups = {(job.version_id, job.mode_type, job.sub_mode_type, job.custom_params) for job in jobs}
+    
+    return EvaluationMatrixStatus(
+        matrix_id=matrix.matrix_id,
+        description=matrix.description,
+        priority=matrix.priority,
+        evaluation_model_type=matrix.evaluation_model_type,
+        created_at=matrix.created_at,
+        total_jobs=len(jobs),
+        status_counts=status_counts,
+        engine_groups=len(engine_groups),
+        jobs=[EvaluationMatrixJob.model_validate(job) for job in jobs]
+    )
+
+@router.post("/{job_id}/cancel", response_model=EvaluationJobStatus)
+def cancel_evaluation_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_release_manager_user)
+) -> Any:
+    """
+    Cancel a queued or running evaluation job. Its engine containers (labelled with the job ID) are
+    removed and scoring stops; the worker slot is released as soon as the pipeline notices.
+    """
+    logger.info(f"Cancel request for job_id={job_id}, user_id={current_user.user_id}")
+    
+    job = crud_evaluation.get(db, job_id=job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Evaluation job not found"
+        )
+    
+    if not crud_evaluation.cancel(db, job_id=job_id, log_message=f"Cancelled by {current_user.username}"):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Evaluation job already finished with status {crud_evaluation.get(db, job_id=job_id).status}"
+        )
+    logger.info(f"Job {job_id} cancelled by user {current_user.user_id}")
+    
+    # Running on this process's worker: stop it now. Remote workers notice on their next loop iteration.
+    if evaluation_worker.local_worker:
+        evaluation_worker.local_worker.check_cancellations()
+    coalescing.resolve_followers(db, job_id)
+    scheduler.notify_job_submitted()
+    return get_evaluation_status(job_id=job_id, db=db, current_user=current_user)
+
+@router.post("/{job_id}/upgrade", response_model=EvaluationJobStatus)
+def upgrade_sampled_evaluation_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_release_manager_user)
+) -> Any:
+    """
+    Queue a full evaluation with the settings of a completed sampled job. The segments the sampled
+    run translated are reused, so the engine only translates the rest of the testset.
+    """
+    logger.info(f"Upgrade request for sampled job_id={job_id}, user_id={current_user.user_id}")
+    
+    job = crud_evaluation.get(db, job_id=job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Evaluation job not found"
+        )
+    if not job.sample_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only sampled evaluation jobs can be upgraded to a full run"
+        )
+    if job.status != EvaluationStatus.COMPLETED.value:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Sampled evaluation job has status {job.status}; only completed jobs can be upgraded"
+        )
+    
+    sample_result = parse_json_column(job.sample_result, "sample_result") or {}
+    evaluation_in = EvaluationJobCreate(
+        version_id=job.version_id,
+        testset_id=job.testset_id,
+        auto_add_to_details=True,
+        mode_type=job.mode_type,
+        sub_mode_type=job.sub_mode_type,
+        custom_params=job.custom_params,
+        evaluation_model_type=job.evaluation_model_type,
+        priority=job.priority
+    )
+    # A coalesced follower shares the leader's sample and translations
+    return submit_evaluation_job(
+        evaluation_in,
+        db,
+        current_user,
+        reuse_translations_from_job_id=job.coalesced_into_job_id or job.job_id,
+        reused_segments=sample_result.get("sample_segments", 0)
+    )
+
+def job_output_file(job, model_type: str) -> Optional[str]:
+    """
+    Output file of a job for model_type ("base" from base_model_result, anything else the main output)
+    """
+    if model_type == "base":
+        return (parse_json_column(job.base_model_result, "base_model_result") or {}).get("output_file_path")
+    return job.output_file_path
+
+@router.get("/{job_id}/significance")
+def get_evaluation_significance(
+    job_id: int,
+    baseline_job_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Paired bootstrap and approximate randomization significance of a job's scores. Without
+    baseline_job_id the job's finetuned output is tested against its base output; otherwise the job's
+    output is tested against the output of baseline_job_id on the same testset.
+    """
+    job = crud_evaluation.get(db, job_id=job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Evaluation job not found"
+        )
+    if job.status != EvaluationStatus.COMPLETED.value:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Evaluation job has status {job.status}; only completed jobs can be tested"
+        )
+    
+    if baseline_job_id is None:
+        if not job.base_model_result:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Evaluation job has no base model output; pass baseline_job_id to compare with another job"
+            )
+        baseline_output = job_output_file(job, "base")
+    else:
+        baseline = crud_evaluation.get(db, job_id=baseline_job_id)
+        if not baseline:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Baseline evaluation job not found"
+            )
+        if baseline.testset_id != job.testset_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Jobs evaluated different testsets and cannot be compared"
+            )
+        baseline_output = baseline.output_file_path
+    
+    baseline_stats = segment_store.load(baseline_output)
+    system_stats = segment_store.load(job.output_file_path)
+    if baseline_stats is None or system_stats is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Segment statistics of the outputs are not available"
+        )
+    result = significance.compare(baseline_stats, system_stats, seed=job_id)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Outputs were not scored on the same segments and cannot be compared"
+        )
+    return {"job_id": job_id, "baseline_job_id": baseline_job_id, **result}
+
+@router.post("/{job_id}/segments/metrics", response_model=SegmentSubsetMetrics)
+def get_segment_subset_metrics(
+    job_id: int,
+    subset: SegmentSubsetRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Corpus BLEU, chrF and COMET of a subset of a job's segments, recomputed from the job's segment
+    store without reading the output or reference text again
+    """
+    job = crud_evaluation.get(db, job_id=job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Evaluation job not found"
+        )
+    
+    store = segment_store.load(job_output_file(job, subset.model_type))
+    if store is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No segment statistics stored for the {subset.model_type} output of this job"
+        )
+    try:
+        metrics = segment_store.corpus_metrics(store, subset.indices)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return SegmentSubsetMetrics(job_id=job_id, model_type=subset.model_type, total_segments=store.segments, **metrics)
+
+@router.get("/{job_id}/segment-regressions", response_model=PaginatedSegmentRegressions)
+def list_segment_regressions(
+    job_id: int,
+    kind: str = segment_regressions.REGRESSION,
+    page: int = Query(1, ge=1),
+    size: int = Query(20, ge=1, le=200),
+    include_text: bool = True,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Page through a job's largest segment-level regressions (or improvements) against the previous
+    model version's run of the same testset, largest change first
+    """
+    if kind not in (segment_regressions.REGRESSION, segment_regressions.IMPROVEMENT):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="kind must be either 'regression' or 'improvement'"
+        )
+    job = crud_evaluation.get(db, job_id=job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Evaluation job not found"
+        )
+    # A coalesced job shares its leader's output and comparison
+    if job.coalesced_into_job_id:
+        job = crud_evaluation.get(db, job_id=job.coalesced_into_job_id) or job
+    
+    summary = parse_json_column(job.segment_regression_summary, "segment_regression_summary")
+    query = db.query(SegmentRegression).filter(SegmentRegression.job_id == job.job_id, SegmentRegression.kind == kind)
+    total = query.count()
+    rows = query.order_by(SegmentRegression.rank).offset((page - 1) * size).limit(size).all()
+    items = [SegmentRegressionItem.model_validate(row) for row in rows]
+    
+    if include_text and items:
+        previous = crud_evaluation.get(db, job_id=summary["previous_job_id"]) if summary else None
+        testset = crud_testset.get_testset(db, testset_id=job.testset_id)
+        indices = [item.segment_index for item in items]
+        texts = {
+            "source": segment_index.segment_texts(testset.source_file_path_on_server if testset else None, indices),
+            "reference": segment_index.segment_texts(testset.target_file_path_on_server if testset else None, indices),
+            "output": segment_regressions.segment_lines(job.output_file_path, indices),
+            "previous_output": segment_regressions.segment_lines(previous.output_file_path if previous else None, indices)
+        }
+        for item in items:
+            for field, lines in texts.items():
+                setattr(item, field, lines.get(item.segment_index))
+    
+    return PaginatedSegmentRegressions(
+        job_id=job_id,
+        previous_job_id=summary.get("previous_job_id") if summary else None,
+        summary=summary,
+        items=items,
+        total=total,
+        page=page,
+        size=size,
+        pages=math.ceil(total / size) if total else 0
+    )
+
 @router.get("/", response_model=PaginatedEvaluationJobs)
 def list_evaluation_jobs(
     db: Session = Depends(get_db),
@@ -328,6 +1082,7 @@ def list_evaluation_jobs(
                 "status": job.status,
                 "bleu_score": job.bleu_score,
                 "comet_score": job.comet_score,
+                "chrf_score": job.chrf_score,
                 "output_file_path": job.output_file_path,
                 "log_message": job.log_message,
                 "auto_add_to_details_requested": bool(job.auto_add_to_details_requested),
@@ -338,7 +1093,16 @@ def list_evaluation_jobs(
                 "mode_type": job.mode_type,
                 "sub_mode_type": job.sub_mode_type,
                 "custom_params": job.custom_params,
-                "evaluation_model_type": job.evaluation_model_type
+                "evaluation_model_type": job.evaluation_model_type,
+                "stage_timings": parse_json_column(job.stage_timings, "stage_timings"),
+                "priority": job.priority,
+                "coalesced_into_job_id": job.coalesced_into_job_id,
+                "sample_size": job.sample_size,
+                "sample_result": parse_json_column(job.sample_result, "sample_result"),
+                "reuse_translations_from_job_id": job.reuse_translations_from_job_id,
+                "significance": parse_json_column(job.significance, "significance"),
+                "segment_regression_summary": parse_json_column(job.segment_regression_summary, "segment_regression_summary"),
+                "rescored_at": job.rescored_at
             }
             
             # Parse base_model_result if it exists
@@ -426,15 +1190,24 @@ def download_output_file(
                 detail="Finetuned model output file not found"
             )
     
-    if not os.path.exists(file_path):
+    stored_path = output_files.resolve(file_path)
+    if not stored_path:
         logger.warning(f"Download request failed: {model_type} model output file does not exist on disk for job {job_id}")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Output file does not exist on disk"
         )
+    retention.record_access(file_path)
     
+    if output_files.is_compressed(stored_path):
+        # Compressed by the retention service: decompressed while streaming
+        return StreamingResponse(
+            output_files.iter_bytes(file_path),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
     return FileResponse(
-        path=file_path,
+        path=stored_path,
         filename=filename,
         media_type="application/octet-stream"
     )
@@ -487,21 +1260,22 @@ def get_output_content(
                 detail="Finetuned model output file not found"
             )
     
-    if not os.path.exists(file_path):
+    if not output_files.exists(file_path):
         logger.warning(f"Content request failed: {model_type} model output file does not exist on disk for job {job_id}")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Output file does not exist on disk"
         )
+    retention.record_access(file_path)
     
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
+        with output_files.open_text(file_path, encoding="utf-8", errors="strict") as file:
             content = file.read()
         return {"content": content, "model_type": model_type}
     except UnicodeDecodeError:
         # Try with different encoding if UTF-8 fails
         try:
-            with open(file_path, "r", encoding="latin-1") as file:
+            with output_files.open_text(file_path, encoding="latin-1", errors="strict") as file:
                 content = file.read()
             return {"content": content, "model_type": model_type}
         except Exception as e:
@@ -519,6 +1293,105 @@ def get_output_content(
             detail="Error reading file content"
         )
 
+def engine_log_job_id(job) -> int:
+    """
+    Job whose engine log holds a job's engine output: the job it was coalesced into, or the leader of its
+    shared matrix engine run
+    """
+    if job.coalesced_into_job_id:
+        return job.coalesced_into_job_id
+    shared_engine = (parse_json_column(job.stage_timings, "stage_timings") or {}).get("shared_engine") or {}
+    return shared_engine.get("leader_job_id") or job.job_id
+
+def parse_log_range(header: str, log_size: int) -> Optional[tuple]:
+    """
+    [start, end) of a single "bytes=" range (RFC 9110), None if unsatisfiable
+    """
+    unit, _, spec = header.partition("=")
+    first, dash, last = spec.strip().partition("-")
+    if unit.strip() != "bytes" or not dash or "," in spec or not (first.isdigit() or last.isdigit()):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only a single bytes range is supported"
+        )
+    if not first:
+        start, end = max(log_size - int(last), 0), log_size
+    else:
+        start, end = int(first), min(int(last) + 1, log_size) if last.isdigit() else log_size
+    return (start, end) if start < end else None
+
+@router.get("/{job_id}/logs")
+def get_engine_logs(
+    job_id: int,
+    tail: Optional[int] = Query(None, ge=1, le=100000, description="Only the last N lines"),
+    start: Optional[int] = Query(None, ge=0, description="First byte of the uncompressed log"),
+    end: Optional[int] = Query(None, ge=0, description="Byte after the last one to read"),
+    follow: bool = False,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Engine stdout/stderr of a job as plain text, read from its compressed engine log. Select the part with
+    tail=N lines, start/end byte offsets or a Range header (answered with 206); X-Log-Size is the current
+    length of the log, to continue from. One response carries at most ENGINE_LOG_MAX_READ_BYTES. With
+    follow=true the selected part is streamed, then new output as the engine writes it until the job ends.
+    """
+    job = crud_evaluation.get(db, job_id=job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Evaluation job not found"
+        )
+    log_job_id = engine_log_job_id(job)
+    path = engine_logs.log_path(log_job_id)
+    log_size = engine_logs.size(path)
+    if not log_size and job.status in scheduler.TERMINAL_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Evaluation job has no engine log"
+        )
+    
+    partial = None
+    if range_header:
+        partial = parse_log_range(range_header, log_size)
+        if partial is None:
+            return Response(status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE, headers={"Content-Range": f"bytes */{log_size}"})
+        start, end = partial
+    elif tail is not None:
+        start, end = engine_logs.tail_start(path, tail), log_size
+    else:
+        start = min(start or 0, log_size)
+        end = log_size if end is None else min(max(end, start), log_size)
+    
+    headers = {"X-Log-Size": str(log_size), "X-Log-Job-Id": str(log_job_id), "Accept-Ranges": "bytes"}
+    if follow:
+        def is_running() -> bool:
+            session = SessionLocal()
+            try:
+                log_job = crud_evaluation.get(session, job_id=log_job_id)
+                return bool(log_job) and log_job.status not in scheduler.TERMINAL_STATUSES
+            finally:
+                session.close()
+        # The request session would otherwise hold a pooled connection for as long as the client keeps reading
+        db.close()
+        return StreamingResponse(
+            engine_logs.follow(path, start, is_running),
+            media_type="text/plain; charset=utf-8",
+            headers={**headers, "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    end = min(end, start + settings.ENGINE_LOG_MAX_READ_BYTES)
+    content = engine_logs.read_range(path, start, end)
+    if partial is not None:
+        headers["Content-Range"] = f"bytes {start}-{start + len(content) - 1}/{log_size}"
+    return Response(
+        content=content,
+        status_code=status.HTTP_206_PARTIAL_CONTENT if partial is not None else status.HTTP_200_OK,
+        media_type="text/plain; charset=utf-8",
+        headers=headers
+    )
+
 @router.get("/debug-job/{job_id}")
 def debug_job_data(
     job_id: int,
@@ -548,69 +1421,26 @@ def bulk_delete_jobs(
     current_user: User = Depends(get_current_admin_user)
 ) -> Any:
     """
-    Delete multiple evaluation jobs by job IDs (admin only)
+    Delete multiple evaluation jobs by job IDs (admin only).
+    Their files are removed in the background, follow the returned gc_id for progress.
     """
-    logger.info(f"Bulk delete request received: job_ids={request.job_ids}, user_id={current_user.user_id}")
-    
-    deleted_count = 0
-    failed_deletions = []
+    logger.info(f"Bulk delete request received: {len(request.job_ids)} job_ids, user_id={current_user.user_id}")
     
     try:
-        for job_id in request.job_ids:
-            try:
-                # Get job details first
-                job = crud_evaluation.get_with_details(db, job_id=job_id)
-                if not job:
-                    failed_deletions.append({
-                        "job_id": job_id,
-                        "error": "Job not found"
-                    })
-                    continue
-                
-                # Delete associated files
-                try:
-                    if job.get("output_file_path") and os.path.exists(job["output_file_path"]):
-                        os.remove(job["output_file_path"])
-                        logger.info(f"Deleted output file: {job['output_file_path']}")
-                    # Delete base model output file if exists
-                    if job.get("base_model_result"):
-                        try:
-                            base_model_result = json.loads(job["base_model_result"])
-                            base_output_path = base_model_result.get("output_file_path")
-                            if base_output_path and os.path.exists(base_output_path):
-                                os.remove(base_output_path)
-                                logger.info(f"Deleted base model output file: {base_output_path}")
-                        except (json.JSONDecodeError, TypeError):
-                            pass
-                    # Delete temp evaluation folders if exist
-                    temp_eval_folder1 = os.path.join(settings.DOCKER_VOLUME_TMP_PATH_HOST, "evaluation_temp", f"evaluation_{job_id}")
-                    temp_eval_folder2 = os.path.join(settings.DOCKER_VOLUME_TMP_PATH_HOST, "eval_temp", f"eval_{job_id}")
-                    for temp_folder in [temp_eval_folder1, temp_eval_folder2]:
-                        if os.path.exists(temp_folder):
-                            try:
-                                shutil.rmtree(temp_folder)
-                                logger.info(f"Deleted temp evaluation folder: {temp_folder}")
-                            except Exception as e:
-                                logger.warning(f"Failed to delete temp folder {temp_folder} for job {job_id}: {str(e)}")
-                except Exception as e:
-                    logger.warning(f"Failed to delete files for job {job_id}: {str(e)}")
-                
-                # Delete job from database
-                crud_evaluation.remove(db, job_id=job_id)
-                deleted_count += 1
-                logger.info(f"Successfully deleted job {job_id}")
-                
-            except Exception as e:
-                logger.error(f"Failed to delete job {job_id}: {str(e)}")
-                failed_deletions.append({
-                    "job_id": job_id,
-                    "error": str(e)
-                })
+        deleted = crud_evaluation.delete_many(db, job_ids=request.job_ids)
+        deleted_ids = {job["job_id"] for job in deleted}
+        failed_deletions = [
+            {"job_id": job_id, "error": "Job not found"}
+            for job_id in dict.fromkeys(request.job_ids) if job_id not in deleted_ids
+        ]
+        gc_handle = collect_job_files(deleted)
         
         return DeleteResponse(
-            deleted_count=deleted_count,
-            message=f"Successfully deleted {deleted_count} jobs",
-            failed_deletions=failed_deletions if failed_deletions else None
+            deleted_count=len(deleted),
+            message=f"Successfully deleted {len(deleted)} jobs",
+            failed_deletions=failed_deletions if failed_deletions else None,
+            tombstones=gc_handle["total"],
+            gc_id=gc_handle["gc_id"]
         )
     except Exception as e:
         logger.error(f"Error bulk deleting jobs: {str(e)}")
@@ -627,7 +1457,8 @@ def date_range_delete_jobs(
     current_user: User = Depends(get_current_admin_user)
 ) -> Any:
     """
-    Delete evaluation jobs within a specified date range (admin only)
+    Delete evaluation jobs within a specified date range (admin only).
+    Their files are removed in the background, follow the returned gc_id for progress.
     """
     logger.info(f"Date range delete request received: start_date={request.start_date}, end_date={request.end_date}, version_id={request.version_id}, status={request.status}, user_id={current_user.user_id}")
     
@@ -642,68 +1473,24 @@ def date_range_delete_jobs(
                 detail=f"Invalid status value. Must be one of: {', '.join([s.value for s in EvaluationStatus])}"
             )
     
-    deleted_count = 0
-    failed_deletions = []
-    
     try:
-        # Get jobs matching criteria
-        jobs = crud_evaluation.get_by_date_range(
+        job_ids = crud_evaluation.get_ids_by_date_range(
             db=db,
             start_date=request.start_date,
             end_date=request.end_date,
             version_id=request.version_id,
             status=status_enum
         )
-        logger.info(f"Found {len(jobs)} jobs to delete in date range")
+        logger.info(f"Found {len(job_ids)} jobs to delete in date range")
         
-        for job in jobs:
-            try:
-                job_id = job.job_id
-                
-                # Delete associated files
-                try:
-                    if job.output_file_path and os.path.exists(job.output_file_path):
-                        os.remove(job.output_file_path)
-                        logger.info(f"Deleted output file: {job.output_file_path}")
-                    # Delete base model output file if exists
-                    if hasattr(job, 'base_model_result') and job.base_model_result:
-                        try:
-                            base_model_result = json.loads(job.base_model_result)
-                            base_output_path = base_model_result.get("output_file_path")
-                            if base_output_path and os.path.exists(base_output_path):
-                                os.remove(base_output_path)
-                                logger.info(f"Deleted base model output file: {base_output_path}")
-                        except (json.JSONDecodeError, TypeError):
-                            pass
-                    # Delete temp evaluation folders if exist
-                    temp_eval_folder1 = os.path.join(settings.DOCKER_VOLUME_TMP_PATH_HOST, "evaluation_temp", f"evaluation_{job_id}")
-                    temp_eval_folder2 = os.path.join(settings.DOCKER_VOLUME_TMP_PATH_HOST, "eval_temp", f"eval_{job_id}")
-                    for temp_folder in [temp_eval_folder1, temp_eval_folder2]:
-                        if os.path.exists(temp_folder):
-                            try:
-                                shutil.rmtree(temp_folder)
-                                logger.info(f"Deleted temp evaluation folder: {temp_folder}")
-                            except Exception as e:
-                                logger.warning(f"Failed to delete temp folder {temp_folder} for job {job_id}: {str(e)}")
-                except Exception as e:
-                    logger.warning(f"Failed to delete files for job {job_id}: {str(e)}")
-                
-                # Delete job from database
-                crud_evaluation.remove(db, job_id=job_id)
-                deleted_count += 1
-                logger.info(f"Successfully deleted job {job_id}")
-                
-            except Exception as e:
-                logger.error(f"Failed to delete job {job.job_id}: {str(e)}")
-                failed_deletions.append({
-                    "job_id": job.job_id,
-                    "error": str(e)
-                })
+        deleted = crud_evaluation.delete_many(db, job_ids=job_ids)
+        gc_handle = collect_job_files(deleted)
         
         return DeleteResponse(
-            deleted_count=deleted_count,
-            message=f"Successfully deleted {deleted_count} jobs from date range",
-            failed_deletions=failed_deletions if failed_deletions else None
+            deleted_count=len(deleted),
+            message=f"Successfully deleted {len(deleted)} jobs from date range",
+            tombstones=gc_handle["total"],
+            gc_id=gc_handle["gc_id"]
         )
     except Exception as e:
         logger.error(f"Error date range deleting jobs: {str(e)}")
@@ -711,4 +1498,115 @@ def date_range_delete_jobs(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error date range deleting jobs"
-        ) 
\ No newline at end of file
+        )
+
+def collect_job_files(deleted: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Queue the files of deleted jobs for background removal; a coalesced job's files belong to the job whose run it shared
+    """
+    paths = []
+    for job in deleted:
+        if job["files_shared"]:
+            # Still used by coalesced jobs that were not deleted
+            continue
+        if job["coalesced_into_job_id"]:
+            paths.extend(file_gc.job_paths(job["job_id"], None, None))
+        else:
+            paths.extend(file_gc.job_paths(job["job_id"], job["output_file_path"], job["base_model_result"]))
+    return file_gc.submit(paths)
+
+@router.get("/gc")
+def list_file_gc(
+    current_user: User = Depends(get_current_admin_user)
+) -> Any:
+    """
+    Recent file GC handles of deleted jobs, newest first (admin only)
+    """
+    return file_gc.list_handles()
+
+@router.get("/gc/{gc_id}")
+def get_file_gc(
+    gc_id: str,
+    current_user: User = Depends(get_current_admin_user)
+) -> Any:
+    """
+    Progress of the background file removal of a deletion (admin only)
+    """
+    handle = file_gc.status(gc_id)
+    if not handle:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File GC handle not found"
+        )
+    return handle
+
+@router.post("/rescore")
+def start_rescoring(
+    request: RescoringRequest,
+    current_user: User = Depends(get_current_admin_user)
+) -> Any:
+    """
+    Rescore all completed jobs whose outputs survive, in the background across a process pool (admin only).
+    Pass the run_id of a stopped run to resume it from its checkpoint.
+    """
+    logger.info(f"Rescoring request: metrics={request.metrics}, run_id={request.run_id}, user_id={current_user.user_id}")
+    unknown = set(request.metrics) - set(rescoring.METRICS)
+    if unknown or not request.metrics:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"metrics must be a non-empty subset of {', '.join(rescoring.METRICS)}"
+        )
+    try:
+        run_id = rescoring.start_background(
+            run_id=request.run_id,
+            metrics=request.metrics,
+            workers=request.workers,
+            batch_size=request.batch_size,
+            max_outputs_per_second=request.max_outputs_per_second
+        )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    return {"run_id": run_id, "checkpoint": rescoring.read_checkpoint(run_id)}
+
+@router.get("/rescore")
+def list_rescoring_runs(
+    current_user: User = Depends(get_current_admin_user)
+) -> Any:
+    """
+    Rescoring runs with their checkpointed progress, newest first (admin only)
+    """
+    return rescoring.list_checkpoints()
+
+@router.get("/rescore/{run_id}")
+def get_rescoring_run(
+    run_id: str,
+    current_user: User = Depends(get_current_admin_user)
+) -> Any:
+    """
+    Checkpointed progress of a rescoring run (admin only)
+    """
+    checkpoint = rescoring.read_checkpoint(run_id)
+    if not checkpoint:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Rescoring run not found"
+        )
+    return checkpoint
+
+@router.post("/rescore/{run_id}/stop")
+def stop_rescoring_run(
+    run_id: str,
+    current_user: User = Depends(get_current_admin_user)
+) -> Any:
+    """
+    Stop a rescoring run after its current batch; it can be resumed later (admin only)
+    """
+    if not rescoring.stop(run_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Rescoring run is not running in this server process"
+        )
+    return {"run_id": run_id, "stopping": True}
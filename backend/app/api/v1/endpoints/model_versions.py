@@ -8,6 +8,7 @@ from app.schemas.model_version import ModelVersion, ModelVersionCreate, ModelVer
 from app.db.models import User
 from app.core.config import settings
 import math
+from datetime import datetime
 
 router = APIRouter()
 
@@ -516,7 +517,6 @@ def export_model_versions(
     if format.lower() == "excel":
         import pandas as pd
         import io
-        from datetime import datetime
         
         # Create Excel file in memory
         output = io.BytesIO()
@@ -3,10 +3,14 @@ import logging
 from typing import Dict, Any
 from pathlib import Path
 from fastapi import APIRouter, Depends, HTTPException, status
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
-from app.core.deps import get_current_active_user, get_db
+from app.core.deps import get_current_active_user, get_current_admin_user, get_db
+from app.core.config import settings
+from app.core import scheduler, retention, translation_cache, engine_runtime, engine_placement
+from app.crud import crud_evaluation_worker
 from ....schemas.user import User
 
 logger = logging.getLogger(__name__)
@@ -219,6 +223,15 @@ async def get_system_status(
             models.EvaluationJob.status.in_(active_statuses)
         ).count()
         
+        # Evaluation worker pool capacity
+        online_workers = crud_evaluation_worker.get_multi(db, online_only=True)
+        total_slots = sum(worker.capacity for worker in online_workers)
+        busy_slots = sum(min(worker.active_jobs, worker.capacity) for worker in online_workers)
+        
+        # Engine runtime (cached daemon health, see app/core/engine_runtime.py)
+        runtime_health = await run_in_threadpool(engine_runtime.get().health)
+        placement = engine_placement.status()
+        
         # API Server status (if we reach this point, API is working)
         api_status = "online"
         api_message = "Online and healthy"
@@ -236,6 +249,23 @@ async def get_system_status(
                 "active_evaluations": active_evaluations,
                 "message": f"{active_evaluations} running" if active_evaluations > 0 else "No active evaluations"
             },
+            "evaluation_workers": {
+                "online": len(online_workers),
+                "total_slots": total_slots,
+                "busy_slots": busy_slots,
+                "message": f"{len(online_workers)} worker(s), {busy_slots}/{total_slots} slots busy" if online_workers else "No evaluation workers online"
+            },
+            "engine_runtime": {
+                "status": "online" if runtime_health["available"] else "error",
+                "runtime": runtime_health["runtime"],
+                "version": runtime_health["version"],
+                "checked_at": runtime_health["checked_at"],
+                "message": f"Docker {runtime_health['version']}" if runtime_health["available"] else f"Unavailable: {runtime_health['error']}"
+            },
+            "engine_placement": {
+                **placement,
+                "message": f"{placement['busy_slots']}/{placement['total_slots']} engine slots busy" if placement["enabled"] else "Engine placement disabled"
+            },
             "storage_health": {
                 "status": "healthy",
                 "message": "All storage paths accessible"
@@ -310,4 +340,82 @@ async def get_active_evaluations(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get active evaluations: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+@router.get("/workers")
+async def get_evaluation_workers(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    List evaluation workers with their capacity, labels and last heartbeat.
+    """
+    try:
+        workers = [scheduler.describe_worker(worker) for worker in crud_evaluation_worker.get_multi(db)]
+        online = [worker for worker in workers if worker["status"] == "online"]
+        return {
+            "workers": workers,
+            "online_count": len(online),
+            "total_slots": sum(worker["capacity"] for worker in online),
+            "free_slots": sum(worker["free_slots"] for worker in online)
+        }
+    except Exception as e:
+        logger.error(f"Error getting evaluation workers: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get evaluation workers: {str(e)}"
+        )
+
+@router.get("/retention")
+async def get_retention_status(
+    current_user: User = Depends(get_current_active_user)
+) -> Dict[str, Any]:
+    """
+    Retention policy of evaluation outputs and the report of its last pass.
+    """
+    return {
+        "enabled": settings.RETENTION_ENABLED,
+        "policy": {
+            "interval_minutes": settings.RETENTION_INTERVAL_MINUTES,
+            "compress_after_days": settings.RETENTION_COMPRESS_AFTER_DAYS,
+            "disk_high_watermark": settings.RETENTION_DISK_HIGH_WATERMARK,
+            "disk_low_watermark": settings.RETENTION_DISK_LOW_WATERMARK,
+            "max_bytes": settings.RETENTION_MAX_BYTES or None,
+            "evict_min_idle_hours": settings.RETENTION_EVICT_MIN_IDLE_HOURS
+        },
+        "last_run": retention.last_report()
+    }
+
+@router.post("/retention/run")
+def run_retention(
+    current_user: User = Depends(get_current_admin_user)
+) -> Dict[str, Any]:
+    """
+    Run a retention pass now (admin only).
+    """
+    try:
+        return retention.run_once()
+    except Exception as e:
+        logger.error(f"Error running retention pass: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to run retention pass: {str(e)}"
+        )
+
+@router.get("/translation-cache")
+async def get_translation_cache_status(
+    current_user: User = Depends(get_current_active_user)
+) -> Dict[str, Any]:
+    """
+    Size, hit ratio and evictions of the direct translation cache.
+    """
+    return translation_cache.stats()
+
+@router.delete("/translation-cache")
+def clear_translation_cache(
+    current_user: User = Depends(get_current_admin_user)
+) -> Dict[str, Any]:
+    """
+    Drop all cached direct translations (admin only).
+    """
+    return {"removed": translation_cache.clear()}
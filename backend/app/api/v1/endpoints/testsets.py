@@ -1,4 +1,5 @@
 from typing import Any, List, Optional
+import io
 import os
 import shutil
 import logging
@@ -6,14 +7,17 @@ from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File,
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from app.core.deps import get_db, get_current_release_manager_user, get_current_active_user
+from app.core.deps import get_db, get_current_release_manager_user, get_current_active_user, get_current_admin_user
 from app.crud import crud_testset
-from app.schemas.testset import Testset, TestsetCreate, TestsetUpdate, PaginatedTestsets
+from app.schemas.testset import Testset, TestsetCreate, TestsetUpdate, TestsetPatch, PaginatedTestsets
 from app.db.models import User
 from app.core.config import settings
+from app.core import testset_ingest, segment_index, testset_patch
 import json
 import math
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 @router.get("/", response_model=PaginatedTestsets)
@@ -111,18 +115,7 @@ async def create_testset(
         testset = crud_testset.create_testset(db, testset_in)
         
         # Process uploaded files if provided
-        file_update = {}
-        if source_file:
-            source_filename, source_path = crud_testset.save_uploaded_file(source_file, testset.testset_id, "source")
-            file_update["source_file_name"] = source_filename
-            file_update["source_file_path_on_server"] = source_path
-            file_update["source_file_path"] = source_path  # Keep for backward compatibility
-            
-        if target_file:
-            target_filename, target_path = crud_testset.save_uploaded_file(target_file, testset.testset_id, "target")
-            file_update["target_file_name"] = target_filename
-            file_update["target_file_path_on_server"] = target_path
-            file_update["target_file_path"] = target_path  # Keep for backward compatibility
+        file_update = ingest_uploaded_files(db, testset, source_file, target_file, remove_testset_on_error=True)
             
         # Update the testset with file information if files were uploaded
         if file_update:
@@ -197,32 +190,7 @@ async def update_testset(
         testset = crud_testset.update_testset(db, testset_id=testset_id, testset=update_data)
     
     # Process uploaded files if provided
-    file_update = {}
-    if source_file:
-        # Remove old file if exists
-        if testset.source_file_path_on_server and os.path.exists(testset.source_file_path_on_server):
-            try:
-                os.remove(testset.source_file_path_on_server)
-            except Exception as e:
-                print(f"Error removing old source file: {str(e)}")
-                
-        source_filename, source_path = crud_testset.save_uploaded_file(source_file, testset.testset_id, "source")
-        file_update["source_file_name"] = source_filename
-        file_update["source_file_path_on_server"] = source_path
-        file_update["source_file_path"] = source_path  # Keep for backward compatibility
-        
-    if target_file:
-        # Remove old file if exists
-        if testset.target_file_path_on_server and os.path.exists(testset.target_file_path_on_server):
-            try:
-                os.remove(testset.target_file_path_on_server)
-            except Exception as e:
-                print(f"Error removing old target file: {str(e)}")
-                
-        target_filename, target_path = crud_testset.save_uploaded_file(target_file, testset.testset_id, "target")
-        file_update["target_file_name"] = target_filename
-        file_update["target_file_path_on_server"] = target_path
-        file_update["target_file_path"] = target_path  # Keep for backward compatibility
+    file_update = ingest_uploaded_files(db, testset, source_file, target_file)
         
     # Update the testset with file information if files were uploaded
     if file_update:
@@ -230,6 +198,62 @@ async def update_testset(
         
     return testset
 
+def ingest_uploaded_files(
+    db: Session,
+    testset: Any,
+    source_file: Optional[UploadFile],
+    target_file: Optional[UploadFile],
+    remove_testset_on_error: bool = False
+) -> dict:
+    """
+    Ingest uploaded source/target files, check their line counts against each other (or the file that
+    is kept) and move them into place, replacing the old ones; returns the testset fields to update.
+    Unusable uploads leave the testset's files untouched and raise 400.
+    """
+    staged = {}
+    try:
+        for file_type, upload in (("source", source_file), ("target", target_file)):
+            if upload:
+                staged[file_type] = crud_testset.save_uploaded_file(upload, testset.testset_id, file_type)
+        if not staged:
+            return {}
+        file_update = testset_ingest.stats_update(
+            testset,
+            source=staged["source"][1] if "source" in staged else None,
+            target=staged["target"][1] if "target" in staged else None
+        )
+    except testset_ingest.IngestError as e:
+        for _, ingested in staged.values():
+            testset_ingest.discard(ingested)
+        if remove_testset_on_error:
+            crud_testset.delete_testset(db, testset_id=testset.testset_id)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid testset file: {str(e)}"
+        )
+    
+    for file_type, (filename, ingested) in staged.items():
+        # Remove old file if it was stored under another name
+        old_path = getattr(testset, f"{file_type}_file_path_on_server")
+        if old_path and old_path != ingested.path and os.path.exists(old_path):
+            try:
+                os.remove(old_path)
+                testset_ingest.remove_index(old_path)
+            except Exception as e:
+                logger.warning(f"Error removing old {file_type} file: {str(e)}")
+        testset_ingest.commit(ingested)
+        testset_patch.remove_history(old_path)
+        testset_patch.remove_history(ingested.path)
+        file_update[f"{file_type}_file_name"] = filename
+        file_update[f"{file_type}_file_path_on_server"] = ingested.path
+        file_update[f"{file_type}_file_path"] = ingested.path  # Keep for backward compatibility
+        logger.info(
+            f"Testset {testset.testset_id}: ingested {file_type} file {filename} ({ingested.stats['lines']} lines, "
+            f"{ingested.stats['encoding']}, {ingested.stats['nfc_changed_lines']} lines NFC-normalized)"
+        )
+        segment_index.submit(testset.testset_id, file_type, ingested.path)
+    return file_update
+
 @router.get("/{testset_id}/files/{file_type}", response_class=Response)
 def download_testset_file(
     testset_id: int,
@@ -381,15 +405,20 @@ def get_testset_file_content(
         with open(file_path, "r", encoding="utf-8") as file:
             content = file.read()
         
-        # Count lines for UI display
-        lines_count = len(content.splitlines())
+        # Count lines for UI display (known from ingest for normalized files)
+        if testset_ingest.is_normalized(testset, file_type):
+            lines_count = testset_ingest.testset_stats(testset)[file_type]["lines"]
+        else:
+            lines_count = len(content.splitlines())
         
         return {
             "content": content,
             "filename": filename,
             "file_type": file_type,
             "lines_count": lines_count,
-            "size_bytes": len(content.encode('utf-8'))
+            "size_bytes": len(content.encode('utf-8')),
+            # base_revision for PATCH /content/{file_type}
+            "revision": testset_patch.revision(testset, file_type)
         }
     except UnicodeDecodeError:
         # Try with different encoding if UTF-8 fails
@@ -478,50 +507,160 @@ def update_testset_file_content(
         filename = testset.target_file_name
     
     try:
-        # Create backup of original file
-        import shutil
-        backup_path = f"{file_path}.backup"
-        shutil.copy2(file_path, backup_path)
-        
-        # Write new content
-        with open(file_path, "w", encoding="utf-8") as file:
-            file.write(new_content)
+        # Write new content through ingest, so it is normalized and indexed like an upload; it goes to a
+        # temp file renamed over the old one, so a failed write leaves the old content in place
+        ingested = testset_ingest.ingest(io.BytesIO(new_content.encode('utf-8')), file_path)
+        # A full rewrite continues the revision numbering but can not be undone through deltas
+        ingested.stats["revision"] = testset_patch.revision(testset, file_type) + 1
+        # Edits are saved one file at a time, so a line count mismatch is reported, not rejected
+        file_update = testset_ingest.stats_update(testset, check=False, **{file_type: ingested})
+        testset_ingest.commit(ingested)
+        testset_patch.remove_history(file_path)
+        crud_testset.update_testset(db, testset_id=testset_id, testset=file_update)
+        segment_index.submit(testset_id, file_type, file_path)
         
         # Log the update
-        import logging
-        logger = logging.getLogger(__name__)
         logger.info(f"User {current_user.username} updated {file_type} file content for testset {testset_id} ({filename})")
         
         # Return updated file info
-        lines_count = len(new_content.splitlines())
-        return {
+        response = {
             "success": True,
             "message": f"{file_type.capitalize()} file content updated successfully",
             "filename": filename,
             "file_type": file_type,
-            "lines_count": lines_count,
-            "size_bytes": len(new_content.encode('utf-8'))
+            "lines_count": ingested.stats["lines"],
+            "size_bytes": ingested.stats["bytes"],
+            "revision": ingested.stats["revision"]
         }
+        warning = line_count_warning(testset)
+        if warning:
+            response["warning"] = warning
+        return response
         
+    except testset_ingest.IngestError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid file content: {str(e)}"
+        )
     except Exception as e:
-        # Restore from backup if write failed
-        try:
-            if os.path.exists(backup_path):
-                shutil.copy2(backup_path, file_path)
-        except:
-            pass
-        
+        # The old content is untouched until the rename; only a partial temp file can be left
+        if os.path.exists(file_path + ".tmp"):
+            os.remove(file_path + ".tmp")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error updating file content: {str(e)}"
         )
-    finally:
-        # Clean up backup file
-        try:
-            if os.path.exists(backup_path):
-                os.remove(backup_path)
-        except:
-            pass
+
+def line_count_warning(testset: Any) -> Optional[str]:
+    """
+    Why source and target of a testset no longer line up, None when they do
+    """
+    try:
+        testset_ingest.check_line_counts(*(testset_ingest.testset_stats(testset).get(name) for name in ("source", "target")))
+    except testset_ingest.IngestError as e:
+        return str(e)
+    return None
+
+def get_patchable_testset(db: Session, testset_id: int, file_type: str) -> Any:
+    if file_type not in segment_index.FILE_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid file type. Must be one of: {', '.join(segment_index.FILE_TYPES)}"
+        )
+    testset = crud_testset.get_testset(db, testset_id=testset_id)
+    if not testset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Testset not found"
+        )
+    path = segment_index.file_path(testset, file_type)
+    if not path or not os.path.exists(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"{file_type.capitalize()} file not found"
+        )
+    return testset
+
+def store_patch_results(db: Session, testset: Any, file_type: str, results: List[testset_patch.PatchResult]) -> dict:
+    """
+    Save the statistics of patched file revisions on the testset and queue them for the segment index
+    """
+    latest = results[-1].ingested
+    crud_testset.update_testset(db, testset_id=testset.testset_id, testset=testset_ingest.stats_update(testset, check=False, **{file_type: latest}))
+    for result in results:
+        segment_index.submit(testset.testset_id, file_type, latest.path, result.plan, result.old_lines)
+    response = {
+        "success": True,
+        "file_type": file_type,
+        "revision": results[-1].revision,
+        "changed_lines": sum(result.changed_lines for result in results),
+        "lines_count": latest.stats["lines"],
+        "size_bytes": latest.stats["bytes"]
+    }
+    warning = line_count_warning(testset)
+    if warning:
+        response["warning"] = warning
+    return response
+
+@router.patch("/{testset_id}/content/{file_type}")
+def patch_testset_file_content(
+    testset_id: int,
+    file_type: str,
+    patch: TestsetPatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_release_manager_user)
+) -> Any:
+    """
+    Apply line-range edits (replace/insert/delete) to a testset file without sending the whole file.
+    Positions refer to the file at base_revision; 409 if the file has changed since.
+    """
+    testset = get_patchable_testset(db, testset_id, file_type)
+    try:
+        result = testset_patch.apply(testset, file_type, patch.edits, base_revision=patch.base_revision, username=current_user.username)
+    except testset_patch.RevisionConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except (testset_patch.PatchError, testset_ingest.IngestError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid patch: {str(e)}")
+    logger.info(f"User {current_user.username} patched {file_type} file of testset {testset_id} to revision {result.revision}")
+    return store_patch_results(db, testset, file_type, [result])
+
+@router.get("/{testset_id}/content/{file_type}/history")
+def get_testset_file_history(
+    testset_id: int,
+    file_type: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Revisions of a testset file that can be undone, newest first
+    """
+    testset = get_patchable_testset(db, testset_id, file_type)
+    return {
+        "file_type": file_type,
+        "revision": testset_patch.revision(testset, file_type),
+        "deltas": testset_patch.history(segment_index.file_path(testset, file_type))
+    }
+
+@router.post("/{testset_id}/content/{file_type}/undo")
+def undo_testset_file_patches(
+    testset_id: int,
+    file_type: str,
+    to_revision: int = Query(..., ge=0, description="Revision to go back to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_release_manager_user)
+) -> Any:
+    """
+    Revert a testset file to an earlier revision by applying the stored deltas backwards
+    """
+    testset = get_patchable_testset(db, testset_id, file_type)
+    if to_revision == testset_patch.revision(testset, file_type):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File is already at that revision")
+    try:
+        results = testset_patch.undo(testset, file_type, to_revision)
+    except (testset_patch.PatchError, testset_ingest.IngestError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    logger.info(f"User {current_user.username} reverted {file_type} file of testset {testset_id} to revision {to_revision}")
+    return store_patch_results(db, testset, file_type, results)
 
 @router.get("/{testset_id}/reference-content")
 def get_reference_file_content(
@@ -566,4 +705,138 @@ def get_reference_file_content(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error reading file content: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+def get_indexed_testset(db: Session, testset_id: int, file_types: List[str]) -> Any:
+    """
+    Testset with its file_types files in the segment index (404 if it does not exist)
+    """
+    for file_type in file_types:
+        if file_type not in segment_index.FILE_TYPES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid file type. Must be one of: {', '.join(segment_index.FILE_TYPES)}"
+            )
+    testset = crud_testset.get_testset(db, testset_id=testset_id)
+    if not testset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Testset not found"
+        )
+    for file_type in set(file_types):
+        segment_index.ensure_indexed(db, testset, file_type)
+    return testset
+
+@router.get("/{testset_id}/overlap")
+def get_testset_overlaps(
+    testset_id: int,
+    file_type: str = Query("source", description="File of this testset: 'source' or 'target'"),
+    other_file_type: Optional[str] = Query(None, description="File of the other testsets (defaults to file_type)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Every other testset sharing segments with this one (contamination check), from the global segment index.
+    Testsets uploaded before the index existed are only included after POST /testsets/segment-index/rebuild.
+    """
+    other_file_type = other_file_type or file_type
+    get_indexed_testset(db, testset_id, [file_type, other_file_type])
+    return segment_index.overlaps(db, testset_id, file_type, other_file_type)
+
+@router.get("/{testset_id}/overlap/{other_testset_id}")
+def get_testset_pair_overlap(
+    testset_id: int,
+    other_testset_id: int,
+    file_type: str = Query("source", description="File of this testset: 'source' or 'target'"),
+    other_file_type: Optional[str] = Query(None, description="File of the other testset (defaults to file_type)"),
+    limit: int = Query(100, ge=0, le=10000, description="Maximum number of matching segment pairs to return"),
+    include_text: bool = Query(False, description="Include the text of the returned segments"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Exact segment overlap between two testsets
+    """
+    other_file_type = other_file_type or file_type
+    testset = get_indexed_testset(db, testset_id, [file_type])
+    get_indexed_testset(db, other_testset_id, [other_file_type])
+    result = segment_index.pair_overlap(db, testset_id, other_testset_id, file_type, other_file_type, limit)
+    if include_text and result["pairs"]:
+        texts = segment_index.segment_texts(segment_index.file_path(testset, file_type), [pair["segment_index"] for pair in result["pairs"]])
+        for pair in result["pairs"]:
+            pair["text"] = texts.get(pair["segment_index"])
+    return result
+
+@router.get("/{testset_id}/duplicates")
+def get_testset_duplicates(
+    testset_id: int,
+    file_type: str = Query("source", description="'source' or 'target'"),
+    include_text: bool = Query(False, description="Include the duplicated text of each group"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Groups of identical segments within a testset file
+    """
+    testset = get_indexed_testset(db, testset_id, [file_type])
+    groups = [{"segment_indices": group} for group in segment_index.duplicates(db, testset_id, file_type)]
+    if include_text and groups:
+        texts = segment_index.segment_texts(segment_index.file_path(testset, file_type), [group["segment_indices"][0] for group in groups])
+        for group in groups:
+            group["text"] = texts.get(group["segment_indices"][0])
+    return {
+        "testset_id": testset_id,
+        "file_type": file_type,
+        "duplicate_groups": len(groups),
+        # Segments that repeat an earlier one
+        "redundant_segments": sum(len(group["segment_indices"]) - 1 for group in groups),
+        "groups": groups
+    }
+
+@router.get("/{testset_id}/near-duplicates")
+def get_testset_near_duplicates(
+    testset_id: int,
+    file_type: str = Query("source", description="'source' or 'target'"),
+    threshold: float = Query(0.8, ge=0.5, le=1.0, description="Minimum estimated Jaccard similarity of character shingles"),
+    across_testsets: bool = Query(False, description="Also match segments of every other indexed testset"),
+    limit: int = Query(100, ge=1, le=10000, description="Maximum number of clusters to return"),
+    include_text: bool = Query(False, description="Include the text of the clustered segments"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Clusters of near-duplicate segments (MinHash LSH) within a testset file or across testsets
+    """
+    get_indexed_testset(db, testset_id, [file_type])
+    clusters = segment_index.near_duplicates(db, testset_id, file_type, threshold, across_testsets=across_testsets)
+    returned = clusters[:limit]
+    if include_text and returned:
+        wanted: dict = {}
+        for cluster in returned:
+            for segment in cluster["segments"]:
+                wanted.setdefault(segment["testset_id"], set()).add(segment["segment_index"])
+        texts = {}
+        for member_id, indices in wanted.items():
+            member = crud_testset.get_testset(db, testset_id=member_id)
+            texts[member_id] = segment_index.segment_texts(segment_index.file_path(member, file_type), sorted(indices)) if member else {}
+        for cluster in returned:
+            for segment in cluster["segments"]:
+                segment["text"] = texts[segment["testset_id"]].get(segment["segment_index"])
+    return {
+        "testset_id": testset_id,
+        "file_type": file_type,
+        "threshold": threshold,
+        "across_testsets": across_testsets,
+        "total_clusters": len(clusters),
+        "clusters": returned
+    }
+
+@router.post("/segment-index/rebuild")
+def rebuild_segment_index(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+) -> Any:
+    """
+    Re-index the segments of every testset (admin only)
+    """
+    return segment_index.rebuild(db)
@@ -1,4 +1,5 @@
-from typing import Any, List, Optional
+import json
+from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func
@@ -9,6 +10,18 @@ from app.db.database import SessionLocal
 
 router = APIRouter()
 
+
+def significance_fields(raw: Optional[str], metric: str) -> Dict[str, Any]:
+    """
+    Finetuned vs base significance of one metric from a TrainingResult.significance column
+    (delta, ci, p_value, p_value_randomization, significant); empty when no test was run
+    """
+    try:
+        result = json.loads(raw) if raw else None
+    except (TypeError, ValueError):
+        return {}
+    return (result or {}).get(metric) or {}
+
 @router.get("/comparison")
 def get_comparison_data(
     db: Session = Depends(get_db),
@@ -85,12 +98,14 @@ def get_comparison_data(
             {
                 "metric": "BLEU",
                 "base_model": result.base_model_bleu if result.base_model_bleu is not None else None,
-                "finetuned_model": result.finetuned_model_bleu if result.finetuned_model_bleu is not None else None
+                "finetuned_model": result.finetuned_model_bleu if result.finetuned_model_bleu is not None else None,
+                **significance_fields(result.significance, "bleu")
             },
             {
                 "metric": "COMET",
                 "base_model": result.base_model_comet,
-                "finetuned_model": result.finetuned_model_comet
+                "finetuned_model": result.finetuned_model_comet,
+                **significance_fields(result.significance, "comet")
             }
         ]
 
@@ -179,6 +194,7 @@ def get_testset_comparison(
     
     results = (
         db.query(
+            Testset.testset_id,
             Testset.testset_name,
             func.avg(
                 TrainingResult.finetuned_model_bleu if metric == "bleu"
@@ -201,6 +217,13 @@ def get_testset_comparison(
             detail="No training results found for this version"
         )
     
+    # Finetuned vs base significance, where both scores came from the same evaluation
+    significance_by_testset = {
+        testset_id: raw
+        for testset_id, raw in db.query(TrainingResult.testset_id, TrainingResult.significance)
+            .filter(TrainingResult.version_id == version_id, TrainingResult.significance.isnot(None))
+    }
+    
     # Convert BLEU scores to 0-100 scale if needed
     scale_factor = 1
     
@@ -213,7 +236,8 @@ def get_testset_comparison(
             {
                 "testset_name": r.testset_name,
                 "finetuned_score": float(r.finetuned_score) * scale_factor if r.finetuned_score is not None else None,
-                "base_score": float(r.base_score) * scale_factor if r.base_score is not None else None
+                "base_score": float(r.base_score) * scale_factor if r.base_score is not None else None,
+                "significance": significance_fields(significance_by_testset.get(r.testset_id), metric) or None
             }
             for r in results
         ]
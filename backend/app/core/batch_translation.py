@@ -0,0 +1,428 @@
+import os
+import json
+import codecs
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core import cancellation, translation_cache
+from app.core.evaluation import build_engine_spec, run_engine_with_retries, fake_engine_translate_file
+from app.core.scheduler import TERMINAL_STATUSES
+from app.db.database import SessionLocal
+from app.db.models import TranslationBatch, ModelVersion, LanguagePair
+from app.schemas.evaluation import EvaluationStatus
+
+logger = logging.getLogger(__name__)
+
+# File-based direct translation. An uploaded document becomes a TranslationBatch row (no testset, no
+# EvaluationJob) that the evaluation workers claim like a job (app/core/scheduler.py). The worker walks the
+# source in blocks of BATCH_TRANSLATION_CHUNK_SEGMENTS lines: segments in the translation cache are taken
+# from it and the rest of the block goes through one engine run. The engine's output file is tailed while it
+# runs, so each translated line is appended to the output file (with the cached lines around it) as soon as
+# the engine writes it. translated_segments counts the leading output lines that are final, so readers can
+# stream them while the batch runs, and a batch requeued after a worker crash resumes right after them.
+
+BATCH_DIR = "translation_batches"
+SOURCE_FILE = "source.txt"
+OUTPUT_FILE = "output.txt"
+ENGINE_ATTEMPTS = 3
+ENGINE_RETRY_DELAY_SECONDS = 10
+_UPLOAD_READ_BYTES = 1024 * 1024
+# Idle SSE streams send a comment this often so proxies keep the connection open
+_SSE_KEEPALIVE_SECONDS = 15.0
+
+
+class BatchCancelled(Exception):
+    """The batch was cancelled while this process was translating it"""
+
+
+_cancel_events: Dict[int, threading.Event] = {}
+_events_lock = threading.Lock()
+
+
+def _cancel_event(batch_id: int) -> threading.Event:
+    with _events_lock:
+        event = _cancel_events.get(batch_id)
+        if event is None:
+            event = _cancel_events[batch_id] = threading.Event()
+        return event
+
+
+def batch_dir(batch_id: int) -> str:
+    return os.path.join(settings.DOCKER_VOLUME_TMP_PATH_HOST, BATCH_DIR, f"batch_{batch_id}")
+
+
+def container_name(batch_id: int) -> str:
+    return f"nmt-batch-{batch_id}"
+
+
+def request_cancel(batch_id: int) -> None:
+    """
+    Stop a batch running in this process: flag it and remove its engine container
+    """
+    event = _cancel_event(batch_id)
+    if event.is_set():
+        return
+    event.set()
+    if not settings.FAKE_EVALUATION_MODE:
+        cancellation.remove_container(container_name(batch_id))
+
+
+def forget(batch_id: int) -> None:
+    with _events_lock:
+        _cancel_events.pop(batch_id, None)
+
+
+def model_files(model_version: ModelVersion, model_type: str) -> Optional[Tuple[str, str]]:
+    """
+    (model file, hparams file) of the base or finetuned model, None if not uploaded
+    """
+    if model_type == "base":
+        files = (model_version.base_model_file_path_on_server, model_version.base_hparams_file_path_on_server)
+    else:
+        files = (model_version.model_file_path_on_server, model_version.hparams_file_path_on_server)
+    return files if all(files) else None
+
+
+async def save_upload(upload: UploadFile, path: str) -> int:
+    """
+    Stream an uploaded UTF-8 text file to path with LF line endings and a final newline; returns its line count.
+    Raises ValueError for an empty, oversized or non UTF-8 file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    size = 0
+    lines = 0
+    carry = ""
+    last = ""
+    with open(path, 'w', encoding='utf-8', newline='\n') as out:
+        while True:
+            data = await upload.read(_UPLOAD_READ_BYTES)
+            size += len(data)
+            if size > settings.BATCH_TRANSLATION_MAX_BYTES:
+                raise ValueError(f"File is larger than {settings.BATCH_TRANSLATION_MAX_BYTES} bytes")
+            try:
+                text = carry + decoder.decode(data, final=not data)
+            except UnicodeDecodeError as e:
+                raise ValueError(f"File is not valid UTF-8 text: {e}")
+            # A CR at the end of a read may be the first half of a CRLF
+            carry = text[-1:] if text.endswith("\r") and data else ""
+            text = (text[:-1] if carry else text).replace("\r\n", "\n").replace("\r", "\n")
+            if text:
+                out.write(text)
+                lines += text.count("\n")
+                last = text[-1]
+            if not data:
+                break
+        if not lines and not last:
+            raise ValueError("File is empty")
+        if last != "\n":
+            out.write("\n")
+            lines += 1
+    return lines
+
+
+def _truncate_lines(path: str, lines: int) -> None:
+    """
+    Keep only the first `lines` lines of path (output of an interrupted run past its last final line)
+    """
+    if not os.path.exists(path):
+        open(path, 'w').close()
+        return
+    offset = 0
+    with open(path, 'rb') as f:
+        for _ in range(lines):
+            line = f.readline()
+            if not line:
+                break
+            offset += len(line)
+    os.truncate(path, offset)
+
+
+class _OutputTail:
+    """
+    Complete lines of an engine output file that were not read yet. A retried run rewrites the file from the
+    start, so lines delivered by an earlier attempt are skipped instead of being delivered twice.
+    """
+
+    def __init__(self, path: str, limit: int):
+        self.path = path
+        self.limit = limit
+        self.delivered = 0
+        self.restart()
+
+    def restart(self) -> None:
+        self.offset = 0
+        self.lines = 0
+
+    def read(self) -> List[str]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        if not end:
+            return []
+        self.offset += end
+        lines = data[:end].decode('utf-8', errors='replace').split("\n")[:-1]
+        fresh = lines[max(self.delivered - self.lines, 0):max(self.limit - self.lines, 0)]
+        self.lines += len(lines)
+        self.delivered += len(fresh)
+        return fresh
+
+
+def _run_engine(batch: TranslationBatch, language_pair: LanguagePair, files: Tuple[str, str], segments: List[str],
+                on_lines: Callable[[List[str]], None]) -> None:
+    """
+    Translate segments with one engine run, passing translations to on_lines as the engine writes them;
+    retried, and stopped as soon as the batch is cancelled
+    """
+    work_dir = os.path.dirname(batch.source_file_path)
+    chunk_source = os.path.join(work_dir, "chunk.src")
+    chunk_output = os.path.join(work_dir, "chunk.out")
+    with open(chunk_source, 'w', encoding='utf-8') as f:
+        f.write("\n".join(segments) + "\n")
+    cancel_event = _cancel_event(batch.batch_id)
+    tail = _OutputTail(chunk_output, len(segments))
+    poll = max(settings.BATCH_TRANSLATION_STREAM_POLL_SECONDS, 0.05)
+
+    def translate(errors: List[BaseException]) -> None:
+        try:
+            if settings.FAKE_EVALUATION_MODE:
+                if cancel_event.wait(settings.FAKE_ENGINE_STARTUP_SECONDS):
+                    raise BatchCancelled()
+                fake_engine_translate_file(chunk_source, chunk_output, settings.FAKE_ENGINE_SEGMENT_LATENCY_MS)
+            else:
+                spec = build_engine_spec(
+                    source_file=chunk_source,
+                    output_path=chunk_output,
+                    model_file=files[0],
+                    hparams_file=files[1],
+                    source_lang=language_pair.source_language_code,
+                    target_lang=language_pair.target_language_code,
+                    mode_type=batch.mode_type,
+                    sub_mode_type=batch.sub_mode_type,
+                    custom_params=batch.custom_params,
+                    container_name=container_name(batch.batch_id)
+                )
+                run_engine_with_retries(spec, timeout_seconds=settings.NMT_ENGINE_TIMEOUT_SECONDS, max_retries=1,
+                                        container_name=container_name(batch.batch_id))
+        except BaseException as e:
+            errors.append(e)
+
+    for attempt in range(1, ENGINE_ATTEMPTS + 1):
+        if cancel_event.is_set():
+            raise BatchCancelled()
+        if os.path.exists(chunk_output):
+            os.remove(chunk_output)
+        tail.restart()
+        errors: List[BaseException] = []
+        engine = threading.Thread(target=translate, args=(errors,), name=f"batch-{batch.batch_id}-engine", daemon=True)
+        engine.start()
+        try:
+            while engine.is_alive():
+                engine.join(poll)
+                lines = tail.read()
+                if lines:
+                    on_lines(lines)
+        except BatchCancelled:
+            request_cancel(batch.batch_id)
+            raise
+        if not errors:
+            break
+        if isinstance(errors[0], BatchCancelled) or cancel_event.is_set():
+            raise BatchCancelled()
+        if attempt == ENGINE_ATTEMPTS:
+            raise errors[0]
+        logger.warning(f"Translation batch {batch.batch_id}: engine attempt {attempt}/{ENGINE_ATTEMPTS} failed ({str(errors[0])}), retrying")
+        if cancel_event.wait(ENGINE_RETRY_DELAY_SECONDS):
+            raise BatchCancelled()
+
+    if tail.lines != len(segments):
+        raise Exception(f"Engine returned {tail.lines} lines for {len(segments)} segments")
+
+
+def _mark(db, batch_id: int, values: Dict[Any, Any]) -> None:
+    """
+    Update a running batch; BatchCancelled if it was cancelled (or lost) meanwhile
+    """
+    updated = db.query(TranslationBatch).filter(
+        TranslationBatch.batch_id == batch_id,
+        TranslationBatch.status == EvaluationStatus.RUNNING_ENGINE.value
+    ).update(values, synchronize_session=False)
+    db.commit()
+    if not updated:
+        raise BatchCancelled()
+
+
+def run_batch(batch_id: int) -> None:
+    """
+    Translate a claimed batch to its output file (worker slot entry point)
+    """
+    db = SessionLocal()
+    try:
+        batch = db.query(TranslationBatch).filter(TranslationBatch.batch_id == batch_id).first()
+        if not batch or batch.status in TERMINAL_STATUSES:
+            return
+        model_version = db.query(ModelVersion).filter(ModelVersion.version_id == batch.version_id).first()
+        language_pair = db.query(LanguagePair).filter(LanguagePair.lang_pair_id == model_version.lang_pair_id).first() if model_version else None
+        files = model_files(model_version, batch.model_type) if model_version else None
+        if not language_pair or not files or not all(os.path.exists(path) for path in files):
+            raise Exception(f"{batch.model_type.capitalize()} model files of version {batch.version_id} are not available")
+
+        batch.status = EvaluationStatus.RUNNING_ENGINE.value
+        batch.processing_started_at = batch.processing_started_at or datetime.utcnow()
+        batch.error_message = None
+        db.commit()
+
+        with open(batch.source_file_path, 'r', encoding='utf-8') as f:
+            segments = [line.rstrip("\n") for line in f]
+        position = batch.translated_segments
+        cached_segments = batch.cached_segments
+        if position:
+            logger.info(f"Translation batch {batch_id}: resuming after {position}/{len(segments)} segments")
+        _truncate_lines(batch.output_file_path, position)
+
+        prefix = None
+        if settings.TRANSLATION_CACHE_ENABLED:
+            prefix = translation_cache.key_prefix(files[0], files[1], batch.mode_type, batch.sub_mode_type, batch.custom_params)
+        block_size = max(1, settings.BATCH_TRANSLATION_CHUNK_SEGMENTS)
+        with open(batch.output_file_path, 'a', encoding='utf-8') as out:
+            while position < len(segments):
+                block = segments[position:position + block_size]
+                keys = [translation_cache.segment_key(prefix, segment) for segment in block] if prefix else block
+                hits = translation_cache.lookup(keys) if prefix else {}
+                if prefix:
+                    translation_cache.record_lookups([hits[key][1] if key in hits else "miss" for key in keys])
+                found = {key: value[0] for key, value in hits.items()}
+                missing = list(dict.fromkeys(key for key in keys if key not in found))
+                written = 0
+
+                def write_ready() -> None:
+                    # Append the leading lines of the block that are translated and record them as final
+                    nonlocal written, position, cached_segments
+                    ready = written
+                    while ready < len(keys) and keys[ready] in found:
+                        ready += 1
+                    if ready == written:
+                        return
+                    out.write("".join(found[key] + "\n" for key in keys[written:ready]))
+                    out.flush()
+                    position += ready - written
+                    cached_segments += sum(1 for key in keys[written:ready] if key in hits)
+                    written = ready
+                    _mark(db, batch_id, {TranslationBatch.translated_segments: position, TranslationBatch.cached_segments: cached_segments})
+                    logger.debug(f"Translation batch {batch_id}: {position}/{len(segments)} segments final")
+
+                def take(lines: List[str]) -> None:
+                    translated = len(found) - len(hits)
+                    fresh = dict(zip(missing[translated:translated + len(lines)], lines))
+                    if prefix:
+                        translation_cache.store(fresh)
+                    found.update(fresh)
+                    write_ready()
+
+                write_ready()
+                if missing:
+                    by_key = dict(zip(keys, block))
+                    _run_engine(batch, language_pair, files, [by_key[key] for key in missing], take)
+                    write_ready()
+
+        _mark(db, batch_id, {TranslationBatch.status: EvaluationStatus.COMPLETED.value, TranslationBatch.completed_at: datetime.utcnow()})
+        logger.info(f"Translation batch {batch_id} completed: {len(segments)} segments, {cached_segments} from the translation cache")
+    except BatchCancelled:
+        db.rollback()
+        logger.info(f"Translation batch {batch_id} stopped: cancelled")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Translation batch {batch_id} failed: {str(e)}")
+        logger.exception("Exception details:")
+        db.query(TranslationBatch).filter(
+            TranslationBatch.batch_id == batch_id,
+            TranslationBatch.status.notin_(TERMINAL_STATUSES)
+        ).update({
+            TranslationBatch.status: EvaluationStatus.FAILED.value,
+            TranslationBatch.error_message: str(e),
+            TranslationBatch.completed_at: datetime.utcnow()
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+        for name in ("chunk.src", "chunk.out"):
+            path = os.path.join(batch_dir(batch_id), name)
+            if os.path.exists(path):
+                os.remove(path)
+        forget(batch_id)
+
+
+def _progress(batch_id: int) -> Optional[Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        batch = db.query(TranslationBatch).filter(TranslationBatch.batch_id == batch_id).first()
+        if not batch:
+            return None
+        return {
+            "status": batch.status,
+            "segments": batch.segments,
+            "translated_segments": batch.translated_segments,
+            "cached_segments": batch.cached_segments,
+            "error_message": batch.error_message,
+            "output_file_path": batch.output_file_path
+        }
+    finally:
+        db.close()
+
+
+def _event(sse: bool, kind: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    payload = json.dumps(data, ensure_ascii=False)
+    if not sse:
+        return payload + "\n"
+    return (f"id: {event_id}\n" if event_id is not None else "") + f"event: {kind}\ndata: {payload}\n\n"
+
+
+async def stream(batch_id: int, from_segment: int = 0, sse: bool = False) -> AsyncIterator[str]:
+    """
+    Translated segments of a batch from from_segment on, as NDJSON lines or SSE events, followed by an
+    end event with the final status. Waits for new lines while the batch is queued or running.
+    """
+    position = max(from_segment, 0)
+    output = None
+    idle = 0.0
+    poll = max(settings.BATCH_TRANSLATION_STREAM_POLL_SECONDS, 0.05)
+    try:
+        while True:
+            progress = await run_in_threadpool(_progress, batch_id)
+            if progress is None:
+                yield _event(sse, "end", {"status": "DELETED"})
+                return
+            final = progress["translated_segments"]
+            if position < final:
+                if output is None:
+                    output = open(progress["output_file_path"], 'r', encoding='utf-8', errors='replace')
+                    for _ in range(position):
+                        output.readline()
+                while position < final:
+                    line = output.readline()
+                    if not line.endswith("\n"):
+                        break
+                    yield _event(sse, "segment", {"index": position, "translation": line[:-1]}, position)
+                    position += 1
+                idle = 0.0
+            if progress["status"] in TERMINAL_STATUSES and position >= final:
+                yield _event(sse, "end", {key: value for key, value in progress.items() if key != "output_file_path"})
+                return
+            await asyncio.sleep(poll)
+            idle += poll
+            if sse and idle >= _SSE_KEEPALIVE_SECONDS:
+                idle = 0.0
+                yield ": keepalive\n\n"
+    finally:
+        if output is not None:
+            output.close()
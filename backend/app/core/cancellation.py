@@ -0,0 +1,122 @@
+import logging
+import threading
+from typing import Dict, Iterable, Optional
+
+from app.core.config import settings
+from app.core import engine_runtime
+
+logger = logging.getLogger(__name__)
+
+# Engine containers carry the evaluation job ID as a label and in their name, so a job's engine can be
+# stopped without touching anyone else's (previously a timeout killed every container of the image).
+# Jobs sharing one engine session (matrix groups) run under the leader's job ID.
+JOB_ID_LABEL = "nmt.evaluation_job_id"
+MODEL_TYPE_LABEL = "nmt.model_type"
+
+
+class JobCancelled(Exception):
+    """The evaluation job was cancelled while this process was working on it"""
+
+
+# Per-job cancellation events of jobs running in this process
+_events: Dict[int, threading.Event] = {}
+_lock = threading.Lock()
+
+
+def _event(job_id: int) -> threading.Event:
+    with _lock:
+        event = _events.get(job_id)
+        if event is None:
+            event = _events[job_id] = threading.Event()
+        return event
+
+
+def request_cancel(job_id: int) -> None:
+    """
+    Make the evaluation pipeline of job_id in this process stop at its next check
+    """
+    _event(job_id).set()
+
+
+def is_cancelled(job_id: Optional[int]) -> bool:
+    if job_id is None:
+        return False
+    with _lock:
+        event = _events.get(job_id)
+    return bool(event and event.is_set())
+
+
+def raise_if_cancelled(job_id: Optional[int]) -> None:
+    if is_cancelled(job_id):
+        raise JobCancelled(f"Evaluation job {job_id} was cancelled")
+
+
+def wait(job_id: Optional[int], seconds: float) -> None:
+    """
+    Sleep for up to `seconds`, returning early with JobCancelled if the job is cancelled meanwhile
+    """
+    if job_id is None:
+        if seconds > 0:
+            threading.Event().wait(seconds)
+        return
+    if _event(job_id).wait(seconds):
+        raise JobCancelled(f"Evaluation job {job_id} was cancelled")
+
+
+def forget(job_ids: Iterable[int]) -> None:
+    """
+    Drop the cancellation state of jobs this process is done with
+    """
+    with _lock:
+        for job_id in job_ids:
+            _events.pop(job_id, None)
+
+
+def engine_container_name(job_id: Optional[int], model_type: str, suffix: Optional[str] = None) -> Optional[str]:
+    """
+    Deterministic container name for a job's engine run, e.g. nmt-eval-42-finetuned-chunk_00003
+    """
+    if job_id is None:
+        return None
+    name = f"nmt-eval-{job_id}-{model_type}"
+    return f"{name}-{suffix}" if suffix else name
+
+
+def engine_container_labels(job_id: Optional[int], model_type: str) -> Dict[str, str]:
+    """
+    Labels of a job's engine container
+    """
+    if job_id is None:
+        return {}
+    return {JOB_ID_LABEL: str(job_id), MODEL_TYPE_LABEL: model_type}
+
+
+def remove_container(name: str) -> None:
+    """
+    Force-remove a container by exact name (kills it if running); a missing container is not an error
+    """
+    engine_runtime.get().remove_container(name)
+
+
+def kill_job_containers(job_id: int) -> int:
+    """
+    Force-remove every engine container labelled with job_id on this host; returns how many were found
+    """
+    if settings.FAKE_EVALUATION_MODE:
+        return 0
+    try:
+        removed = engine_runtime.get().remove_labelled(JOB_ID_LABEL, str(job_id))
+        if removed:
+            logger.info(f"Removed {removed} engine container(s) of job {job_id}")
+        return removed
+    except Exception as e:
+        logger.error(f"Error killing engine containers of job {job_id}: {str(e)}")
+        return 0
+
+
+def cancel_running(job_id: int) -> None:
+    """
+    Stop a job running in this process right away: flag it and kill its engine containers
+    """
+    request_cancel(job_id)
+    kill_job_containers(job_id)
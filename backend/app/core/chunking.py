@@ -0,0 +1,152 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Chunked engine runs: a large source file is split into chunks of EVALUATION_CHUNK_SEGMENTS segments,
+# each translated by its own engine run into <output>.chunks/chunk_NNNNN.out. A chunk output is only
+# renamed into place once the engine finished it, so it doubles as a checkpoint: retries, and reruns
+# of the job after a worker crash, translate only the chunks that are missing. The chunk directory is
+# tied to the source content and engine settings through manifest.json and is removed after the merge.
+
+MANIFEST_FILE = "manifest.json"
+
+
+def should_chunk(segments: int, chunk_segments: Optional[int] = None) -> bool:
+    chunk_segments = settings.EVALUATION_CHUNK_SEGMENTS if chunk_segments is None else chunk_segments
+    return chunk_segments > 0 and segments > chunk_segments
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _prepare_chunk_dir(chunk_dir: str, manifest: Dict[str, Any]) -> bool:
+    """
+    Make sure chunk_dir belongs to this exact run; returns True if earlier checkpoints can be reused
+    """
+    manifest_path = os.path.join(chunk_dir, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                if json.load(f) == manifest:
+                    return True
+        except (OSError, json.JSONDecodeError):
+            pass
+        logger.info(f"Discarding stale chunk checkpoints in {chunk_dir} (source or engine settings changed)")
+        shutil.rmtree(chunk_dir, ignore_errors=True)
+    os.makedirs(chunk_dir, exist_ok=True)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    return False
+
+
+def split_source(source_file: str, chunk_dir: str, chunk_segments: int) -> List[str]:
+    """
+    Split source_file into chunk source files of chunk_segments lines; existing chunk files are kept
+    """
+    chunk_sources = []
+    chunk = None
+    chunk_lines = 0
+
+    def chunk_path(index: int) -> str:
+        return os.path.join(chunk_dir, f"chunk_{index:05d}.src")
+
+    with open(source_file, 'r', encoding='utf-8', errors='replace') as src:
+        for line in src:
+            if chunk is None or chunk_lines >= chunk_segments:
+                if chunk:
+                    chunk.close()
+                    os.replace(chunk.name, chunk_sources[-1])
+                chunk_sources.append(chunk_path(len(chunk_sources)))
+                chunk = open(chunk_sources[-1] + ".tmp", 'w', encoding='utf-8')
+                chunk_lines = 0
+            chunk.write(line if line.endswith('\n') else line + '\n')
+            chunk_lines += 1
+    if chunk:
+        chunk.close()
+        os.replace(chunk.name, chunk_sources[-1])
+    return chunk_sources
+
+
+def translate_in_chunks(
+    source_file: str,
+    output_path: str,
+    translate_chunk: Callable[[str, str], None],
+    *,
+    job_id: Optional[int] = None,
+    engine_signature: Optional[Dict[str, Any]] = None,
+    chunk_segments: Optional[int] = None,
+    parallelism: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Translate source_file into output_path chunk by chunk. translate_chunk(chunk_source, chunk_output)
+    runs the engine for one chunk, with its own retries. Up to `parallelism` chunks run at once, each in
+    its own engine. Returns {"chunks": ..., "resumed_chunks": ...}.
+    """
+    chunk_segments = chunk_segments or settings.EVALUATION_CHUNK_SEGMENTS
+    parallelism = max(1, parallelism or settings.EVALUATION_CHUNK_PARALLELISM)
+    chunk_dir = f"{output_path}.chunks"
+
+    manifest = {
+        "source_sha1": file_digest(source_file),
+        "chunk_segments": chunk_segments,
+        "engine": engine_signature or {}
+    }
+    resumable = _prepare_chunk_dir(chunk_dir, manifest)
+    chunk_sources = split_source(source_file, chunk_dir, chunk_segments)
+
+    chunk_outputs = [path[:-len(".src")] + ".out" for path in chunk_sources]
+    pending = [index for index, path in enumerate(chunk_outputs) if not (resumable and os.path.exists(path))]
+    resumed = len(chunk_sources) - len(pending)
+    if resumed:
+        logger.info(f"Job {job_id}: resuming chunked run, {resumed}/{len(chunk_sources)} chunk(s) already translated")
+    logger.info(f"Job {job_id}: translating {len(pending)} chunk(s) of up to {chunk_segments} segments, {parallelism} at a time")
+
+    def run_chunk(index: int) -> None:
+        partial_output = chunk_outputs[index] + ".partial"
+        if os.path.exists(partial_output):
+            os.remove(partial_output)
+        translate_chunk(chunk_sources[index], partial_output)
+        if not os.path.exists(partial_output):
+            raise FileNotFoundError(f"Engine produced no output for chunk {index}: {partial_output}")
+        # Checkpoint: the chunk counts as done only once its output is complete
+        os.replace(partial_output, chunk_outputs[index])
+        logger.info(f"Job {job_id}: chunk {index + 1}/{len(chunk_sources)} translated")
+
+    if parallelism == 1:
+        for index in pending:
+            run_chunk(index)
+    elif pending:
+        with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix=f"chunks-{job_id}") as executor:
+            futures = [executor.submit(run_chunk, index) for index in pending]
+            done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in not_done:
+                future.cancel()
+            for future in done:
+                # Re-raise the first chunk failure; finished chunks stay checkpointed
+                future.result()
+            wait(not_done)
+
+    # Merge chunk outputs in order, then drop the checkpoints
+    merged_tmp = output_path + ".merging"
+    with open(merged_tmp, 'w', encoding='utf-8') as out:
+        for path in chunk_outputs:
+            with open(path, 'r', encoding='utf-8', errors='replace') as chunk:
+                for line in chunk:
+                    out.write(line if line.endswith('\n') else line + '\n')
+    os.replace(merged_tmp, output_path)
+    shutil.rmtree(chunk_dir, ignore_errors=True)
+    logger.info(f"Job {job_id}: merged {len(chunk_outputs)} chunk(s) into {output_path}")
+    return {"chunks": len(chunk_outputs), "resumed_chunks": resumed}
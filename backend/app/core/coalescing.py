@@ -0,0 +1,278 @@
+import os
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy.orm import Session, aliased
+
+from app.core.config import settings
+from app.core.metrics import EVALUATION_JOBS_FINISHED
+from app.core.scheduler import TERMINAL_STATUSES, PRIORITY_RANKS
+from app.core import output_files
+from app.db.models import EvaluationJob, ModelVersion, Testset
+from app.schemas.evaluation import EvaluationStatus
+
+logger = logging.getLogger(__name__)
+
+# Single-flight coalescing: a submitted job identical to one already queued or running is attached to it
+# (coalesced_into_job_id) instead of being run, and receives the leader's outputs and scores when the
+# leader finishes. Identical jobs completed recently, with unchanged inputs, are served from history.
+# Identity is (version, testset, mode, sub mode, custom params, evaluation model type, sample size).
+# Followers are never claimed, so a PENDING leader is raised to the highest priority among its followers.
+
+LeaderJob = aliased(EvaluationJob)
+
+
+def _same_evaluation(job_cls, version_id: int, testset_id: int, mode_type: Optional[str], sub_mode_type: Optional[str],
+                     custom_params: Optional[str], evaluation_model_type: Optional[str], sample_size: Optional[int]) -> list:
+    return [
+        job_cls.version_id == version_id,
+        job_cls.testset_id == testset_id,
+        job_cls.mode_type.is_not_distinct_from(mode_type),
+        job_cls.sub_mode_type.is_not_distinct_from(sub_mode_type),
+        job_cls.custom_params.is_not_distinct_from(custom_params),
+        job_cls.evaluation_model_type.is_not_distinct_from(evaluation_model_type or "finetuned"),
+        job_cls.sample_size.is_not_distinct_from(sample_size),
+        # Only jobs that run themselves can lead, so coalescing never chains
+        job_cls.coalesced_into_job_id.is_(None)
+    ]
+
+
+def find_in_flight(db: Session, *, version_id: int, testset_id: int, mode_type: Optional[str] = None,
+                   sub_mode_type: Optional[str] = None, custom_params: Optional[str] = None,
+                   evaluation_model_type: Optional[str] = "finetuned", sample_size: Optional[int] = None,
+                   before_job_id: Optional[int] = None) -> Optional[EvaluationJob]:
+    """
+    Oldest identical job that is PENDING or running, if any
+    """
+    query = db.query(EvaluationJob).filter(
+        *_same_evaluation(EvaluationJob, version_id, testset_id, mode_type, sub_mode_type, custom_params, evaluation_model_type, sample_size),
+        EvaluationJob.status.notin_(TERMINAL_STATUSES)
+    )
+    if before_job_id is not None:
+        query = query.filter(EvaluationJob.job_id < before_job_id)
+    return query.order_by(EvaluationJob.job_id).first()
+
+
+def _inputs_unchanged_since(db: Session, job: EvaluationJob) -> bool:
+    """
+    True if the model and testset files a completed job used have not been replaced since it started
+    """
+    model_version = db.query(ModelVersion).filter(ModelVersion.version_id == job.version_id).first()
+    testset = db.query(Testset).filter(Testset.testset_id == job.testset_id).first()
+    if not model_version or not testset or not job.processing_started_at:
+        return False
+
+    paths = [testset.source_file_path_on_server, testset.target_file_path_on_server]
+    if job.evaluation_model_type in ("finetuned", "both", None):
+        paths += [model_version.model_file_path_on_server, model_version.hparams_file_path_on_server]
+    if job.evaluation_model_type in ("base", "both"):
+        paths += [model_version.base_model_file_path_on_server, model_version.base_hparams_file_path_on_server]
+    for path in paths:
+        if not path or not os.path.exists(path):
+            return False
+        # processing_started_at is local time (datetime.now()), like the file modification time
+        if datetime.fromtimestamp(os.path.getmtime(path)) >= job.processing_started_at:
+            return False
+    return True
+
+
+def find_reusable(db: Session, *, version_id: int, testset_id: int, mode_type: Optional[str] = None,
+                  sub_mode_type: Optional[str] = None, custom_params: Optional[str] = None,
+                  evaluation_model_type: Optional[str] = "finetuned", sample_size: Optional[int] = None) -> Optional[EvaluationJob]:
+    """
+    Most recent identical COMPLETED job whose results can be served again: within
+    EVALUATION_RESULT_REUSE_MAX_AGE_HOURS, output file still on disk and inputs unchanged since it ran
+    """
+    if settings.EVALUATION_RESULT_REUSE_MAX_AGE_HOURS <= 0:
+        return None
+    oldest = datetime.now() - timedelta(hours=settings.EVALUATION_RESULT_REUSE_MAX_AGE_HOURS)
+    candidates = db.query(EvaluationJob).filter(
+        *_same_evaluation(EvaluationJob, version_id, testset_id, mode_type, sub_mode_type, custom_params, evaluation_model_type, sample_size),
+        EvaluationJob.status == EvaluationStatus.COMPLETED.value,
+        EvaluationJob.completed_at >= oldest,
+        EvaluationJob.bleu_score.isnot(None)
+    ).order_by(EvaluationJob.job_id.desc()).limit(5).all()
+    for job in candidates:
+        if output_files.exists(job.output_file_path) and _inputs_unchanged_since(db, job):
+            return job
+    return None
+
+
+def raise_leader_priority(db: Session, leader_id: int, priority: Optional[str]) -> bool:
+    """
+    Raise a still PENDING leader to a follower's priority if that is higher; a conditional update, so a
+    leader claimed (or raised by another follower) in the meantime is left alone. True if it was raised.
+    """
+    if priority not in PRIORITY_RANKS:
+        return False
+    lower = [name for name, rank in PRIORITY_RANKS.items() if rank > PRIORITY_RANKS[priority]]
+    if not lower:
+        return False
+    try:
+        raised = db.query(EvaluationJob).filter(
+            EvaluationJob.job_id == leader_id,
+            EvaluationJob.status == EvaluationStatus.PENDING.value,
+            EvaluationJob.priority.in_(lower)
+        ).update({EvaluationJob.priority: priority}, synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error raising the priority of job {leader_id}: {str(e)}")
+        raise
+    if raised:
+        logger.info(f"Job {leader_id} raised to priority {priority} for a coalesced submission")
+    return bool(raised)
+
+
+def attach_to_earlier_duplicate(db: Session, job: EvaluationJob) -> Optional[int]:
+    """
+    Close the race between two identical submissions that both found nothing in flight: the later job
+    attaches itself to the earlier one, unless a worker already claimed it. Returns the leader job ID.
+    """
+    leader = find_in_flight(
+        db,
+        version_id=job.version_id,
+        testset_id=job.testset_id,
+        mode_type=job.mode_type,
+        sub_mode_type=job.sub_mode_type,
+        custom_params=job.custom_params,
+        evaluation_model_type=job.evaluation_model_type,
+        sample_size=job.sample_size,
+        before_job_id=job.job_id
+    )
+    if not leader:
+        return None
+    try:
+        attached = db.query(EvaluationJob).filter(
+            EvaluationJob.job_id == job.job_id,
+            EvaluationJob.status == EvaluationStatus.PENDING.value,
+            EvaluationJob.claimed_by_worker_id.is_(None)
+        ).update({EvaluationJob.coalesced_into_job_id: leader.job_id}, synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error attaching job {job.job_id} to job {leader.job_id}: {str(e)}")
+        raise
+    if not attached:
+        return None
+    db.refresh(job)
+    logger.info(f"Job {job.job_id} coalesced into concurrently submitted job {leader.job_id}")
+    return leader.job_id
+
+
+def copy_results(db: Session, follower: EvaluationJob, leader: EvaluationJob) -> None:
+    """
+    Finish a coalesced job with the outcome of the job it was attached to
+    """
+    # Imported here: app.core.evaluation pulls in the whole evaluation pipeline
+    from app.core.evaluation import add_results_to_training_details
+
+    follower.completed_at = datetime.now()
+    follower.stage_timings = None
+    if leader.status == EvaluationStatus.COMPLETED.value:
+        follower.status = EvaluationStatus.COMPLETED.value
+        follower.bleu_score = leader.bleu_score
+        follower.comet_score = leader.comet_score
+        follower.chrf_score = leader.chrf_score
+        follower.output_file_path = leader.output_file_path
+        follower.base_model_result = leader.base_model_result
+        follower.base_model_bleu_score = leader.base_model_bleu_score
+        follower.base_model_comet_score = leader.base_model_comet_score
+        follower.base_model_output_file_path = leader.base_model_output_file_path
+        follower.sample_result = leader.sample_result
+        follower.significance = leader.significance
+        follower.log_message = f"Results shared from evaluation job {leader.job_id}"
+    else:
+        follower.status = EvaluationStatus.FAILED.value
+        follower.log_message = f"Coalesced into evaluation job {leader.job_id}, which failed: {leader.log_message}"
+    db.commit()
+    EVALUATION_JOBS_FINISHED.inc(status=follower.status)
+
+    if follower.status == EvaluationStatus.COMPLETED.value and follower.auto_add_to_details_requested:
+        if leader.details_added_successfully:
+            follower.details_added_successfully = True
+            db.commit()
+            return
+        try:
+            model_type = follower.evaluation_model_type or "finetuned"
+            scores = [(model_type == "base", leader.bleu_score, leader.comet_score)]
+            if model_type == "both" and leader.base_model_result:
+                base_result = json.loads(leader.base_model_result)
+                scores.append((True, base_result.get("bleu_score"), base_result.get("comet_score")))
+            for is_base, bleu_score, comet_score in scores:
+                add_results_to_training_details(
+                    db=db,
+                    version_id=follower.version_id,
+                    testset_id=follower.testset_id,
+                    is_base=is_base,
+                    bleu_score=bleu_score,
+                    comet_score=comet_score,
+                    job_id=follower.job_id
+                )
+            follower.details_added_successfully = True
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Job {follower.job_id}: failed to add shared results to training details: {str(e)}")
+
+
+def detach(db: Session, job_ids: List[int]) -> None:
+    """
+    Turn coalesced jobs back into ordinary queued jobs
+    """
+    try:
+        db.query(EvaluationJob).filter(EvaluationJob.job_id.in_(job_ids)).update(
+            {EvaluationJob.coalesced_into_job_id: None}, synchronize_session=False
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error detaching coalesced jobs {job_ids}: {str(e)}")
+        raise
+
+
+def resolve_followers(db: Session, leader_id: int) -> int:
+    """
+    Finish every job coalesced into leader_id once the leader reached a terminal status; returns how many
+    """
+    leader = db.query(EvaluationJob).filter(EvaluationJob.job_id == leader_id).first()
+    if not leader or leader.status not in TERMINAL_STATUSES:
+        return 0
+    followers = db.query(EvaluationJob).filter(
+        EvaluationJob.coalesced_into_job_id == leader_id,
+        EvaluationJob.status.notin_(TERMINAL_STATUSES)
+    ).all()
+    if followers and leader.status == EvaluationStatus.CANCELLED.value:
+        # Cancelling a job only cancels that submission: the jobs sharing its run are queued on their own
+        detach(db, [follower.job_id for follower in followers])
+        logger.info(f"Job {leader_id} was cancelled, queued coalesced job(s) {[f.job_id for f in followers]} to run on their own")
+        return 0
+    for follower in followers:
+        copy_results(db, follower, leader)
+    if followers:
+        logger.info(f"Job {leader_id} finished with {leader.status}, shared with coalesced job(s) {[f.job_id for f in followers]}")
+    return len(followers)
+
+
+def resolve_orphans(db: Session) -> List[int]:
+    """
+    Periodic sweep (worker heartbeat): finish followers whose leader ended without resolving them, and
+    detach followers whose leader was deleted so they are queued and run on their own
+    """
+    rows = db.query(EvaluationJob.job_id, EvaluationJob.coalesced_into_job_id, LeaderJob.job_id.label("leader_id"), LeaderJob.status.label("leader_status")).outerjoin(
+        LeaderJob, EvaluationJob.coalesced_into_job_id == LeaderJob.job_id
+    ).filter(
+        EvaluationJob.coalesced_into_job_id.isnot(None),
+        EvaluationJob.status.notin_(TERMINAL_STATUSES)
+    ).all()
+
+    orphaned = [row.job_id for row in rows if row.leader_id is None]
+    finished_leaders = {row.leader_id for row in rows if row.leader_id is not None and row.leader_status in TERMINAL_STATUSES}
+    if orphaned:
+        detach(db, orphaned)
+        logger.warning(f"Leader of coalesced job(s) {orphaned} no longer exists, queued them to run on their own")
+    for leader_id in finished_leaders:
+        resolve_followers(db, leader_id)
+    return orphaned
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -25,6 +25,12 @@ class Settings(BaseSettings):
     
     # Evaluation Settings
     FAKE_EVALUATION_MODE: bool = os.getenv("FAKE_EVALUATION_MODE", "false").lower() == "true"
+    # Fake engine tuning (used by benchmarks/): "fixed" writes the canned sample text,
+    # "deterministic" writes a reproducible per-segment translation of the source
+    FAKE_ENGINE_OUTPUT: str = os.getenv("FAKE_ENGINE_OUTPUT", "fixed")
+    FAKE_ENGINE_STARTUP_SECONDS: float = float(os.getenv("FAKE_ENGINE_STARTUP_SECONDS", "2"))
+    FAKE_ENGINE_SEGMENT_LATENCY_MS: float = float(os.getenv("FAKE_ENGINE_SEGMENT_LATENCY_MS", "0"))
+    FAKE_EVALUATION_REAL_METRICS: bool = os.getenv("FAKE_EVALUATION_REAL_METRICS", "false").lower() == "true"
     T2T_RESOURCES_BASE_PATH: str = os.getenv("T2T_RESOURCES_BASE_PATH", "/home/hongthaing/hdd1/users/hongthaing/t2t-resources/resources/directions")
     DOCKER_VOLUME_RESOURCES_PATH_CONTAINER: str = os.getenv("DOCKER_VOLUME_RESOURCES_PATH_CONTAINER", "/resouce")
     DOCKER_VOLUME_TMP_PATH_HOST: str = os.getenv("DOCKER_VOLUME_TMP_PATH_HOST", "/home/hongthaing")
@@ -32,7 +38,108 @@ class Settings(BaseSettings):
     DOCKER_IMAGE_NAME: str = os.getenv("DOCKER_IMAGE_NAME", "translator-cli:develop")
     NMT_ENGINE_DOCKER_IMAGE: str = os.getenv("NMT_ENGINE_DOCKER_IMAGE", "nmt-engine:latest")
     NMT_ENGINE_TIMEOUT_SECONDS: int = int(os.getenv("NMT_ENGINE_TIMEOUT_SECONDS", "1800"))  # 30 minutes
-    
+    # Engine container runtime (app/core/engine_runtime.py): "docker-api" (Docker Engine API on the unix socket, pooled
+    # connections; DOCKER_HOST=unix://... overrides the socket path), "cli" (docker CLI) or "fake" (no Docker, for tests)
+    ENGINE_RUNTIME: str = os.getenv("ENGINE_RUNTIME", "docker-api")
+    DOCKER_SOCKET_PATH: str = os.getenv("DOCKER_SOCKET_PATH", "/var/run/docker.sock")
+    DOCKER_API_MAX_CONNECTIONS: int = int(os.getenv("DOCKER_API_MAX_CONNECTIONS", "32"))  # Each running engine holds 2
+    DOCKER_HEALTH_CACHE_SECONDS: float = float(os.getenv("DOCKER_HEALTH_CACHE_SECONDS", "30"))
+    # CPU/memory placement of engine containers (app/core/engine_placement.py): engine slots the host cores are split into
+    # (0 = EVALUATION_WORKER_SLOTS), optional cpulist of the cores to use ("" = all), and the memory limit
+    # ENGINE_MEMORY_BASE_MB + ENGINE_MEMORY_MODEL_FACTOR x model file size (factor 0 = no limit), capped at ENGINE_MEMORY_MAX_MB
+    ENGINE_PLACEMENT_ENABLED: bool = os.getenv("ENGINE_PLACEMENT_ENABLED", "true").lower() == "true"
+    ENGINE_PLACEMENT_SLOTS: int = int(os.getenv("ENGINE_PLACEMENT_SLOTS", "0"))
+    ENGINE_PLACEMENT_CPUS: str = os.getenv("ENGINE_PLACEMENT_CPUS", "")
+    ENGINE_MEMORY_BASE_MB: int = int(os.getenv("ENGINE_MEMORY_BASE_MB", "1024"))
+    ENGINE_MEMORY_MODEL_FACTOR: float = float(os.getenv("ENGINE_MEMORY_MODEL_FACTOR", "3"))
+    ENGINE_MEMORY_MAX_MB: int = int(os.getenv("ENGINE_MEMORY_MAX_MB", "0"))
+    # Opt-in checkpointing: testsets longer than this many segments are translated in checkpointed chunks (0, the
+    # default, disables chunking). Every chunk is its own engine run that loads the model again, so only set it to
+    # chunk sizes whose engine runs are long enough that resuming after a crash outweighs a model load (e.g. 50000)
+    EVALUATION_CHUNK_SEGMENTS: int = int(os.getenv("EVALUATION_CHUNK_SEGMENTS", "0"))
+    EVALUATION_CHUNK_PARALLELISM: int = int(os.getenv("EVALUATION_CHUNK_PARALLELISM", "1"))  # Chunks translated at once, one engine each
+    # Engine stdout/stderr streamed to compressed per-job logs (app/core/engine_logs.py): text per gzip member, longest
+    # wait before buffered output becomes readable, cap per job, engine lines kept in memory for error messages,
+    # and the most a single GET /evaluations/{job_id}/logs response returns
+    ENGINE_LOG_BLOCK_BYTES: int = int(os.getenv("ENGINE_LOG_BLOCK_BYTES", str(64 * 1024)))
+    ENGINE_LOG_FLUSH_SECONDS: float = float(os.getenv("ENGINE_LOG_FLUSH_SECONDS", "2"))
+    ENGINE_LOG_MAX_BYTES: int = int(os.getenv("ENGINE_LOG_MAX_BYTES", str(256 * 1024 * 1024)))
+    ENGINE_LOG_TAIL_LINES: int = int(os.getenv("ENGINE_LOG_TAIL_LINES", "20"))
+    ENGINE_LOG_MAX_READ_BYTES: int = int(os.getenv("ENGINE_LOG_MAX_READ_BYTES", str(4 * 1024 * 1024)))
+
+    # Evaluation workers (see evaluation_worker.py). The API process runs a local worker unless disabled,
+    # extra hosts run the standalone worker against the same database and shared storage paths
+    EVALUATION_LOCAL_WORKER_ENABLED: bool = os.getenv("EVALUATION_LOCAL_WORKER_ENABLED", "true").lower() == "true"
+    EVALUATION_WORKER_ID: Optional[str] = os.getenv("EVALUATION_WORKER_ID")  # Defaults to <hostname>-<pid>
+    EVALUATION_WORKER_SLOTS: int = int(os.getenv("EVALUATION_WORKER_SLOTS", "4"))
+    EVALUATION_WORKER_LABELS: str = os.getenv("EVALUATION_WORKER_LABELS", "")  # Extra comma separated labels, "*" = any language pair
+    EVALUATION_WORKER_POLL_SECONDS: float = float(os.getenv("EVALUATION_WORKER_POLL_SECONDS", "2"))
+    EVALUATION_WORKER_HEARTBEAT_SECONDS: float = float(os.getenv("EVALUATION_WORKER_HEARTBEAT_SECONDS", "15"))
+    EVALUATION_LEASE_SECONDS: int = int(os.getenv("EVALUATION_LEASE_SECONDS", "120"))
+
+    # Evaluation scheduling: priority classes, fair share across users and language pairs
+    EVALUATION_MAX_RUNNING_PER_USER: int = int(os.getenv("EVALUATION_MAX_RUNNING_PER_USER", "2"))
+    EVALUATION_FAIR_SHARE_WINDOW_SECONDS: int = int(os.getenv("EVALUATION_FAIR_SHARE_WINDOW_SECONDS", "3600"))
+    EVALUATION_PRIORITY_AGING_SECONDS: int = int(os.getenv("EVALUATION_PRIORITY_AGING_SECONDS", "1800"))  # Waiting this long raises a job one priority class
+    EVALUATION_DEFAULT_DURATION_SECONDS: int = int(os.getenv("EVALUATION_DEFAULT_DURATION_SECONDS", "600"))  # ETA fallback without history
+    EVALUATION_SHORTEST_JOB_FIRST: bool = os.getenv("EVALUATION_SHORTEST_JOB_FIRST", "true").lower() == "true"  # Within a priority class, by predicted duration
+    # Engine timeouts from historical throughput (app/core/throughput.py): factor x expected run time + slack, clamped
+    EVALUATION_ADAPTIVE_TIMEOUTS_ENABLED: bool = os.getenv("EVALUATION_ADAPTIVE_TIMEOUTS_ENABLED", "true").lower() == "true"
+    EVALUATION_TIMEOUT_FACTOR: float = float(os.getenv("EVALUATION_TIMEOUT_FACTOR", "3"))
+    EVALUATION_TIMEOUT_SLACK_SECONDS: int = int(os.getenv("EVALUATION_TIMEOUT_SLACK_SECONDS", "120"))
+    EVALUATION_MIN_ENGINE_TIMEOUT_SECONDS: int = int(os.getenv("EVALUATION_MIN_ENGINE_TIMEOUT_SECONDS", "300"))
+    EVALUATION_MAX_ENGINE_TIMEOUT_SECONDS: int = int(os.getenv("EVALUATION_MAX_ENGINE_TIMEOUT_SECONDS", "43200"))
+    EVALUATION_THROUGHPUT_SMOOTHING: float = float(os.getenv("EVALUATION_THROUGHPUT_SMOOTHING", "0.2"))  # Weight of the newest run
+    # Sampled quick-look runs (app/core/sampling.py): source length strata, sample seed (plus testset ID), bootstrap intervals
+    EVALUATION_SAMPLE_STRATA: int = int(os.getenv("EVALUATION_SAMPLE_STRATA", "5"))
+    EVALUATION_SAMPLE_SEED: int = int(os.getenv("EVALUATION_SAMPLE_SEED", "12345"))
+    EVALUATION_BOOTSTRAP_RESAMPLES: int = int(os.getenv("EVALUATION_BOOTSTRAP_RESAMPLES", "1000"))
+    EVALUATION_CONFIDENCE_LEVEL: float = float(os.getenv("EVALUATION_CONFIDENCE_LEVEL", "0.95"))
+    EVALUATION_RANDOMIZATION_TRIALS: int = int(os.getenv("EVALUATION_RANDOMIZATION_TRIALS", "5000"))  # Base vs finetuned significance (app/core/significance.py)
+    # Segment-level comparison of each completed job with the previous version on the same testset (app/core/segment_regressions.py)
+    EVALUATION_SEGMENT_REGRESSIONS_ENABLED: bool = os.getenv("EVALUATION_SEGMENT_REGRESSIONS_ENABLED", "true").lower() == "true"
+    EVALUATION_SEGMENT_REGRESSIONS_TOP: int = int(os.getenv("EVALUATION_SEGMENT_REGRESSIONS_TOP", "200"))  # Ranked segments kept per direction
+    # Duplicate submissions share one run; identical completed jobs this recent are served from history (0 disables)
+    EVALUATION_COALESCING_ENABLED: bool = os.getenv("EVALUATION_COALESCING_ENABLED", "true").lower() == "true"
+    EVALUATION_RESULT_REUSE_MAX_AGE_HOURS: int = int(os.getenv("EVALUATION_RESULT_REUSE_MAX_AGE_HOURS", "168"))
+    EVALUATION_MATRIX_MAX_GROUP_JOBS: int = int(os.getenv("EVALUATION_MATRIX_MAX_GROUP_JOBS", "50"))  # Testsets sharing one engine session
+    # Historical rescoring backfill (app/core/rescoring.py): scoring processes (0 = half the CPUs), jobs per DB batch,
+    # output rate limit (0 = unlimited) and nice increment of the scoring processes so live evaluations keep priority
+    RESCORING_WORKERS: int = int(os.getenv("RESCORING_WORKERS", "0"))
+    RESCORING_BATCH_SIZE: int = int(os.getenv("RESCORING_BATCH_SIZE", "200"))
+    RESCORING_MAX_OUTPUTS_PER_SECOND: float = float(os.getenv("RESCORING_MAX_OUTPUTS_PER_SECOND", "0"))
+    RESCORING_NICE: int = int(os.getenv("RESCORING_NICE", "10"))
+    # Background removal of deleted jobs' files (app/core/file_gc.py): parallel removals and GC handles kept for progress queries
+    FILE_GC_WORKERS: int = int(os.getenv("FILE_GC_WORKERS", "4"))
+    FILE_GC_HISTORY: int = int(os.getenv("FILE_GC_HISTORY", "100"))
+    # Tiered retention of evaluation_temp (app/core/retention.py): outputs idle this many days are zstd-compressed;
+    # above the high disk watermark (fraction of the volume) or RETENTION_MAX_BYTES of job folders
+    # (0 = no cap), least recently used folders idle at least RETENTION_EVICT_MIN_IDLE_HOURS are evicted down to the low one.
+    # Every API process may enable it: passes take a lock file on the volume, so only one runs at a time.
+    RETENTION_ENABLED: bool = os.getenv("RETENTION_ENABLED", "true").lower() == "true"
+    RETENTION_INTERVAL_MINUTES: int = int(os.getenv("RETENTION_INTERVAL_MINUTES", "60"))
+    RETENTION_COMPRESS_AFTER_DAYS: float = float(os.getenv("RETENTION_COMPRESS_AFTER_DAYS", "7"))
+    RETENTION_COMPRESS_MIN_BYTES: int = int(os.getenv("RETENTION_COMPRESS_MIN_BYTES", "4096"))
+    RETENTION_COMPRESS_EXTENSIONS: List[str] = [ext.strip() for ext in os.getenv("RETENTION_COMPRESS_EXTENSIONS", ".txt,.log").split(",") if ext.strip()]
+    RETENTION_ZSTD_LEVEL: int = int(os.getenv("RETENTION_ZSTD_LEVEL", "10"))
+    RETENTION_DISK_HIGH_WATERMARK: float = float(os.getenv("RETENTION_DISK_HIGH_WATERMARK", "0.85"))
+    RETENTION_DISK_LOW_WATERMARK: float = float(os.getenv("RETENTION_DISK_LOW_WATERMARK", "0.75"))
+    RETENTION_MAX_BYTES: int = int(os.getenv("RETENTION_MAX_BYTES", "0"))
+    RETENTION_EVICT_MIN_IDLE_HOURS: float = float(os.getenv("RETENTION_EVICT_MIN_IDLE_HOURS", "24"))
+    # Line-range patches of testset files (app/core/testset_patch.py): deltas kept per file for undo
+    TESTSET_DELTA_HISTORY: int = int(os.getenv("TESTSET_DELTA_HISTORY", "50"))
+    # Per-segment cache of direct translations (app/core/translation_cache.py): LRU in memory, backed by an LRU SQLite file
+    TRANSLATION_CACHE_ENABLED: bool = os.getenv("TRANSLATION_CACHE_ENABLED", "true").lower() == "true"
+    TRANSLATION_CACHE_MEMORY_BYTES: int = int(os.getenv("TRANSLATION_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+    TRANSLATION_CACHE_DISK_BYTES: int = int(os.getenv("TRANSLATION_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))  # 0 = memory only
+    TRANSLATION_CACHE_PATH: str = os.getenv("TRANSLATION_CACHE_PATH", str(BASE_DIR / "storage" / "translation_cache.sqlite3"))
+    # File-based translation batches (app/core/batch_translation.py): upload limit, segments per engine run (each run
+    # pays the engine startup and its output is streamed as it is written, cached segments never reach it) and how
+    # often the engine output and streaming readers are polled for new lines
+    BATCH_TRANSLATION_MAX_BYTES: int = int(os.getenv("BATCH_TRANSLATION_MAX_BYTES", str(50 * 1024 * 1024)))
+    BATCH_TRANSLATION_CHUNK_SEGMENTS: int = int(os.getenv("BATCH_TRANSLATION_CHUNK_SEGMENTS", "50000"))
+    BATCH_TRANSLATION_STREAM_POLL_SECONDS: float = float(os.getenv("BATCH_TRANSLATION_STREAM_POLL_SECONDS", "0.5"))
+
     # Ensure these paths exist
     @property
     def model_files_storage_path(self) -> Path:
@@ -0,0 +1,336 @@
+import os
+import gzip
+import time
+import bisect
+import asyncio
+import logging
+import threading
+import subprocess
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import AsyncIterator, Callable, Deque, Dict, Iterator, List, NamedTuple, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Engine stdout/stderr of an evaluation job, streamed to <evaluation folder>/engine.log.gz while the engine
+# runs instead of being collected in memory. The file is a series of independent gzip members holding up to
+# ENGINE_LOG_BLOCK_BYTES of text each (so zcat reads it as one log), and engine.log.gz.idx lists each
+# member's uncompressed and compressed offsets: a byte range or the tail is served by decompressing only the
+# members it covers. A member is cut at least every ENGINE_LOG_FLUSH_SECONDS so followers see new output.
+# Every engine run of the job (retries, chunks, shared matrix runs under the leader) appends to the same log.
+
+LOG_FILE = "engine.log.gz"
+INDEX_SUFFIX = ".idx"
+_READ_LINE_BYTES = 64 * 1024
+_TRUNCATED_MARKER = b"[log truncated: ENGINE_LOG_MAX_BYTES reached]\n"
+
+
+class Member(NamedTuple):
+    start: int  # Offset in the uncompressed log
+    offset: int  # Offset in the log file
+    size: int
+    compressed_size: int
+
+
+class EngineRun(NamedTuple):
+    returncode: int
+    stdout_tail: str
+    stderr_tail: str
+
+
+def log_path(job_id: int) -> str:
+    return os.path.join(settings.DOCKER_VOLUME_TMP_PATH_HOST, "evaluation_temp", f"evaluation_{job_id}", LOG_FILE)
+
+
+def read_index(path: str) -> List[Member]:
+    members: List[Member] = []
+    try:
+        with open(path + INDEX_SUFFIX, 'r') as f:
+            for line in f:
+                fields = line.split()
+                # A line cut short by a crash is ignored along with everything after it
+                if not line.endswith("\n") or len(fields) != 4:
+                    break
+                members.append(Member(*map(int, fields)))
+    except FileNotFoundError:
+        pass
+    return members
+
+
+def size(path: str) -> int:
+    """
+    Uncompressed length of the log, 0 if there is none yet
+    """
+    members = read_index(path)
+    return members[-1].start + members[-1].size if members else 0
+
+
+class EngineLog:
+    """
+    Append-only writer of one log file, shared by the engine runs of a job in this process
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        members = read_index(path)
+        self._size = members[-1].start + members[-1].size if members else 0
+        compressed_end = members[-1].offset + members[-1].compressed_size if members else 0
+        # Drop a member whose index line was never written
+        if os.path.exists(path) and os.path.getsize(path) > compressed_end:
+            os.truncate(path, compressed_end)
+        self._data = open(path, 'ab')
+        self._index = open(path + INDEX_SUFFIX, 'a')
+        self._compressed_end = compressed_end
+        self._buffer = bytearray()
+        self._truncated = self._size >= settings.ENGINE_LOG_MAX_BYTES
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self.users = 0
+
+    def write(self, data: bytes) -> None:
+        with self._lock:
+            if self._truncated:
+                return
+            if self._size + len(self._buffer) + len(data) > settings.ENGINE_LOG_MAX_BYTES:
+                self._buffer += _TRUNCATED_MARKER
+                self._truncated = True
+                self._flush()
+                return
+            self._buffer += data
+            if len(self._buffer) >= settings.ENGINE_LOG_BLOCK_BYTES:
+                self._flush()
+
+    def flush_if_due(self) -> None:
+        with self._lock:
+            if self._buffer and time.monotonic() - self._last_flush >= settings.ENGINE_LOG_FLUSH_SECONDS:
+                self._flush()
+
+    def _flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        member = gzip.compress(bytes(self._buffer), compresslevel=6, mtime=0)
+        self._data.write(member)
+        self._data.flush()
+        # The index line goes last: readers only see members that are completely written
+        self._index.write(f"{self._size} {self._compressed_end} {len(self._buffer)} {len(member)}\n")
+        self._index.flush()
+        self._size += len(self._buffer)
+        self._compressed_end += len(member)
+        self._buffer.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            self._data.close()
+            self._index.close()
+
+
+_open_logs: Dict[str, EngineLog] = {}
+_open_logs_lock = threading.Lock()
+_flusher: Optional[threading.Thread] = None
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(max(settings.ENGINE_LOG_FLUSH_SECONDS / 2, 0.05))
+        with _open_logs_lock:
+            logs = list(_open_logs.values())
+        for log in logs:
+            try:
+                log.flush_if_due()
+            except Exception as e:
+                logger.error(f"Error flushing engine log {log.path}: {str(e)}")
+
+
+@contextmanager
+def opened(path: Optional[str]) -> Iterator[Optional[EngineLog]]:
+    """
+    The shared writer of path for the duration of an engine run (None without a path)
+    """
+    global _flusher
+    if not path:
+        yield None
+        return
+    with _open_logs_lock:
+        log = _open_logs.get(path)
+        if log is None:
+            log = _open_logs[path] = EngineLog(path)
+        log.users += 1
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="engine-log-flusher", daemon=True)
+            _flusher.start()
+    try:
+        yield log
+    finally:
+        with _open_logs_lock:
+            log.users -= 1
+            if log.users == 0:
+                _open_logs.pop(path, None)
+                log.close()
+
+
+def append(path: Optional[str], text: str) -> None:
+    """
+    Add text (whole lines) to a log outside of an engine run
+    """
+    with opened(path) as log:
+        if log:
+            log.write(text.encode("utf-8"))
+
+
+class Capture:
+    """
+    Output of one engine run: lines of each stream go to the log prefixed with [tag stream], and the last
+    ENGINE_LOG_TAIL_LINES lines of each are kept for error messages. Output may arrive in arbitrary pieces;
+    one stream must not be fed from two threads at once.
+    """
+
+    def __init__(self, log: Optional[EngineLog], tag: str):
+        self.log = log
+        self.tag = tag
+        self.tails: Dict[str, Deque[str]] = {name: deque(maxlen=max(settings.ENGINE_LOG_TAIL_LINES, 1)) for name in ("stdout", "stderr")}
+        self._partial: Dict[str, bytes] = {"stdout": b"", "stderr": b""}
+
+    def note(self, text: str) -> None:
+        if self.log:
+            self.log.write(f"[{self.tag}] {text}\n".encode("utf-8"))
+
+    def feed(self, stream: str, data: bytes) -> None:
+        lines = (self._partial[stream] + data).split(b"\n")
+        self._partial[stream] = lines.pop()
+        for line in lines:
+            self._line(stream, line)
+        # Longer engine lines are split
+        while len(self._partial[stream]) >= _READ_LINE_BYTES:
+            self._line(stream, self._partial[stream][:_READ_LINE_BYTES])
+            self._partial[stream] = self._partial[stream][_READ_LINE_BYTES:]
+
+    def finish(self) -> None:
+        for stream, partial in self._partial.items():
+            if partial:
+                self._line(stream, partial)
+            self._partial[stream] = b""
+
+    def _line(self, stream: str, line: bytes) -> None:
+        self.tails[stream].append(line.decode("utf-8", errors="replace"))
+        if self.log:
+            self.log.write(f"[{self.tag} {stream}] ".encode("utf-8") + line + b"\n")
+
+    def tail(self, stream: str) -> str:
+        return "\n".join(self.tails[stream])
+
+    def result(self, returncode: int) -> EngineRun:
+        return EngineRun(returncode, self.tail("stdout"), self.tail("stderr"))
+
+
+def _pump(stream, name: str, capture: Capture) -> None:
+    for data in iter(lambda: stream.read1(_READ_LINE_BYTES), b""):
+        capture.feed(name, data)
+    stream.close()
+
+
+def run(command: List[str], timeout_seconds: float, path: Optional[str] = None, tag: str = "engine") -> EngineRun:
+    """
+    Run an engine command with its stdout and stderr streamed line by line into the log at path. Only the
+    last ENGINE_LOG_TAIL_LINES lines of each stream are kept in memory. On timeout the process is killed
+    and subprocess.TimeoutExpired raised, carrying those tails.
+    """
+    with opened(path) as log:
+        capture = Capture(log, tag)
+        capture.note(f"started {datetime.now().isoformat(timespec='seconds')}")
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        pumps = [
+            threading.Thread(target=_pump, args=(process.stdout, "stdout", capture), daemon=True),
+            threading.Thread(target=_pump, args=(process.stderr, "stderr", capture), daemon=True)
+        ]
+        for pump in pumps:
+            pump.start()
+        try:
+            returncode = process.wait(timeout=timeout_seconds)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            for pump in pumps:
+                pump.join(timeout=5)
+            capture.finish()
+            capture.note(f"killed after {timeout_seconds}s timeout")
+            raise subprocess.TimeoutExpired(command, timeout_seconds, output=capture.tail("stdout"), stderr=capture.tail("stderr"))
+        for pump in pumps:
+            pump.join()
+        capture.finish()
+        capture.note(f"exited with code {returncode}")
+    return capture.result(returncode)
+
+
+def read_range(path: str, start: int, end: int) -> bytes:
+    """
+    Uncompressed bytes [start, end) of the log, decompressing only the members they fall in
+    """
+    members = read_index(path)
+    if not members or start >= end:
+        return b""
+    first = max(bisect.bisect_right([member.start for member in members], start) - 1, 0)
+    parts = []
+    with open(path, 'rb') as f:
+        for member in members[first:]:
+            if member.start >= end:
+                break
+            f.seek(member.offset)
+            text = gzip.decompress(f.read(member.compressed_size))
+            parts.append(text[max(start - member.start, 0):max(end - member.start, 0)])
+    return b"".join(parts)
+
+
+def tail_start(path: str, lines: int) -> int:
+    """
+    Offset of the last `lines` lines of the log, reading members backwards from the end
+    """
+    members = read_index(path)
+    if not members:
+        return 0
+    end = members[-1].start + members[-1].size
+    newlines = 0
+    with open(path, 'rb') as f:
+        for member in reversed(members):
+            f.seek(member.offset)
+            text = gzip.decompress(f.read(member.compressed_size))
+            # The log's final newline ends the last line rather than starting another
+            search_end = len(text) - 1 if member.start + len(text) == end and text.endswith(b"\n") else len(text)
+            position = search_end
+            while True:
+                position = text.rfind(b"\n", 0, position)
+                if position < 0:
+                    break
+                newlines += 1
+                if newlines == lines:
+                    return member.start + position + 1
+    return 0
+
+
+async def follow(path: str, start: int, is_running: Callable[[], bool]) -> AsyncIterator[bytes]:
+    """
+    The log from start on, then its new output as it is written until is_running() turns False
+    """
+    position = start
+    poll = max(settings.ENGINE_LOG_FLUSH_SECONDS / 2, 0.05)
+    finished = False
+    while True:
+        current = await run_in_threadpool(size, path)
+        if current > position:
+            data = await run_in_threadpool(read_range, path, position, min(current, position + settings.ENGINE_LOG_MAX_READ_BYTES))
+            position += len(data)
+            yield data
+            continue
+        if finished:
+            return
+        # One more read after the job ended picks up its last flush
+        finished = not await run_in_threadpool(is_running)
+        if not finished:
+            await asyncio.sleep(poll)
@@ -0,0 +1,199 @@
+import os
+import glob
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from app.core.config import settings
+from app.core.engine_runtime import EngineSpec
+from app.core.metrics import ENGINE_SLOTS_BUSY, ENGINE_SLOTS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# CPU and memory placement of engine containers. The host's cores are split into ENGINE_PLACEMENT_SLOTS engine
+# slots (default EVALUATION_WORKER_SLOTS), each a contiguous run of cores within one NUMA node (or whole nodes
+# when there are fewer slots than nodes), and each engine container is pinned to a slot for as long as it runs:
+# --cpuset-cpus / --cpuset-mems, --cpus, and OMP/MKL/... thread counts equal to the slot's cores, so concurrent
+# engines stop competing for the same cores and caches. Its memory limit is sized from the model file:
+# ENGINE_MEMORY_BASE_MB + ENGINE_MEMORY_MODEL_FACTOR x model size, capped at ENGINE_MEMORY_MAX_MB.
+# A container takes the free slot (lowest first); when every slot is busy (chunk parallelism, direct
+# translations next to jobs) it shares the least used one rather than waiting. Slots are per process: run one
+# worker process per host, or give each its own ENGINE_PLACEMENT_CPUS.
+
+THREAD_ENV_VARS = ["OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS", "TF_NUM_INTRAOP_THREADS"]
+
+
+class Slot(NamedTuple):
+    index: int
+    cpus: List[int]
+    nodes: List[int]
+
+
+def parse_cpulist(text: str) -> List[int]:
+    """
+    CPUs of a kernel cpulist such as "0-3,8-11"
+    """
+    cpus: List[int] = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def format_cpulist(cpus: List[int]) -> str:
+    ranges: List[str] = []
+    for cpu in sorted(cpus):
+        if ranges and int(ranges[-1].split("-")[-1]) == cpu - 1:
+            ranges[-1] = f"{ranges[-1].split('-')[0]}-{cpu}"
+        else:
+            ranges.append(str(cpu))
+    return ",".join(ranges)
+
+
+def numa_nodes() -> Dict[int, List[int]]:
+    """
+    Node -> CPUs of the host (restricted to ENGINE_PLACEMENT_CPUS), one pseudo-node without NUMA information
+    """
+    allowed = set(parse_cpulist(settings.ENGINE_PLACEMENT_CPUS)) if settings.ENGINE_PLACEMENT_CPUS else None
+    nodes: Dict[int, List[int]] = {}
+    for path in glob.glob("/sys/devices/system/node/node[0-9]*/cpulist"):
+        try:
+            with open(path, 'r') as f:
+                cpus = parse_cpulist(f.read())
+        except (OSError, ValueError):
+            continue
+        cpus = [cpu for cpu in cpus if allowed is None or cpu in allowed]
+        if cpus:
+            nodes[int(os.path.basename(os.path.dirname(path))[4:])] = cpus
+    if not nodes:
+        nodes[0] = sorted(allowed) if allowed else list(range(os.cpu_count() or 1))
+    return dict(sorted(nodes.items()))
+
+
+def plan_slots(nodes: Dict[int, List[int]], slots: int) -> List[Slot]:
+    """
+    Split the nodes' CPUs into at most `slots` slots that never straddle a node boundary, except that with
+    fewer slots than nodes each slot takes whole nodes
+    """
+    node_ids = list(nodes)
+    total = sum(len(cpus) for cpus in nodes.values())
+    slots = max(1, min(slots, total))
+    if slots <= len(node_ids):
+        groups = [node_ids[i::slots] for i in range(slots)]
+        return [Slot(i, sorted(cpu for node in group for cpu in nodes[node]), group) for i, group in enumerate(groups)]
+
+    # Slots per node proportional to its CPUs, at least one each; the remainder goes to the largest nodes
+    per_node = {node: max(1, len(nodes[node]) * slots // total) for node in node_ids}
+    for node in sorted(node_ids, key=lambda n: len(nodes[n]), reverse=True):
+        if sum(per_node.values()) >= slots:
+            break
+        if per_node[node] < len(nodes[node]):
+            per_node[node] += 1
+    while sum(per_node.values()) > slots:
+        node = max(node_ids, key=lambda n: per_node[n])
+        per_node[node] -= 1
+
+    planned: List[Slot] = []
+    for node in node_ids:
+        cpus = sorted(nodes[node])
+        count = per_node[node]
+        for i in range(count):
+            planned.append(Slot(len(planned), cpus[i * len(cpus) // count:(i + 1) * len(cpus) // count], [node]))
+    return planned
+
+
+def memory_limit_bytes(model_file: Optional[str]) -> Optional[int]:
+    """
+    Container memory limit for an engine loading model_file, None for no limit
+    """
+    if settings.ENGINE_MEMORY_MODEL_FACTOR <= 0 or not model_file or not os.path.exists(model_file):
+        return None
+    limit = settings.ENGINE_MEMORY_BASE_MB * 1024 * 1024 + int(os.path.getsize(model_file) * settings.ENGINE_MEMORY_MODEL_FACTOR)
+    if settings.ENGINE_MEMORY_MAX_MB > 0:
+        limit = min(limit, settings.ENGINE_MEMORY_MAX_MB * 1024 * 1024)
+    return limit
+
+
+_lock = threading.Lock()
+_slots: Optional[List[Slot]] = None
+_users: List[int] = []
+_multi_node = False
+
+
+def _ensure_slots() -> List[Slot]:
+    global _slots, _users, _multi_node
+    if _slots is None:
+        nodes = numa_nodes()
+        _multi_node = len(nodes) > 1
+        _slots = plan_slots(nodes, settings.ENGINE_PLACEMENT_SLOTS or settings.EVALUATION_WORKER_SLOTS)
+        _users = [0] * len(_slots)
+        ENGINE_SLOTS_TOTAL.set(len(_slots))
+        logger.info(f"Engine placement: {len(_slots)} slot(s) over {len(nodes)} NUMA node(s): "
+                    + ", ".join(f"{format_cpulist(slot.cpus)} (node {','.join(map(str, slot.nodes))})" for slot in _slots))
+    return _slots
+
+
+def place(spec: EngineSpec, slot: Slot) -> EngineSpec:
+    """
+    spec pinned to slot, with thread counts and a memory limit for its model
+    """
+    threads = str(len(slot.cpus))
+    env = dict(spec.env or {})
+    for name in THREAD_ENV_VARS:
+        env.setdefault(name, threads)
+    model = dict(zip(spec.args, spec.args[1:])).get("--model")
+    return spec._replace(
+        env=env,
+        cpuset_cpus=format_cpulist(slot.cpus),
+        # Memory from the slot's node only makes a difference with several nodes
+        cpuset_mems=",".join(map(str, slot.nodes)) if _multi_node else None,
+        cpus=float(len(slot.cpus)),
+        memory_bytes=memory_limit_bytes(spec.host_path(model) if model else None)
+    )
+
+
+@contextmanager
+def placement(spec: EngineSpec) -> Iterator[EngineSpec]:
+    """
+    Hold an engine slot for the duration of one container run; yields the placed spec (spec unchanged when
+    placement is disabled)
+    """
+    if not settings.ENGINE_PLACEMENT_ENABLED:
+        yield spec
+        return
+    with _lock:
+        slots = _ensure_slots()
+        index = min(range(len(slots)), key=lambda i: _users[i])
+        if _users[index]:
+            logger.warning(f"Every engine slot is busy, {spec.name or 'engine container'} shares slot {index}")
+        _users[index] += 1
+        ENGINE_SLOTS_BUSY.set(sum(1 for users in _users if users))
+    try:
+        yield place(spec, slots[index])
+    finally:
+        with _lock:
+            _users[index] -= 1
+            ENGINE_SLOTS_BUSY.set(sum(1 for users in _users if users))
+
+
+def status() -> Dict[str, Any]:
+    """
+    Slot layout and usage of this process, for /system/status
+    """
+    if not settings.ENGINE_PLACEMENT_ENABLED:
+        return {"enabled": False, "total_slots": 0, "busy_slots": 0, "slots": []}
+    with _lock:
+        slots = _ensure_slots()
+        return {
+            "enabled": True,
+            "numa_nodes": len({node for slot in slots for node in slot.nodes}),
+            "total_slots": len(slots),
+            "busy_slots": sum(1 for users in _users if users),
+            "slots": [
+                {"slot": slot.index, "cpus": format_cpulist(slot.cpus), "nodes": slot.nodes, "containers": _users[slot.index]}
+                for slot in slots
+            ]
+        }
@@ -0,0 +1,406 @@
+import os
+import json
+import time
+import logging
+import threading
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+from app.core import engine_logs
+
+logger = logging.getLogger(__name__)
+
+# Where engine containers run. ENGINE_RUNTIME selects:
+#   docker-api  the Docker Engine API over the unix socket DOCKER_SOCKET_PATH, through one pooled HTTP client
+#               per process (no docker CLI process per run, kill or health check; connections are reused)
+#   cli         the docker CLI, as before
+#   fake        no Docker at all: "containers" translate with the fake engine (FAKE_ENGINE_* settings), so the
+#               real evaluation path (retries, chunks, timeouts, cancellation, engine logs) runs in tests
+# Daemon health is cached for DOCKER_HEALTH_CACHE_SECONDS, so per-job preflight checks cost nothing.
+
+# Docker's exit code of a killed container
+KILLED_EXIT_CODE = 137
+_STREAMS = {1: "stdout", 2: "stderr"}
+
+
+class EngineSpec(NamedTuple):
+    """
+    One engine container: image, engine arguments, bind mounts (host path, container path, read only),
+    optional container name, labels, environment and CPU/memory limits (see app/core/engine_placement.py)
+    """
+    image: str
+    args: List[str]
+    binds: List[Tuple[str, str, bool]]
+    name: Optional[str] = None
+    labels: Optional[Dict[str, str]] = None
+    env: Optional[Dict[str, str]] = None
+    cpuset_cpus: Optional[str] = None
+    cpuset_mems: Optional[str] = None
+    cpus: Optional[float] = None
+    memory_bytes: Optional[int] = None
+
+    def docker_command(self) -> List[str]:
+        """
+        Equivalent `docker run` command line, for the CLI runtime and for logs
+        """
+        command = ["docker", "run", "--rm"]
+        if self.name:
+            command += ["--name", self.name]
+        for key, value in (self.labels or {}).items():
+            command += ["--label", f"{key}={value}"]
+        for key, value in (self.env or {}).items():
+            command += ["-e", f"{key}={value}"]
+        if self.cpuset_cpus:
+            command += ["--cpuset-cpus", self.cpuset_cpus]
+        if self.cpuset_mems:
+            command += ["--cpuset-mems", self.cpuset_mems]
+        if self.cpus:
+            command += ["--cpus", f"{self.cpus:g}"]
+        if self.memory_bytes:
+            command += ["--memory", str(self.memory_bytes), "--memory-swap", str(self.memory_bytes)]
+        for host_path, container_path, read_only in self.binds:
+            command += ["-v", f"{host_path}:{container_path}{':ro' if read_only else ''}"]
+        return command + [self.image, *self.args]
+
+    def host_path(self, container_path: str) -> str:
+        """
+        Host path of a path inside the container, through the bind mounts
+        """
+        for host_path, mount_point, _ in self.binds:
+            if container_path == mount_point or container_path.startswith(mount_point.rstrip("/") + "/"):
+                return os.path.join(host_path, os.path.relpath(container_path, mount_point))
+        return container_path
+
+
+class DockerAPIError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"Docker API error {status_code}: {message}")
+        self.status_code = status_code
+
+
+class EngineRuntime:
+    name = ""
+
+    def __init__(self):
+        self._health: Optional[Dict[str, Any]] = None
+        self._health_checked = 0.0
+        # Re-entrant: a failing check marks the runtime unavailable from inside health()
+        self._health_lock = threading.RLock()
+
+    def run(self, spec: EngineSpec, timeout_seconds: float, log_path: Optional[str] = None, tag: str = "engine") -> engine_logs.EngineRun:
+        """
+        Run a container to completion with its output streamed to the engine log at log_path. On timeout the
+        container is removed and subprocess.TimeoutExpired raised, carrying the output tails.
+        """
+        raise NotImplementedError
+
+    def remove_container(self, name: str) -> None:
+        """
+        Force-remove a container by exact name or ID (kills it if running); a missing container is not an error
+        """
+        raise NotImplementedError
+
+    def remove_labelled(self, label: str, value: str) -> int:
+        """
+        Force-remove every container with label=value; returns how many were found
+        """
+        raise NotImplementedError
+
+    def _check(self) -> str:
+        """
+        Daemon version, raising if the daemon cannot be reached
+        """
+        raise NotImplementedError
+
+    def health(self, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Cached daemon reachability and version
+        """
+        with self._health_lock:
+            if refresh or self._health is None or time.monotonic() - self._health_checked >= settings.DOCKER_HEALTH_CACHE_SECONDS:
+                try:
+                    self._health = {"runtime": self.name, "available": True, "version": self._check(), "error": None}
+                except Exception as e:
+                    self._health = {"runtime": self.name, "available": False, "version": None, "error": str(e)}
+                self._health["checked_at"] = datetime.utcnow().isoformat()
+                self._health_checked = time.monotonic()
+            return dict(self._health)
+
+    def mark_unavailable(self) -> None:
+        """
+        Drop a cached healthy state after a failed daemon call, so the next check reflects it
+        """
+        with self._health_lock:
+            if self._health and self._health["available"]:
+                self._health_checked = 0.0
+
+
+class DockerAPIRuntime(EngineRuntime):
+    name = "docker-api"
+
+    def __init__(self, socket_path: str):
+        super().__init__()
+        self.socket_path = socket_path
+        transport = httpx.HTTPTransport(
+            uds=socket_path,
+            limits=httpx.Limits(max_connections=settings.DOCKER_API_MAX_CONNECTIONS, max_keepalive_connections=settings.DOCKER_API_MAX_CONNECTIONS)
+        )
+        # The host name is ignored on a unix socket; unversioned paths get the daemon's current API version
+        self._client = httpx.Client(transport=transport, base_url="http://docker", timeout=httpx.Timeout(30.0, pool=60.0))
+
+    def _request(self, method: str, path: str, allow: Tuple[int, ...] = (), **kwargs) -> httpx.Response:
+        try:
+            response = self._client.request(method, path, **kwargs)
+        except httpx.TransportError as e:
+            if not isinstance(e, httpx.ReadTimeout):
+                self.mark_unavailable()
+            raise
+        if response.status_code >= 400 and response.status_code not in allow:
+            try:
+                message = response.json().get("message", response.text)
+            except ValueError:
+                message = response.text
+            raise DockerAPIError(response.status_code, message)
+        return response
+
+    def _check(self) -> str:
+        version = self._request("GET", "/version").json()
+        return f"{version.get('Version')} (API {version.get('ApiVersion')})"
+
+    def _pull(self, image: str) -> None:
+        repository, tag = image, "latest"
+        name, _, maybe_tag = image.rpartition(":")
+        if name and "/" not in maybe_tag:
+            repository, tag = name, maybe_tag
+        logger.info(f"Pulling engine image {image}")
+        with self._client.stream("POST", "/images/create", params={"fromImage": repository, "tag": tag},
+                                 timeout=httpx.Timeout(30.0, read=None)) as response:
+            for line in response.iter_lines():
+                if line and "error" in line:
+                    error = json.loads(line).get("error")
+                    if error:
+                        raise DockerAPIError(response.status_code, error)
+            if response.status_code >= 400:
+                raise DockerAPIError(response.status_code, f"pulling {image} failed")
+
+    def _create(self, spec: EngineSpec) -> str:
+        body = {
+            "Image": spec.image,
+            "Cmd": spec.args,
+            "Labels": spec.labels or {},
+            "Env": [f"{key}={value}" for key, value in (spec.env or {}).items()],
+            "HostConfig": {
+                "Binds": [f"{host_path}:{container_path}{':ro' if read_only else ''}" for host_path, container_path, read_only in spec.binds]
+            }
+        }
+        if spec.cpuset_cpus:
+            body["HostConfig"]["CpusetCpus"] = spec.cpuset_cpus
+        if spec.cpuset_mems:
+            body["HostConfig"]["CpusetMems"] = spec.cpuset_mems
+        if spec.cpus:
+            body["HostConfig"]["NanoCpus"] = int(spec.cpus * 1e9)
+        if spec.memory_bytes:
+            # Memory+swap equal to the limit: an engine over it is OOM-killed instead of swapping
+            body["HostConfig"]["Memory"] = spec.memory_bytes
+            body["HostConfig"]["MemorySwap"] = spec.memory_bytes
+        params = {"name": spec.name} if spec.name else {}
+        response = self._request("POST", "/containers/create", allow=(404,), params=params, json=body)
+        if response.status_code == 404:
+            # Missing image, pulled like `docker run` would
+            self._pull(spec.image)
+            response = self._request("POST", "/containers/create", params=params, json=body)
+        return response.json()["Id"]
+
+    def _stream_logs(self, container_id: str, capture: engine_logs.Capture) -> None:
+        """
+        Follow the container's multiplexed output (8-byte frame headers: stream, 0, 0, 0, big-endian size)
+        """
+        try:
+            with self._client.stream("GET", f"/containers/{container_id}/logs", params={"follow": 1, "stdout": 1, "stderr": 1},
+                                     timeout=httpx.Timeout(30.0, read=None)) as response:
+                if response.status_code >= 400:
+                    return
+                buffer = b""
+                for data in response.iter_bytes():
+                    buffer += data
+                    while len(buffer) >= 8:
+                        size = int.from_bytes(buffer[4:8], "big")
+                        if len(buffer) < 8 + size:
+                            break
+                        capture.feed(_STREAMS.get(buffer[0], "stdout"), buffer[8:8 + size])
+                        buffer = buffer[8 + size:]
+        except Exception as e:
+            logger.warning(f"Engine output stream of container {container_id[:12]} ended: {str(e)}")
+
+    def run(self, spec: EngineSpec, timeout_seconds: float, log_path: Optional[str] = None, tag: str = "engine") -> engine_logs.EngineRun:
+        with engine_logs.opened(log_path) as log:
+            capture = engine_logs.Capture(log, tag)
+            capture.note(f"started {datetime.now().isoformat(timespec='seconds')}")
+            container_id = self._create(spec)
+            try:
+                self._request("POST", f"/containers/{container_id}/start")
+                pump = threading.Thread(target=self._stream_logs, args=(container_id, capture), daemon=True)
+                pump.start()
+                try:
+                    # The wait response is held back until the container stops
+                    response = self._request("POST", f"/containers/{container_id}/wait", allow=(404,),
+                                             timeout=httpx.Timeout(30.0, read=timeout_seconds))
+                except httpx.ReadTimeout:
+                    self.remove_container(container_id)
+                    pump.join(timeout=5)
+                    capture.finish()
+                    capture.note(f"killed after {timeout_seconds}s timeout")
+                    raise subprocess.TimeoutExpired(spec.docker_command(), timeout_seconds, output=capture.tail("stdout"), stderr=capture.tail("stderr"))
+                # Removed meanwhile (cancelled)
+                returncode = response.json().get("StatusCode", KILLED_EXIT_CODE) if response.status_code != 404 else KILLED_EXIT_CODE
+                pump.join(timeout=30)
+                capture.finish()
+                capture.note(f"exited with code {returncode}")
+            finally:
+                self.remove_container(container_id)
+        return capture.result(returncode)
+
+    def remove_container(self, name: str) -> None:
+        try:
+            self._request("DELETE", f"/containers/{name}", allow=(404, 409), params={"force": "true"})
+        except Exception as e:
+            logger.error(f"Error removing engine container {name}: {str(e)}")
+
+    def remove_labelled(self, label: str, value: str) -> int:
+        containers = self._request("GET", "/containers/json", params={"all": "true", "filters": json.dumps({"label": [f"{label}={value}"]})}).json()
+        for container in containers:
+            self.remove_container(container["Id"])
+        return len(containers)
+
+
+class CLIRuntime(EngineRuntime):
+    name = "cli"
+
+    def _check(self) -> str:
+        result = subprocess.run(["docker", "version", "--format", "{{.Server.Version}}"], capture_output=True, text=True, timeout=10)
+        if result.returncode != 0:
+            raise Exception(result.stderr.strip() or f"docker version exited with code {result.returncode}")
+        return result.stdout.strip()
+
+    def run(self, spec: EngineSpec, timeout_seconds: float, log_path: Optional[str] = None, tag: str = "engine") -> engine_logs.EngineRun:
+        try:
+            return engine_logs.run(spec.docker_command(), timeout_seconds, log_path, tag=tag)
+        except subprocess.TimeoutExpired:
+            # The timeout only stops the docker client
+            if spec.name:
+                self.remove_container(spec.name)
+            raise
+
+    def remove_container(self, name: str) -> None:
+        try:
+            subprocess.run(["docker", "rm", "-f", name], capture_output=True, text=True, timeout=30)
+        except Exception as e:
+            logger.error(f"Error removing engine container {name}: {str(e)}")
+
+    def remove_labelled(self, label: str, value: str) -> int:
+        listing = subprocess.run(["docker", "ps", "-aq", "--filter", f"label={label}={value}"], capture_output=True, text=True, timeout=30)
+        container_ids = listing.stdout.split()
+        if container_ids:
+            subprocess.run(["docker", "rm", "-f", *container_ids], capture_output=True, text=True, timeout=60)
+        return len(container_ids)
+
+
+class FakeRuntime(EngineRuntime):
+    """
+    Runs the fake engine in-process: --input is translated into --output (paths mapped through the bind
+    mounts) after FAKE_ENGINE_STARTUP_SECONDS. Removing a running container ends it with code 137.
+    """
+    name = "fake"
+
+    def __init__(self):
+        super().__init__()
+        self._running: Dict[str, Tuple[Dict[str, str], threading.Event]] = {}
+        self._lock = threading.Lock()
+        self.runs = 0
+
+    def _check(self) -> str:
+        return "fake"
+
+    def run(self, spec: EngineSpec, timeout_seconds: float, log_path: Optional[str] = None, tag: str = "engine") -> engine_logs.EngineRun:
+        # Imported here: app.core.evaluation imports this module
+        from app.core.evaluation import fake_engine_translate_file
+
+        args = dict(zip(spec.args, spec.args[1:]))
+        name = spec.name or f"fake-{id(spec)}-{time.monotonic_ns()}"
+        killed = threading.Event()
+        with self._lock:
+            if name in self._running:
+                raise DockerAPIError(409, f"Conflict. The container name \"/{name}\" is already in use")
+            self._running[name] = (spec.labels or {}, killed)
+            self.runs += 1
+        try:
+            with engine_logs.opened(log_path) as log:
+                capture = engine_logs.Capture(log, tag)
+                capture.note(f"started {datetime.now().isoformat(timespec='seconds')}")
+                capture.feed("stderr", f"loading model {args.get('--model')}\n".encode("utf-8"))
+                if killed.wait(min(settings.FAKE_ENGINE_STARTUP_SECONDS, timeout_seconds)):
+                    returncode = KILLED_EXIT_CODE
+                elif settings.FAKE_ENGINE_STARTUP_SECONDS >= timeout_seconds:
+                    capture.note(f"killed after {timeout_seconds}s timeout")
+                    raise subprocess.TimeoutExpired(spec.docker_command(), timeout_seconds, output=capture.tail("stdout"), stderr=capture.tail("stderr"))
+                else:
+                    segments = fake_engine_translate_file(spec.host_path(args["--input"]), spec.host_path(args["--output"]),
+                                                          settings.FAKE_ENGINE_SEGMENT_LATENCY_MS)
+                    capture.feed("stdout", f"translated {segments} segments\n".encode("utf-8"))
+                    returncode = KILLED_EXIT_CODE if killed.is_set() else 0
+                capture.finish()
+                capture.note(f"exited with code {returncode}")
+        finally:
+            with self._lock:
+                self._running.pop(name, None)
+        return capture.result(returncode)
+
+    def remove_container(self, name: str) -> None:
+        with self._lock:
+            running = self._running.get(name)
+        if running:
+            running[1].set()
+
+    def remove_labelled(self, label: str, value: str) -> int:
+        with self._lock:
+            matching = [killed for labels, killed in self._running.values() if labels.get(label) == value]
+        for killed in matching:
+            killed.set()
+        return len(matching)
+
+
+def socket_path() -> str:
+    """
+    DOCKER_SOCKET_PATH, or the socket of a unix:// DOCKER_HOST
+    """
+    docker_host = os.getenv("DOCKER_HOST", "")
+    if docker_host.startswith("unix://"):
+        return docker_host[len("unix://"):]
+    return settings.DOCKER_SOCKET_PATH
+
+
+_runtime: Optional[EngineRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get() -> EngineRuntime:
+    """
+    The process-wide engine runtime chosen by ENGINE_RUNTIME
+    """
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None or _runtime.name != settings.ENGINE_RUNTIME:
+            if settings.ENGINE_RUNTIME == "cli":
+                _runtime = CLIRuntime()
+            elif settings.ENGINE_RUNTIME == "fake":
+                _runtime = FakeRuntime()
+            else:
+                if settings.ENGINE_RUNTIME != "docker-api":
+                    logger.warning(f"Unknown ENGINE_RUNTIME {settings.ENGINE_RUNTIME!r}, using docker-api")
+                    settings.ENGINE_RUNTIME = "docker-api"
+                _runtime = DockerAPIRuntime(socket_path())
+        return _runtime
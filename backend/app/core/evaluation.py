@@ -4,20 +4,30 @@ import subprocess
 import yaml
 import time
 import random
-from typing import Optional, Dict, Any, Tuple, List
+from typing import Optional, Dict, Any, Tuple, List, Callable
 from datetime import datetime
 import logging
 from pathlib import Path
 import tempfile
 import json
+import zlib
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core import chunking, cancellation, throughput, sampling, significance, segment_store, output_files, testset_ingest, engine_logs, engine_runtime, engine_placement
 from app.db.database import SessionLocal, get_db
 from app.schemas.evaluation import EvaluationStatus
 from app.crud import crud_evaluation, crud_model_version, crud_training_result, crud_testset, crud_language_pair
 from app.db.models import ModelVersion, Testset, LanguagePair, TrainingResult, EvaluationJob
 from app.schemas.training_result import TrainingResultCreate
+from app.core.metrics import (
+    record_stage,
+    record_engine_throughput,
+    EVALUATION_QUEUE_WAIT,
+    EVALUATION_JOBS_FINISHED,
+    SCORING_DURATION
+)
 
 logger = logging.getLogger(__name__)
 
@@ -69,6 +79,45 @@ This is a sample English text for testing 24.
     
     logger.info(f"[FAKE MODE] Created fake output file with {num_lines} lines: {output_path}")
 
+def fake_engine_translate_line(line: str) -> str:
+    """
+    Deterministic stand-in translation of one segment: roughly one token in five is
+    replaced based on a CRC of (position, token), so reruns produce identical output
+    and BLEU against a source-derived reference stays in a realistic range
+    """
+    tokens = line.split()
+    translated = []
+    for position, token in enumerate(tokens):
+        checksum = zlib.crc32(f"{position}:{token}".encode("utf-8"))
+        translated.append(f"x{checksum % 997}" if checksum % 5 == 0 else token)
+    return " ".join(translated)
+
+def fake_engine_translate_file(source_file: str, output_path: str, segment_latency_ms: float = 0.0, batch_size: int = 256) -> int:
+    """
+    Stream the source file through fake_engine_translate_line, simulating
+    segment_latency_ms of engine time per segment (slept per batch to keep
+    timer overhead negligible). Returns the number of segments translated.
+    """
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    segments = 0
+    batch = []
+    with open(source_file, 'r', encoding='utf-8', errors='replace') as src, open(output_path, 'w', encoding='utf-8') as out:
+        for line in src:
+            batch.append(fake_engine_translate_line(line.rstrip("\n")))
+            if len(batch) >= batch_size:
+                if segment_latency_ms > 0:
+                    time.sleep(len(batch) * segment_latency_ms / 1000.0)
+                out.write("\n".join(batch) + "\n")
+                out.flush()
+                segments += len(batch)
+                batch = []
+        if batch:
+            if segment_latency_ms > 0:
+                time.sleep(len(batch) * segment_latency_ms / 1000.0)
+            out.write("\n".join(batch) + "\n")
+            segments += len(batch)
+    return segments
+
 def fake_calculate_metrics(output_file: str, reference_file: str, source_file: str) -> Tuple[float, float]:
     """
     Calculate fake BLEU and COMET scores for testing purposes
@@ -93,7 +142,13 @@ def fake_perform_model_evaluation(
     mode_type: Optional[str] = None,
     sub_mode_type: Optional[str] = None,
     custom_params: Optional[str] = None,
-    job_id: Optional[int] = None
+    job_id: Optional[int] = None,
+    model_type: str = "finetuned",
+    stage_timings: Optional[Dict[str, Any]] = None,
+    on_stage: Optional[Callable[[EvaluationStatus], None]] = None,
+    calculate_metrics: bool = True,
+    reused: Optional[sampling.ReusedTranslations] = None,
+    allow_chunking: bool = True
 ) -> Dict[str, Any]:
     """
     Fake model evaluation for testing purposes
@@ -104,19 +159,74 @@ def fake_perform_model_evaluation(
     logger.info(f"[FAKE MODE] Output: {output_path}")
     logger.info(f"[FAKE MODE] Mode: {mode_type}, SubMode: {sub_mode_type}")
     
-    # Simulate processing time
-    time.sleep(2)
+    if on_stage:
+        on_stage(EvaluationStatus.RUNNING_ENGINE)
+    engine_start = time.perf_counter()
+    engine_source, engine_output = sampling.engine_input(source_file, output_path, reused)
+    segments, tokens = count_segments_and_tokens(engine_source)
+    
+    def fake_engine_run(run_source: str, run_output: str) -> None:
+        # Simulate engine startup / model load time
+        cancellation.raise_if_cancelled(job_id)
+        if settings.FAKE_ENGINE_STARTUP_SECONDS > 0:
+            cancellation.wait(job_id, settings.FAKE_ENGINE_STARTUP_SECONDS)
+        
+        log_file = engine_logs.log_path(job_id) if job_id is not None else None
+        engine_logs.append(log_file, f"[fake-engine {model_type}] translating {os.path.basename(run_source)}\n")
+        # Create fake translation output
+        if settings.FAKE_ENGINE_OUTPUT == "deterministic":
+            fake_engine_translate_file(run_source, run_output, settings.FAKE_ENGINE_SEGMENT_LATENCY_MS)
+        else:
+            fake_create_translation_output(run_source, run_output)
+        engine_logs.append(log_file, f"[fake-engine {model_type}] wrote {os.path.basename(run_output)}\n")
     
-    # Create fake translation output
-    fake_create_translation_output(source_file, output_path)
+    chunk_stats = None
+    if reused and not segments:
+        logger.info(f"[FAKE MODE] Job {job_id}: every segment reused, engine not started")
+    elif allow_chunking and chunking.should_chunk(segments):
+        chunk_stats = chunking.translate_in_chunks(
+            engine_source,
+            engine_output,
+            fake_engine_run,
+            job_id=job_id,
+            engine_signature=engine_signature(model_file, hparams_file, source_lang, target_lang, mode_type, sub_mode_type, custom_params)
+        )
+    else:
+        fake_engine_run(engine_source, engine_output)
+    if reused:
+        sampling.merge_reused(engine_output, output_path, reused, len(reused.indices) + segments)
     
-    # Calculate fake metrics
-    fake_bleu, fake_comet = fake_calculate_metrics(output_path, target_file, source_file)
+    engine_elapsed = time.perf_counter() - engine_start
+    record_stage(stage_timings, EvaluationStatus.RUNNING_ENGINE.value, engine_elapsed, model_type)
+    record_chunked_run(stage_timings, model_type, chunk_stats)
+    if segments and (not chunk_stats or not chunk_stats["resumed_chunks"]):
+        record_engine_throughput(stage_timings, model_type, segments, tokens, engine_elapsed)
+    
+    if not calculate_metrics:
+        return {"bleu_score": None, "comet_score": None, "output_path": output_path}
+    
+    cancellation.raise_if_cancelled(job_id)
+    if on_stage:
+        on_stage(EvaluationStatus.CALCULATING_METRICS)
+    metrics_start = time.perf_counter()
+    
+    # Calculate metrics (real scorers when benchmarking the scoring path)
+    comet_segment_scores: List[float] = []
+    if settings.FAKE_EVALUATION_REAL_METRICS:
+        with SCORING_DURATION.time(metric="bleu"):
+            fake_bleu = calculate_bleu_score(output_file=output_path, reference_file=target_file)
+        with SCORING_DURATION.time(metric="comet"):
+            fake_comet = calculate_comet_score(output_file=output_path, source_file=source_file, reference_file=target_file, segment_scores=comet_segment_scores)
+    else:
+        fake_bleu, fake_comet = fake_calculate_metrics(output_path, target_file, source_file)
+    
+    record_stage(stage_timings, EvaluationStatus.CALCULATING_METRICS.value, time.perf_counter() - metrics_start, model_type)
     
     logger.info(f"[FAKE MODE] Fake evaluation completed for job {job_id}")
     return {
         "bleu_score": fake_bleu,
         "comet_score": fake_comet,
+        "comet_segment_scores": comet_segment_scores,
         "output_path": output_path
     }
 
@@ -245,6 +355,21 @@ def determine_langpack_folder(source_code: str, target_code: str) -> Optional[st
     # Format as source+target if not in the predefined list
     return f"{source_code}{target_code}"
 
+def count_segments_and_tokens(file_path: str) -> Tuple[int, int]:
+    """
+    Count lines (segments) and whitespace tokens of a text file in one streaming pass
+    """
+    segments = 0
+    tokens = 0
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                segments += 1
+                tokens += len(line.split())
+    except OSError as e:
+        logger.warning(f"Could not count segments in {file_path}: {str(e)}")
+    return segments, tokens
+
 def create_temp_directory(job_id: int) -> str:
     """Create a temporary directory for evaluation output"""
     temp_dir = os.path.join(settings.DOCKER_VOLUME_TMP_PATH_HOST, "evaluation_temp", f"evaluation_{job_id}")
@@ -285,6 +410,12 @@ def calculate_bleu_score(output_file: str, reference_file: str) -> float:
         logger.info(f"BLEU calculation - Output file: {output_file} (Size: {os.path.getsize(output_file)} bytes)")
         logger.info(f"BLEU calculation - Reference file: {reference_file} (Size: {os.path.getsize(reference_file)} bytes)")
         
+        # Sum the per-segment statistics the segment store is built from, so BLEU is counted once
+        bleu_score = bleu_from_segment_statistics(output_file, reference_file)
+        if bleu_score is not None:
+            logger.info(f"BLEU score calculation successful: {bleu_score}")
+            return bleu_score
+        
         # Using sacrebleu through subprocess
         logger.info("Running sacrebleu command...")
         cmd = ["sacrebleu", reference_file, "-i", output_file, "-b"]
@@ -307,7 +438,25 @@ def calculate_bleu_score(output_file: str, reference_file: str) -> float:
         logger.error(f"Error calculating BLEU score: {str(e)}")
         return 0.0
 
-def calculate_comet_score(output_file: str, source_file: str, reference_file: str) -> float:
+def bleu_from_segment_statistics(output_file: str, reference_file: str) -> Optional[float]:
+    """
+    Corpus BLEU (as the sacrebleu CLI prints it) summed from per-segment statistics, which are staged for
+    the output's segment store; None to fall back to the CLI (files do not line up, or the statistics
+    do not reproduce sacrebleu)
+    """
+    try:
+        if not sampling.check_bleu_statistics():
+            return None
+        stats = segment_store.bleu_file_statistics(output_file, reference_file)
+        if stats is None:
+            return None
+        segment_store.stage_column(output_file, "bleu", stats)
+        return sampling.reported_bleu(stats.sum(axis=0))
+    except Exception as e:
+        logger.warning(f"Could not compute BLEU of {output_file} from segment statistics: {str(e)}")
+        return None
+
+def calculate_comet_score(output_file: str, source_file: str, reference_file: str, segment_scores: Optional[List[float]] = None) -> float:
     """
     Calculate COMET score using unbabel-comet
     
@@ -315,10 +464,15 @@ def calculate_comet_score(output_file: str, source_file: str, reference_file: st
         output_file: Path to the system output file
         source_file: Path to the source file
         reference_file: Path to the reference file
+        segment_scores: If given, filled with the per-segment scores in segment order
     
     Returns:
         float: COMET score
     """
+    # Outputs compressed by the retention service are scored from a decompressed temporary copy
+    if not os.path.exists(output_file) and output_files.exists(output_file):
+        with output_files.plain_copy(output_file) as plain_output:
+            return calculate_comet_score(plain_output, source_file, reference_file, segment_scores)
     try:
         # Verify files exist before calculation
         if not os.path.exists(output_file):
@@ -367,17 +521,27 @@ def calculate_comet_score(output_file: str, source_file: str, reference_file: st
         # This is a simplification - adapt based on actual output format
         logger.info(f"COMET result output: {result.stdout}")
         comet_score = None
+        first_score = None
         for line in result.stdout.strip().split('\n'):
             if "score:" in line:
-                comet_score = float(line.split("score:")[1].strip())
-                logger.info(f"COMET score extracted: {comet_score}")
-                return comet_score
+                value = float(line.split("score:")[1].strip())
+                if first_score is None:
+                    first_score = value
+                # comet-score prints "<file>\tSegment <i>\tscore: <x>" per segment, then "<file>\tscore: <x>"
+                if "Segment" in line:
+                    if segment_scores is not None:
+                        segment_scores.append(value)
+                else:
+                    comet_score = value
         
+        if comet_score is None:
+            comet_score = first_score
         if comet_score is None:
             logger.error("Failed to extract COMET score from output")
             return 0.0
         
-        return 0.0
+        logger.info(f"COMET score extracted: {comet_score}")
+        return comet_score
     except subprocess.CalledProcessError as e:
         logger.error(f"Error calculating COMET score - Command failed: {str(e)}")
         logger.error(f"Command stderr: {e.stderr}")
@@ -389,6 +553,108 @@ def calculate_comet_score(output_file: str, source_file: str, reference_file: st
         logger.error(f"Error calculating COMET score: {str(e)}")
         return 0.0
 
+def sampled_job_translations(db: Session, job: EvaluationJob, source_file: str) -> Dict[str, sampling.ReusedTranslations]:
+    """
+    Translations a full run can take over from the sampled job it was upgraded from, per model type
+    """
+    if not job.reuse_translations_from_job_id:
+        return {}
+    sample_job = crud_evaluation.get(db=db, job_id=job.reuse_translations_from_job_id)
+    if not sample_job or sample_job.status != EvaluationStatus.COMPLETED.value or not sample_job.sample_size:
+        logger.info(f"Job {job.job_id}: sampled job {job.reuse_translations_from_job_id} is not available, translating every segment")
+        return {}
+
+    sample_outputs = {}
+    if (sample_job.evaluation_model_type or "finetuned") == "both":
+        sample_outputs["finetuned"] = sample_job.output_file_path
+        try:
+            sample_outputs["base"] = json.loads(sample_job.base_model_result or "{}").get("output_file_path")
+        except (json.JSONDecodeError, TypeError):
+            pass
+    else:
+        sample_outputs[sample_job.evaluation_model_type or "finetuned"] = sample_job.output_file_path
+
+    reused = {}
+    for model_type, output_file in sample_outputs.items():
+        found = sampling.reusable_translations(output_file, source_file)
+        if found:
+            reused[model_type] = found
+    return reused
+
+def sample_confidence_intervals(job_id: int, output_path: str, target_file: str, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Bootstrap confidence intervals of a sampled run's scores; None if they cannot be computed"""
+    try:
+        return sampling.confidence_intervals(output_path, target_file, result.get("comet_segment_scores"), seed=job_id)
+    except Exception as e:
+        logger.warning(f"Job {job_id}: could not compute confidence intervals: {str(e)}")
+        return None
+
+def store_segment_statistics(job_id: int, output_path: str, target_file: str, result: Dict[str, Any],
+                             source_file: Optional[str] = None) -> None:
+    """
+    Stage the segment store of an output (with its per-segment COMET scores); the store, the corpus chrF
+    and the significance test come from build_segment_stores() once the job's results are saved.
+    Failures only cost segment-level analysis.
+    """
+    try:
+        segment_store.stage(output_path, target_file, result.get("comet_segment_scores"), source_file)
+    except Exception as e:
+        logger.warning(f"Job {job_id}: could not stage segment statistics of {output_path}: {str(e)}")
+
+def _build_segment_store(job_id: int, output_path: Optional[str]) -> Optional[float]:
+    """Build an output's staged segment store; its corpus chrF, None without a store"""
+    if not output_path:
+        return None
+    try:
+        segment_store.build_pending(output_path)
+        store = segment_store.load(output_path)
+        return segment_store.corpus_metrics(store)["chrf_score"] if store else None
+    except Exception as e:
+        logger.warning(f"Job {job_id}: could not store segment statistics of {output_path}: {str(e)}")
+        return None
+
+def build_segment_stores(db: Session, job_ids: List[int]) -> int:
+    """
+    Post-completion step of the worker: build the segment stores staged by the completed ones of job_ids,
+    streaming their files, then fill in chrF (the base model's in base_model_result too) and, for base +
+    finetuned runs, the significance test, on each job and the jobs coalesced into it. Runs after the
+    results are saved, so large testsets do not hold back job completion. Returns how many jobs were updated.
+    """
+    updated = 0
+    for job in db.query(EvaluationJob).filter(
+        EvaluationJob.job_id.in_(list(job_ids)),
+        EvaluationJob.status == EvaluationStatus.COMPLETED.value,
+        EvaluationJob.coalesced_into_job_id.is_(None)
+    ).all():
+        try:
+            update_data: Dict[str, Any] = {"chrf_score": _build_segment_store(job.job_id, job.output_file_path)}
+            base_model_result = json.loads(job.base_model_result) if job.base_model_result else None
+            if base_model_result:
+                base_model_result["chrf_score"] = _build_segment_store(job.job_id, base_model_result.get("output_file_path"))
+                update_data["base_model_result"] = json.dumps(base_model_result)
+                # Is the finetuned model's difference to the base model more than resampling noise?
+                update_data["significance"] = significance.compare_json(base_model_result.get("output_file_path"), job.output_file_path, seed=job.job_id)
+
+            followers = db.query(EvaluationJob).filter(EvaluationJob.coalesced_into_job_id == job.job_id).all()
+            for target in [job] + followers:
+                for field, value in update_data.items():
+                    setattr(target, field, value)
+            if update_data.get("significance") and any(target.details_added_successfully for target in [job] + followers):
+                training_result = crud_training_result.get_by_version_and_testset(db=db, version_id=job.version_id, testset_id=job.testset_id)
+                if training_result:
+                    training_result.significance = update_data["significance"]
+            db.commit()
+            updated += 1
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Job {job.job_id}: could not build segment stores: {str(e)}")
+    return updated
+
+def sample_result_json(sample_info: Optional[Dict[str, Any]]) -> Optional[str]:
+    if not sample_info:
+        return None
+    return json.dumps({key: value for key, value in sample_info.items() if key not in ("source_file", "target_file")})
+
 def run_evaluation(job_id: int) -> None:
     """
     Run the evaluation process for a specific job
@@ -404,6 +670,17 @@ def run_evaluation(job_id: int) -> None:
             print(f"Error: Job {job_id} not found")
             return
 
+        # Per-job stage timings, persisted on the job for cross-version regression analysis
+        stage_timings: Dict[str, Any] = {}
+        if job.requested_at:
+            queue_wait = max((datetime.utcnow() - job.requested_at).total_seconds(), 0.0)
+            EVALUATION_QUEUE_WAIT.observe(queue_wait)
+            stage_timings.setdefault("job", {})["QUEUE_WAIT"] = round(queue_wait, 4)
+        setup_start = time.perf_counter()
+
+        def on_stage(stage: EvaluationStatus) -> None:
+            crud_evaluation.update_status(db=db, job_id=job_id, status=stage)
+
         # Update job status
         logger.info(f"Job {job_id}: Changing status from {job.status} to {EvaluationStatus.PREPARING_SETUP}")
         job = crud_evaluation.update_status(
@@ -522,11 +799,10 @@ def run_evaluation(job_id: int) -> None:
             logger.info(f"Job {job_id}: Found testset source file: {testset.source_file_path_on_server} (Size: {os.path.getsize(testset.source_file_path_on_server)} bytes)")
             # Log the first few lines of the testset source file (useful for debugging)
             try:
-                with open(testset.source_file_path_on_server, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()[:5]  # First 5 lines
-                    logger.info(f"Job {job_id}: First {len(lines)} lines of source testset:")
-                    for i, line in enumerate(lines):
-                        logger.info(f"Line {i+1}: {line.strip()}")
+                lines = testset_ingest.head(testset.source_file_path_on_server, 5)  # First 5 lines
+                logger.info(f"Job {job_id}: First {len(lines)} lines of source testset:")
+                for i, line in enumerate(lines):
+                    logger.info(f"Line {i+1}: {line.strip()}")
             except Exception as e:
                 logger.warning(f"Job {job_id}: Could not read source testset content: {str(e)}")
 
@@ -547,11 +823,10 @@ def run_evaluation(job_id: int) -> None:
             logger.info(f"Job {job_id}: Found testset target file: {testset.target_file_path_on_server} (Size: {os.path.getsize(testset.target_file_path_on_server)} bytes)")
             # Log the first few lines of the testset target file (useful for debugging)
             try:
-                with open(testset.target_file_path_on_server, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()[:5]  # First 5 lines
-                    logger.info(f"Job {job_id}: First {len(lines)} lines of target testset:")
-                    for i, line in enumerate(lines):
-                        logger.info(f"Line {i+1}: {line.strip()}")
+                lines = testset_ingest.head(testset.target_file_path_on_server, 5)  # First 5 lines
+                logger.info(f"Job {job_id}: First {len(lines)} lines of target testset:")
+                for i, line in enumerate(lines):
+                    logger.info(f"Line {i+1}: {line.strip()}")
             except Exception as e:
                 logger.warning(f"Job {job_id}: Could not read target testset content: {str(e)}")
 
@@ -560,6 +835,25 @@ def run_evaluation(job_id: int) -> None:
         temp_dir = create_temp_directory(job_id)
         logger.info(f"Job {job_id}: Created temporary directory: {temp_dir}")
         
+        # Sampled quick-look runs translate a stratified sample of the testset; full runs upgraded
+        # from a sampled job take over the translations it already has
+        source_path = testset.source_file_path_on_server
+        target_path = testset.target_file_path_on_server
+        sample_info = None
+        if job.sample_size:
+            try:
+                sample_info = sampling.draw_sample(source_path, target_path, temp_dir, sample_size=job.sample_size, seed=sampling.sample_seed(job.testset_id))
+            except (OSError, ValueError) as e:
+                error_msg = f"Error: Could not sample testset: {str(e)}"
+                logger.error(f"Job {job_id}: {error_msg}")
+                update_job_failed(db=db, job=job, error=error_msg)
+                return
+            source_path, target_path = sample_info["source_file"], sample_info["target_file"]
+        reused_translations = sampled_job_translations(db, job, source_path)
+        for model_type, reused in reused_translations.items():
+            stage_timings.setdefault(model_type, {})["reused_segments"] = len(reused.indices)
+        record_stage(stage_timings, EvaluationStatus.PREPARING_SETUP.value, time.perf_counter() - setup_start)
+        
         # Run the evaluation based on the evaluation model type
         base_model_result = None
         
@@ -575,13 +869,13 @@ def run_evaluation(job_id: int) -> None:
                 
                 base_output_path = os.path.join(temp_dir, "base_output.txt")
                 logger.info(f"Job {job_id}: Base model output will be saved to: {base_output_path}")
-                logger.info(f"Job {job_id}: Base model details - Source: {testset.source_file_path_on_server}, Target: {testset.target_file_path_on_server}")
+                logger.info(f"Job {job_id}: Base model details - Source: {source_path}, Target: {target_path}")
                 logger.info(f"Job {job_id}: Base model details - Model: {model_version.base_model_file_path_on_server}, HParams: {model_version.base_hparams_file_path_on_server}")
                 logger.info(f"Job {job_id}: Calling perform_model_evaluation for base model")
                 
                 base_result = perform_model_evaluation(
-                    source_file=testset.source_file_path_on_server,
-                    target_file=testset.target_file_path_on_server,
+                    source_file=source_path,
+                    target_file=target_path,
                     model_file=model_version.base_model_file_path_on_server,
                     hparams_file=model_version.base_hparams_file_path_on_server,
                     output_path=base_output_path,
@@ -590,10 +884,24 @@ def run_evaluation(job_id: int) -> None:
                     mode_type=job.mode_type,
                     sub_mode_type=job.sub_mode_type,
                     custom_params=job.custom_params,
-                    job_id=job.job_id
+                    job_id=job.job_id,
+                    model_type="base",
+                    stage_timings=stage_timings,
+                    on_stage=on_stage,
+                    segments_per_second=throughput.expected_segments_per_second(
+                        db,
+                        lang_pair_id=model_version.lang_pair_id,
+                        mode_type=job.mode_type,
+                        sub_mode_type=job.sub_mode_type,
+                        model_file=model_version.base_model_file_path_on_server
+                    ),
+                    reused=reused_translations.get("base")
                 )
                 
                 logger.info(f"Job {job_id}: Base model evaluation completed successfully with results: BLEU={base_result['bleu_score']}, COMET={base_result['comet_score']}")
+                store_segment_statistics(job_id, base_output_path, target_path, base_result, source_path)
+                if sample_info:
+                    sample_info["base"] = sample_confidence_intervals(job_id, base_output_path, target_path, base_result)
                 
                 if evaluation_model_type == "base":
                     # Update job with base model results
@@ -606,9 +914,12 @@ def run_evaluation(job_id: int) -> None:
                         update_data={
                             "bleu_score": base_result["bleu_score"],
                             "comet_score": base_result["comet_score"],
-                            "output_file_path": base_output_path
+                            "output_file_path": base_output_path,
+                            "stage_timings": json.dumps(stage_timings),
+                            "sample_result": sample_result_json(sample_info)
                         }
                     )
+                    EVALUATION_JOBS_FINISHED.inc(status=EvaluationStatus.COMPLETED.value)
                     
                     # If requested, update training results
                     if job.auto_add_to_details_requested:
@@ -639,7 +950,7 @@ def run_evaluation(job_id: int) -> None:
             except Exception as e:
                 error_msg = f"Error in base model evaluation: {str(e)}"
                 logger.error(f"Job {job_id}: {error_msg}")
-                update_job_failed(db=db, job=job, error=error_msg)
+                update_job_failed(db=db, job=job, error=error_msg, stage_timings=stage_timings)
                 
         if evaluation_model_type == "finetuned" or evaluation_model_type == "both":
             # Evaluate with finetuned model
@@ -653,13 +964,13 @@ def run_evaluation(job_id: int) -> None:
         
                 finetuned_output_path = os.path.join(temp_dir, "finetuned_output.txt")
                 logger.info(f"Job {job_id}: Finetuned model output will be saved to: {finetuned_output_path}")
-                logger.info(f"Job {job_id}: Finetuned model details - Source: {testset.source_file_path_on_server}, Target: {testset.target_file_path_on_server}")
+                logger.info(f"Job {job_id}: Finetuned model details - Source: {source_path}, Target: {target_path}")
                 logger.info(f"Job {job_id}: Finetuned model details - Model: {model_version.model_file_path_on_server}, HParams: {model_version.hparams_file_path_on_server}")
                 logger.info(f"Job {job_id}: Calling perform_model_evaluation for finetuned model")
                 
                 finetuned_result = perform_model_evaluation(
-                    source_file=testset.source_file_path_on_server,
-                    target_file=testset.target_file_path_on_server,
+                    source_file=source_path,
+                    target_file=target_path,
                     model_file=model_version.model_file_path_on_server,
                     hparams_file=model_version.hparams_file_path_on_server,
                     output_path=finetuned_output_path,
@@ -668,16 +979,32 @@ def run_evaluation(job_id: int) -> None:
                     mode_type=job.mode_type,
                     sub_mode_type=job.sub_mode_type,
                     custom_params=job.custom_params,
-                    job_id=job.job_id
+                    job_id=job.job_id,
+                    model_type="finetuned",
+                    stage_timings=stage_timings,
+                    on_stage=on_stage,
+                    segments_per_second=throughput.expected_segments_per_second(
+                        db,
+                        lang_pair_id=model_version.lang_pair_id,
+                        mode_type=job.mode_type,
+                        sub_mode_type=job.sub_mode_type,
+                        model_file=model_version.model_file_path_on_server
+                    ),
+                    reused=reused_translations.get("finetuned")
                 )
                 
                 logger.info(f"Job {job_id}: Finetuned model evaluation completed successfully with results: BLEU={finetuned_result['bleu_score']}, COMET={finetuned_result['comet_score']}")
+                store_segment_statistics(job_id, finetuned_output_path, target_path, finetuned_result, source_path)
+                if sample_info:
+                    sample_info["finetuned"] = sample_confidence_intervals(job_id, finetuned_output_path, target_path, finetuned_result)
                 
                 # Update job with finetuned model results
                 update_data = {
                     "bleu_score": finetuned_result["bleu_score"],
                     "comet_score": finetuned_result["comet_score"],
-                    "output_file_path": finetuned_output_path
+                    "output_file_path": finetuned_output_path,
+                    "stage_timings": json.dumps(stage_timings),
+                    "sample_result": sample_result_json(sample_info)
                 }
                 
                 if base_model_result:
@@ -692,6 +1019,7 @@ def run_evaluation(job_id: int) -> None:
                     completed_at=datetime.now(),
                     update_data=update_data
                 )
+                EVALUATION_JOBS_FINISHED.inc(status=EvaluationStatus.COMPLETED.value)
                 
                 # If requested, update training results
                 if job.auto_add_to_details_requested:
@@ -736,7 +1064,7 @@ def run_evaluation(job_id: int) -> None:
             except Exception as e:
                 error_msg = f"Error in finetuned model evaluation: {str(e)}"
                 logger.error(f"Job {job_id}: {error_msg}")
-                update_job_failed(db=db, job=job, error=error_msg)
+                update_job_failed(db=db, job=job, error=error_msg, stage_timings=stage_timings)
                 
     except Exception as e:
         print(f"Unexpected error in evaluation job {job_id}: {str(e)}")
@@ -789,13 +1117,8 @@ def translate_text(
         source_lang = "en"  # Default placeholder
         target_lang = "vi"  # Default placeholder
         
-        # Construct the Docker command
-        docker_cmd = [
-            "docker", "run", "--rm",
-            "-v", f"{os.path.dirname(model_file_path)}:/app/models",
-            "-v", f"{os.path.dirname(source_file_path)}:/app/input",
-            "-v", f"{os.path.dirname(output_file_path)}:/app/output",
-            "nmt-engine:latest",
+        # Construct the engine container
+        engine_args = [
             "--input", f"/app/input/{os.path.basename(source_file_path)}",
             "--output", f"/app/output/{os.path.basename(output_file_path)}",
             "--model", f"/app/models/{os.path.basename(model_file_path)}",
@@ -806,24 +1129,31 @@ def translate_text(
         
         # Add mode parameters if specified
         if mode_type:
-            docker_cmd.extend(["--mode", mode_type])
+            engine_args.extend(["--mode", mode_type])
         
         if sub_mode_type and (mode_type == "Samsung Note Mode" or mode_type == "Samsung Internet Mode"):
-            docker_cmd.extend(["--sub-mode", sub_mode_type])
+            engine_args.extend(["--sub-mode", sub_mode_type])
         
         if custom_params and mode_type == "Custom":
             # Split custom params by spaces and add to command
-            docker_cmd.extend(custom_params.split())
+            engine_args.extend(custom_params.split())
         
-        # Execute the translation
-        process = subprocess.run(
-            docker_cmd,
-            check=True,
-                    stdout=subprocess.PIPE, 
-                    stderr=subprocess.PIPE, 
-            timeout=60  # Short timeout for direct translation
+        spec = engine_runtime.EngineSpec(
+            image=settings.NMT_ENGINE_DOCKER_IMAGE,
+            args=engine_args,
+            binds=[
+                (os.path.dirname(model_file_path), "/app/models", False),
+                (os.path.dirname(source_file_path), "/app/input", False),
+                (os.path.dirname(output_file_path), "/app/output", False)
+            ]
         )
         
+        # Execute the translation
+        with engine_placement.placement(spec) as placed_spec:
+            run = engine_runtime.get().run(placed_spec, 60)  # Short timeout for direct translation
+        if run.returncode != 0:
+            raise subprocess.CalledProcessError(run.returncode, spec.docker_command(), output=run.stdout_tail, stderr=run.stderr_tail)
+        
         # Read the translated output
         with open(output_file_path, 'r') as f:
             translated_text = f.read()
@@ -831,7 +1161,7 @@ def translate_text(
         return translated_text
         
     except subprocess.CalledProcessError as e:
-        raise Exception(f"Translation process failed: {e.stderr.decode()}")
+        raise Exception(f"Translation process failed: {e.stderr}")
     except subprocess.TimeoutExpired:
         raise Exception("Translation process timed out")
     except Exception as e:
@@ -843,6 +1173,183 @@ def translate_text(
         if os.path.exists(output_file_path):
             os.unlink(output_file_path)
 
+def build_engine_spec(
+    source_file: str,
+    output_path: str,
+    model_file: str,
+    hparams_file: str,
+    source_lang: str,
+    target_lang: str,
+    mode_type: Optional[str] = None,
+    sub_mode_type: Optional[str] = None,
+    custom_params: Optional[str] = None,
+    job_id: Optional[int] = None,
+    model_type: str = "finetuned",
+    container_name: Optional[str] = None
+) -> engine_runtime.EngineSpec:
+    """
+    Engine container translating source_file into output_path with the given model and mode.
+    The container is labelled with job_id (see app/core/cancellation.py) and named container_name.
+    """
+    base_engine_args = [
+        "--input", f"/app/input/{os.path.basename(source_file)}",
+        "--output", f"/app/output/{os.path.basename(output_path)}",
+        "--model", f"/app/models/{os.path.basename(model_file)}",
+        "--hparams", f"/app/models/{os.path.basename(hparams_file)}",
+        "--source-lang", source_lang,
+        "--target-lang", target_lang,
+    ]
+    
+    logger.info(f"Docker image: {settings.NMT_ENGINE_DOCKER_IMAGE}")
+    logger.info(f"Docker volume mappings:")
+    logger.info(f"  {os.path.dirname(model_file)} -> /app/models")
+    logger.info(f"  {os.path.dirname(source_file)} -> /app/input")
+    logger.info(f"  {os.path.dirname(output_path)} -> /app/output")
+    
+    return engine_runtime.EngineSpec(
+        image=settings.NMT_ENGINE_DOCKER_IMAGE,
+        args=construct_evaluation_docker_command(
+            base_command_args=base_engine_args,
+            selected_mode=mode_type,
+            sub_mode_type=sub_mode_type,
+            custom_params=custom_params
+        ),
+        binds=[
+            (os.path.dirname(model_file), "/app/models", True),
+            (os.path.dirname(source_file), "/app/input", True),
+            (os.path.dirname(output_path), "/app/output", False)
+        ],
+        name=container_name,
+        labels=cancellation.engine_container_labels(job_id, model_type)
+    )
+
+def engine_signature(model_file: str, hparams_file: str, source_lang: str, target_lang: str,
+                     mode_type: Optional[str], sub_mode_type: Optional[str], custom_params: Optional[str]) -> Dict[str, Any]:
+    """
+    Everything besides the source text that determines engine output; chunk checkpoints are only reused when it matches
+    """
+    return {
+        "model_file": model_file,
+        "model_mtime": os.path.getmtime(model_file) if os.path.exists(model_file) else None,
+        "hparams_file": hparams_file,
+        "source_lang": source_lang,
+        "target_lang": target_lang,
+        "mode_type": mode_type,
+        "sub_mode_type": sub_mode_type,
+        "custom_params": custom_params
+    }
+
+def record_chunked_run(stage_timings: Optional[Dict[str, Any]], model_type: str, chunk_stats: Optional[Dict[str, int]]) -> None:
+    """Note chunk counts of a chunked engine run in the job's stage_timings"""
+    if stage_timings is not None and chunk_stats:
+        bucket = stage_timings.setdefault(model_type, {})
+        bucket["chunks"] = chunk_stats["chunks"]
+        bucket["resumed_chunks"] = chunk_stats["resumed_chunks"]
+
+def run_engine_with_retries(
+    spec: engine_runtime.EngineSpec,
+    job_id: Optional[int] = None,
+    timeout_seconds: int = 1800,
+    max_retries: int = 3,
+    retry_delay_seconds: int = 10,
+    container_name: Optional[str] = None
+) -> None:
+    """
+    Run one engine container, retrying up to max_retries times on failure or timeout.
+    Raises cancellation.JobCancelled as soon as the job is cancelled.
+    """
+    last_exception = None
+    for attempt in range(1, max_retries + 1):
+        cancellation.raise_if_cancelled(job_id)
+        if container_name:
+            # A container left over from a crashed run of this job would block the name
+            cancellation.remove_container(container_name)
+        try:
+            logger.info(f"Attempt {attempt}/{max_retries} - Starting Docker command...")
+            start_time = time.time()
+            
+            # Run the engine container pinned to an engine slot, its output streamed to the job's engine log
+            with engine_placement.placement(spec) as placed_spec:
+                logger.info(f"Engine container of job {job_id}: cpus {placed_spec.cpuset_cpus}, memory limit {placed_spec.memory_bytes}")
+                run = engine_runtime.get().run(
+                    placed_spec,
+                    timeout_seconds,
+                    engine_logs.log_path(job_id) if job_id is not None else None,
+                    tag=container_name or "engine"
+                )
+            if run.returncode != 0:
+                if run.returncode == engine_runtime.KILLED_EXIT_CODE and placed_spec.memory_bytes and not cancellation.is_cancelled(job_id):
+                    logger.warning(f"Engine container of job {job_id} was killed; it may have exceeded its {placed_spec.memory_bytes} byte memory limit (ENGINE_MEMORY_*)")
+                raise subprocess.CalledProcessError(run.returncode, placed_spec.docker_command(), output=run.stdout_tail, stderr=run.stderr_tail)
+            
+            end_time = time.time()
+            execution_time = end_time - start_time
+            logger.info(f"Docker process completed successfully for job {job_id} (attempt {attempt}). Execution time: {execution_time:.2f} seconds")
+            
+            # Only the last lines are kept in memory, the whole output is in the engine log
+            if run.stdout_tail:
+                logger.info(f"Docker process stdout for job {job_id} (last lines):\n{run.stdout_tail}")
+            if run.stderr_tail:
+                logger.warning(f"Docker process stderr for job {job_id} (last lines):\n{run.stderr_tail}")
+            
+            break  # Success, exit retry loop
+        except subprocess.CalledProcessError as e:
+            # Killed because the job was cancelled: not a failure worth retrying
+            cancellation.raise_if_cancelled(job_id)
+            execution_time = time.time() - start_time
+            logger.error(f"Docker command failed for job {job_id} (attempt {attempt}/{max_retries}) after {execution_time:.2f} seconds")
+            logger.error(f"Error code: {e.returncode}")
+            
+            # Log the tail of the error output
+            if e.stderr:
+                logger.error(f"Error output (last lines):\n{e.stderr}")
+            if e.stdout:
+                logger.error(f"Command stdout (last lines):\n{e.stdout}")
+            
+            last_exception = e
+            if attempt < max_retries:
+                logger.info(f"Retrying Docker run in {retry_delay_seconds} seconds...")
+                cancellation.wait(job_id, retry_delay_seconds)
+            else:
+                error_msg = f"Docker run failed after {max_retries} attempts for job {job_id}. Last error: {e.stderr if hasattr(e, 'stderr') else str(e)}"
+                logger.error(error_msg)
+                raise Exception(error_msg)
+        except subprocess.TimeoutExpired as e:
+            logger.error(f"Docker command timed out after {timeout_seconds} seconds for job {job_id} (attempt {attempt}/{max_retries})")
+            
+            # The runtime stops the timed out container; make sure this run's container, and only that one, is gone
+            if container_name:
+                logger.info(f"Removing timed out engine container {container_name}")
+                cancellation.remove_container(container_name)
+            else:
+                logger.warning(f"Engine container of job {job_id} has no name, it may still be running")
+            
+            last_exception = e
+            if attempt < max_retries:
+                logger.info(f"Retrying Docker run in {retry_delay_seconds} seconds...")
+                cancellation.wait(job_id, retry_delay_seconds)
+            else:
+                error_msg = f"Docker run timed out after {max_retries} attempts for job {job_id}. Process took longer than {timeout_seconds} seconds"
+                logger.error(error_msg)
+                raise Exception(error_msg)
+        except cancellation.JobCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error running Docker command for job {job_id} (attempt {attempt}/{max_retries})")
+            logger.error(f"Error type: {type(e).__name__}")
+            logger.error(f"Error message: {str(e)}")
+            last_exception = e
+            if attempt < max_retries:
+                logger.info(f"Retrying Docker run in {retry_delay_seconds} seconds...")
+                cancellation.wait(job_id, retry_delay_seconds)
+            else:
+                error_msg = f"Unexpected error after {max_retries} attempts for job {job_id}: {str(e)}"
+                logger.error(error_msg)
+                raise Exception(error_msg)
+    else:
+        # If we exit the loop without breaking, raise the last exception
+        raise last_exception if last_exception else Exception("Unknown error in Docker run")
+
 def perform_model_evaluation(
     source_file: str,
     target_file: str,
@@ -854,11 +1361,30 @@ def perform_model_evaluation(
     mode_type: Optional[str] = None,
     sub_mode_type: Optional[str] = None,
     custom_params: Optional[str] = None,
-    job_id: Optional[int] = None
+    job_id: Optional[int] = None,
+    model_type: str = "finetuned",
+    stage_timings: Optional[Dict[str, Any]] = None,
+    on_stage: Optional[Callable[[EvaluationStatus], None]] = None,
+    calculate_metrics: bool = True,
+    segments_per_second: Optional[float] = None,
+    reused: Optional[sampling.ReusedTranslations] = None,
+    allow_chunking: bool = True
 ) -> Dict[str, Any]:
     """
     Perform model evaluation by translating source file and calculating metrics.
     Uses Docker to run the translation engine. Retries up to 3 times if Docker fails to start.
+    Source files longer than EVALUATION_CHUNK_SEGMENTS are translated in checkpointed chunks
+    (see app/core/chunking.py), so retries and reruns only redo the unfinished chunks;
+    allow_chunking=False always uses a single engine run (one model load).
+    segments_per_second is the historical engine throughput used to size the engine timeout
+    (see app/core/throughput.py); without it NMT_ENGINE_TIMEOUT_SECONDS applies.
+    With `reused` (translations of a sampled run, see app/core/sampling.py) the engine only
+    translates the other segments and output_path is the merge of both.
+    
+    Stage durations and engine throughput are recorded in the metrics registry and,
+    when stage_timings is given, accumulated there under model_type. on_stage is
+    called on RUNNING_ENGINE / CALCULATING_METRICS transitions. With
+    calculate_metrics=False only the translation is produced (scores are None).
     """
     # Check if fake evaluation mode is enabled
     if settings.FAKE_EVALUATION_MODE:
@@ -874,42 +1400,37 @@ def perform_model_evaluation(
             mode_type=mode_type,
             sub_mode_type=sub_mode_type,
             custom_params=custom_params,
-            job_id=job_id
+            job_id=job_id,
+            model_type=model_type,
+            stage_timings=stage_timings,
+            on_stage=on_stage,
+            calculate_metrics=calculate_metrics,
+            reused=reused,
+            allow_chunking=allow_chunking
         )
 
+    cancellation.raise_if_cancelled(job_id)
     logger.info(f"Starting model evaluation for job_id: {job_id if job_id else 'N/A'}")
     logger.info(f"Source: {source_file}, Target (Ref): {target_file}, Model: {model_file}, HParams: {hparams_file}")
     logger.info(f"Output will be saved to: {output_path}")
     logger.info(f"Lang: {source_lang}->{target_lang}, Mode: {mode_type}, SubMode: {sub_mode_type}, CustomParams: {custom_params}")
 
-    DOCKER_TIMEOUT_SECONDS = 1800  # 30 minutes
+    DOCKER_TIMEOUT_SECONDS = settings.NMT_ENGINE_TIMEOUT_SECONDS  # Until the testset size is known
     MAX_DOCKER_RETRIES = 3
     DOCKER_RETRY_DELAY_SECONDS = 10
 
+    prepare_start = time.perf_counter()
     try:
         # Ensure output directory exists
         logger.info(f"Creating output directory: {os.path.dirname(output_path)}")
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        # Check if Docker is available
-        try:
-            logger.info("Checking if Docker is available...")
-            docker_check = subprocess.run(
-                ["docker", "--version"], 
-                check=True, 
-                capture_output=True, 
-                text=True, 
-                timeout=10
-            )
-            logger.info(f"Docker check result: {docker_check.stdout.strip()}")
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Docker check failed - Command error: {e.returncode}")
-            logger.error(f"Docker check stdout: {e.stdout if hasattr(e, 'stdout') else 'N/A'}")
-            logger.error(f"Docker check stderr: {e.stderr if hasattr(e, 'stderr') else 'N/A'}")
-        except subprocess.TimeoutExpired:
-            logger.error("Docker check timed out after 10 seconds")
-        except Exception as e:
-            logger.error(f"Docker check failed with unexpected error: {str(e)}, type: {type(e).__name__}")
+        # Check if Docker is available (cached by the runtime, no daemon call per job)
+        runtime_health = engine_runtime.get().health()
+        if runtime_health["available"]:
+            logger.info(f"Engine runtime {runtime_health['runtime']}: Docker {runtime_health['version']}")
+        else:
+            logger.error(f"Engine runtime {runtime_health['runtime']} unavailable: {runtime_health['error']}")
         # Continue anyway, as the main Docker command will retry
         
         # Check if files exist and have correct permissions
@@ -923,135 +1444,90 @@ def perform_model_evaluation(
         
         # Prepare Docker command
         logger.info(f"Preparing Docker command for job {job_id}")
-        base_docker_cmd = [
-            "docker", "run", "--rm",
-            "-v", f"{os.path.dirname(model_file)}:/app/models:ro",
-            "-v", f"{os.path.dirname(source_file)}:/app/input:ro",
-            "-v", f"{os.path.dirname(output_path)}:/app/output",
-            settings.NMT_ENGINE_DOCKER_IMAGE,
-            "--input", f"/app/input/{os.path.basename(source_file)}",
-            "--output", f"/app/output/{os.path.basename(output_path)}",
-            "--model", f"/app/models/{os.path.basename(model_file)}",
-            "--hparams", f"/app/models/{os.path.basename(hparams_file)}",
-            "--source-lang", source_lang,
-            "--target-lang", target_lang,
-        ]
-        
-        logger.info(f"Docker image: {settings.NMT_ENGINE_DOCKER_IMAGE}")
-        logger.info(f"Docker volume mappings:")
-        logger.info(f"  {os.path.dirname(model_file)} -> /app/models")
-        logger.info(f"  {os.path.dirname(source_file)} -> /app/input")
-        logger.info(f"  {os.path.dirname(output_path)} -> /app/output")
-        
-        full_docker_cmd = construct_evaluation_docker_command(
-            base_command_args=base_docker_cmd,
-            selected_mode=mode_type,
+        engine_source, engine_output = sampling.engine_input(source_file, output_path, reused)
+        engine_spec = build_engine_spec(
+            source_file=engine_source,
+            output_path=engine_output,
+            model_file=model_file,
+            hparams_file=hparams_file,
+            source_lang=source_lang,
+            target_lang=target_lang,
+            mode_type=mode_type,
             sub_mode_type=sub_mode_type,
-            custom_params=custom_params
+            custom_params=custom_params,
+            job_id=job_id,
+            model_type=model_type,
+            container_name=cancellation.engine_container_name(job_id, model_type)
         )
-        logger.info(f"Executing Docker command: {' '.join(full_docker_cmd)}")
+        logger.info(f"Executing Docker command: {' '.join(engine_spec.docker_command())}")
+        record_stage(stage_timings, EvaluationStatus.PREPARING_ENGINE.value, time.perf_counter() - prepare_start, model_type)
 
-        last_exception = None
-        for attempt in range(1, MAX_DOCKER_RETRIES + 1):
-            try:
-                logger.info(f"Attempt {attempt}/{MAX_DOCKER_RETRIES} - Starting Docker command...")
-                start_time = time.time()
-                
-                # Run Docker command
-                process = subprocess.run(
-                    full_docker_cmd,
-                    check=True,
-                    capture_output=True,
-                    text=True,
-                    timeout=DOCKER_TIMEOUT_SECONDS
+        if on_stage:
+            on_stage(EvaluationStatus.RUNNING_ENGINE)
+        engine_start = time.perf_counter()
+        segments, tokens = count_segments_and_tokens(engine_source)
+        DOCKER_TIMEOUT_SECONDS = throughput.engine_timeout_seconds(segments, segments_per_second)
+        if stage_timings is not None:
+            stage_timings.setdefault(model_type, {})["engine_timeout_seconds"] = DOCKER_TIMEOUT_SECONDS
+        chunk_stats = None
+        if reused and not segments:
+            logger.info(f"Job {job_id}: every segment reused from the sampled run, engine not started")
+        elif allow_chunking and chunking.should_chunk(segments):
+            chunk_timeout_seconds = throughput.engine_timeout_seconds(min(segments, settings.EVALUATION_CHUNK_SEGMENTS), segments_per_second)
+            logger.info(f"Job {job_id}: engine timeout {chunk_timeout_seconds}s per chunk")
+            # Large testsets: translate in checkpointed chunks so a retry or a rerun after a crash resumes
+            def translate_chunk(chunk_source: str, chunk_output: str) -> None:
+                chunk_container = cancellation.engine_container_name(job_id, model_type, os.path.splitext(os.path.basename(chunk_source))[0])
+                chunk_spec = build_engine_spec(
+                    source_file=chunk_source,
+                    output_path=chunk_output,
+                    model_file=model_file,
+                    hparams_file=hparams_file,
+                    source_lang=source_lang,
+                    target_lang=target_lang,
+                    mode_type=mode_type,
+                    sub_mode_type=sub_mode_type,
+                    custom_params=custom_params,
+                    job_id=job_id,
+                    model_type=model_type,
+                    container_name=chunk_container
                 )
-                
-                end_time = time.time()
-                execution_time = end_time - start_time
-                logger.info(f"Docker process completed successfully for job {job_id} (attempt {attempt}). Execution time: {execution_time:.2f} seconds")
-                
-                # Log Docker output details
-                stdout_lines = process.stdout.strip().split('\n')
-                if len(stdout_lines) > 10:
-                    logger.info(f"Docker process stdout for job {job_id} (first 10 lines):\n" + '\n'.join(stdout_lines[:10]))
-                    logger.info(f"... and {len(stdout_lines) - 10} more lines")
-                else:
-                    logger.info(f"Docker process stdout for job {job_id}:\n{process.stdout}")
-                
-                if process.stderr:
-                    stderr_lines = process.stderr.strip().split('\n')
-                    if len(stderr_lines) > 10:
-                        logger.warning(f"Docker process stderr for job {job_id} (first 10 lines):\n" + '\n'.join(stderr_lines[:10]))
-                        logger.warning(f"... and {len(stderr_lines) - 10} more lines")
-                    else:
-                        logger.warning(f"Docker process stderr for job {job_id}:\n{process.stderr}")
-                
-                break  # Success, exit retry loop
-            except subprocess.CalledProcessError as e:
-                execution_time = time.time() - start_time
-                logger.error(f"Docker command failed for job {job_id} (attempt {attempt}/{MAX_DOCKER_RETRIES}) after {execution_time:.2f} seconds")
-                logger.error(f"Error code: {e.returncode}")
-                
-                # Log detailed error output
-                if hasattr(e, 'stderr') and e.stderr:
-                    stderr_lines = e.stderr.split('\n')
-                    if len(stderr_lines) > 20:
-                        logger.error(f"Error output (first 20 lines):\n" + '\n'.join(stderr_lines[:20]))
-                        logger.error(f"... and {len(stderr_lines) - 20} more lines")
-                    else:
-                        logger.error(f"Error output:\n{e.stderr}")
-                
-                if hasattr(e, 'stdout') and e.stdout:
-                    stdout_lines = e.stdout.split('\n')
-                    if len(stdout_lines) > 10:
-                        logger.error(f"Command stdout (first 10 lines):\n" + '\n'.join(stdout_lines[:10]))
-                    else:
-                        logger.error(f"Command stdout:\n{e.stdout}")
-                
-                last_exception = e
-                if attempt < MAX_DOCKER_RETRIES:
-                    logger.info(f"Retrying Docker run in {DOCKER_RETRY_DELAY_SECONDS} seconds...")
-                    time.sleep(DOCKER_RETRY_DELAY_SECONDS)
-                else:
-                    error_msg = f"Docker run failed after {MAX_DOCKER_RETRIES} attempts for job {job_id}. Last error: {e.stderr if hasattr(e, 'stderr') else str(e)}"
-                    logger.error(error_msg)
-                    raise Exception(error_msg)
-            except subprocess.TimeoutExpired as e:
-                logger.error(f"Docker command timed out after {DOCKER_TIMEOUT_SECONDS} seconds for job {job_id} (attempt {attempt}/{MAX_DOCKER_RETRIES})")
-                
-                # Try to kill the process if still running
-                try:
-                    logger.info(f"Attempting to kill any hanging Docker processes...")
-                    # This is a simplified approach - in production you might want a more robust solution
-                    kill_cmd = f"docker ps | grep {settings.NMT_ENGINE_DOCKER_IMAGE} | awk '{{print $1}}' | xargs -r docker kill"
-                    subprocess.run(kill_cmd, shell=True, timeout=30)
-                    logger.info("Kill command executed")
-                except Exception as kill_err:
-                    logger.error(f"Error trying to kill Docker processes: {str(kill_err)}")
-                
-                last_exception = e
-                if attempt < MAX_DOCKER_RETRIES:
-                    logger.info(f"Retrying Docker run in {DOCKER_RETRY_DELAY_SECONDS} seconds...")
-                    time.sleep(DOCKER_RETRY_DELAY_SECONDS)
-                else:
-                    error_msg = f"Docker run timed out after {MAX_DOCKER_RETRIES} attempts for job {job_id}. Process took longer than {DOCKER_TIMEOUT_SECONDS} seconds"
-                    logger.error(error_msg)
-                    raise Exception(error_msg)
-            except Exception as e:
-                logger.error(f"Unexpected error running Docker command for job {job_id} (attempt {attempt}/{MAX_DOCKER_RETRIES})")
-                logger.error(f"Error type: {type(e).__name__}")
-                logger.error(f"Error message: {str(e)}")
-                last_exception = e
-                if attempt < MAX_DOCKER_RETRIES:
-                    logger.info(f"Retrying Docker run in {DOCKER_RETRY_DELAY_SECONDS} seconds...")
-                    time.sleep(DOCKER_RETRY_DELAY_SECONDS)
-                else:
-                    error_msg = f"Unexpected error after {MAX_DOCKER_RETRIES} attempts for job {job_id}: {str(e)}"
-                    logger.error(error_msg)
-                    raise Exception(error_msg)
+                run_engine_with_retries(
+                    chunk_spec,
+                    job_id=job_id,
+                    timeout_seconds=chunk_timeout_seconds,
+                    max_retries=MAX_DOCKER_RETRIES,
+                    retry_delay_seconds=DOCKER_RETRY_DELAY_SECONDS,
+                    container_name=chunk_container
+                )
+
+            chunk_stats = chunking.translate_in_chunks(
+                engine_source,
+                engine_output,
+                translate_chunk,
+                job_id=job_id,
+                engine_signature=engine_signature(model_file, hparams_file, source_lang, target_lang, mode_type, sub_mode_type, custom_params)
+            )
         else:
-            # If we exit the loop without breaking, raise the last exception
-            raise last_exception if last_exception else Exception("Unknown error in Docker run")
+            logger.info(f"Job {job_id}: engine timeout {DOCKER_TIMEOUT_SECONDS}s for {segments} segments")
+            run_engine_with_retries(
+                engine_spec,
+                job_id=job_id,
+                timeout_seconds=DOCKER_TIMEOUT_SECONDS,
+                max_retries=MAX_DOCKER_RETRIES,
+                retry_delay_seconds=DOCKER_RETRY_DELAY_SECONDS,
+                container_name=cancellation.engine_container_name(job_id, model_type)
+            )
+        if reused:
+            sampling.merge_reused(engine_output, output_path, reused, len(reused.indices) + segments)
+
+        engine_elapsed = time.perf_counter() - engine_start
+        record_stage(stage_timings, EvaluationStatus.RUNNING_ENGINE.value, engine_elapsed, model_type)
+        record_chunked_run(stage_timings, model_type, chunk_stats)
+        if segments and (not chunk_stats or not chunk_stats["resumed_chunks"]):
+            # Throughput of a resumed run would count segments translated by an earlier attempt
+            record_engine_throughput(stage_timings, model_type, segments, tokens, engine_elapsed)
+        logger.info(f"Engine throughput for job {job_id}: {segments} segments in {engine_elapsed:.2f}s ({segments / engine_elapsed if engine_elapsed > 0 else 0:.2f} segments/sec)")
 
         # Check if output file was created
         logger.info(f"Checking if output file was created: {output_path}")
@@ -1078,10 +1554,18 @@ def perform_model_evaluation(
                     logger.info(f"Line {i+1}: {line.strip()}")
         except Exception as e:
             logger.warning(f"Could not read translation output content: {str(e)}")
+        if not calculate_metrics:
+            # Caller scores the output itself (e.g. split per testset after a matrix run)
+            return {"bleu_score": None, "comet_score": None, "output_path": output_path}
         # Calculate scores
+        cancellation.raise_if_cancelled(job_id)
+        if on_stage:
+            on_stage(EvaluationStatus.CALCULATING_METRICS)
+        metrics_start = time.perf_counter()
         logger.info(f"Calculating BLEU score for job {job_id}...")
         try:
-            bleu_score = calculate_bleu_score(output_file=output_path, reference_file=target_file)
+            with SCORING_DURATION.time(metric="bleu"):
+                bleu_score = calculate_bleu_score(output_file=output_path, reference_file=target_file)
             logger.info(f"Calculated BLEU score for job {job_id}: {bleu_score}")
         except Exception as e:
             logger.error(f"BLEU score calculation failed: {str(e)}")
@@ -1089,21 +1573,28 @@ def perform_model_evaluation(
             bleu_score = 0.0
             
         logger.info(f"Calculating COMET score for job {job_id}...")
+        comet_segment_scores: List[float] = []
         try:
-            comet_score = calculate_comet_score(output_file=output_path, source_file=source_file, reference_file=target_file)
+            with SCORING_DURATION.time(metric="comet"):
+                comet_score = calculate_comet_score(output_file=output_path, source_file=source_file, reference_file=target_file, segment_scores=comet_segment_scores)
             logger.info(f"Calculated COMET score for job {job_id}: {comet_score}")
         except Exception as e:
             logger.error(f"COMET score calculation failed: {str(e)}")
             logger.warning("Defaulting COMET score to 0.0")
             comet_score = 0.0
+        record_stage(stage_timings, EvaluationStatus.CALCULATING_METRICS.value, time.perf_counter() - metrics_start, model_type)
         
         logger.info(f"Model evaluation completed successfully for job {job_id}")
         return {
             "bleu_score": bleu_score,
             "comet_score": comet_score,
+            "comet_segment_scores": comet_segment_scores,
             "output_path": output_path
         }
 
+    except cancellation.JobCancelled:
+        logger.info(f"Model evaluation for job {job_id} stopped: job was cancelled")
+        raise
     except FileNotFoundError as e:
         error_msg = f"File not found during model evaluation for job {job_id}: {str(e)}"
         logger.error(error_msg)
@@ -1121,20 +1612,26 @@ def perform_model_evaluation(
         logger.error(error_msg)
         raise Exception(error_msg)
 
-def update_job_failed(db: Session, job: EvaluationJob, error: str) -> None:
+def update_job_failed(db: Session, job: EvaluationJob, error: str, stage_timings: Optional[Dict[str, Any]] = None) -> None:
     """
     Update job status to FAILED with error message
     """
     # Import EvaluationStatus from schemas to ensure we're using enum
     from app.schemas.evaluation import EvaluationStatus
     
+    current = crud_evaluation.get(db=db, job_id=job.job_id)
+    if cancellation.is_cancelled(job.job_id) or (current and current.status == EvaluationStatus.CANCELLED.value):
+        logger.info(f"Job {job.job_id} was cancelled, not marking it FAILED ({error})")
+        return
     crud_evaluation.update_status(
         db=db,
         job_id=job.job_id,
         status=EvaluationStatus.FAILED,
         log_message=error,
-        completed_at=datetime.now()
+        completed_at=datetime.now(),
+        update_data={"stage_timings": json.dumps(stage_timings)} if stage_timings else None
     )
+    EVALUATION_JOBS_FINISHED.inc(status=EvaluationStatus.FAILED.value)
 
 def add_results_to_training_details(
     db: Session,
@@ -1182,20 +1679,34 @@ def add_results_to_training_details(
             "training_details_notes": f"Updated with evaluation job {job_id} on {datetime.now()}"
         }
     
-    # Create or update the training result
+    # Create or update the training result; a significance test of the old scores no longer applies
     if existing:
         return crud_training_result.update(
             db=db,
             db_obj=existing,
-            obj_in=fields
+            obj_in={**fields, "significance": None}
         )
     else:
-        create_data = {
-            "version_id": version_id,
-            "testset_id": testset_id,
-            **fields
-        }
-        return crud_training_result.create(db=db, obj_in=create_data)
+        return create_or_merge_training_result(db=db, version_id=version_id, testset_id=testset_id, fields=fields)
+
+def create_or_merge_training_result(db: Session, version_id: int, testset_id: int, fields: Dict[str, Any]) -> Any:
+    """
+    Create the training result row for a version and testset. Jobs of the same version and testset
+    finishing at the same time (e.g. base and finetuned, or several modes of a matrix run) can race
+    on the insert; the loser updates the row the winner created.
+    """
+    try:
+        return crud_training_result.create(
+            db=db,
+            obj_in=TrainingResultCreate(version_id=version_id, testset_id=testset_id, **fields)
+        )
+    except IntegrityError:
+        db.rollback()
+        existing = crud_training_result.get_by_version_and_testset(db=db, version_id=version_id, testset_id=testset_id)
+        if not existing:
+            raise
+        logger.info(f"Training result for version {version_id}, testset {testset_id} was created concurrently, updating it")
+        return crud_training_result.update(db=db, db_obj=existing, obj_in=fields)
 
 def fake_add_results_to_training_details(
     db: Session,
@@ -1240,13 +1751,8 @@ def fake_add_results_to_training_details(
         return crud_training_result.update(
             db=db,
             db_obj=existing,
-            obj_in=fields
+            obj_in={**fields, "significance": None}
         )
     else:
         logger.info(f"[FAKE MODE] Creating new training result")
-        create_data = TrainingResultCreate(
-            version_id=version_id,
-            testset_id=testset_id,
-            **fields
-        )
-        return crud_training_result.create(db=db, obj_in=create_data) 
\ No newline at end of file
+        return create_or_merge_training_result(db=db, version_id=version_id, testset_id=testset_id, fields=fields) 
\ No newline at end of file
@@ -0,0 +1,163 @@
+import os
+import json
+import uuid
+import shutil
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.config import settings
+from app.core import segment_store
+
+logger = logging.getLogger(__name__)
+
+# Asynchronous file garbage collection for deleted evaluation jobs. Deleting jobs only renames
+# their files and folders to tombstones (<path>.deleted-<gc_id>, same directory so it is a cheap
+# metadata operation that can not cross devices) and returns; a small thread pool then removes the
+# tombstones in parallel. Each deletion gets a GC handle whose progress is kept in memory; tombstones
+# left by a restart are picked up again by sweep_tombstones() at startup.
+
+TOMBSTONE_MARKER = ".deleted-"
+
+# Folder layouts that hold per-job files, relative to DOCKER_VOLUME_TMP_PATH_HOST
+JOB_FOLDERS = [("evaluation_temp", "evaluation_{job_id}"), ("eval_temp", "eval_{job_id}")]
+
+_handles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_handles_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _handles_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(settings.FILE_GC_WORKERS, 1), thread_name_prefix="file-gc")
+        return _executor
+
+
+def job_paths(job_id: int, output_file_path: Optional[str], base_model_result: Optional[str]) -> List[str]:
+    """
+    Files and folders owned by a job: its temp folders, outputs and their segment stores
+    """
+    paths = [os.path.join(settings.DOCKER_VOLUME_TMP_PATH_HOST, parent, name.format(job_id=job_id)) for parent, name in JOB_FOLDERS]
+    outputs = [output_file_path]
+    if base_model_result:
+        try:
+            outputs.append(json.loads(base_model_result).get("output_file_path"))
+        except (json.JSONDecodeError, TypeError, AttributeError):
+            pass
+    job_folder_parents = {os.path.join(settings.DOCKER_VOLUME_TMP_PATH_HOST, parent) for parent, _ in JOB_FOLDERS}
+    for output in outputs:
+        if output:
+            paths.extend([output, segment_store.store_path(output)])
+            # The job folder the output was written to, another job's when this job took over a deleted job's run
+            if os.path.dirname(os.path.dirname(output)) in job_folder_parents:
+                paths.append(os.path.dirname(output))
+    return paths
+
+
+def _outermost(paths: Iterable[str]) -> List[str]:
+    # Drop paths inside another collected folder: removing the folder removes them
+    kept: List[str] = []
+    for path in sorted({os.path.abspath(path) for path in paths}):
+        if not kept or not path.startswith(kept[-1] + os.sep):
+            kept.append(path)
+    return kept
+
+
+def _tombstone(path: str, gc_id: str) -> Optional[str]:
+    if not os.path.lexists(path):
+        return None
+    tombstone = f"{path}{TOMBSTONE_MARKER}{gc_id}"
+    try:
+        os.rename(path, tombstone)
+        return tombstone
+    except OSError as e:
+        # Still removed in the background, just not hidden right away
+        logger.warning(f"Could not tombstone {path}: {str(e)}")
+        return path
+
+
+def _remove(gc_id: str, path: str) -> None:
+    try:
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+        outcome = "removed"
+    except FileNotFoundError:
+        outcome = "removed"
+    except Exception as e:
+        outcome = "failed"
+        logger.warning(f"File GC {gc_id}: failed to remove {path}: {str(e)}")
+
+    with _handles_lock:
+        handle = _handles.get(gc_id)
+        if handle is None:
+            return
+        handle[outcome] += 1
+        if handle["removed"] + handle["failed"] >= handle["total"]:
+            handle["status"] = "completed" if not handle["failed"] else "completed_with_errors"
+            handle["finished_at"] = datetime.utcnow().isoformat()
+            logger.info(f"File GC {gc_id} {handle['status']}: {handle['removed']} removed, {handle['failed']} failed")
+
+
+def submit(paths: Iterable[str], *, tombstoned: bool = False) -> Dict[str, Any]:
+    """
+    Tombstone the existing ones of paths and queue them for removal; returns the GC handle.
+    Paths already tombstoned (sweep_tombstones) are queued as they are.
+    """
+    gc_id = uuid.uuid4().hex[:12]
+    if tombstoned:
+        queued = list(paths)
+    else:
+        queued = [tombstone for tombstone in (_tombstone(path, gc_id) for path in _outermost(paths)) if tombstone]
+    handle = {
+        "gc_id": gc_id,
+        "status": "running" if queued else "completed",
+        "total": len(queued),
+        "removed": 0,
+        "failed": 0,
+        "queued_at": datetime.utcnow().isoformat(),
+        "finished_at": None if queued else datetime.utcnow().isoformat()
+    }
+    with _handles_lock:
+        _handles[gc_id] = handle
+        # Keep the most recent handles only, never one that is still running
+        finished = [key for key, value in _handles.items() if value["status"] != "running"]
+        for key in finished[:max(len(_handles) - settings.FILE_GC_HISTORY, 0)]:
+            del _handles[key]
+    pool = _pool()
+    for path in queued:
+        pool.submit(_remove, gc_id, path)
+    logger.info(f"File GC {gc_id}: {len(queued)} path(s) queued for removal")
+    return dict(handle)
+
+
+def status(gc_id: str) -> Optional[Dict[str, Any]]:
+    with _handles_lock:
+        handle = _handles.get(gc_id)
+        return dict(handle) if handle else None
+
+
+def list_handles() -> List[Dict[str, Any]]:
+    with _handles_lock:
+        return [dict(handle) for handle in reversed(_handles.values())]
+
+
+def sweep_tombstones() -> Optional[Dict[str, Any]]:
+    """
+    Queue the job folder tombstones left behind by an interrupted GC; None when there are none
+    """
+    leftovers = []
+    for parent, _ in JOB_FOLDERS:
+        folder = os.path.join(settings.DOCKER_VOLUME_TMP_PATH_HOST, parent)
+        if os.path.isdir(folder):
+            leftovers.extend(entry.path for entry in os.scandir(folder) if TOMBSTONE_MARKER in entry.name)
+    if not leftovers:
+        return None
+    logger.info(f"Found {len(leftovers)} tombstone(s) from an interrupted file GC")
+    return submit(leftovers, tombstoned=True)
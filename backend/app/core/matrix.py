@@ -0,0 +1,284 @@
+import os
+import json
+import time
+import shutil
+import logging
+from datetime import datetime
+from typing import Any, Dict, List
+
+from app.core.config import settings
+from app.core import throughput
+from app.db.database import SessionLocal
+from app.schemas.evaluation import EvaluationStatus
+from app.crud import crud_evaluation, crud_model_version, crud_testset, crud_language_pair
+from app.core.evaluation import (
+    run_evaluation,
+    perform_model_evaluation,
+    create_temp_directory,
+    calculate_bleu_score,
+    calculate_comet_score,
+    add_results_to_training_details,
+    store_segment_statistics,
+    update_job_failed
+)
+from app.core.metrics import record_stage, EVALUATION_JOBS_FINISHED, SCORING_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+class OutputSplitError(Exception):
+    """Engine output of a concatenated run cannot be mapped back to the individual testsets"""
+
+
+def concatenate_sources(source_files: List[str], combined_path: str) -> List[int]:
+    """
+    Write the source files one after another into combined_path and return each file's line count.
+    A missing trailing newline is added so segments never merge across files.
+    """
+    line_counts = []
+    with open(combined_path, 'w', encoding='utf-8') as out:
+        for source_file in source_files:
+            count = 0
+            with open(source_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.endswith('\n'):
+                        line += '\n'
+                    out.write(line)
+                    count += 1
+            line_counts.append(count)
+    return line_counts
+
+
+def split_output(combined_output: str, line_counts: List[int], output_paths: List[str]) -> None:
+    """
+    Split a concatenated engine output back into one file per testset
+    """
+    total_expected = sum(line_counts)
+    with open(combined_output, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    if len(lines) != total_expected:
+        raise OutputSplitError(f"Engine produced {len(lines)} lines for {total_expected} input segments")
+    start = 0
+    for count, output_path in zip(line_counts, output_paths):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.writelines(lines[start:start + count])
+        start += count
+
+
+def run_matrix_group(job_ids: List[int]) -> None:
+    """
+    Run evaluation jobs of one matrix run that share a model version and mode through a single engine
+    session: their testsets are concatenated, translated once per model type, split back per testset
+    and scored per job. Each job is then completed exactly as run_evaluation would complete it.
+
+    Falls back to evaluating the jobs one by one if the engine output cannot be split back.
+    """
+    db = SessionLocal()
+    leader_id = job_ids[0]
+    logger.info(f"=== Starting shared-engine evaluation for jobs {job_ids} ===")
+    try:
+        jobs = [crud_evaluation.get(db=db, job_id=job_id) for job_id in job_ids]
+        jobs = [job for job in jobs if job]
+        if not jobs:
+            logger.error(f"Error: none of jobs {job_ids} found")
+            return
+        leader = jobs[0]
+
+        shared_timings: Dict[str, Any] = {}
+        setup_start = time.perf_counter()
+        for job in jobs:
+            crud_evaluation.update_status(
+                db=db,
+                job_id=job.job_id,
+                status=EvaluationStatus.PREPARING_SETUP,
+                processing_started_at=datetime.now()
+            )
+
+        model_version = crud_model_version.get(db=db, version_id=leader.version_id)
+        language_pair = crud_language_pair.get_language_pair(db=db, lang_pair_id=model_version.lang_pair_id) if model_version else None
+        if not model_version or not language_pair:
+            for job in jobs:
+                update_job_failed(db=db, job=job, error=f"Error: Model version {leader.version_id} or its language pair not found")
+            return
+
+        evaluation_model_type = leader.evaluation_model_type or "finetuned"
+        model_types = ["base", "finetuned"] if evaluation_model_type == "both" else [evaluation_model_type]
+        model_files = {
+            "base": (model_version.base_model_file_path_on_server, model_version.base_hparams_file_path_on_server),
+            "finetuned": (model_version.model_file_path_on_server, model_version.hparams_file_path_on_server)
+        }
+        for model_type in model_types:
+            model_file, hparams_file = model_files[model_type]
+            if not model_file or not hparams_file or not os.path.exists(model_file) or not os.path.exists(hparams_file):
+                error_msg = f"Error: {model_type.capitalize()} model or hparams file not found or path invalid"
+                logger.error(f"Jobs {job_ids}: {error_msg}")
+                for job in jobs:
+                    update_job_failed(db=db, job=job, error=error_msg)
+                return
+
+        # Testsets with missing files fail on their own, the rest of the group carries on
+        runnable = []
+        testsets = {}
+        for job in jobs:
+            testset = crud_testset.get_testset(db=db, testset_id=job.testset_id)
+            if (
+                not testset
+                or not testset.source_file_path_on_server or not os.path.exists(testset.source_file_path_on_server)
+                or not testset.target_file_path_on_server or not os.path.exists(testset.target_file_path_on_server)
+            ):
+                update_job_failed(db=db, job=job, error=f"Error: Testset {job.testset_id} source or target file not found or path invalid")
+                continue
+            testsets[job.job_id] = testset
+            runnable.append(job)
+        if not runnable:
+            return
+
+        group_dir = os.path.join(settings.DOCKER_VOLUME_TMP_PATH_HOST, "evaluation_temp", f"matrix_{leader.matrix_id}_group_{leader_id}")
+        def on_stage(stage: EvaluationStatus) -> None:
+            for job in runnable:
+                crud_evaluation.update_status(db=db, job_id=job.job_id, status=stage)
+
+        # One engine session per model type for the whole group. The combined source and outputs are only
+        # needed until the outputs are split into the jobs' own folders; the group folder matches no job
+        # folder pattern, so nothing else would ever remove it.
+        output_paths: Dict[str, Dict[int, str]] = {}
+        os.makedirs(group_dir, exist_ok=True)
+        try:
+            combined_source = os.path.join(group_dir, "combined_source.txt")
+            line_counts = concatenate_sources([testsets[job.job_id].source_file_path_on_server for job in runnable], combined_source)
+            job_dirs = {job.job_id: create_temp_directory(job.job_id) for job in runnable}
+            record_stage(shared_timings, EvaluationStatus.PREPARING_SETUP.value, time.perf_counter() - setup_start)
+            logger.info(f"Jobs {[job.job_id for job in runnable]}: concatenated {len(runnable)} testsets ({sum(line_counts)} segments) into {combined_source}")
+
+            for model_type in model_types:
+                on_stage(EvaluationStatus.PREPARING_ENGINE)
+                model_file, hparams_file = model_files[model_type]
+                combined_output = os.path.join(group_dir, f"{model_type}_output.txt")
+                perform_model_evaluation(
+                    source_file=combined_source,
+                    target_file=combined_source,
+                    model_file=model_file,
+                    hparams_file=hparams_file,
+                    output_path=combined_output,
+                    source_lang=language_pair.source_language_code,
+                    target_lang=language_pair.target_language_code,
+                    mode_type=leader.mode_type,
+                    sub_mode_type=leader.sub_mode_type,
+                    custom_params=leader.custom_params,
+                    job_id=leader_id,
+                    model_type=model_type,
+                    stage_timings=shared_timings,
+                    on_stage=on_stage,
+                    calculate_metrics=False,
+                    # One model load for the whole group is the point of the shared run
+                    allow_chunking=False,
+                    segments_per_second=throughput.expected_segments_per_second(
+                        db,
+                        lang_pair_id=model_version.lang_pair_id,
+                        mode_type=leader.mode_type,
+                        sub_mode_type=leader.sub_mode_type,
+                        model_file=model_file
+                    )
+                )
+                output_paths[model_type] = {job.job_id: os.path.join(job_dirs[job.job_id], f"{model_type}_output.txt") for job in runnable}
+                split_output(combined_output, line_counts, [output_paths[model_type][job.job_id] for job in runnable])
+        except OutputSplitError as e:
+            shutil.rmtree(group_dir, ignore_errors=True)
+            logger.warning(f"Jobs {[job.job_id for job in runnable]}: {str(e)}, evaluating testsets one by one instead")
+            for job in runnable:
+                crud_evaluation.update_status(db=db, job_id=job.job_id, status=EvaluationStatus.PENDING)
+                run_evaluation(job.job_id)
+            return
+        except Exception as e:
+            error_msg = f"Error in shared engine run: {str(e)}"
+            logger.error(f"Jobs {[job.job_id for job in runnable]}: {error_msg}")
+            for job in runnable:
+                update_job_failed(db=db, job=job, error=error_msg, stage_timings=shared_timings)
+            return
+        finally:
+            shutil.rmtree(group_dir, ignore_errors=True)
+
+        # Score and complete each job individually
+        for job in runnable:
+            db.refresh(job)
+            if job.status == EvaluationStatus.CANCELLED.value:
+                logger.info(f"Job {job.job_id}: cancelled, skipping scoring of shared engine output")
+                continue
+            testset = testsets[job.job_id]
+            stage_timings = json.loads(json.dumps(shared_timings))
+            stage_timings["shared_engine"] = {"jobs": len(runnable), "matrix_id": leader.matrix_id, "leader_job_id": leader_id}
+            try:
+                crud_evaluation.update_status(db=db, job_id=job.job_id, status=EvaluationStatus.CALCULATING_METRICS)
+                scores = {}
+                for model_type in model_types:
+                    metrics_start = time.perf_counter()
+                    output_path = output_paths[model_type][job.job_id]
+                    with SCORING_DURATION.time(metric="bleu"):
+                        bleu_score = calculate_bleu_score(output_file=output_path, reference_file=testset.target_file_path_on_server)
+                    comet_segment_scores: List[float] = []
+                    with SCORING_DURATION.time(metric="comet"):
+                        comet_score = calculate_comet_score(
+                            output_file=output_path,
+                            source_file=testset.source_file_path_on_server,
+                            reference_file=testset.target_file_path_on_server,
+                            segment_scores=comet_segment_scores
+                        )
+                    store_segment_statistics(job.job_id, output_path, testset.target_file_path_on_server, {"comet_segment_scores": comet_segment_scores}, testset.source_file_path_on_server)
+                    # Scoring is per job; replace the shared (empty) scoring time
+                    stage_timings.get(model_type, {}).pop(EvaluationStatus.CALCULATING_METRICS.value, None)
+                    record_stage(stage_timings, EvaluationStatus.CALCULATING_METRICS.value, time.perf_counter() - metrics_start, model_type)
+                    scores[model_type] = {"bleu_score": bleu_score, "comet_score": comet_score, "output_file_path": output_path}
+
+                main_type = "finetuned" if "finetuned" in scores else "base"
+                update_data = {
+                    "bleu_score": scores[main_type]["bleu_score"],
+                    "comet_score": scores[main_type]["comet_score"],
+                    "output_file_path": scores[main_type]["output_file_path"],
+                    "stage_timings": json.dumps(stage_timings)
+                }
+                if evaluation_model_type == "both":
+                    update_data["base_model_result"] = json.dumps(scores["base"])
+                crud_evaluation.update_status(
+                    db=db,
+                    job_id=job.job_id,
+                    status=EvaluationStatus.COMPLETED,
+                    completed_at=datetime.now(),
+                    update_data=update_data
+                )
+                EVALUATION_JOBS_FINISHED.inc(status=EvaluationStatus.COMPLETED.value)
+                logger.info(f"Job {job.job_id}: completed from shared engine run, BLEU={update_data['bleu_score']}, COMET={update_data['comet_score']}")
+
+                if job.auto_add_to_details_requested:
+                    for model_type, result in scores.items():
+                        add_results_to_training_details(
+                            db=db,
+                            version_id=job.version_id,
+                            testset_id=job.testset_id,
+                            is_base=model_type == "base",
+                            bleu_score=result["bleu_score"],
+                            comet_score=result["comet_score"],
+                            job_id=job.job_id
+                        )
+                    crud_evaluation.update_status(
+                        db=db,
+                        job_id=job.job_id,
+                        status=EvaluationStatus.COMPLETED,
+                        update_data={"details_added_successfully": True}
+                    )
+            except Exception as e:
+                error_msg = f"Error scoring shared engine output: {str(e)}"
+                logger.error(f"Job {job.job_id}: {error_msg}")
+                update_job_failed(db=db, job=job, error=error_msg, stage_timings=stage_timings)
+    except Exception as e:
+        logger.error(f"Unexpected error in shared-engine evaluation of jobs {job_ids}: {str(e)}")
+        logger.exception("Exception details:")
+        for job_id in job_ids:
+            try:
+                job = crud_evaluation.get(db=db, job_id=job_id)
+                if job and job.status not in (EvaluationStatus.COMPLETED.value, EvaluationStatus.FAILED.value, EvaluationStatus.CANCELLED.value):
+                    update_job_failed(db=db, job=job, error=f"Unexpected error: {str(e)}")
+            except Exception:
+                pass
+    finally:
+        db.close()
@@ -0,0 +1,336 @@
+import threading
+import time
+import bisect
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple, Any
+
+# Default histogram buckets (seconds) - covers sub-millisecond DB queries up to long engine runs
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+THROUGHPUT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000)
+
+
+def _escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(label_names: Sequence[str], label_values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape_label_value(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Metric {self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def get(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = state
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: Any):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels: Any) -> Dict[str, Any]:
+        """Return count, sum and cumulative bucket counts for one label set"""
+        with self._lock:
+            state = list(self._values.get(self._key(labels), [0.0] * (len(self.buckets) + 2)))
+        cumulative = []
+        running = 0.0
+        for bound, bucket_count in zip(self.buckets, state[:-2]):
+            running += bucket_count
+            cumulative.append((bound, running))
+        return {"count": state[-1], "sum": state[-2], "buckets": cumulative}
+
+    def quantile(self, q: float, **labels: Any) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside the matching bucket"""
+        snap = self.snapshot(**labels)
+        if snap["count"] == 0:
+            return None
+        rank = q * snap["count"]
+        lower_bound, lower_count = 0.0, 0.0
+        for bound, cumulative in snap["buckets"]:
+            if cumulative >= rank:
+                if cumulative == lower_count:
+                    return bound
+                return lower_bound + (bound - lower_bound) * (rank - lower_count) / (cumulative - lower_count)
+            lower_bound, lower_count = bound, cumulative
+        return self.buckets[-1] if self.buckets else None
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in items:
+            running = 0.0
+            for bound, bucket_count in zip(self.buckets, state[:-2]):
+                running += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', _format_value(bound)))} {_format_value(running)}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', '+Inf'))} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {_format_value(state[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics registry rendering the Prometheus text exposition format,
+    so /metrics can be scraped without running an external collector or client library.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Evaluation pipeline
+EVALUATION_STAGE_DURATION = registry.histogram(
+    "nmt_evaluation_stage_duration_seconds",
+    "Time spent in each evaluation pipeline stage",
+    ["stage", "model_type"]
+)
+EVALUATION_QUEUE_WAIT = registry.histogram(
+    "nmt_evaluation_queue_wait_seconds",
+    "Time between an evaluation job being requested and processing starting"
+)
+EVALUATION_JOBS_FINISHED = registry.counter(
+    "nmt_evaluation_jobs_finished_total",
+    "Evaluation jobs that reached a terminal status",
+    ["status"]
+)
+ENGINE_SEGMENTS_PER_SECOND = registry.histogram(
+    "nmt_engine_segments_per_second",
+    "Translation engine throughput in segments per second, per engine run",
+    ["model_type"],
+    buckets=THROUGHPUT_BUCKETS
+)
+ENGINE_TOKENS_PER_SECOND = registry.histogram(
+    "nmt_engine_tokens_per_second",
+    "Translation engine throughput in source tokens per second, per engine run",
+    ["model_type"],
+    buckets=THROUGHPUT_BUCKETS
+)
+ENGINE_SEGMENTS_TOTAL = registry.counter(
+    "nmt_engine_segments_total",
+    "Source segments translated by the engine",
+    ["model_type"]
+)
+SCORING_DURATION = registry.histogram(
+    "nmt_scoring_duration_seconds",
+    "Time spent computing an evaluation metric",
+    ["metric"]
+)
+
+# Engine CPU placement (app/core/engine_placement.py)
+ENGINE_SLOTS_TOTAL = registry.gauge(
+    "nmt_engine_slots_total",
+    "CPU slots engine containers are pinned to"
+)
+ENGINE_SLOTS_BUSY = registry.gauge(
+    "nmt_engine_slots_busy",
+    "Engine CPU slots with a running container"
+)
+
+# Direct translation cache (app/core/translation_cache.py)
+TRANSLATION_CACHE_LOOKUPS = registry.counter(
+    "nmt_translation_cache_lookups_total",
+    "Direct translation segments looked up in the cache",
+    ["result"]
+)
+TRANSLATION_CACHE_HIT_RATIO = registry.gauge(
+    "nmt_translation_cache_hit_ratio",
+    "Fraction of direct translation segments served from the cache since the process started"
+)
+TRANSLATION_CACHE_BYTES = registry.gauge(
+    "nmt_translation_cache_bytes",
+    "Size of cached direct translations",
+    ["tier"]
+)
+TRANSLATION_CACHE_EVICTIONS = registry.counter(
+    "nmt_translation_cache_evictions_total",
+    "Cached direct translations evicted to stay within the size limit",
+    ["tier"]
+)
+
+# Database and HTTP
+DB_QUERY_DURATION = registry.histogram(
+    "nmt_db_query_duration_seconds",
+    "Database statement execution time",
+    ["operation"]
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "nmt_http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route", "status_code"]
+)
+
+
+def record_stage(stage_timings: Optional[Dict[str, Any]], stage: str, elapsed: float, model_type: str = "job") -> None:
+    """
+    Record a pipeline stage duration in the stage histogram and, if given,
+    in the per-job stage_timings dict (seconds, accumulated per model type)
+    """
+    EVALUATION_STAGE_DURATION.observe(elapsed, stage=stage, model_type=model_type)
+    if stage_timings is not None:
+        bucket = stage_timings.setdefault(model_type, {})
+        bucket[stage] = round(bucket.get(stage, 0.0) + elapsed, 4)
+
+
+@contextmanager
+def time_stage(stage_timings: Optional[Dict[str, Any]], stage: str, model_type: str = "job"):
+    """
+    Context manager form of record_stage
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage_timings, stage, time.perf_counter() - start, model_type)
+
+
+def record_engine_throughput(stage_timings: Optional[Dict[str, Any]], model_type: str, segments: int, tokens: int, elapsed: float) -> None:
+    """
+    Record engine throughput (segments/sec, tokens/sec) for one engine run
+    """
+    if elapsed <= 0:
+        return
+    segments_per_second = segments / elapsed
+    tokens_per_second = tokens / elapsed
+    ENGINE_SEGMENTS_PER_SECOND.observe(segments_per_second, model_type=model_type)
+    ENGINE_TOKENS_PER_SECOND.observe(tokens_per_second, model_type=model_type)
+    ENGINE_SEGMENTS_TOTAL.inc(segments, model_type=model_type)
+    if stage_timings is not None:
+        bucket = stage_timings.setdefault(model_type, {})
+        bucket["segments"] = segments
+        bucket["segments_per_second"] = round(segments_per_second, 3)
+        bucket["tokens_per_second"] = round(tokens_per_second, 3)
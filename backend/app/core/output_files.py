@@ -0,0 +1,118 @@
+import io
+import os
+import gzip
+import logging
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional
+
+import zstandard
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Evaluation output files that may have been compressed by the retention service (app/core/retention.py).
+# A compressed output keeps its original path in the database and sits next to it as <path>.zst;
+# readers go through resolve()/open_text()/iter_bytes() and never need to know which tier a file is in.
+# They still read <path>.gz, written by earlier versions that fell back to gzip without zstandard.
+
+ZSTD_SUFFIX = ".zst"
+GZIP_SUFFIX = ".gz"
+COMPRESSED_SUFFIXES = (ZSTD_SUFFIX, GZIP_SUFFIX)
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def resolve(path: Optional[str]) -> Optional[str]:
+    """
+    The file actually holding path's content: path itself or its compressed form, None if neither exists
+    """
+    if not path:
+        return None
+    if os.path.exists(path):
+        return path
+    for suffix in COMPRESSED_SUFFIXES:
+        if os.path.exists(path + suffix):
+            return path + suffix
+    return None
+
+
+def exists(path: Optional[str]) -> bool:
+    return resolve(path) is not None
+
+
+def is_compressed(path: str) -> bool:
+    return path.endswith(COMPRESSED_SUFFIXES)
+
+
+def _open_binary(stored: str) -> IO[bytes]:
+    if stored.endswith(ZSTD_SUFFIX):
+        return zstandard.ZstdDecompressor().stream_reader(open(stored, 'rb'), closefd=True)
+    if stored.endswith(GZIP_SUFFIX):
+        return gzip.open(stored, 'rb')
+    return open(stored, 'rb')
+
+
+def open_text(path: str, encoding: str = 'utf-8', errors: str = 'replace') -> IO[str]:
+    """
+    Open path (or its compressed form) for reading text; FileNotFoundError if neither exists
+    """
+    stored = resolve(path)
+    if stored is None:
+        raise FileNotFoundError(path)
+    return io.TextIOWrapper(_open_binary(stored), encoding=encoding, errors=errors)
+
+
+def iter_bytes(path: str, chunk_size: int = _CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Uncompressed content of path in chunks, decompressing on the fly
+    """
+    stored = resolve(path)
+    if stored is None:
+        raise FileNotFoundError(path)
+    with _open_binary(stored) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+@contextmanager
+def plain_copy(path: str) -> Iterator[str]:
+    """
+    A plain file with path's content for tools that cannot read compressed input: path itself, or a
+    temporary decompressed copy removed afterwards; FileNotFoundError if neither exists
+    """
+    stored = resolve(path)
+    if stored is None:
+        raise FileNotFoundError(path)
+    if not is_compressed(stored):
+        yield stored
+        return
+    handle, tmp_path = tempfile.mkstemp(prefix="output_", suffix=os.path.splitext(path)[1])
+    try:
+        with os.fdopen(handle, 'wb') as destination:
+            for chunk in iter_bytes(path):
+                destination.write(chunk)
+        yield tmp_path
+    finally:
+        os.remove(tmp_path)
+
+
+def compress(path: str) -> int:
+    """
+    Replace path with its zstd-compressed form, keeping its modification time; returns the bytes saved
+    """
+    target = path + ZSTD_SUFFIX
+    tmp_target = target + ".tmp"
+    original_size = os.path.getsize(path)
+    with open(path, 'rb') as source, open(tmp_target, 'wb') as destination:
+        zstandard.ZstdCompressor(level=settings.RETENTION_ZSTD_LEVEL).copy_stream(source, destination)
+    stat = os.stat(path)
+    os.utime(tmp_target, (stat.st_atime, stat.st_mtime))
+    # Readers resolve the plain file first, so the compressed one is complete before the original goes
+    os.replace(tmp_target, target)
+    os.remove(path)
+    return original_size - os.path.getsize(target)
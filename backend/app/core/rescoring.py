@@ -0,0 +1,306 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core import segment_store, significance, output_files
+from app.core.sampling import SAMPLE_SOURCE_FILE, SAMPLE_TARGET_FILE, reported_bleu
+from app.db.database import SessionLocal
+from app.db.models import EvaluationJob, Testset
+from app.schemas.evaluation import EvaluationStatus
+
+logger = logging.getLogger(__name__)
+
+# Historical rescoring backfill: recompute the scores of completed jobs from the outputs that survive
+# under evaluation_temp, without translating anything again. Jobs are walked in job ID order in
+# batches; each batch is scored across a process pool (niced, optionally rate limited) and written
+# back in one bulk update, then the highest job ID is checkpointed so a stopped or crashed run resumes
+# where it left off. Rescoring rebuilds each output's segment store, so BLEU/chrF (and COMET when
+# requested) and the significance tests follow tokenization or metric changes.
+
+METRICS = ("bleu", "chrf", "comet")
+DEFAULT_METRICS = ("bleu", "chrf")
+
+# Background runs started from the API in this process, by run ID
+_runs: Dict[str, threading.Event] = {}
+_runs_lock = threading.Lock()
+
+
+def checkpoint_dir() -> str:
+    return os.path.join(settings.DOCKER_VOLUME_TMP_PATH_HOST, "rescoring")
+
+
+def checkpoint_path(run_id: str) -> str:
+    return os.path.join(checkpoint_dir(), f"{run_id}.json")
+
+
+def read_checkpoint(run_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(checkpoint_path(run_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_checkpoint(state: Dict[str, Any]) -> None:
+    os.makedirs(checkpoint_dir(), exist_ok=True)
+    state["updated_at"] = datetime.utcnow().isoformat()
+    path = checkpoint_path(state["run_id"])
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def list_checkpoints() -> List[Dict[str, Any]]:
+    if not os.path.isdir(checkpoint_dir()):
+        return []
+    runs = [read_checkpoint(name[:-len(".json")]) for name in os.listdir(checkpoint_dir()) if name.endswith(".json")]
+    return sorted((run for run in runs if run), key=lambda run: run.get("started_at", ""), reverse=True)
+
+
+def _lower_priority(nice: int) -> None:
+    if nice > 0 and hasattr(os, "nice"):
+        os.nice(nice)
+
+
+def _rescore_output(output_file: str, reference_file: str, source_file: Optional[str], with_comet: bool) -> Optional[Dict[str, Any]]:
+    comet_score = None
+    if with_comet:
+        # Imported here: the COMET scorer lives with the evaluation pipeline
+        from app.core.evaluation import calculate_comet_score
+        comet_segment_scores: List[float] = []
+        comet_score = calculate_comet_score(output_file=output_file, source_file=source_file, reference_file=reference_file, segment_scores=comet_segment_scores)
+        # The scorer reports failures as 0.0; that must not replace the job's real score
+        if not comet_segment_scores:
+            raise RuntimeError(f"COMET scoring of {output_file} failed")
+    else:
+        # Keep the per-segment COMET of the existing store
+        previous = segment_store.load(output_file)
+        comet_segment_scores = [float(score) for score in previous.comet] if previous is not None and previous.comet is not None else None
+
+    if not segment_store.save(output_file, reference_file, comet_segment_scores, source_file):
+        return None
+    store = segment_store.load(output_file)
+    metrics = segment_store.corpus_metrics(store)
+    # BLEU at the precision the scoring pipeline stores it, so an unchanged output keeps an unchanged score
+    bleu_score = reported_bleu(np.asarray(store.bleu).sum(axis=0))
+    return {"bleu_score": bleu_score, "chrf_score": metrics["chrf_score"], "comet_score": comet_score}
+
+
+def rescore_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Rescore the outputs of one job; runs in a pool process. Returns per-output scores (None for an
+    output that no longer lines up with its reference) and the recomputed significance test.
+    """
+    result: Dict[str, Any] = {"job_id": task["job_id"], "outputs": {}, "significance": None, "error": None}
+    try:
+        for kind, output_file in task["outputs"].items():
+            result["outputs"][kind] = _rescore_output(output_file, task["reference_file"], task["source_file"], task["with_comet"])
+        if "base" in task["outputs"] and all(result["outputs"].values()):
+            result["significance"] = significance.compare_json(task["outputs"]["base"], task["outputs"]["main"], seed=task["job_id"])
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def _task_for(job: EvaluationJob, testset: Optional[Testset], with_comet: bool) -> Optional[Dict[str, Any]]:
+    """
+    Scoring task of a job, None if its outputs or reference are gone
+    """
+    outputs = {"main": job.output_file_path}
+    if job.base_model_result and job.evaluation_model_type == "both":
+        try:
+            outputs["base"] = json.loads(job.base_model_result).get("output_file_path")
+        except (TypeError, ValueError):
+            return None
+    if not all(output_files.exists(path) for path in outputs.values()):
+        return None
+
+    if job.sample_size:
+        # Sampled runs were scored against the sample drawn into the job directory
+        work_dir = os.path.dirname(job.output_file_path)
+        reference_file, source_file = os.path.join(work_dir, SAMPLE_TARGET_FILE), os.path.join(work_dir, SAMPLE_SOURCE_FILE)
+    elif testset:
+        reference_file, source_file = testset.target_file_path_on_server, testset.source_file_path_on_server
+    else:
+        return None
+    if not reference_file or not os.path.exists(reference_file):
+        return None
+    return {"job_id": job.job_id, "outputs": outputs, "reference_file": reference_file, "source_file": source_file, "with_comet": with_comet}
+
+
+def _job_update(job: EvaluationJob, result: Dict[str, Any], with_comet: bool, rescored_at: datetime) -> Dict[str, Any]:
+    main = result["outputs"]["main"]
+    update: Dict[str, Any] = {"job_id": job.job_id, "bleu_score": main["bleu_score"], "chrf_score": main["chrf_score"], "rescored_at": rescored_at}
+    if with_comet:
+        update["comet_score"] = main["comet_score"]
+    base = result["outputs"].get("base")
+    if base:
+        base_model_result = json.loads(job.base_model_result)
+        base_model_result.update(bleu_score=base["bleu_score"], chrf_score=base["chrf_score"])
+        if with_comet:
+            base_model_result["comet_score"] = base["comet_score"]
+        update["base_model_result"] = json.dumps(base_model_result)
+        update["significance"] = result["significance"]
+    return update
+
+
+def _score_batch(db: Session, pool: ProcessPoolExecutor, jobs: Sequence[EvaluationJob], with_comet: bool,
+                 state: Dict[str, Any]) -> int:
+    """
+    Score one batch of jobs and write their new scores in one bulk update; returns the outputs scored
+    """
+    testset_ids = {job.testset_id for job in jobs}
+    testsets = {testset.testset_id: testset for testset in db.query(Testset).filter(Testset.testset_id.in_(testset_ids))}
+    tasks = []
+    for job in jobs:
+        task = _task_for(job, testsets.get(job.testset_id), with_comet)
+        if task:
+            tasks.append(task)
+        else:
+            state["missing"] += 1
+
+    rescored_at = datetime.utcnow()
+    jobs_by_id = {job.job_id: job for job in jobs}
+    updates = []
+    for result in pool.map(rescore_task, tasks):
+        if result["error"]:
+            state["failed"] += 1
+            logger.warning(f"Rescoring job {result['job_id']} failed: {result['error']}")
+        elif not all(result["outputs"].values()):
+            state["mismatched"] += 1
+        else:
+            updates.append(_job_update(jobs_by_id[result["job_id"]], result, with_comet, rescored_at))
+
+    # Coalesced jobs share their leader's outputs and take over its new scores
+    if updates:
+        by_leader = {update["job_id"]: update for update in updates}
+        for follower_id, leader_id in db.query(EvaluationJob.job_id, EvaluationJob.coalesced_into_job_id).filter(
+            EvaluationJob.coalesced_into_job_id.in_(list(by_leader)),
+            EvaluationJob.status == EvaluationStatus.COMPLETED.value
+        ):
+            updates.append({**by_leader[leader_id], "job_id": follower_id})
+        db.bulk_update_mappings(EvaluationJob, updates)
+        db.commit()
+    state["rescored"] += len(updates)
+    return sum(len(task["outputs"]) for task in tasks)
+
+
+def run(*, run_id: Optional[str] = None, metrics: Sequence[str] = DEFAULT_METRICS, workers: Optional[int] = None,
+        batch_size: Optional[int] = None, max_outputs_per_second: Optional[float] = None,
+        stop_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    Rescore every completed job with surviving outputs; resumes run_id from its checkpoint when it
+    exists. Returns the final checkpoint state.
+    """
+    state = read_checkpoint(run_id) if run_id else None
+    if state is None:
+        unknown = set(metrics) - set(METRICS)
+        if unknown:
+            raise ValueError(f"Unknown metrics: {', '.join(sorted(unknown))}")
+        state = {
+            "run_id": run_id or f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}",
+            "metrics": list(metrics),
+            "last_job_id": 0,
+            "processed": 0, "rescored": 0, "missing": 0, "mismatched": 0, "failed": 0, "outputs": 0,
+            "started_at": datetime.utcnow().isoformat()
+        }
+    else:
+        logger.info(f"Resuming rescoring run {state['run_id']} after job {state['last_job_id']}")
+    state.update({"status": "running", "finished_at": None})
+    with_comet = "comet" in state["metrics"]
+    workers = workers or settings.RESCORING_WORKERS or max(1, (os.cpu_count() or 2) // 2)
+    batch_size = max(1, batch_size or settings.RESCORING_BATCH_SIZE)
+    rate = settings.RESCORING_MAX_OUTPUTS_PER_SECOND if max_outputs_per_second is None else max_outputs_per_second
+    stop_event = stop_event or threading.Event()
+
+    db = SessionLocal()
+    state["total"] = db.query(EvaluationJob).filter(
+        EvaluationJob.status == EvaluationStatus.COMPLETED.value,
+        EvaluationJob.coalesced_into_job_id.is_(None),
+        EvaluationJob.output_file_path.isnot(None)
+    ).count()
+    _write_checkpoint(state)
+    logger.info(f"Rescoring run {state['run_id']}: {', '.join(state['metrics'])} with {workers} process(es), batches of {batch_size}")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_lower_priority, initargs=(settings.RESCORING_NICE,)) as pool:
+            while not stop_event.is_set():
+                jobs = db.query(EvaluationJob).filter(
+                    EvaluationJob.job_id > state["last_job_id"],
+                    EvaluationJob.status == EvaluationStatus.COMPLETED.value,
+                    EvaluationJob.coalesced_into_job_id.is_(None),
+                    EvaluationJob.output_file_path.isnot(None)
+                ).order_by(EvaluationJob.job_id).limit(batch_size).all()
+                if not jobs:
+                    state["status"] = "completed"
+                    break
+
+                batch_start = time.monotonic()
+                outputs = _score_batch(db, pool, jobs, with_comet, state)
+                state["processed"] += len(jobs)
+                state["outputs"] += outputs
+                state["last_job_id"] = jobs[-1].job_id
+                _write_checkpoint(state)
+                db.expunge_all()
+                logger.info(f"Rescoring run {state['run_id']}: {state['processed']}/{state['total']} jobs, last job {state['last_job_id']}")
+
+                # Throttle: stretch the batch to the configured output rate
+                if rate and rate > 0:
+                    stop_event.wait(max(outputs / rate - (time.monotonic() - batch_start), 0.0))
+            else:
+                state["status"] = "stopped"
+    except Exception as e:
+        db.rollback()
+        state["status"] = "failed"
+        state["error"] = str(e)
+        logger.error(f"Rescoring run {state['run_id']} failed: {str(e)}")
+        logger.exception("Exception details:")
+    finally:
+        db.close()
+        state["finished_at"] = datetime.utcnow().isoformat()
+        _write_checkpoint(state)
+    logger.info(f"Rescoring run {state['run_id']} {state['status']}: {state['rescored']} jobs rescored, {state['missing']} without outputs")
+    return state
+
+
+def start_background(**options) -> str:
+    """
+    Start (or resume, given run_id) a rescoring run in a background thread; returns its run ID
+    """
+    run_id = options.pop("run_id", None) or f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    stop_event = threading.Event()
+    with _runs_lock:
+        if any(not event.is_set() for event in _runs.values()):
+            raise RuntimeError("A rescoring run is already in progress")
+        _runs[run_id] = stop_event
+
+    def target() -> None:
+        try:
+            run(run_id=run_id, stop_event=stop_event, **options)
+        finally:
+            stop_event.set()
+
+    threading.Thread(target=target, name=f"rescoring-{run_id}", daemon=True).start()
+    return run_id
+
+
+def stop(run_id: str) -> bool:
+    """
+    Ask a background run of this process to stop after its current batch; False if it is not running
+    """
+    with _runs_lock:
+        event = _runs.get(run_id)
+    if event is None or event.is_set():
+        return False
+    event.set()
+    return True
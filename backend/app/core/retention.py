@@ -0,0 +1,266 @@
+import os
+import re
+import time
+import shutil
+import logging
+import threading
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows: passes are then only serialized within a process
+    fcntl = None
+
+from app.core.config import settings
+from app.core import file_gc, output_files
+from app.core.scheduler import TERMINAL_STATUSES
+from app.core.segment_store import SEGMENT_STORE_SUFFIX
+from app.db.database import SessionLocal
+from app.db.models import EvaluationJob, TrainingResult
+
+logger = logging.getLogger(__name__)
+
+# Tiered retention of per-job evaluation folders under DOCKER_VOLUME_TMP_PATH_HOST:
+#   hot   - folders used within RETENTION_COMPRESS_AFTER_DAYS stay as they are,
+#   warm  - older ones have their text outputs compressed in place (app/core/output_files.py, read
+#           transparently by the content/download endpoints and the scoring code),
+#   evict - when the volume is above RETENTION_DISK_HIGH_WATERMARK (or evaluation folders exceed
+#           RETENTION_MAX_BYTES), least recently used folders are removed through the file GC until
+#           usage is back under RETENTION_DISK_LOW_WATERMARK.
+# Folders of unfinished jobs and of jobs whose scores back a TrainingResult are never evicted.
+# Segment stores are left uncompressed: they are memory-mapped.
+# Every API process runs passes, but only one at a time per volume: a pass holds an exclusive lock on
+# LOCK_FILE in DOCKER_VOLUME_TMP_PATH_HOST, and a process that finds it taken skips its pass.
+
+# Touched whenever an output of the folder is served, so eviction follows reads and not only age
+ACCESS_MARKER = ".last_access"
+LOCK_FILE = ".retention.lock"
+
+_JOB_FOLDER_PATTERN = re.compile(r"^(?:evaluation|eval)_(\d+)$")
+
+_thread: Optional[threading.Thread] = None
+_stop_event = threading.Event()
+_run_lock = threading.Lock()
+_last_report: Optional[Dict[str, Any]] = None
+
+
+class JobFolder(NamedTuple):
+    path: str
+    job_id: int
+    size: int
+    last_access: float
+    compressible: List[str]
+
+
+def record_access(output_path: Optional[str]) -> None:
+    """
+    Mark the folder of an output as just used
+    """
+    if not output_path:
+        return
+    marker = os.path.join(os.path.dirname(output_path), ACCESS_MARKER)
+    try:
+        with open(marker, 'a'):
+            pass
+        os.utime(marker)
+    except OSError:
+        pass
+
+
+def _scan_folder(path: str, job_id: int) -> JobFolder:
+    size = 0
+    last_access = 0.0
+    compressible = []
+    for root, _, files in os.walk(path):
+        # Segment stores are memory-mapped, never compressed
+        in_store = root.endswith(SEGMENT_STORE_SUFFIX)
+        for name in files:
+            file_path = os.path.join(root, name)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            size += stat.st_size
+            last_access = max(last_access, stat.st_mtime)
+            if (not in_store and name.endswith(tuple(settings.RETENTION_COMPRESS_EXTENSIONS))
+                    and stat.st_size >= settings.RETENTION_COMPRESS_MIN_BYTES):
+                compressible.append(file_path)
+    return JobFolder(path=path, job_id=job_id, size=size, last_access=last_access or os.path.getmtime(path), compressible=compressible)
+
+
+def job_folders() -> List[JobFolder]:
+    """
+    Per-job folders of both temp layouts with their size and last use
+    """
+    folders = []
+    for parent, _ in file_gc.JOB_FOLDERS:
+        parent_path = os.path.join(settings.DOCKER_VOLUME_TMP_PATH_HOST, parent)
+        if not os.path.isdir(parent_path):
+            continue
+        for entry in os.scandir(parent_path):
+            match = _JOB_FOLDER_PATTERN.match(entry.name)
+            if match and entry.is_dir(follow_symlinks=False):
+                try:
+                    folders.append(_scan_folder(entry.path, int(match.group(1))))
+                except OSError as e:
+                    logger.warning(f"Retention: could not scan {entry.path}: {str(e)}")
+    return folders
+
+
+def active_job_ids(db) -> Set[int]:
+    return {job_id for (job_id,) in db.query(EvaluationJob.job_id).filter(EvaluationJob.status.notin_(TERMINAL_STATUSES))}
+
+
+def pinned_job_ids(db) -> Set[int]:
+    """
+    Jobs whose scores were added to a TrainingResult, with the leaders whose folders hold their outputs
+    """
+    pinned = {job_id for (job_id,) in db.query(EvaluationJob.job_id).join(
+        TrainingResult,
+        (TrainingResult.version_id == EvaluationJob.version_id) & (TrainingResult.testset_id == EvaluationJob.testset_id)
+    ).filter(EvaluationJob.details_added_successfully.is_(True))}
+    if pinned:
+        pinned |= {leader_id for (leader_id,) in db.query(EvaluationJob.coalesced_into_job_id).filter(
+            EvaluationJob.job_id.in_(pinned), EvaluationJob.coalesced_into_job_id.isnot(None))}
+    return pinned
+
+
+def _bytes_to_free(evaluation_bytes: int) -> int:
+    disk = shutil.disk_usage(settings.DOCKER_VOLUME_TMP_PATH_HOST)
+    to_free = 0
+    if disk.used > settings.RETENTION_DISK_HIGH_WATERMARK * disk.total:
+        to_free = int(disk.used - settings.RETENTION_DISK_LOW_WATERMARK * disk.total)
+    if settings.RETENTION_MAX_BYTES and evaluation_bytes > settings.RETENTION_MAX_BYTES:
+        to_free = max(to_free, evaluation_bytes - settings.RETENTION_MAX_BYTES)
+    return to_free
+
+
+@contextmanager
+def _volume_lock() -> Iterator[bool]:
+    """
+    Exclusive retention lock of the volume for the duration of a pass; yields False if another process holds it
+    """
+    if fcntl is None:
+        yield True
+        return
+    os.makedirs(settings.DOCKER_VOLUME_TMP_PATH_HOST, exist_ok=True)
+    with open(os.path.join(settings.DOCKER_VOLUME_TMP_PATH_HOST, LOCK_FILE), 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def run_once() -> Dict[str, Any]:
+    """
+    One retention pass: compress idle folders, then evict least recently used ones while over budget.
+    Skipped (report with "skipped") while another process runs a pass on the same volume.
+    """
+    with _run_lock, _volume_lock() as locked:
+        if not locked:
+            logger.info("Retention: another process is running a pass on this volume, skipping")
+            return {"started_at": datetime.utcnow().isoformat(), "skipped": "another process is running a retention pass"}
+        return _run_pass()
+
+
+def _run_pass() -> Dict[str, Any]:
+    global _last_report
+    started = time.perf_counter()
+    now = time.time()
+    report: Dict[str, Any] = {
+        "started_at": datetime.utcnow().isoformat(),
+        "folders": 0, "bytes": 0,
+        "compressed_files": 0, "compressed_saved_bytes": 0,
+        "evicted_folders": 0, "evicted_bytes": 0, "gc_id": None
+    }
+    db = SessionLocal()
+    try:
+        active = active_job_ids(db)
+        protected = active | pinned_job_ids(db)
+    finally:
+        db.close()
+
+    folders = job_folders()
+    report["folders"] = len(folders)
+    report["protected"] = sum(1 for folder in folders if folder.job_id in protected)
+
+    # Warm tier: compress text outputs of idle folders of finished (or deleted) jobs
+    compress_before = now - timedelta(days=settings.RETENTION_COMPRESS_AFTER_DAYS).total_seconds()
+    for folder in folders:
+        if folder.last_access >= compress_before or folder.job_id in active:
+            continue
+        for path in folder.compressible:
+            try:
+                report["compressed_saved_bytes"] += output_files.compress(path)
+                report["compressed_files"] += 1
+            except OSError as e:
+                logger.warning(f"Retention: could not compress {path}: {str(e)}")
+    if report["compressed_files"]:
+        folders = job_folders()
+    report["bytes"] = sum(folder.size for folder in folders)
+
+    # Eviction: least recently used first, never protected or recently used folders
+    to_free = _bytes_to_free(report["bytes"])
+    if to_free > 0:
+        idle_before = now - settings.RETENTION_EVICT_MIN_IDLE_HOURS * 3600
+        evicted = []
+        for folder in sorted(folders, key=lambda folder: folder.last_access):
+            if report["evicted_bytes"] >= to_free:
+                break
+            if folder.job_id in protected or folder.last_access >= idle_before:
+                continue
+            evicted.append(folder.path)
+            report["evicted_folders"] += 1
+            report["evicted_bytes"] += folder.size
+        if evicted:
+            report["gc_id"] = file_gc.submit(evicted)["gc_id"]
+        if report["evicted_bytes"] < to_free:
+            logger.warning(f"Retention: {to_free - report['evicted_bytes']} bytes over budget, remaining folders are protected or in use")
+
+    report["bytes_to_free"] = max(to_free, 0)
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    _last_report = report
+    logger.info(
+        f"Retention: {report['folders']} folders ({report['bytes']} bytes), compressed {report['compressed_files']} files "
+        f"saving {report['compressed_saved_bytes']} bytes, evicted {report['evicted_folders']} folders ({report['evicted_bytes']} bytes) "
+        f"in {report['seconds']}s"
+    )
+    return report
+
+
+def last_report() -> Optional[Dict[str, Any]]:
+    return dict(_last_report) if _last_report else None
+
+
+def _loop() -> None:
+    # First pass shortly after startup, then every RETENTION_INTERVAL_MINUTES
+    while not _stop_event.wait(60 if _last_report is None else settings.RETENTION_INTERVAL_MINUTES * 60):
+        try:
+            run_once()
+        except Exception as e:
+            logger.error(f"Retention pass failed: {str(e)}")
+            logger.exception("Exception details:")
+
+
+def start() -> None:
+    """
+    Run retention passes in a background thread of this process
+    """
+    global _thread
+    if _thread and _thread.is_alive():
+        return
+    _stop_event.clear()
+    _thread = threading.Thread(target=_loop, name="evaluation-retention", daemon=True)
+    _thread.start()
+    logger.info(f"Evaluation output retention started (every {settings.RETENTION_INTERVAL_MINUTES} min)")
+
+
+def stop() -> None:
+    _stop_event.set()
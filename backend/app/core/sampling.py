@@ -0,0 +1,339 @@
+import os
+import json
+import logging
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.chunking import file_digest
+
+logger = logging.getLogger(__name__)
+
+# Sampled quick-look evaluations: the engine translates a stratified sample of the testset (strata are
+# source length quantiles, so short and long segments are represented in proportion) and BLEU/COMET are
+# reported with bootstrap confidence intervals. The sample is drawn with EVALUATION_SAMPLE_SEED plus the
+# testset ID, so every version is scored on the same segments. A full run upgraded from a sampled job
+# only translates the segments outside the sample and merges in the sample's translations.
+
+SAMPLE_SOURCE_FILE = "sample_source.txt"
+SAMPLE_TARGET_FILE = "sample_target.txt"
+SAMPLE_INDEX_FILE = "sample_indices.json"
+
+BLEU_MAX_ORDER = 4
+# Decimals of a job's reported BLEU, as the sacrebleu CLI prints it (-b)
+BLEU_SCORE_DECIMALS = 1
+
+# Sample our BLEU and chrF statistics are checked against sacrebleu with: tokenization, repeated n-grams, an
+# empty hypothesis, a short one (brevity penalty) and a reference shorter than the n-gram orders
+CHECK_HYPOTHESES = (
+    "The cat sat on the mat, didn't it?",
+    "Prices rose 3.5% in Q1 (year-on-year) -- see p. 12.",
+    "",
+    "the the the the",
+    "สวัสดี ครับ ยินดี ต้อนรับ",
+    "a short one",
+    "ok then"
+)
+CHECK_REFERENCES = (
+    "The cat was sitting on the mat, wasn't it?",
+    "Prices rose by 3.5% in Q1 (year on year); see page 12.",
+    "Nothing came out.",
+    "the cat is on the mat",
+    "สวัสดี ครับ ยินดี ต้อนรับ ทุกคน",
+    "a much longer reference than the short hypothesis",
+    "ok"
+)
+
+# Bootstrap resamples are drawn in blocks of at most this many (resample x segment) counts
+_BOOTSTRAP_BLOCK_CELLS = 4_000_000
+
+
+class ReusedTranslations(NamedTuple):
+    indices: List[int]  # Testset line numbers already translated, ascending
+    output_file: str  # Their translations, one line each in index order
+
+
+def _read_lines(path: str) -> List[str]:
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return [line.rstrip('\n') for line in f]
+
+
+def _write_lines(path: str, lines: Sequence[str]) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for line in lines:
+            f.write(line + '\n')
+    os.replace(tmp_path, path)
+
+
+def sample_seed(testset_id: int) -> int:
+    return settings.EVALUATION_SAMPLE_SEED + testset_id
+
+
+def stratified_indices(lengths: Sequence[int], sample_size: int, strata: int, seed: int) -> List[int]:
+    """
+    Sorted indices of a sample of sample_size segments, allocated to `strata` equally sized length
+    quantile strata in proportion to their size (largest remainder) and drawn without replacement
+    """
+    total = len(lengths)
+    if sample_size >= total:
+        return list(range(total))
+    rng = np.random.default_rng(seed)
+    by_length = np.argsort(np.asarray(lengths), kind="stable")
+    groups = [group for group in np.array_split(by_length, max(1, min(strata, sample_size))) if len(group)]
+
+    quotas = np.array([len(group) * sample_size / total for group in groups])
+    allocation = np.floor(quotas).astype(int)
+    for index in np.argsort(-(quotas - allocation), kind="stable")[:sample_size - allocation.sum()]:
+        allocation[index] += 1
+
+    chosen = [rng.choice(group, size=count, replace=False) for group, count in zip(groups, allocation) if count]
+    return sorted(int(index) for index in np.concatenate(chosen))
+
+
+def draw_sample(source_file: str, target_file: str, work_dir: str, *, sample_size: int, seed: int) -> Dict[str, Any]:
+    """
+    Write the sampled source/reference lines and their testset line numbers to work_dir.
+    Returns {"source_file", "target_file", "total_segments", "sample_segments", "strata", "seed"}.
+    """
+    source_lines = _read_lines(source_file)
+    target_lines = _read_lines(target_file)
+    if len(source_lines) != len(target_lines):
+        raise ValueError(f"Testset source has {len(source_lines)} lines but the reference has {len(target_lines)}; cannot sample")
+
+    strata = max(1, settings.EVALUATION_SAMPLE_STRATA)
+    indices = stratified_indices([len(line.split()) for line in source_lines], sample_size, strata, seed)
+
+    sample_source = os.path.join(work_dir, SAMPLE_SOURCE_FILE)
+    sample_target = os.path.join(work_dir, SAMPLE_TARGET_FILE)
+    _write_lines(sample_source, [source_lines[index] for index in indices])
+    _write_lines(sample_target, [target_lines[index] for index in indices])
+    with open(os.path.join(work_dir, SAMPLE_INDEX_FILE), 'w', encoding='utf-8') as f:
+        json.dump({
+            "indices": indices,
+            "total_segments": len(source_lines),
+            "source_sha1": file_digest(source_file),
+            "seed": seed,
+            "strata": strata
+        }, f)
+
+    logger.info(f"Sampled {len(indices)} of {len(source_lines)} segments in {strata} length strata (seed {seed}) into {work_dir}")
+    return {
+        "source_file": sample_source,
+        "target_file": sample_target,
+        "total_segments": len(source_lines),
+        "sample_segments": len(indices),
+        "strata": strata,
+        "seed": seed
+    }
+
+
+def reusable_translations(sample_output_file: Optional[str], source_file: str) -> Optional[ReusedTranslations]:
+    """
+    Translations of a sampled job that a full run over source_file can take over, None if the sample
+    output is gone or the testset changed since
+    """
+    if not sample_output_file or not os.path.exists(sample_output_file):
+        return None
+    index_path = os.path.join(os.path.dirname(sample_output_file), SAMPLE_INDEX_FILE)
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            sample = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if sample.get("source_sha1") != file_digest(source_file):
+        logger.info(f"Not reusing {sample_output_file}: the testset source changed since it was sampled")
+        return None
+    with open(sample_output_file, 'rb') as f:
+        output_lines = sum(1 for _ in f)
+    if output_lines != len(sample["indices"]):
+        logger.warning(f"Not reusing {sample_output_file}: {output_lines} lines for {len(sample['indices'])} sampled segments")
+        return None
+    return ReusedTranslations(indices=sample["indices"], output_file=sample_output_file)
+
+
+def engine_input(source_file: str, output_path: str, reused: Optional[ReusedTranslations]) -> Tuple[str, str]:
+    """
+    (source, output) of the engine run: all of source_file, or only the lines not covered by `reused`
+    (written next to output_path)
+    """
+    if reused is None:
+        return source_file, output_path
+    skip = set(reused.indices)
+    remaining = [line for index, line in enumerate(_read_lines(source_file)) if index not in skip]
+    remaining_source = output_path + ".remaining.src"
+    _write_lines(remaining_source, remaining)
+    logger.info(f"Reusing {len(skip)} translated segments from {reused.output_file}, {len(remaining)} left to translate")
+    return remaining_source, output_path + ".remaining"
+
+
+def merge_reused(engine_output: Optional[str], output_path: str, reused: ReusedTranslations, total_segments: int) -> None:
+    """
+    Interleave reused translations with the engine output of the remaining segments into output_path
+    """
+    reused_lines = dict(zip(reused.indices, _read_lines(reused.output_file)))
+    engine_lines = _read_lines(engine_output) if engine_output and os.path.exists(engine_output) else []
+    expected = total_segments - len(reused_lines)
+    if len(engine_lines) != expected:
+        logger.warning(f"Engine output {engine_output} has {len(engine_lines)} lines for {expected} segments; merged output may be misaligned")
+
+    translated = iter(engine_lines)
+    _write_lines(output_path, [
+        reused_lines[index] if index in reused_lines else next(translated, "")
+        for index in range(total_segments)
+    ])
+    for path in (engine_output, output_path + ".remaining.src"):
+        if path and path != output_path and os.path.exists(path):
+            os.remove(path)
+
+
+def _word_ngram_counts(tokens: List[str]) -> Counter:
+    counts: Counter = Counter()
+    for order in range(1, BLEU_MAX_ORDER + 1):
+        for start in range(len(tokens) - order + 1):
+            counts[tuple(tokens[start:start + order])] += 1
+    return counts
+
+
+@lru_cache(maxsize=1)
+def _bleu_tokenizer():
+    # Imported here: only needed when scoring
+    from sacrebleu.tokenizers.tokenizer_13a import Tokenizer13a
+    return Tokenizer13a()
+
+
+def bleu_segment_statistics(hypothesis: str, reference: str) -> List[int]:
+    """
+    BLEU sufficient statistics of one segment, [hyp_len, ref_len, correct_1..4, total_1..4], with the
+    13a tokenization the sacrebleu CLI uses for the reported score
+    """
+    tokenize = _bleu_tokenizer()
+    hyp_tokens = tokenize(hypothesis.rstrip()).split()
+    ref_tokens = tokenize(reference.rstrip()).split()
+    hyp_counts = _word_ngram_counts(hyp_tokens)
+    ref_counts = _word_ngram_counts(ref_tokens)
+    correct = [0] * BLEU_MAX_ORDER
+    total = [0] * BLEU_MAX_ORDER
+    for ngram, count in hyp_counts.items():
+        total[len(ngram) - 1] += count
+        if ngram in ref_counts:
+            correct[len(ngram) - 1] += min(count, ref_counts[ngram])
+    return [len(hyp_tokens), len(ref_tokens)] + correct + total
+
+
+def bleu_statistics(hypotheses: Sequence[str], references: Sequence[str]) -> np.ndarray:
+    """
+    Per-segment BLEU sufficient statistics, one row of bleu_segment_statistics() per segment
+    """
+    check_bleu_statistics()
+    stats = np.zeros((len(hypotheses), 2 + 2 * BLEU_MAX_ORDER), dtype=np.float64)
+    for index, (hypothesis, reference) in enumerate(zip(hypotheses, references)):
+        stats[index] = bleu_segment_statistics(hypothesis, reference)
+    return stats
+
+
+def bleu_from_statistics(stats: np.ndarray) -> np.ndarray:
+    """
+    Corpus BLEU for each row of summed statistics (shape (k, 10)), vectorized equivalent of sacrebleu's
+    compute_bleu with its default 'exp' smoothing
+    """
+    stats = np.atleast_2d(stats)
+    sys_len, ref_len = stats[:, 0], stats[:, 1]
+    correct, total = stats[:, 2:6], stats[:, 6:10]
+
+    missing = correct == 0
+    smooth = np.power(2.0, np.cumsum(missing, axis=1))
+    safe_total = np.maximum(total, 1)
+    precisions = np.where(missing, 100.0 / (smooth * safe_total), 100.0 * correct / safe_total)
+    # sacrebleu stops at the first n-gram order without any hypothesis n-grams
+    precisions = np.where(np.cumprod(total > 0, axis=1).astype(bool), precisions, 0.0)
+    log_precisions = np.where(precisions > 0, np.log(np.where(precisions > 0, precisions, 1.0)), -9999999999.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        brevity_penalty = np.where(sys_len < ref_len, np.exp(1.0 - ref_len / np.where(sys_len > 0, sys_len, 1.0)), 1.0)
+    brevity_penalty = np.where(sys_len > 0, brevity_penalty, 0.0)
+    scores = brevity_penalty * np.exp(log_precisions.mean(axis=1))
+    return np.where(correct.sum(axis=1) > 0, scores, 0.0)
+
+
+@lru_cache(maxsize=1)
+def check_bleu_statistics() -> bool:
+    """
+    Whether the statistics of bleu_segment_statistics() reproduce sacrebleu.corpus_bleu on a fixed sample;
+    checked once per process since the counting is ours and the tokenizer and scoring are sacrebleu's
+    """
+    import sacrebleu
+    stats = np.array([bleu_segment_statistics(hyp, ref) for hyp, ref in zip(CHECK_HYPOTHESES, CHECK_REFERENCES)], dtype=np.float64)
+    ours = float(bleu_from_statistics(stats.sum(axis=0))[0])
+    expected = float(sacrebleu.corpus_bleu(list(CHECK_HYPOTHESES), [list(CHECK_REFERENCES)]).score)
+    if abs(ours - expected) > 1e-6:
+        logger.error(f"BLEU from segment statistics ({ours}) does not match sacrebleu {sacrebleu.__version__} ({expected})")
+        return False
+    return True
+
+
+def reported_bleu(summed: np.ndarray) -> float:
+    """
+    A job's BLEU score from summed statistics, rounded like every score the scoring pipeline stores
+    """
+    return round(float(bleu_from_statistics(summed)[0]), BLEU_SCORE_DECIMALS)
+
+
+def resample_weights(segments: int, resamples: int, seed: int) -> Iterator[np.ndarray]:
+    """
+    Bootstrap resamples as blocks of per-segment draw counts (shape (block, segments)); a resample's
+    statistic is the counts-weighted sum of per-segment statistics
+    """
+    rng = np.random.default_rng(seed)
+    block = max(1, min(resamples, _BOOTSTRAP_BLOCK_CELLS // max(segments, 1)))
+    for start in range(0, resamples, block):
+        rows = min(block, resamples - start)
+        # Count the draws of every row in one bincount over row-offset segment indices
+        draws = rng.integers(0, segments, size=(rows, segments)) + (np.arange(rows) * segments)[:, None]
+        yield np.bincount(draws.ravel(), minlength=rows * segments).reshape(rows, segments).astype(np.float64)
+
+
+def _interval(values: np.ndarray, confidence: float) -> List[float]:
+    alpha = 1.0 - confidence
+    low, high = np.percentile(values, [100.0 * alpha / 2, 100.0 * (1 - alpha / 2)])
+    return [float(low), float(high)]
+
+
+def bleu_confidence_interval(hypotheses: Sequence[str], references: Sequence[str], *, resamples: int,
+                             confidence: float, seed: int) -> Dict[str, Any]:
+    stats = bleu_statistics(hypotheses, references)
+    scores = np.concatenate([bleu_from_statistics(weights @ stats) for weights in resample_weights(len(stats), resamples, seed)])
+    low, high = _interval(scores, confidence)
+    return {"score": round(float(bleu_from_statistics(stats.sum(axis=0))[0]), 2), "ci": [round(low, 2), round(high, 2)]}
+
+
+def mean_confidence_interval(values: Sequence[float], *, resamples: int, confidence: float, seed: int) -> Dict[str, Any]:
+    values = np.asarray(values, dtype=np.float64)
+    means = np.concatenate([weights @ values / len(values) for weights in resample_weights(len(values), resamples, seed)])
+    low, high = _interval(means, confidence)
+    return {"score": round(float(values.mean()), 4), "ci": [round(low, 4), round(high, 4)]}
+
+
+def confidence_intervals(output_file: str, reference_file: str, comet_segment_scores: Optional[Sequence[float]] = None,
+                         *, seed: int = 0) -> Dict[str, Any]:
+    """
+    Bootstrap confidence intervals of BLEU (and COMET, given per-segment scores) over the segments of
+    output_file, with EVALUATION_BOOTSTRAP_RESAMPLES resamples at EVALUATION_CONFIDENCE_LEVEL
+    """
+    resamples = settings.EVALUATION_BOOTSTRAP_RESAMPLES
+    confidence = settings.EVALUATION_CONFIDENCE_LEVEL
+    result: Dict[str, Any] = {"confidence_level": confidence, "resamples": resamples, "bleu": None, "comet": None}
+
+    hypotheses = _read_lines(output_file)
+    references = _read_lines(reference_file)
+    if not hypotheses or len(hypotheses) != len(references):
+        logger.warning(f"No confidence intervals for {output_file}: {len(hypotheses)} output lines for {len(references)} references")
+        return result
+
+    result["bleu"] = bleu_confidence_interval(hypotheses, references, resamples=resamples, confidence=confidence, seed=seed)
+    if comet_segment_scores and len(comet_segment_scores) == len(hypotheses):
+        result["comet"] = mean_confidence_interval(comet_segment_scores, resamples=resamples, confidence=confidence, seed=seed)
+    return result
@@ -0,0 +1,704 @@
+import os
+import json
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, or_, func, select
+from sqlalchemy.orm import Session, aliased
+
+from app.core.config import settings
+from app.db.models import EvaluationJob, ModelVersion, LanguagePair, EvaluationWorker, TranslationBatch
+from app.schemas.evaluation import EvaluationStatus, EvaluationPriority
+
+logger = logging.getLogger(__name__)
+
+# Label advertised by workers that accept every language pair
+ANY_LABEL = "*"
+
+TERMINAL_STATUSES = [EvaluationStatus.COMPLETED.value, EvaluationStatus.FAILED.value, EvaluationStatus.CANCELLED.value]
+
+# Second alias of the jobs table for the per-user running count inside the claim UPDATE
+RunningJob = aliased(EvaluationJob)
+
+# Set whenever a job is submitted so the in-process worker claims it without waiting for its next poll
+_job_submitted = threading.Event()
+
+
+def notify_job_submitted() -> None:
+    """
+    Wake the local worker after a new job was queued
+    """
+    _job_submitted.set()
+
+
+def wait_for_submission(timeout: float) -> None:
+    """
+    Block until a job is submitted in this process or the timeout elapses
+    """
+    if _job_submitted.wait(timeout):
+        _job_submitted.clear()
+
+
+def discover_langpack_labels(resources_base_path: Optional[str] = None) -> List[str]:
+    """
+    Language pack folders (e.g. 'enth', 'vien') available under T2T_RESOURCES_BASE_PATH on this host
+    """
+    base_path = resources_base_path or settings.T2T_RESOURCES_BASE_PATH
+    try:
+        return sorted(
+            entry.name for entry in os.scandir(base_path)
+            if entry.is_dir() and not entry.name.startswith(".")
+        )
+    except OSError as e:
+        logger.warning(f"Could not list language packs in {base_path}: {str(e)}")
+        return []
+
+
+def worker_labels() -> List[str]:
+    """
+    Labels this host advertises: its language packs plus EVALUATION_WORKER_LABELS.
+    A host without any language pack directory advertises '*' so single-host setups keep working.
+    """
+    labels = set(discover_langpack_labels())
+    labels.update(label.strip() for label in settings.EVALUATION_WORKER_LABELS.split(",") if label.strip())
+    if settings.FAKE_EVALUATION_MODE or not labels:
+        labels.add(ANY_LABEL)
+    return sorted(labels)
+
+
+def capable_lang_pair_ids(db: Session, labels: Iterable[str]) -> Optional[Set[int]]:
+    """
+    Language pairs a worker with these labels can evaluate, or None when it accepts every pair
+    """
+    # Imported here: app.core.evaluation pulls in the whole pipeline
+    from app.core.evaluation import determine_langpack_folder
+
+    labels = set(labels)
+    if ANY_LABEL in labels:
+        return None
+    capable = set()
+    for lang_pair in db.query(LanguagePair).all():
+        if determine_langpack_folder(lang_pair.source_language_code, lang_pair.target_language_code) in labels:
+            capable.add(lang_pair.lang_pair_id)
+    return capable
+
+
+# Lower rank is scheduled first
+PRIORITY_RANKS = {
+    EvaluationPriority.INTERACTIVE.value: 0,
+    EvaluationPriority.RELEASE_BLOCKING.value: 1,
+    EvaluationPriority.BATCH.value: 2,
+}
+
+
+def effective_rank(priority: Optional[str], requested_at: Optional[datetime], now: datetime) -> int:
+    """
+    Priority rank after aging: every EVALUATION_PRIORITY_AGING_SECONDS spent waiting moves a job up
+    one class, so batch work cannot be starved indefinitely by a steady stream of interactive jobs
+    """
+    rank = PRIORITY_RANKS.get(priority or EvaluationPriority.INTERACTIVE.value, 0)
+    if requested_at and settings.EVALUATION_PRIORITY_AGING_SECONDS > 0:
+        waited = max((now - requested_at).total_seconds(), 0.0)
+        rank -= int(waited // settings.EVALUATION_PRIORITY_AGING_SECONDS)
+    return max(rank, 0)
+
+
+def _usage(db: Session, now: datetime) -> Tuple[Dict[Any, int], Dict[Any, int], Dict[Any, int]]:
+    """
+    Fair-share usage per user and per language pair (jobs running now plus jobs claimed within
+    EVALUATION_FAIR_SHARE_WINDOW_SECONDS), and jobs currently running per user
+    """
+    cutoff = now - timedelta(seconds=settings.EVALUATION_FAIR_SHARE_WINDOW_SECONDS)
+    running = and_(EvaluationJob.claimed_by_worker_id.isnot(None), EvaluationJob.status.notin_(TERMINAL_STATUSES))
+    rows = db.query(
+        EvaluationJob.requested_by_user_id,
+        ModelVersion.lang_pair_id,
+        running.label("running")
+    ).join(
+        ModelVersion, EvaluationJob.version_id == ModelVersion.version_id
+    ).filter(
+        or_(running, EvaluationJob.claimed_at >= cutoff)
+    ).all()
+    user_usage: Dict[Any, int] = {}
+    lang_pair_usage: Dict[Any, int] = {}
+    user_running: Dict[Any, int] = {}
+    for row in rows:
+        user_usage[row.requested_by_user_id] = user_usage.get(row.requested_by_user_id, 0) + 1
+        lang_pair_usage[row.lang_pair_id] = lang_pair_usage.get(row.lang_pair_id, 0) + 1
+        if row.running:
+            user_running[row.requested_by_user_id] = user_running.get(row.requested_by_user_id, 0) + 1
+    return user_usage, lang_pair_usage, user_running
+
+
+def _pending_query(db: Session, lang_pair_ids: Optional[Set[int]] = None):
+    query = db.query(
+        EvaluationJob.job_id,
+        EvaluationJob.requested_by_user_id,
+        EvaluationJob.priority,
+        EvaluationJob.requested_at,
+        EvaluationJob.predicted_duration_seconds,
+        ModelVersion.lang_pair_id
+    ).join(
+        ModelVersion, EvaluationJob.version_id == ModelVersion.version_id
+    ).filter(
+        EvaluationJob.status == EvaluationStatus.PENDING.value,
+        EvaluationJob.claimed_by_worker_id.is_(None),
+        EvaluationJob.coalesced_into_job_id.is_(None)
+    )
+    if lang_pair_ids is not None:
+        query = query.filter(ModelVersion.lang_pair_id.in_(lang_pair_ids))
+    return query
+
+
+def predicted_duration(job) -> float:
+    """Predicted processing time of a job row, EVALUATION_DEFAULT_DURATION_SECONDS without a prediction"""
+    return job.predicted_duration_seconds or float(settings.EVALUATION_DEFAULT_DURATION_SECONDS)
+
+
+def _shortest_job_key(job, now: datetime) -> float:
+    """
+    Shortest-job-first with aging (highest response ratio next): (waited + predicted) / predicted, negated
+    so that lower sorts first. Short jobs go first, long jobs catch up as they wait. 0 when SJF is disabled.
+    """
+    if not settings.EVALUATION_SHORTEST_JOB_FIRST:
+        return 0.0
+    duration = max(predicted_duration(job), 1.0)
+    waited = max((now - job.requested_at).total_seconds(), 0.0) if job.requested_at else 0.0
+    return -(waited + duration) / duration
+
+
+def _group_order_key(job, now: datetime) -> tuple:
+    # Order of jobs inside one (priority, user, language pair) group
+    return (_shortest_job_key(job, now), job.job_id)
+
+
+def _schedule_key(job, user_usage: Dict[Any, int], lang_pair_usage: Dict[Any, int], now: datetime) -> tuple:
+    return (
+        effective_rank(job.priority, job.requested_at, now),
+        user_usage.get(job.requested_by_user_id, 0),
+        lang_pair_usage.get(job.lang_pair_id, 0),
+        _shortest_job_key(job, now),
+        job.requested_at or now,
+        job.job_id
+    )
+
+
+def claim_next_job(db: Session, *, worker_id: str, labels: Iterable[str]) -> Optional[int]:
+    """
+    Atomically claim the next PENDING job this worker is capable of running.
+
+    Only the first job of each (priority, user, language pair) group is a candidate; candidates are
+    ordered by aged priority class, then by how much the user and the language pair have used the
+    workers recently (fair share), then shortest predicted job first (with aging), then by age. Users
+    already running EVALUATION_MAX_RUNNING_PER_USER jobs are skipped. With EVALUATION_SHORTEST_JOB_FIRST
+    disabled the first job of a group is its oldest.
+
+    The claim is a conditional UPDATE (still PENDING, no owner, user under the cap), so when several
+    workers race for the same row exactly one of them sees rowcount == 1.
+    """
+    lang_pair_ids = capable_lang_pair_ids(db, labels)
+    if lang_pair_ids is not None and not lang_pair_ids:
+        return None
+
+    now = datetime.utcnow()
+    group_heads: Dict[tuple, Any] = {}
+    for job in _pending_query(db, lang_pair_ids).all():
+        group_key = (job.priority, job.requested_by_user_id, job.lang_pair_id)
+        head = group_heads.get(group_key)
+        if head is None or _group_order_key(job, now) < _group_order_key(head, now):
+            group_heads[group_key] = job
+    heads = list(group_heads.values())
+    if not heads:
+        return None
+    user_usage, lang_pair_usage, user_running = _usage(db, now)
+    max_running = settings.EVALUATION_MAX_RUNNING_PER_USER
+
+    lease_expires_at = now + timedelta(seconds=settings.EVALUATION_LEASE_SECONDS)
+    for job in sorted(heads, key=lambda job: _schedule_key(job, user_usage, lang_pair_usage, now)):
+        conditions = [
+            EvaluationJob.job_id == job.job_id,
+            EvaluationJob.status == EvaluationStatus.PENDING.value,
+            EvaluationJob.claimed_by_worker_id.is_(None),
+            EvaluationJob.coalesced_into_job_id.is_(None)
+        ]
+        if max_running > 0 and job.requested_by_user_id is not None:
+            if user_running.get(job.requested_by_user_id, 0) >= max_running:
+                continue
+            running_for_user = select(func.count(RunningJob.job_id)).where(
+                RunningJob.requested_by_user_id == job.requested_by_user_id,
+                RunningJob.claimed_by_worker_id.isnot(None),
+                RunningJob.status.notin_(TERMINAL_STATUSES)
+            ).scalar_subquery()
+            conditions.append(running_for_user < max_running)
+        try:
+            claimed = db.query(EvaluationJob).filter(*conditions).update(
+                {
+                    EvaluationJob.claimed_by_worker_id: worker_id,
+                    EvaluationJob.claimed_at: now,
+                    EvaluationJob.lease_expires_at: lease_expires_at
+                },
+                synchronize_session=False
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Database error claiming job {job.job_id} for worker {worker_id}: {str(e)}")
+            raise
+        if claimed == 1:
+            logger.info(f"Worker {worker_id} claimed evaluation job {job.job_id} (priority={job.priority}, user={job.requested_by_user_id}, lang_pair={job.lang_pair_id})")
+            return job.job_id
+    return None
+
+
+def claim_matrix_siblings(db: Session, *, worker_id: str, job_id: int) -> List[int]:
+    """
+    After claiming a matrix job, claim the other PENDING jobs of the same matrix that use the same
+    model and mode, so they run through one engine session. Returns all claimed job IDs, leader first.
+    """
+    leader = db.query(EvaluationJob).filter(EvaluationJob.job_id == job_id).first()
+    if not leader or not leader.matrix_id:
+        return [job_id]
+
+    sibling_filter = [
+        EvaluationJob.matrix_id == leader.matrix_id,
+        EvaluationJob.version_id == leader.version_id,
+        EvaluationJob.evaluation_model_type.is_not_distinct_from(leader.evaluation_model_type),
+        EvaluationJob.mode_type.is_not_distinct_from(leader.mode_type),
+        EvaluationJob.sub_mode_type.is_not_distinct_from(leader.sub_mode_type),
+        EvaluationJob.custom_params.is_not_distinct_from(leader.custom_params),
+        EvaluationJob.status == EvaluationStatus.PENDING.value,
+        EvaluationJob.claimed_by_worker_id.is_(None)
+    ]
+    max_group = max(settings.EVALUATION_MATRIX_MAX_GROUP_JOBS - 1, 0)
+    sibling_ids = [
+        row.job_id for row in db.query(EvaluationJob.job_id).filter(*sibling_filter).order_by(EvaluationJob.job_id).limit(max_group)
+    ]
+    if not sibling_ids:
+        return [job_id]
+
+    now = datetime.utcnow()
+    try:
+        db.query(EvaluationJob).filter(EvaluationJob.job_id.in_(sibling_ids), *sibling_filter).update(
+            {
+                EvaluationJob.claimed_by_worker_id: worker_id,
+                EvaluationJob.claimed_at: now,
+                EvaluationJob.lease_expires_at: now + timedelta(seconds=settings.EVALUATION_LEASE_SECONDS)
+            },
+            synchronize_session=False
+        )
+        db.commit()
+        claimed = [
+            row.job_id for row in db.query(EvaluationJob.job_id).filter(
+                EvaluationJob.job_id.in_(sibling_ids),
+                EvaluationJob.claimed_by_worker_id == worker_id
+            ).order_by(EvaluationJob.job_id)
+        ]
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error claiming matrix {leader.matrix_id} siblings of job {job_id}: {str(e)}")
+        raise
+    logger.info(f"Worker {worker_id} claimed {len(claimed)} more job(s) of matrix {leader.matrix_id} to share the engine with job {job_id}")
+    return [job_id] + claimed
+
+
+def queue_order(db: Session) -> List[Any]:
+    """
+    PENDING jobs in the order the scheduler would start them, simulating fair share as jobs are
+    handed out (worker capabilities and per-user caps are not taken into account)
+    """
+    now = datetime.utcnow()
+    user_usage, lang_pair_usage, _ = _usage(db, now)
+    groups: Dict[tuple, List[Any]] = {}
+    for job in _pending_query(db).all():
+        groups.setdefault((job.priority, job.requested_by_user_id, job.lang_pair_id), []).append(job)
+    for group in groups.values():
+        group.sort(key=lambda job: _group_order_key(job, now), reverse=True)
+
+    ordered = []
+    while groups:
+        # Each group list is in reverse start order, so its head is the last element
+        group_key = min(groups, key=lambda key: _schedule_key(groups[key][-1], user_usage, lang_pair_usage, now))
+        job = groups[group_key].pop()
+        if not groups[group_key]:
+            del groups[group_key]
+        ordered.append(job)
+        user_usage[job.requested_by_user_id] = user_usage.get(job.requested_by_user_id, 0) + 1
+        lang_pair_usage[job.lang_pair_id] = lang_pair_usage.get(job.lang_pair_id, 0) + 1
+    return ordered
+
+
+def average_job_duration_seconds(db: Session, sample_size: int = 50) -> float:
+    """Mean processing time of recently completed jobs, EVALUATION_DEFAULT_DURATION_SECONDS without history"""
+    rows = db.query(EvaluationJob.processing_started_at, EvaluationJob.completed_at).filter(
+        EvaluationJob.status == EvaluationStatus.COMPLETED.value,
+        EvaluationJob.processing_started_at.isnot(None),
+        EvaluationJob.completed_at.isnot(None)
+    ).order_by(EvaluationJob.job_id.desc()).limit(sample_size).all()
+    durations = [(row.completed_at - row.processing_started_at).total_seconds() for row in rows]
+    durations = [duration for duration in durations if duration > 0]
+    if not durations:
+        return float(settings.EVALUATION_DEFAULT_DURATION_SECONDS)
+    return sum(durations) / len(durations)
+
+
+def estimate_start_times(db: Session, ordered: List[Any]) -> Dict[int, Optional[datetime]]:
+    """
+    Estimated UTC start time for each queued job: queued jobs are handed to the earliest free slot
+    across online workers. Jobs take their predicted duration, or the average job duration when
+    they have no prediction.
+    """
+    workers = db.query(EvaluationWorker).filter(EvaluationWorker.status == "online").all()
+    total_slots = sum(worker.capacity for worker in workers)
+    if total_slots <= 0:
+        return {job.job_id: None for job in ordered}
+
+    now = datetime.utcnow()
+    average_duration = average_job_duration_seconds(db)
+    running = db.query(EvaluationJob.claimed_at, EvaluationJob.predicted_duration_seconds).filter(
+        EvaluationJob.claimed_by_worker_id.isnot(None),
+        EvaluationJob.status.notin_(TERMINAL_STATUSES)
+    ).all()
+    # Seconds from now until each slot is free
+    slot_free = []
+    for row in running:
+        duration = row.predicted_duration_seconds or average_duration
+        slot_free.append(max(duration - (now - row.claimed_at).total_seconds(), 0.0) if row.claimed_at else duration)
+    slot_free = sorted(slot_free)[:total_slots]
+    slot_free.extend([0.0] * (total_slots - len(slot_free)))
+    heapq.heapify(slot_free)
+
+    estimates = {}
+    for job in ordered:
+        start_in = heapq.heappop(slot_free)
+        estimates[job.job_id] = now + timedelta(seconds=start_in)
+        heapq.heappush(slot_free, start_in + (job.predicted_duration_seconds or average_duration))
+    return estimates
+
+
+def estimate_completion(db: Session, job: Dict[str, Any], estimated_start_at: Optional[datetime]) -> Optional[datetime]:
+    """
+    Estimated UTC completion time of a queued (given its estimated start) or running job
+    """
+    if job["status"] == EvaluationStatus.PENDING.value:
+        start_at = estimated_start_at
+    elif job["status"] not in TERMINAL_STATUSES and job.get("claimed_at"):
+        start_at = job["claimed_at"]
+    else:
+        return None
+    if start_at is None:
+        return None
+    duration = job.get("predicted_duration_seconds") or average_job_duration_seconds(db)
+    return max(start_at + timedelta(seconds=duration), datetime.utcnow())
+
+
+def queue_status(db: Session, job_id: int) -> Tuple[Optional[int], Optional[datetime]]:
+    """
+    1-based queue position and estimated start time of a PENDING job, (None, None) otherwise
+    """
+    ordered = queue_order(db)
+    for index, job in enumerate(ordered):
+        if job.job_id == job_id:
+            return index + 1, estimate_start_times(db, ordered[:index + 1]).get(job_id)
+    return None, None
+
+
+def cancelled_jobs(db: Session, *, job_ids: Iterable[int]) -> Set[int]:
+    """
+    Which of the given jobs have been cancelled
+    """
+    job_ids = list(job_ids)
+    if not job_ids:
+        return set()
+    return {
+        row.job_id for row in db.query(EvaluationJob.job_id).filter(
+            EvaluationJob.job_id.in_(job_ids),
+            EvaluationJob.status == EvaluationStatus.CANCELLED.value
+        )
+    }
+
+
+def renew_leases(db: Session, *, worker_id: str, job_ids: Iterable[int]) -> Set[int]:
+    """
+    Extend the leases of jobs this worker is running; returns the job IDs it still owns
+    """
+    job_ids = list(job_ids)
+    if not job_ids:
+        return set()
+    lease_expires_at = datetime.utcnow() + timedelta(seconds=settings.EVALUATION_LEASE_SECONDS)
+    try:
+        db.query(EvaluationJob).filter(
+            EvaluationJob.job_id.in_(job_ids),
+            EvaluationJob.claimed_by_worker_id == worker_id
+        ).update({EvaluationJob.lease_expires_at: lease_expires_at}, synchronize_session=False)
+        db.commit()
+        owned = {
+            row.job_id for row in db.query(EvaluationJob.job_id).filter(
+                EvaluationJob.job_id.in_(job_ids),
+                EvaluationJob.claimed_by_worker_id == worker_id
+            )
+        }
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error renewing leases for worker {worker_id}: {str(e)}")
+        raise
+    lost = set(job_ids) - owned
+    if lost:
+        logger.warning(f"Worker {worker_id} lost the lease on job(s) {sorted(lost)}")
+    return owned
+
+
+def release_job(db: Session, *, job_id: int, worker_id: str) -> None:
+    """
+    Drop the lease once the worker is done with a job. The worker ID is kept on the row as a record
+    of where the job ran. A job left in a non-terminal status is failed rather than stuck forever.
+    """
+    try:
+        job = db.query(EvaluationJob).filter(
+            EvaluationJob.job_id == job_id,
+            EvaluationJob.claimed_by_worker_id == worker_id
+        ).first()
+        if not job:
+            return
+        job.lease_expires_at = None
+        if job.status not in TERMINAL_STATUSES:
+            logger.error(f"Job {job_id} finished on worker {worker_id} without a terminal status ({job.status}), marking FAILED")
+            job.status = EvaluationStatus.FAILED.value
+            job.log_message = job.log_message or "Evaluation ended without reporting a result"
+            job.completed_at = datetime.now()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error releasing job {job_id} from worker {worker_id}: {str(e)}")
+        raise
+
+
+def requeue_expired_leases(db: Session) -> List[int]:
+    """
+    Put jobs whose worker stopped renewing its lease back in the queue
+    """
+    now = datetime.utcnow()
+    try:
+        expired = db.query(EvaluationJob).filter(
+            EvaluationJob.lease_expires_at.isnot(None),
+            EvaluationJob.lease_expires_at < now,
+            EvaluationJob.status.notin_(TERMINAL_STATUSES)
+        ).all()
+        requeued = []
+        for job in expired:
+            # Conditional on the same lease so a concurrent renewal wins
+            updated = db.query(EvaluationJob).filter(
+                EvaluationJob.job_id == job.job_id,
+                EvaluationJob.claimed_by_worker_id == job.claimed_by_worker_id,
+                EvaluationJob.lease_expires_at < now
+            ).update(
+                {
+                    EvaluationJob.status: EvaluationStatus.PENDING.value,
+                    EvaluationJob.claimed_by_worker_id: None,
+                    EvaluationJob.claimed_at: None,
+                    EvaluationJob.lease_expires_at: None,
+                    EvaluationJob.log_message: f"Requeued: lease held by worker {job.claimed_by_worker_id} expired"
+                },
+                synchronize_session=False
+            )
+            if updated:
+                requeued.append(job.job_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error requeueing expired leases: {str(e)}")
+        raise
+    if requeued:
+        logger.warning(f"Requeued {len(requeued)} evaluation job(s) with expired leases: {requeued}")
+    return requeued
+
+
+# Translation batches (app/core/batch_translation.py) run on the same worker slots, with the same kind of
+# lease. They are claimed oldest first, before evaluation jobs: they are user-facing and short next to a run.
+
+def claim_next_batch(db: Session, *, worker_id: str, labels: Iterable[str]) -> Optional[int]:
+    """
+    Atomically claim the oldest PENDING translation batch this worker can run. Users already running
+    EVALUATION_MAX_RUNNING_PER_USER batches are skipped.
+    """
+    lang_pair_ids = capable_lang_pair_ids(db, labels)
+    if lang_pair_ids is not None and not lang_pair_ids:
+        return None
+    query = db.query(TranslationBatch.batch_id, TranslationBatch.requested_by_user_id).join(
+        ModelVersion, TranslationBatch.version_id == ModelVersion.version_id
+    ).filter(
+        TranslationBatch.status == EvaluationStatus.PENDING.value,
+        TranslationBatch.claimed_by_worker_id.is_(None)
+    )
+    if lang_pair_ids is not None:
+        query = query.filter(ModelVersion.lang_pair_id.in_(lang_pair_ids))
+    pending = query.order_by(TranslationBatch.requested_at, TranslationBatch.batch_id).limit(100).all()
+    if not pending:
+        return None
+
+    max_running = settings.EVALUATION_MAX_RUNNING_PER_USER
+    user_running = dict(db.query(TranslationBatch.requested_by_user_id, func.count(TranslationBatch.batch_id)).filter(
+        TranslationBatch.claimed_by_worker_id.isnot(None),
+        TranslationBatch.status.notin_(TERMINAL_STATUSES)
+    ).group_by(TranslationBatch.requested_by_user_id).all())
+    now = datetime.utcnow()
+    for batch in pending:
+        if max_running > 0 and batch.requested_by_user_id is not None and user_running.get(batch.requested_by_user_id, 0) >= max_running:
+            continue
+        try:
+            claimed = db.query(TranslationBatch).filter(
+                TranslationBatch.batch_id == batch.batch_id,
+                TranslationBatch.status == EvaluationStatus.PENDING.value,
+                TranslationBatch.claimed_by_worker_id.is_(None)
+            ).update(
+                {
+                    TranslationBatch.claimed_by_worker_id: worker_id,
+                    TranslationBatch.claimed_at: now,
+                    TranslationBatch.lease_expires_at: now + timedelta(seconds=settings.EVALUATION_LEASE_SECONDS)
+                },
+                synchronize_session=False
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Database error claiming translation batch {batch.batch_id} for worker {worker_id}: {str(e)}")
+            raise
+        if claimed == 1:
+            logger.info(f"Worker {worker_id} claimed translation batch {batch.batch_id} (user={batch.requested_by_user_id})")
+            return batch.batch_id
+    return None
+
+
+def batch_queue_position(db: Session, batch: TranslationBatch) -> Optional[int]:
+    """
+    1-based position of a PENDING batch among the pending batches, None once claimed
+    """
+    if batch.status != EvaluationStatus.PENDING.value or batch.claimed_by_worker_id:
+        return None
+    return db.query(func.count(TranslationBatch.batch_id)).filter(
+        TranslationBatch.status == EvaluationStatus.PENDING.value,
+        TranslationBatch.claimed_by_worker_id.is_(None),
+        TranslationBatch.batch_id <= batch.batch_id
+    ).scalar()
+
+
+def cancelled_batches(db: Session, *, batch_ids: Iterable[int]) -> Set[int]:
+    batch_ids = list(batch_ids)
+    if not batch_ids:
+        return set()
+    return {
+        row.batch_id for row in db.query(TranslationBatch.batch_id).filter(
+            TranslationBatch.batch_id.in_(batch_ids),
+            TranslationBatch.status == EvaluationStatus.CANCELLED.value
+        )
+    }
+
+
+def renew_batch_leases(db: Session, *, worker_id: str, batch_ids: Iterable[int]) -> None:
+    batch_ids = list(batch_ids)
+    if not batch_ids:
+        return
+    try:
+        db.query(TranslationBatch).filter(
+            TranslationBatch.batch_id.in_(batch_ids),
+            TranslationBatch.claimed_by_worker_id == worker_id
+        ).update(
+            {TranslationBatch.lease_expires_at: datetime.utcnow() + timedelta(seconds=settings.EVALUATION_LEASE_SECONDS)},
+            synchronize_session=False
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error renewing batch leases for worker {worker_id}: {str(e)}")
+        raise
+
+
+def release_batch(db: Session, *, batch_id: int, worker_id: str) -> None:
+    """
+    Drop the lease of a finished batch; one left in a non-terminal status is failed
+    """
+    try:
+        batch = db.query(TranslationBatch).filter(
+            TranslationBatch.batch_id == batch_id,
+            TranslationBatch.claimed_by_worker_id == worker_id
+        ).first()
+        if not batch:
+            return
+        batch.lease_expires_at = None
+        if batch.status not in TERMINAL_STATUSES:
+            logger.error(f"Translation batch {batch_id} finished on worker {worker_id} without a terminal status ({batch.status}), marking FAILED")
+            batch.status = EvaluationStatus.FAILED.value
+            batch.error_message = batch.error_message or "Translation ended without reporting a result"
+            batch.completed_at = datetime.utcnow()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error releasing translation batch {batch_id} from worker {worker_id}: {str(e)}")
+        raise
+
+
+def requeue_expired_batches(db: Session) -> List[int]:
+    """
+    Put batches whose worker stopped renewing its lease back in the queue; they resume after their last final line
+    """
+    now = datetime.utcnow()
+    try:
+        expired = db.query(TranslationBatch.batch_id, TranslationBatch.claimed_by_worker_id).filter(
+            TranslationBatch.lease_expires_at.isnot(None),
+            TranslationBatch.lease_expires_at < now,
+            TranslationBatch.status.notin_(TERMINAL_STATUSES)
+        ).all()
+        requeued = []
+        for batch in expired:
+            updated = db.query(TranslationBatch).filter(
+                TranslationBatch.batch_id == batch.batch_id,
+                TranslationBatch.claimed_by_worker_id == batch.claimed_by_worker_id,
+                TranslationBatch.lease_expires_at < now
+            ).update(
+                {
+                    TranslationBatch.status: EvaluationStatus.PENDING.value,
+                    TranslationBatch.claimed_by_worker_id: None,
+                    TranslationBatch.claimed_at: None,
+                    TranslationBatch.lease_expires_at: None
+                },
+                synchronize_session=False
+            )
+            if updated:
+                requeued.append(batch.batch_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error requeueing expired batch leases: {str(e)}")
+        raise
+    if requeued:
+        logger.warning(f"Requeued {len(requeued)} translation batch(es) with expired leases: {requeued}")
+    return requeued
+
+
+def parse_labels(raw: Optional[str]) -> List[str]:
+    """Decode the JSON labels column of an EvaluationWorker row"""
+    if not raw:
+        return []
+    try:
+        return json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        logger.warning("Failed to parse worker labels JSON")
+        return []
+
+
+def describe_worker(worker: EvaluationWorker) -> dict:
+    """Serializable view of a worker for the system endpoints"""
+    return {
+        "worker_id": worker.worker_id,
+        "hostname": worker.hostname,
+        "pid": worker.pid,
+        "status": worker.status,
+        "capacity": worker.capacity,
+        "active_jobs": worker.active_jobs,
+        "free_slots": max(worker.capacity - worker.active_jobs, 0) if worker.status == "online" else 0,
+        "labels": parse_labels(worker.labels),
+        "started_at": worker.started_at,
+        "last_heartbeat_at": worker.last_heartbeat_at
+    }
@@ -0,0 +1,559 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import distinct, func
+from sqlalchemy.orm import Session, aliased
+
+from app.core import testset_ingest, segment_regressions
+from app.db.database import SessionLocal
+from app.db.models import Testset, TestsetSegmentHash, TestsetSegmentBucket
+
+logger = logging.getLogger(__name__)
+
+# Global segment index over all testset files, for overlap and contamination checks between testsets.
+# Every non-empty normalized segment is stored with its 64-bit hash (testset_ingest.segment_hash) in
+# testset_segment_hashes, so exact overlap and duplicate queries are indexed joins instead of file
+# comparisons. For near-duplicates each segment also gets a MinHash signature over character
+# shingles (character based so it works for unsegmented scripts such as Thai), kept next to the file
+# in index/<file>.minhash.npy; its LSH band buckets go to testset_segment_buckets. Segments sharing a
+# bucket are candidates, confirmed by the share of equal signature values (estimated Jaccard).
+# Uploads and edits are (re)indexed by a single background thread, in submission order, so requests
+# do not wait for the index; older testsets are indexed on first query or by rebuild().
+
+FILE_TYPES = ("source", "target")
+
+NUM_PERMUTATIONS = 64
+BANDS = 8
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_CHARS = 4
+
+# Segments written (or renumbered) per transaction, so other writers are not locked out by a large file
+_WRITE_CHUNK = 5000
+
+# Fixed permutations: signatures are stored and must stay comparable across processes and restarts
+_PRIME = np.uint64(4294967311)
+_random = np.random.RandomState(20261020)
+_PERM_A = _random.randint(1, 2 ** 32, size=NUM_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _random.randint(0, 2 ** 32, size=NUM_PERMUTATIONS, dtype=np.uint64)
+_SHINGLE_MIX = _random.randint(1, 2 ** 63, size=SHINGLE_CHARS, dtype=np.uint64) | np.uint64(1)
+_LOW_32_BITS = np.uint64(0xFFFFFFFF)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_pending: Dict[Tuple[int, str], int] = {}
+# Per file: last submitted task, and the last one a full re-index made redundant
+_submitted: Dict[Tuple[int, str], int] = {}
+_covered: Dict[Tuple[int, str], int] = {}
+_pending_lock = threading.Lock()
+
+
+def _signed(value: int) -> int:
+    # Hashes are unsigned 64-bit, the database stores signed BIGINTs
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _shingles(text: str) -> np.ndarray:
+    """
+    32-bit hashes of the distinct character shingles of a segment (case and whitespace folded)
+    """
+    folded = " ".join(text.lower().split())
+    codes = np.frombuffer(folded.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    if len(codes) < SHINGLE_CHARS:
+        keys = np.array([(codes * _SHINGLE_MIX[:len(codes)]).sum()], dtype=np.uint64)
+    else:
+        count = len(codes) - SHINGLE_CHARS + 1
+        keys = np.zeros(count, dtype=np.uint64)
+        for offset in range(SHINGLE_CHARS):
+            keys += codes[offset:offset + count] * _SHINGLE_MIX[offset]
+    return np.unique((keys ^ (keys >> np.uint64(32))) & _LOW_32_BITS)
+
+
+def minhash(text: str) -> np.ndarray:
+    """
+    MinHash signature (uint32, NUM_PERMUTATIONS) of a segment
+    """
+    shingles = _shingles(text)
+    values = (_PERM_A[:, None] * shingles[None, :] + _PERM_B[:, None]) % _PRIME
+    return values.min(axis=1).astype(np.uint32)
+
+
+def buckets(signature: np.ndarray) -> List[int]:
+    """
+    LSH bucket of each band of a signature
+    """
+    return [
+        _signed(int.from_bytes(hashlib.blake2b(
+            band.to_bytes(2, 'little') + signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes(),
+            digest_size=8
+        ).digest(), 'little'))
+        for band in range(BANDS)
+    ]
+
+
+def similarity(signature: np.ndarray, other: np.ndarray) -> float:
+    """
+    Estimated Jaccard similarity of two segments' shingle sets
+    """
+    return float(np.mean(signature == other))
+
+
+def _normalized_lines(path: str) -> List[str]:
+    # Ingested files are already UTF-8 NFC with '\n'; older uploads are normalized the same way here
+    with open(path, 'rb') as f:
+        data = f.read()
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = data.decode(testset_ingest.FALLBACK_ENCODING)
+    lines = text.split('\n')
+    if lines and lines[-1] == "":
+        lines.pop()
+    return [unicodedata.normalize("NFC", line[:-1] if line.endswith('\r') else line) for line in lines]
+
+
+def _add_segment(testset_id: int, file_type: str, index: int, line: str, segment_hash: Optional[int],
+                 signature: np.ndarray, hash_rows: List[Dict[str, Any]], bucket_rows: List[Dict[str, Any]]) -> None:
+    # Rows of one segment; its signature is written into signature (left all-zero for empty lines)
+    if not line.strip():
+        return
+    signature[:] = minhash(line)
+    if segment_hash is None:
+        segment_hash = testset_ingest.segment_hash(line)
+    hash_rows.append({"testset_id": testset_id, "file_type": file_type, "segment_index": index, "segment_hash": _signed(segment_hash)})
+    bucket_rows.extend(
+        {"testset_id": testset_id, "file_type": file_type, "segment_index": index, "band": band, "bucket": bucket}
+        for band, bucket in enumerate(buckets(signature))
+    )
+
+
+def _insert(db: Session, hash_rows: List[Dict[str, Any]], bucket_rows: List[Dict[str, Any]]) -> None:
+    # Core executemany inserts: no ORM bookkeeping for millions of bucket rows
+    if hash_rows:
+        db.execute(TestsetSegmentHash.__table__.insert(), hash_rows)
+    if bucket_rows:
+        db.execute(TestsetSegmentBucket.__table__.insert(), bucket_rows)
+
+
+def _renumber(db: Session, testset_id: int, file_type: str, first: int, last: int, change) -> None:
+    # Rows with segment_index in [first, last) get change(segment_index), _WRITE_CHUNK lines per transaction
+    for start in range(first, last, _WRITE_CHUNK):
+        end = min(start + _WRITE_CHUNK, last)
+        for model in (TestsetSegmentHash, TestsetSegmentBucket):
+            db.query(model).filter(
+                model.testset_id == testset_id, model.file_type == file_type,
+                model.segment_index >= start, model.segment_index < end
+            ).update({model.segment_index: change(model.segment_index)}, synchronize_session=False)
+        db.commit()
+
+
+def _save_signatures(path: str, signatures: np.ndarray) -> None:
+    signatures_path = testset_ingest.index_paths(path)["minhash"]
+    os.makedirs(os.path.dirname(signatures_path), exist_ok=True)
+    with open(signatures_path + ".tmp", 'wb') as f:
+        np.save(f, signatures)
+    os.replace(signatures_path + ".tmp", signatures_path)
+
+
+def file_path(testset: Testset, file_type: str) -> Optional[str]:
+    return getattr(testset, f"{file_type}_file_path_on_server", None)
+
+
+def index_file(db: Session, testset_id: int, file_type: str, path: Optional[str]) -> int:
+    """
+    (Re)index one testset file; returns the number of segments indexed
+    """
+    started = time.perf_counter()
+    db.query(TestsetSegmentHash).filter(
+        TestsetSegmentHash.testset_id == testset_id, TestsetSegmentHash.file_type == file_type
+    ).delete(synchronize_session=False)
+    db.query(TestsetSegmentBucket).filter(
+        TestsetSegmentBucket.testset_id == testset_id, TestsetSegmentBucket.file_type == file_type
+    ).delete(synchronize_session=False)
+    if not path or not os.path.exists(path):
+        db.commit()
+        return 0
+
+    db.commit()
+
+    lines = _normalized_lines(path)
+    stored_hashes = testset_ingest.load_hashes(path)
+    if stored_hashes is not None and len(stored_hashes) != len(lines):
+        stored_hashes = None
+    signatures = np.zeros((len(lines), NUM_PERMUTATIONS), dtype=np.uint32)
+    indexed = 0
+    for chunk_start in range(0, len(lines), _WRITE_CHUNK):
+        hash_rows: List[Dict[str, Any]] = []
+        bucket_rows: List[Dict[str, Any]] = []
+        for index in range(chunk_start, min(chunk_start + _WRITE_CHUNK, len(lines))):
+            segment_hash = int(stored_hashes[index]) if stored_hashes is not None else None
+            _add_segment(testset_id, file_type, index, lines[index], segment_hash, signatures[index], hash_rows, bucket_rows)
+        _insert(db, hash_rows, bucket_rows)
+        db.commit()
+        indexed += len(hash_rows)
+
+    _save_signatures(path, signatures)
+    logger.info(f"Indexed {indexed} segments of testset {testset_id} {file_type} in {time.perf_counter() - started:.2f}s")
+    return indexed
+
+
+def apply_patch(db: Session, testset_id: int, file_type: str, path: str, blocks: List[Any], old_lines: int) -> None:
+    """
+    Splice a line-range patch (testset_patch.Block list) into the index of a file: rows of kept lines
+    are renumbered, only replaced and inserted lines are hashed. ValueError when the index does not
+    hold the file as it was before the patch.
+    """
+    try:
+        signatures = np.load(testset_ingest.index_paths(path)["minhash"])
+    except (OSError, ValueError):
+        signatures = None
+    if signatures is None or len(signatures) != old_lines or not is_indexed(db, testset_id, file_type):
+        raise ValueError("the index does not match the file before the patch")
+
+    parts = []
+    hash_rows: List[Dict[str, Any]] = []
+    bucket_rows: List[Dict[str, Any]] = []
+    for block in blocks:
+        if block.lines is not None:
+            for model in (TestsetSegmentHash, TestsetSegmentBucket):
+                db.query(model).filter(
+                    model.testset_id == testset_id, model.file_type == file_type,
+                    model.segment_index >= block.old_start, model.segment_index < block.old_end
+                ).delete(synchronize_session=False)
+            db.commit()
+    moved = []
+    for block in blocks:
+        if block.lines is None:
+            shift = block.new_start - block.old_start
+            if shift:
+                # Through negative numbers, so no renumbered row collides with one not yet moved
+                _renumber(db, testset_id, file_type, block.old_start, block.old_end, lambda index, shift=shift: -(index + shift) - 1)
+                moved.append(block)
+            parts.append(signatures[block.old_start:block.old_end])
+            continue
+        added = np.zeros((len(block.lines), NUM_PERMUTATIONS), dtype=np.uint32)
+        for offset, line in enumerate(block.lines):
+            _add_segment(testset_id, file_type, block.new_start + offset, line, None, added[offset], hash_rows, bucket_rows)
+        parts.append(added)
+    for block in moved:
+        new_end = block.new_start + block.old_end - block.old_start
+        _renumber(db, testset_id, file_type, -new_end, -block.new_start, lambda index: -index - 1)
+    _insert(db, hash_rows, bucket_rows)
+    db.commit()
+    _save_signatures(path, np.concatenate(parts) if parts else np.zeros((0, NUM_PERMUTATIONS), dtype=np.uint32))
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _pending_lock:
+        if _executor is None:
+            # One thread: updates of the same file must be applied in order
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="segment-index")
+        return _executor
+
+
+def _reindex(db: Session, testset_id: int, file_type: str, path: str) -> None:
+    # Reads the file as it is now, which already contains every edit queued so far
+    with _pending_lock:
+        _covered[(testset_id, file_type)] = _submitted[(testset_id, file_type)]
+    index_file(db, testset_id, file_type, path)
+
+
+def _run(sequence: int, testset_id: int, file_type: str, path: str, blocks: Optional[List[Any]], old_lines: int) -> None:
+    db = SessionLocal()
+    try:
+        with _pending_lock:
+            covered = sequence <= _covered.get((testset_id, file_type), 0)
+        if covered:
+            return
+        if blocks is None:
+            _reindex(db, testset_id, file_type, path)
+        else:
+            try:
+                apply_patch(db, testset_id, file_type, path, blocks, old_lines)
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"Testset {testset_id}: could not splice a patch into the {file_type} index, re-indexing: {str(e)}")
+                _reindex(db, testset_id, file_type, path)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Testset {testset_id}: indexing {file_type} segments failed: {str(e)}")
+    finally:
+        db.close()
+        with _pending_lock:
+            _pending[(testset_id, file_type)] -= 1
+            if not _pending[(testset_id, file_type)]:
+                del _pending[(testset_id, file_type)]
+
+
+def submit(testset_id: int, file_type: str, path: str, blocks: Optional[List[Any]] = None, old_lines: int = 0) -> None:
+    """
+    Queue a file for (re)indexing, or with blocks a patch of it for apply_patch()
+    """
+    key = (testset_id, file_type)
+    with _pending_lock:
+        _pending[key] = _pending.get(key, 0) + 1
+        _submitted[key] = sequence = _submitted.get(key, 0) + 1
+    _pool().submit(_run, sequence, testset_id, file_type, path, blocks, old_lines)
+
+
+def is_pending(testset_id: int, file_type: str) -> bool:
+    with _pending_lock:
+        return (testset_id, file_type) in _pending
+
+
+def is_indexed(db: Session, testset_id: int, file_type: str) -> bool:
+    return db.query(TestsetSegmentHash.segment_index).filter(
+        TestsetSegmentHash.testset_id == testset_id, TestsetSegmentHash.file_type == file_type
+    ).first() is not None
+
+
+def ensure_indexed(db: Session, testset: Testset, file_type: str) -> None:
+    """
+    Index a file uploaded before the segment index existed
+    """
+    if not is_pending(testset.testset_id, file_type) and not is_indexed(db, testset.testset_id, file_type):
+        index_file(db, testset.testset_id, file_type, file_path(testset, file_type))
+
+
+def rebuild(db: Session) -> Dict[str, Any]:
+    """
+    Re-index every testset file
+    """
+    started = time.perf_counter()
+    report = {"testsets": 0, "files": 0, "segments": 0, "failed": []}
+    for testset in db.query(Testset).order_by(Testset.testset_id).all():
+        report["testsets"] += 1
+        for file_type in FILE_TYPES:
+            try:
+                report["segments"] += index_file(db, testset.testset_id, file_type, file_path(testset, file_type))
+                report["files"] += 1
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"Could not index testset {testset.testset_id} {file_type}: {str(e)}")
+                report["failed"].append({"testset_id": testset.testset_id, "file_type": file_type, "error": str(e)})
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    logger.info(f"Segment index rebuilt: {report['files']} files, {report['segments']} segments in {report['seconds']}s")
+    return report
+
+
+def remove(db: Session, testset_id: int) -> None:
+    """
+    Drop a testset from the index (SQLite does not enforce the cascade); the caller commits
+    """
+    db.query(TestsetSegmentHash).filter(TestsetSegmentHash.testset_id == testset_id).delete(synchronize_session=False)
+    db.query(TestsetSegmentBucket).filter(TestsetSegmentBucket.testset_id == testset_id).delete(synchronize_session=False)
+
+
+def _indexed_counts(db: Session, file_type: str, testset_ids: List[int]) -> Dict[int, int]:
+    return dict(db.query(TestsetSegmentHash.testset_id, func.count()).filter(
+        TestsetSegmentHash.testset_id.in_(testset_ids), TestsetSegmentHash.file_type == file_type
+    ).group_by(TestsetSegmentHash.testset_id).all())
+
+
+def overlaps(db: Session, testset_id: int, file_type: str, other_file_type: str) -> Dict[str, Any]:
+    """
+    Every other testset sharing segments of testset_id's file_type file (in their other_file_type file)
+    """
+    this = aliased(TestsetSegmentHash)
+    other = aliased(TestsetSegmentHash)
+    rows = db.query(
+        other.testset_id,
+        func.count(distinct(this.segment_index)),
+        func.count(distinct(other.segment_index))
+    ).join(other, other.segment_hash == this.segment_hash).filter(
+        this.testset_id == testset_id,
+        this.file_type == file_type,
+        other.file_type == other_file_type,
+        other.testset_id != testset_id
+    ).group_by(other.testset_id).all()
+
+    indexed = _indexed_counts(db, file_type, [testset_id]).get(testset_id, 0)
+    other_indexed = _indexed_counts(db, other_file_type, [row[0] for row in rows]) if rows else {}
+    names = dict(db.query(Testset.testset_id, Testset.testset_name).filter(Testset.testset_id.in_([row[0] for row in rows]))) if rows else {}
+    items = [
+        {
+            "testset_id": other_id,
+            "testset_name": names.get(other_id),
+            "shared_segments": shared,
+            "other_shared_segments": other_shared,
+            "fraction": round(shared / indexed, 4) if indexed else 0.0,
+            "other_fraction": round(other_shared / other_indexed[other_id], 4) if other_indexed.get(other_id) else 0.0
+        }
+        for other_id, shared, other_shared in rows
+    ]
+    items.sort(key=lambda item: (-item["shared_segments"], item["testset_id"]))
+    return {"testset_id": testset_id, "file_type": file_type, "other_file_type": other_file_type, "segments": indexed, "overlaps": items}
+
+
+def pair_overlap(db: Session, testset_id: int, other_testset_id: int, file_type: str, other_file_type: str,
+                 limit: int) -> Dict[str, Any]:
+    """
+    Exact overlap between two testset files, with up to limit matching segment pairs
+    """
+    # Both files are read through the primary key and matched here: with both testsets fixed SQLite
+    # nest-loops over the primary key instead of using the hash index
+    hashes = _file_hashes(db, testset_id, file_type)
+    other_hashes = _file_hashes(db, other_testset_id, other_file_type)
+    same_file = testset_id == other_testset_id and file_type == other_file_type
+    pairs = sorted(
+        (index, other_index)
+        for segment_hash, indices in hashes.items() if segment_hash in other_hashes
+        for index in indices
+        for other_index in other_hashes[segment_hash] if not (same_file and index == other_index)
+    )
+
+    shared = len({index for index, _ in pairs})
+    other_shared = len({other_index for _, other_index in pairs})
+    segments = sum(len(indices) for indices in hashes.values())
+    other_segments = sum(len(indices) for indices in other_hashes.values())
+    return {
+        "testset_id": testset_id,
+        "other_testset_id": other_testset_id,
+        "file_type": file_type,
+        "other_file_type": other_file_type,
+        "segments": segments,
+        "other_segments": other_segments,
+        "shared_segments": shared,
+        "other_shared_segments": other_shared,
+        "fraction": round(shared / segments, 4) if segments else 0.0,
+        "other_fraction": round(other_shared / other_segments, 4) if other_segments else 0.0,
+        "pairs": [{"segment_index": index, "other_segment_index": other_index} for index, other_index in pairs[:limit]]
+    }
+
+
+def _file_hashes(db: Session, testset_id: int, file_type: str) -> Dict[int, List[int]]:
+    hashes: Dict[int, List[int]] = {}
+    for segment_hash, index in db.query(TestsetSegmentHash.segment_hash, TestsetSegmentHash.segment_index).filter(
+        TestsetSegmentHash.testset_id == testset_id, TestsetSegmentHash.file_type == file_type
+    ):
+        hashes.setdefault(segment_hash, []).append(index)
+    return hashes
+
+
+def duplicates(db: Session, testset_id: int, file_type: str) -> List[List[int]]:
+    """
+    Groups of segment indices with identical text within one testset file, in file order
+    """
+    repeated = db.query(TestsetSegmentHash.segment_hash).filter(
+        TestsetSegmentHash.testset_id == testset_id, TestsetSegmentHash.file_type == file_type
+    ).group_by(TestsetSegmentHash.segment_hash).having(func.count() > 1)
+    rows = db.query(TestsetSegmentHash.segment_hash, TestsetSegmentHash.segment_index).filter(
+        TestsetSegmentHash.testset_id == testset_id,
+        TestsetSegmentHash.file_type == file_type,
+        TestsetSegmentHash.segment_hash.in_(repeated)
+    ).order_by(TestsetSegmentHash.segment_index).all()
+    groups: Dict[int, List[int]] = {}
+    for segment_hash, index in rows:
+        groups.setdefault(segment_hash, []).append(index)
+    return sorted(groups.values(), key=lambda group: group[0])
+
+
+def _load_signatures(db: Session, testset_id: int, file_type: str, cache: Dict[Tuple[int, str], Optional[np.ndarray]]) -> Optional[np.ndarray]:
+    key = (testset_id, file_type)
+    if key not in cache:
+        testset = db.query(Testset).filter(Testset.testset_id == testset_id).first()
+        path = file_path(testset, file_type) if testset else None
+        try:
+            cache[key] = np.load(testset_ingest.index_paths(path)["minhash"], mmap_mode='r') if path else None
+        except (OSError, ValueError):
+            cache[key] = None
+    return cache[key]
+
+
+def _band_groups(signatures: np.ndarray) -> List[np.ndarray]:
+    """
+    Indices of the segments sharing each LSH band value (empty segments have all-zero signatures)
+    """
+    indexed = np.nonzero(signatures.any(axis=1))[0]
+    groups = []
+    for band in range(BANDS):
+        rows = np.ascontiguousarray(signatures[indexed, band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+        keys = rows.view(np.dtype((np.void, rows.dtype.itemsize * ROWS_PER_BAND))).ravel()
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        shared = np.nonzero(counts[inverse] > 1)[0]
+        if not len(shared):
+            continue
+        shared = shared[np.argsort(inverse[shared], kind='stable')]
+        boundaries = np.nonzero(np.diff(inverse[shared]))[0] + 1
+        groups.extend(indexed[group] for group in np.split(shared, boundaries))
+    return groups
+
+
+def near_duplicates(db: Session, testset_id: int, file_type: str, threshold: float,
+                    across_testsets: bool = False) -> List[Dict[str, Any]]:
+    """
+    Clusters of near-duplicate segments of a testset file (estimated Jaccard >= threshold): within the
+    file, or with the same file type of every indexed testset when across_testsets
+    """
+    signatures_cache: Dict[Tuple[int, str], Optional[np.ndarray]] = {}
+    signatures = _load_signatures(db, testset_id, file_type, signatures_cache)
+    if signatures is None:
+        return []
+    # Candidates within the file straight from its signatures, in the same bands as the stored buckets
+    candidates = {
+        (int(index), testset_id, int(other_index))
+        for group in _band_groups(signatures)
+        for position, index in enumerate(group)
+        for other_index in group[position + 1:]
+    }
+    if across_testsets:
+        # Candidates in other testsets through the bucket index
+        this = aliased(TestsetSegmentBucket)
+        other = aliased(TestsetSegmentBucket)
+        candidates.update(db.query(this.segment_index, other.testset_id, other.segment_index).join(
+            other, (other.bucket == this.bucket) & (other.file_type == this.file_type)
+        ).filter(
+            this.testset_id == testset_id,
+            this.file_type == file_type,
+            other.testset_id != testset_id
+        ).distinct().all())
+
+    # Confirm candidates on the full signatures and join confirmed pairs into clusters (union-find)
+    parent: Dict[Tuple[int, int], Tuple[int, int]] = {}
+    lowest: Dict[Tuple[int, int], float] = {}
+
+    def find(node: Tuple[int, int]) -> Tuple[int, int]:
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for index, other_id, other_index in sorted(candidates):
+        other_signatures = _load_signatures(db, other_id, file_type, signatures_cache)
+        if other_signatures is None or index >= len(signatures) or other_index >= len(other_signatures):
+            continue
+        score = similarity(signatures[index], other_signatures[other_index])
+        if score < threshold:
+            continue
+        a, b = find((testset_id, index)), find((other_id, other_index))
+        root = min(a, b)
+        parent[a] = parent[b] = root
+        lowest[root] = min(score, lowest.get(a, 1.0), lowest.get(b, 1.0))
+
+    clusters: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+    for node in parent:
+        clusters.setdefault(find(node), []).append(node)
+    result = [
+        {
+            "size": len(members),
+            "min_similarity": round(lowest.get(root, 1.0), 4),
+            "segments": [{"testset_id": member_id, "segment_index": index} for member_id, index in sorted(members)]
+        }
+        for root, members in clusters.items() if len(members) > 1
+    ]
+    result.sort(key=lambda cluster: (-cluster["size"], cluster["segments"][0]["testset_id"], cluster["segments"][0]["segment_index"]))
+    return result
+
+
+def segment_texts(path: Optional[str], indices: List[int]) -> Dict[int, str]:
+    """
+    Testset lines at the given indices: seeked through the ingest line index, scanned for older testsets
+    """
+    return testset_ingest.read_segments(path, indices) or segment_regressions.segment_lines(path, indices)
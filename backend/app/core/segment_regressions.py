@@ -0,0 +1,194 @@
+import json
+import time
+import logging
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core import segment_store, output_files
+from app.db.models import EvaluationJob, ModelVersion, SegmentRegression
+from app.schemas.evaluation import EvaluationStatus
+
+logger = logging.getLogger(__name__)
+
+# Segment-level regression detection: after a job completes, its output is aligned line by line with
+# the output of the previous model version of the same language pair on the same testset (same engine
+# mode). Per-segment scores come from both jobs' segment stores (sentence chrF from the stored n-gram
+# counts, COMET when both have per-segment scores), so no text is re-read or re-scored. The largest
+# regressions and improvements are kept in the segment_regressions table, a summary on the job.
+
+REGRESSION = "regression"
+IMPROVEMENT = "improvement"
+
+# Per-segment changes smaller than this count as unchanged
+_UNCHANGED_EPSILON = 1e-6
+
+
+def _version_order_key(version: ModelVersion):
+    # Released versions in release order, then unreleased ones in creation order
+    return (version.release_date is None, version.release_date or date.min, version.version_id)
+
+
+def _compared_output(job: EvaluationJob) -> bool:
+    # Finetuned outputs of full runs; base-only and sampled jobs have nothing to compare line by line
+    return job.evaluation_model_type != "base" and not job.sample_size and bool(job.output_file_path)
+
+
+def previous_job(db: Session, job: EvaluationJob) -> Optional[EvaluationJob]:
+    """
+    Latest completed full run of the closest earlier version of the same language pair on the job's
+    testset and engine mode, None if no earlier version ran it
+    """
+    version = db.query(ModelVersion).filter(ModelVersion.version_id == job.version_id).first()
+    if not version:
+        return None
+    versions = sorted(db.query(ModelVersion).filter(ModelVersion.lang_pair_id == version.lang_pair_id).all(), key=_version_order_key)
+    earlier = [v.version_id for v in versions[:[v.version_id for v in versions].index(version.version_id)]]
+
+    for version_id in reversed(earlier):
+        candidates = db.query(EvaluationJob).filter(
+            EvaluationJob.version_id == version_id,
+            EvaluationJob.testset_id == job.testset_id,
+            EvaluationJob.status == EvaluationStatus.COMPLETED.value,
+            EvaluationJob.mode_type.is_not_distinct_from(job.mode_type),
+            EvaluationJob.sub_mode_type.is_not_distinct_from(job.sub_mode_type)
+        ).order_by(EvaluationJob.completed_at.desc()).all()
+        for candidate in candidates:
+            if _compared_output(candidate):
+                return candidate
+    return None
+
+
+def _ranked_rows(job_id: int, previous_job_id: int, kind: str, order: np.ndarray, metric: str, delta: np.ndarray,
+                 chrf: np.ndarray, previous_chrf: np.ndarray, comet: Optional[np.ndarray],
+                 previous_comet: Optional[np.ndarray]) -> List[SegmentRegression]:
+    return [
+        SegmentRegression(
+            job_id=job_id,
+            previous_job_id=previous_job_id,
+            kind=kind,
+            rank=rank,
+            segment_index=int(index),
+            metric=metric,
+            delta=round(float(delta[index]), 4),
+            chrf=round(float(chrf[index]), 2),
+            previous_chrf=round(float(previous_chrf[index]), 2),
+            comet=round(float(comet[index]), 4) if comet is not None else None,
+            previous_comet=round(float(previous_comet[index]), 4) if previous_comet is not None else None
+        )
+        for rank, index in enumerate(order, start=1)
+    ]
+
+
+def analyze(db: Session, job: EvaluationJob) -> Optional[Dict[str, Any]]:
+    """
+    Compare a completed job with the previous version's run and store its ranked segment changes;
+    returns the summary, None when there is nothing to compare with
+    """
+    if not _compared_output(job):
+        return None
+    previous = previous_job(db, job)
+    if previous is None:
+        return None
+    current_store = segment_store.load(job.output_file_path)
+    previous_store = segment_store.load(previous.output_file_path)
+    if current_store is None or previous_store is None:
+        logger.info(f"Job {job.job_id}: no segment stores to compare with job {previous.job_id}")
+        return None
+    if current_store.segments != previous_store.segments or not np.array_equal(current_store.bleu[:, 1], previous_store.bleu[:, 1]):
+        logger.info(f"Job {job.job_id}: testset changed since job {previous.job_id}, not comparing segments")
+        return None
+
+    started = time.perf_counter()
+    chrf = segment_store.chrf_scores(current_store.chrf)
+    previous_chrf = segment_store.chrf_scores(previous_store.chrf)
+    comet = previous_comet = None
+    if current_store.comet is not None and previous_store.comet is not None:
+        comet = np.asarray(current_store.comet, dtype=np.float64)
+        previous_comet = np.asarray(previous_store.comet, dtype=np.float64)
+        metric, delta = "comet", comet - previous_comet
+    else:
+        metric, delta = "chrf", chrf - previous_chrf
+
+    top = max(settings.EVALUATION_SEGMENT_REGRESSIONS_TOP, 0)
+    # Stable sorts so ties keep testset order
+    regressed = np.flatnonzero(delta < -_UNCHANGED_EPSILON)
+    improved = np.flatnonzero(delta > _UNCHANGED_EPSILON)
+    regressions = regressed[np.argsort(delta[regressed], kind="stable")][:top]
+    improvements = improved[np.argsort(-delta[improved], kind="stable")][:top]
+
+    current_metrics = segment_store.corpus_metrics(current_store)
+    previous_metrics = segment_store.corpus_metrics(previous_store)
+    summary = {
+        "previous_job_id": previous.job_id,
+        "previous_version_id": previous.version_id,
+        "metric": metric,
+        "segments": current_store.segments,
+        "regressed": int(len(regressed)),
+        "improved": int(len(improved)),
+        "unchanged": int(current_store.segments - len(regressed) - len(improved)),
+        "mean_delta": round(float(delta.mean()), 4),
+        "bleu_delta": round(current_metrics["bleu_score"] - previous_metrics["bleu_score"], 2),
+        "chrf_delta": round(current_metrics["chrf_score"] - previous_metrics["chrf_score"], 2),
+        "stored_per_direction": top
+    }
+
+    db.query(SegmentRegression).filter(SegmentRegression.job_id == job.job_id).delete(synchronize_session=False)
+    db.add_all(
+        _ranked_rows(job.job_id, previous.job_id, REGRESSION, regressions, metric, delta, chrf, previous_chrf, comet, previous_comet)
+        + _ranked_rows(job.job_id, previous.job_id, IMPROVEMENT, improvements, metric, delta, chrf, previous_chrf, comet, previous_comet)
+    )
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    job.segment_regression_summary = json.dumps(summary)
+    db.commit()
+    logger.info(
+        f"Job {job.job_id}: {summary['regressed']} segments regressed and {summary['improved']} improved ({metric}) "
+        f"since job {previous.job_id} of version {previous.version_id}, in {summary['seconds']}s"
+    )
+    return summary
+
+
+def analyze_completed_jobs(db: Session, job_ids: Iterable[int]) -> int:
+    """
+    Run the segment comparison for the completed ones of job_ids; returns how many were compared.
+    Failures are logged and only cost the comparison.
+    """
+    if not settings.EVALUATION_SEGMENT_REGRESSIONS_ENABLED:
+        return 0
+    compared = 0
+    for job in db.query(EvaluationJob).filter(
+        EvaluationJob.job_id.in_(list(job_ids)),
+        EvaluationJob.status == EvaluationStatus.COMPLETED.value,
+        EvaluationJob.coalesced_into_job_id.is_(None)
+    ).all():
+        try:
+            if analyze(db, job):
+                compared += 1
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Job {job.job_id}: segment regression analysis failed: {str(e)}")
+    return compared
+
+
+def segment_lines(path: Optional[str], indices: Iterable[int]) -> Dict[int, str]:
+    """
+    Lines of a text file at the given 0-based indices, in one pass over the file
+    """
+    wanted = set(indices)
+    lines: Dict[int, str] = {}
+    if not path or not wanted:
+        return lines
+    last = max(wanted)
+    try:
+        with output_files.open_text(path) as f:
+            for index, line in enumerate(f):
+                if index in wanted:
+                    lines[index] = line.rstrip('\n')
+                if index >= last:
+                    break
+    except OSError as e:
+        logger.warning(f"Could not read segments of {path}: {str(e)}")
+    return lines
@@ -0,0 +1,347 @@
+import os
+import json
+import shutil
+import logging
+from array import array
+from collections import Counter
+from functools import lru_cache
+from itertools import zip_longest
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core import output_files, sampling
+from app.core.sampling import BLEU_MAX_ORDER, bleu_segment_statistics, bleu_from_statistics
+
+logger = logging.getLogger(__name__)
+
+# Columnar per-segment metric store. Every scored output gets a directory next to it
+# (<output>_segments/) with one .npy column per statistic, memory-mapped on load:
+#   bleu.npy     int32 (n, 10)  hyp_len, ref_len, correct_1..4, total_1..4 (sacrebleu 13a tokenization)
+#   chrf.npy     int32 (n, 18)  chrF character n-gram hyp/ref/match counts, orders 1..6
+#   comet.npy    float32 (n,)   per-segment COMET, only when COMET produced one score per segment
+#   lengths.npy  int32 (n, 3)   whitespace token counts of source, hypothesis and reference
+# Corpus BLEU/chrF/COMET of any subset of segments are sums over rows, so drill-downs, subset scores,
+# significance tests and regression analysis never re-read or re-tokenize the text files.
+# Scoring stages the store (<output>_segments.pending/: the BLEU statistics the corpus BLEU was summed
+# from, per-segment COMET and the reference/source paths) and the worker builds it after the job's
+# results are saved (evaluation.build_segment_stores), streaming the files line by line.
+
+SEGMENT_STORE_SUFFIX = "_segments"
+STORE_META_FILE = "meta.json"
+STORE_FORMAT_VERSION = 1
+PENDING_SUFFIX = ".pending"
+PENDING_MANIFEST_FILE = "pending.json"
+
+CHRF_CHAR_ORDER = 6
+BLEU_COLUMNS = 2 + 2 * BLEU_MAX_ORDER
+CHRF_COLUMNS = 3 * CHRF_CHAR_ORDER
+
+LENGTH_COLUMNS = ["source", "hypothesis", "reference"]
+
+
+class SegmentStore(NamedTuple):
+    path: str
+    segments: int
+    bleu: np.ndarray
+    chrf: np.ndarray
+    lengths: np.ndarray
+    comet: Optional[np.ndarray]
+
+
+def store_path(output_file: str) -> str:
+    return os.path.splitext(output_file)[0] + SEGMENT_STORE_SUFFIX
+
+
+def pending_path(output_file: str) -> str:
+    return store_path(output_file) + PENDING_SUFFIX
+
+
+def _aligned_lines(output_file: str, reference_file: str) -> Iterator[Tuple[Optional[str], Optional[str]]]:
+    """
+    Output and reference lines side by side, one pair in memory at a time; the shorter file yields None
+    once it runs out
+    """
+    # Outputs may have been compressed by the retention service since they were written
+    with output_files.open_text(output_file) as hypotheses, output_files.open_text(reference_file) as references:
+        for hypothesis, reference in zip_longest(hypotheses, references):
+            yield (None if hypothesis is None else hypothesis.rstrip('\n'),
+                   None if reference is None else reference.rstrip('\n'))
+
+
+def _as_rows(values: array, columns: int) -> np.ndarray:
+    return np.frombuffer(values, dtype=np.int32).reshape(-1, columns) if values else np.zeros((0, columns), dtype=np.int32)
+
+
+def bleu_file_statistics(output_file: str, reference_file: str) -> Optional[np.ndarray]:
+    """
+    Per-segment BLEU statistics of output_file against reference_file in one streaming pass, None if the
+    files do not line up
+    """
+    stats = array('i')
+    for hypothesis, reference in _aligned_lines(output_file, reference_file):
+        if hypothesis is None or reference is None:
+            return None
+        stats.extend(bleu_segment_statistics(hypothesis, reference))
+    return _as_rows(stats, BLEU_COLUMNS) if stats else None
+
+
+def _char_ngram_counts(text: str, order: int) -> Counter:
+    return Counter(text[start:start + order] for start in range(len(text) - order + 1))
+
+
+def chrf_segment_statistics(hypothesis: str, reference: str) -> List[int]:
+    """
+    chrF sufficient statistics of one segment with sacrebleu's defaults (character n-grams up to order 6
+    with whitespace removed, no word n-grams): [hyp, ref, match] counts per n-gram order
+    """
+    hypothesis = "".join(hypothesis.split())
+    reference = "".join(reference.split())
+    stats: List[int] = []
+    for order in range(1, CHRF_CHAR_ORDER + 1):
+        hyp_counts = _char_ngram_counts(hypothesis, order)
+        ref_counts = _char_ngram_counts(reference, order)
+        match = 0
+        for ngram, count in hyp_counts.items():
+            if ngram in ref_counts:
+                match += min(count, ref_counts[ngram])
+        hyp_total = max(len(hypothesis) - order + 1, 0)
+        ref_total = max(len(reference) - order + 1, 0)
+        # sacrebleu does not count hypothesis n-grams of an order the reference is too short for
+        stats.extend([hyp_total if ref_total else 0, ref_total, match])
+    return stats
+
+
+def chrf_scores(stats: np.ndarray, beta: int = 2) -> np.ndarray:
+    """
+    chrF of every row of statistics (shape (n, 3 * orders)), vectorized equivalent of sacrebleu's
+    default chrF (effective order averaging of n-gram precision and recall); sentence chrF per segment
+    """
+    counts = np.asarray(stats, dtype=np.float64).reshape(len(stats), -1, 3)
+    hyp, ref, match = counts[:, :, 0], counts[:, :, 1], counts[:, :, 2]
+    effective = (hyp > 0) & (ref > 0)
+    orders = effective.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(effective, match / np.where(hyp > 0, hyp, 1.0), 0.0).sum(axis=1) / np.maximum(orders, 1)
+        recall = np.where(effective, match / np.where(ref > 0, ref, 1.0), 0.0).sum(axis=1) / np.maximum(orders, 1)
+        factor = beta ** 2
+        denominator = factor * precision + recall
+        scores = np.where(denominator > 0, (1 + factor) * precision * recall / np.where(denominator > 0, denominator, 1.0), 0.0)
+    return 100.0 * scores
+
+
+def chrf_from_statistics(summed: np.ndarray) -> float:
+    """
+    Corpus chrF of summed statistics
+    """
+    return float(chrf_scores(np.asarray(summed)[None, :])[0])
+
+
+@lru_cache(maxsize=1)
+def check_chrf_statistics() -> bool:
+    """
+    Whether chrF from chrf_segment_statistics() reproduces sacrebleu.corpus_chrf on a fixed sample; checked
+    once per process, like sampling.check_bleu_statistics()
+    """
+    import sacrebleu
+    hypotheses, references = list(sampling.CHECK_HYPOTHESES), list(sampling.CHECK_REFERENCES)
+    ours = chrf_from_statistics(np.asarray([chrf_segment_statistics(h, r) for h, r in zip(hypotheses, references)]).sum(axis=0))
+    expected = float(sacrebleu.corpus_chrf(hypotheses, [references]).score)
+    if abs(ours - expected) > 1e-6:
+        logger.error(f"chrF from segment statistics ({ours}) does not match sacrebleu {sacrebleu.__version__} ({expected})")
+        return False
+    return True
+
+
+def stage_column(output_file: str, name: str, values: np.ndarray) -> None:
+    """
+    Keep a column computed while scoring output_file for its segment store, built later by build_pending()
+    """
+    path = pending_path(output_file)
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, f"{name}.npy"), values)
+
+
+def stage(output_file: str, reference_file: str, comet_segment_scores: Optional[Sequence[float]] = None,
+          source_file: Optional[str] = None) -> str:
+    """
+    Record what the segment store of output_file is built from; the store itself is built by
+    build_pending() once the job's results are saved. Returns the pending directory.
+    """
+    if comet_segment_scores:
+        stage_column(output_file, "comet", np.asarray(comet_segment_scores, dtype=np.float32))
+    path = pending_path(output_file)
+    os.makedirs(path, exist_ok=True)
+    # The manifest goes last: a pending directory without one is incomplete
+    with open(os.path.join(path, PENDING_MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump({"reference_file": reference_file, "source_file": source_file}, f)
+    return path
+
+
+def _load_pending(path: str, name: str) -> Optional[np.ndarray]:
+    try:
+        return np.load(os.path.join(path, f"{name}.npy"))
+    except (OSError, ValueError):
+        return None
+
+
+def _source_lengths(source_file: Optional[str], segments: int) -> np.ndarray:
+    lengths = array('i')
+    if source_file and os.path.exists(source_file):
+        with open(source_file, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                lengths.append(len(line.split()))
+                if len(lengths) > segments:
+                    break
+    if len(lengths) != segments:
+        return np.zeros(segments, dtype=np.int32)
+    return np.frombuffer(lengths, dtype=np.int32)
+
+
+def _build(output_file: str, reference_file: str, source_file: Optional[str] = None,
+           staged: Optional[str] = None) -> Optional[str]:
+    if not check_chrf_statistics():
+        raise RuntimeError("chrF segment statistics do not reproduce sacrebleu's chrF")
+    staged_bleu = _load_pending(staged, "bleu") if staged else None
+    staged_comet = _load_pending(staged, "comet") if staged else None
+
+    # One pass over output and reference; BLEU is only counted when scoring did not stage it
+    count_bleu = staged_bleu is None
+    if count_bleu:
+        sampling.check_bleu_statistics()
+    bleu = array('i')
+    chrf = array('i')
+    lengths = array('i')
+    segments = 0
+    for hypothesis, reference in _aligned_lines(output_file, reference_file):
+        if hypothesis is None or reference is None:
+            logger.warning(f"Not storing segment statistics of {output_file}: its lines do not line up with {reference_file}")
+            return None
+        segments += 1
+        if count_bleu:
+            bleu.extend(bleu_segment_statistics(hypothesis, reference))
+        chrf.extend(chrf_segment_statistics(hypothesis, reference))
+        lengths.extend((len(hypothesis.split()), len(reference.split())))
+    if not segments:
+        logger.warning(f"Not storing segment statistics of {output_file}: no output lines")
+        return None
+    if staged_bleu is not None and len(staged_bleu) != segments:
+        logger.warning(f"Staged BLEU statistics of {output_file} have {len(staged_bleu)} rows for {segments} segments; recounting")
+        return _build(output_file, reference_file, source_file)
+
+    columns = {
+        "bleu": _as_rows(bleu, BLEU_COLUMNS) if count_bleu else staged_bleu.astype(np.int32),
+        "chrf": _as_rows(chrf, CHRF_COLUMNS),
+        "lengths": np.column_stack([_source_lengths(source_file, segments), _as_rows(lengths, 2)]).astype(np.int32)
+    }
+    if staged_comet is not None and len(staged_comet) == segments:
+        columns["comet"] = staged_comet.astype(np.float32)
+
+    # Written to a scratch directory and swapped in, so readers never see a half-written store
+    path = store_path(output_file)
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, values in columns.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), values)
+    with open(os.path.join(tmp_path, STORE_META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({
+            "version": STORE_FORMAT_VERSION,
+            "segments": segments,
+            "columns": sorted(columns),
+            "length_columns": LENGTH_COLUMNS
+        }, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def save(output_file: str, reference_file: str, comet_segment_scores: Optional[Sequence[float]] = None,
+         source_file: Optional[str] = None) -> Optional[str]:
+    """
+    Build the segment store of output_file scored against reference_file right away; returns its
+    directory, None if output and reference do not line up. COMET scores are kept only when there is one
+    per segment.
+    """
+    stage(output_file, reference_file, comet_segment_scores, source_file)
+    return build_pending(output_file)
+
+
+def build_pending(output_file: str) -> Optional[str]:
+    """
+    Build the segment store staged for output_file, streaming output, reference and source line by line;
+    columns staged while scoring (BLEU, COMET) are taken over rather than recomputed. Returns the store's
+    directory, None if nothing was staged or output and reference do not line up.
+    """
+    staged = pending_path(output_file)
+    try:
+        with open(os.path.join(staged, PENDING_MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    try:
+        return _build(output_file, manifest["reference_file"], manifest.get("source_file"), staged)
+    finally:
+        shutil.rmtree(staged, ignore_errors=True)
+
+
+def load(output_file: Optional[str]) -> Optional[SegmentStore]:
+    """
+    Memory-mapped segment store of output_file, None if it was never built or is unreadable
+    """
+    if not output_file:
+        return None
+    path = store_path(output_file)
+    try:
+        with open(os.path.join(path, STORE_META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("version") != STORE_FORMAT_VERSION:
+            return None
+        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in meta["columns"]}
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Could not read segment store {path}: {str(e)}")
+        return None
+
+    segments = meta["segments"]
+    if any(len(values) != segments for values in columns.values()):
+        logger.warning(f"Segment store {path} has columns of different lengths; ignoring it")
+        return None
+    return SegmentStore(
+        path=path,
+        segments=segments,
+        bleu=columns["bleu"],
+        chrf=columns["chrf"],
+        lengths=columns["lengths"],
+        comet=columns.get("comet")
+    )
+
+
+def subset_indices(store: SegmentStore, indices: Optional[Sequence[int]] = None) -> np.ndarray:
+    """
+    Sorted unique segment indices (all segments without `indices`); ValueError for indices out of range
+    """
+    if indices is None:
+        return np.arange(store.segments)
+    selected = np.unique(np.asarray(indices, dtype=np.int64))
+    if len(selected) and (selected[0] < 0 or selected[-1] >= store.segments):
+        raise ValueError(f"Segment indices must be between 0 and {store.segments - 1}")
+    return selected
+
+
+def corpus_metrics(store: SegmentStore, indices: Optional[Sequence[int]] = None) -> Dict[str, Any]:
+    """
+    Corpus BLEU, chrF and COMET (None without per-segment COMET) over the given segments
+    """
+    selected = subset_indices(store, indices)
+    if not len(selected):
+        return {"segments": 0, "bleu_score": None, "chrf_score": None, "comet_score": None, "tokens": dict.fromkeys(LENGTH_COLUMNS, 0)}
+    lengths = np.asarray(store.lengths[selected]).sum(axis=0)
+    return {
+        "segments": int(len(selected)),
+        "bleu_score": round(float(bleu_from_statistics(np.asarray(store.bleu[selected]).sum(axis=0))[0]), 2),
+        "chrf_score": round(chrf_from_statistics(np.asarray(store.chrf[selected]).sum(axis=0)), 2),
+        "comet_score": round(float(np.asarray(store.comet[selected], dtype=np.float64).mean()), 4) if store.comet is not None else None,
+        "tokens": {column: int(count) for column, count in zip(LENGTH_COLUMNS, lengths)}
+    }
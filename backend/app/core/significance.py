@@ -0,0 +1,140 @@
+import json
+import logging
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.sampling import bleu_from_statistics, resample_weights
+from app.core.segment_store import SegmentStore, load
+
+logger = logging.getLogger(__name__)
+
+# Significance of score differences between two outputs of the same testset (base vs finetuned, or two
+# versions). They work on the per-segment BLEU sufficient statistics and COMET scores of the segment
+# store built next to each output once its job completes (app/core/segment_store.py): paired bootstrap
+# resampling and approximate randomization only sum those arrays with NumPy, so thousands of resamples
+# take milliseconds and no output is rescored.
+
+# Randomization trials are drawn in blocks of at most this many (trial x segment) swap flags
+_RANDOMIZATION_BLOCK_CELLS = 4_000_000
+
+
+def _bleu_score(summed: np.ndarray, segments: int) -> np.ndarray:
+    return bleu_from_statistics(summed)
+
+
+def _mean_score(summed: np.ndarray, segments: int) -> np.ndarray:
+    return np.atleast_1d(summed) / segments
+
+
+def _randomization_swaps(segments: int, trials: int, seed: int) -> Iterator[np.ndarray]:
+    """
+    Blocks of random 0/1 flags (shape (block, segments)); 1 swaps the two systems' outputs of a segment
+    """
+    rng = np.random.default_rng(seed)
+    block = max(1, min(trials, _RANDOMIZATION_BLOCK_CELLS // max(segments, 1)))
+    for start in range(0, trials, block):
+        yield rng.integers(0, 2, size=(min(block, trials - start), segments), dtype=np.uint8).astype(np.float64)
+
+
+def paired_bootstrap(baseline: np.ndarray, system: np.ndarray, score: Callable[[np.ndarray, int], np.ndarray], *,
+                     resamples: int, confidence: float, seed: int) -> Dict[str, Any]:
+    """
+    Paired bootstrap over segments: both systems are scored on the same resamples. The two-sided p-value
+    compares the observed difference with the bootstrap distribution of the difference centred on zero
+    (the null hypothesis); the interval is the percentile interval of the difference.
+    """
+    segments = len(baseline)
+    observed = float(score(system.sum(axis=0), segments)[0] - score(baseline.sum(axis=0), segments)[0])
+    deltas = np.concatenate([
+        score(weights @ system, segments) - score(weights @ baseline, segments)
+        for weights in resample_weights(segments, resamples, seed)
+    ])
+    alpha = 1.0 - confidence
+    low, high = np.percentile(deltas, [100.0 * alpha / 2, 100.0 * (1 - alpha / 2)])
+    exceed = int(np.count_nonzero(np.abs(deltas - deltas.mean()) >= abs(observed)))
+    return {
+        "delta": observed,
+        "ci": [float(low), float(high)],
+        "p_value": (exceed + 1) / (resamples + 1)
+    }
+
+
+def approximate_randomization(baseline: np.ndarray, system: np.ndarray, score: Callable[[np.ndarray, int], np.ndarray], *,
+                              trials: int, seed: int) -> float:
+    """
+    Two-sided approximate randomization p-value: how often randomly swapping the systems' segment
+    outputs gives a score difference at least as large as the observed one
+    """
+    segments = len(baseline)
+    baseline_sum, system_sum = baseline.sum(axis=0), system.sum(axis=0)
+    observed = abs(float(score(system_sum, segments)[0] - score(baseline_sum, segments)[0]))
+    difference = system - baseline
+    at_least = 0
+    for swaps in _randomization_swaps(segments, trials, seed):
+        moved = swaps @ difference
+        deltas = score(system_sum - moved, segments) - score(baseline_sum + moved, segments)
+        at_least += int(np.count_nonzero(np.abs(deltas) >= observed - 1e-9))
+    return (at_least + 1) / (trials + 1)
+
+
+def compare(baseline: SegmentStore, system: SegmentStore, *, seed: int = 0) -> Optional[Dict[str, Any]]:
+    """
+    Significance of system vs baseline per metric, from their segment stores; None if the two were
+    not scored on the same segments
+    """
+    if baseline.segments != system.segments or not baseline.segments:
+        logger.warning(f"Cannot compare outputs of {baseline.segments} and {system.segments} segments")
+        return None
+    if not np.array_equal(baseline.bleu[:, 1], system.bleu[:, 1]):
+        logger.warning("Cannot compare outputs scored against different references")
+        return None
+
+    resamples = settings.EVALUATION_BOOTSTRAP_RESAMPLES
+    trials = settings.EVALUATION_RANDOMIZATION_TRIALS
+    confidence = settings.EVALUATION_CONFIDENCE_LEVEL
+    result: Dict[str, Any] = {
+        "segments": baseline.segments,
+        "resamples": resamples,
+        "randomization_trials": trials,
+        "confidence_level": confidence,
+        "bleu": None,
+        "comet": None
+    }
+    metrics = [("bleu", np.asarray(baseline.bleu, dtype=np.float64), np.asarray(system.bleu, dtype=np.float64), _bleu_score, 2)]
+    if baseline.comet is not None and system.comet is not None:
+        metrics.append(("comet", np.asarray(baseline.comet, dtype=np.float64), np.asarray(system.comet, dtype=np.float64), _mean_score, 4))
+
+    for metric, baseline_stats, system_stats, score, decimals in metrics:
+        bootstrap = paired_bootstrap(baseline_stats, system_stats, score, resamples=resamples, confidence=confidence, seed=seed)
+        p_value_randomization = approximate_randomization(baseline_stats, system_stats, score, trials=trials, seed=seed)
+        result[metric] = {
+            "delta": round(bootstrap["delta"], decimals),
+            "ci": [round(value, decimals) for value in bootstrap["ci"]],
+            "p_value": round(bootstrap["p_value"], 4),
+            "p_value_randomization": round(p_value_randomization, 4),
+            "significant": bool(bootstrap["p_value"] < 1.0 - confidence and p_value_randomization < 1.0 - confidence)
+        }
+    return result
+
+
+def compare_outputs(baseline_output: Optional[str], system_output: Optional[str], *, seed: int = 0) -> Optional[Dict[str, Any]]:
+    """
+    compare() for two scored output files, None if either has no segment store
+    """
+    baseline = load(baseline_output)
+    system = load(system_output)
+    if baseline is None or system is None:
+        return None
+    return compare(baseline, system, seed=seed)
+
+
+def compare_json(baseline_output: Optional[str], system_output: Optional[str], *, seed: int = 0) -> Optional[str]:
+    """compare_outputs() serialized for a significance column; never raises"""
+    try:
+        result = compare_outputs(baseline_output, system_output, seed=seed)
+    except Exception as e:
+        logger.warning(f"Significance test of {system_output} vs {baseline_output} failed: {str(e)}")
+        return None
+    return json.dumps(result) if result else None
@@ -0,0 +1,276 @@
+import os
+import json
+import codecs
+import hashlib
+import logging
+import unicodedata
+from array import array
+from typing import Any, BinaryIO, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Testset ingest: uploaded testset files are streamed once, decoded (UTF-8, UTF-8/16 with BOM,
+# latin-1 as the legacy fallback), normalized to UTF-8 NFC with '\n' line endings and written to
+# their final path. The same pass collects line/char/token statistics, a 64-bit hash of every
+# segment and the byte offset of every line. Statistics are stored on the Testset row
+# (segments, ingest_stats); offsets and hashes go next to the file in index/<file_type>.offsets.npy
+# and index/<file_type>.hashes.npy, so readers can seek to any segment without rescanning.
+
+INGEST_FORMAT_VERSION = 1
+INDEX_DIR = "index"
+FALLBACK_ENCODING = "latin-1"
+
+_CHUNK_SIZE = 1024 * 1024
+_BOMS = [(codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16")]
+
+
+class IngestError(ValueError):
+    """An uploaded testset file that can not be used"""
+
+
+class IngestedFile(NamedTuple):
+    path: str
+    stats: Dict[str, Any]
+    offsets: np.ndarray  # uint64 (lines + 1,): byte offset of each line start, then the file size
+    hashes: np.ndarray  # uint64 (lines,): segment_hash of each line
+
+
+def segment_hash(text: str) -> int:
+    """
+    64-bit hash of a normalized segment (without its line ending)
+    """
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _detect_encoding(head: bytes) -> str:
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    return "utf-8"
+
+
+def _normalize_stream(stream: BinaryIO, out: BinaryIO, encoding: str) -> Dict[str, Any]:
+    """
+    Decode stream with encoding (strict), write normalized lines to out; returns the statistics and
+    the index arrays under "_offsets" / "_hashes"
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='strict')
+    offsets = array('Q')
+    hashes = array('Q')
+    digest = hashlib.sha1()
+    stats = {"lines": 0, "empty_lines": 0, "chars": 0, "tokens": 0, "max_chars": 0, "max_tokens": 0,
+             "crlf_lines": 0, "nfc_changed_lines": 0}
+    position = 0
+    pending = ""
+
+    def write_line(line: str) -> None:
+        nonlocal position
+        if line.endswith('\r'):
+            line = line[:-1]
+            stats["crlf_lines"] += 1
+        normalized = unicodedata.normalize("NFC", line)
+        if normalized != line:
+            stats["nfc_changed_lines"] += 1
+        data = normalized.encode('utf-8') + b'\n'
+        offsets.append(position)
+        hashes.append(segment_hash(normalized))
+        out.write(data)
+        digest.update(data)
+        position += len(data)
+        tokens = len(normalized.split())
+        stats["lines"] += 1
+        stats["chars"] += len(normalized)
+        stats["tokens"] += tokens
+        stats["max_chars"] = max(stats["max_chars"], len(normalized))
+        stats["max_tokens"] = max(stats["max_tokens"], tokens)
+        if not normalized.strip():
+            stats["empty_lines"] += 1
+
+    for block in iter(lambda: stream.read(_CHUNK_SIZE), b''):
+        pending += decoder.decode(block)
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            write_line(line)
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        # Last line without a line ending
+        write_line(pending)
+
+    offsets.append(position)
+    stats["bytes"] = position
+    stats["sha1"] = digest.hexdigest()
+    stats["_offsets"] = offsets
+    stats["_hashes"] = hashes
+    return stats
+
+
+def index_paths(path: str) -> Dict[str, str]:
+    """
+    Sidecar index files of an ingested testset file
+    """
+    directory = os.path.join(os.path.dirname(path), INDEX_DIR)
+    name = os.path.basename(path)
+    return {
+        "offsets": os.path.join(directory, f"{name}.offsets.npy"),
+        "hashes": os.path.join(directory, f"{name}.hashes.npy"),
+        # MinHash signatures, written by app/core/segment_index.py
+        "minhash": os.path.join(directory, f"{name}.minhash.npy")
+    }
+
+
+def ingest(stream: BinaryIO, path: str) -> IngestedFile:
+    """
+    Normalize an uploaded file into path (written to path.tmp until commit()); IngestError if it
+    can not be decoded or is empty
+    """
+    tmp_path = path + ".tmp"
+    head = stream.read(4)
+    encoding = _detect_encoding(head)
+    stream.seek(0)
+    try:
+        with open(tmp_path, 'wb') as out:
+            stats = _normalize_stream(stream, out, encoding)
+    except UnicodeDecodeError:
+        if encoding != "utf-8":
+            os.remove(tmp_path)
+            raise IngestError(f"File is not valid {encoding}")
+        # Legacy single byte files: a second pass, like the readers used to do on every read
+        logger.info(f"{os.path.basename(path)} is not UTF-8, decoding it as {FALLBACK_ENCODING}")
+        encoding = FALLBACK_ENCODING
+        stream.seek(0)
+        with open(tmp_path, 'wb') as out:
+            stats = _normalize_stream(stream, out, encoding)
+
+    if not stats["lines"]:
+        os.remove(tmp_path)
+        raise IngestError("File is empty")
+    offsets = np.frombuffer(stats.pop("_offsets"), dtype=np.uint64)
+    hashes = np.frombuffer(stats.pop("_hashes"), dtype=np.uint64)
+    stats.update(version=INGEST_FORMAT_VERSION, encoding=encoding)
+    return IngestedFile(path=path, stats=stats, offsets=offsets, hashes=hashes)
+
+
+def commit(ingested: IngestedFile) -> None:
+    """
+    Move an ingested file and its index into place
+    """
+    paths = index_paths(ingested.path)
+    os.makedirs(os.path.dirname(paths["offsets"]), exist_ok=True)
+    for name, values in (("offsets", ingested.offsets), ("hashes", ingested.hashes)):
+        with open(paths[name] + ".tmp", 'wb') as f:
+            np.save(f, values)
+        os.replace(paths[name] + ".tmp", paths[name])
+    os.replace(ingested.path + ".tmp", ingested.path)
+
+
+def discard(ingested: Optional[IngestedFile]) -> None:
+    if ingested and os.path.exists(ingested.path + ".tmp"):
+        os.remove(ingested.path + ".tmp")
+
+
+def remove_index(path: Optional[str]) -> None:
+    if not path:
+        return
+    for index_path in index_paths(path).values():
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
+
+def check_line_counts(source_stats: Optional[Dict[str, Any]], target_stats: Optional[Dict[str, Any]]) -> None:
+    """
+    IngestError if source and target (when both are known) have different numbers of lines
+    """
+    if source_stats and target_stats and source_stats["lines"] != target_stats["lines"]:
+        raise IngestError(f"Source has {source_stats['lines']} lines but target has {target_stats['lines']}; every source line needs a reference")
+
+
+def testset_stats(testset) -> Dict[str, Any]:
+    """
+    Parsed ingest_stats of a testset ({} before it was ingested)
+    """
+    try:
+        return json.loads(testset.ingest_stats) if testset.ingest_stats else {}
+    except (TypeError, ValueError):
+        return {}
+
+
+def stats_update(testset, source: Optional[IngestedFile] = None, target: Optional[IngestedFile] = None, check: bool = True) -> Dict[str, Any]:
+    """
+    Testset fields recording newly ingested source and/or target files; with check, IngestError
+    when source and target end up with different line counts
+    """
+    stats = testset_stats(testset)
+    if source:
+        stats["source"] = source.stats
+    if target:
+        stats["target"] = target.stats
+    if check:
+        check_line_counts(stats.get("source"), stats.get("target"))
+    counted = stats.get("source") or stats.get("target")
+    return {"ingest_stats": json.dumps(stats), "segments": counted["lines"] if counted else None}
+
+
+def is_normalized(testset, file_type: str) -> bool:
+    """
+    True when the testset's file_type file went through ingest (UTF-8, NFC) and is unchanged since
+    """
+    stats = testset_stats(testset).get(file_type)
+    path = getattr(testset, f"{file_type}_file_path_on_server")
+    return bool(stats and path and os.path.exists(path) and os.path.getsize(path) == stats["bytes"])
+
+
+def load_offsets(path: Optional[str]) -> Optional[np.ndarray]:
+    """
+    Memory-mapped line offsets of an ingested file, None without a current index
+    """
+    if not path:
+        return None
+    try:
+        offsets = np.load(index_paths(path)["offsets"], mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    if not len(offsets) or int(offsets[-1]) != os.path.getsize(path):
+        return None
+    return offsets
+
+
+def load_hashes(path: Optional[str]) -> Optional[np.ndarray]:
+    if not path:
+        return None
+    try:
+        return np.load(index_paths(path)["hashes"], mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+
+
+def read_segments(path: Optional[str], indices: Iterable[int]) -> Dict[int, str]:
+    """
+    Lines of an ingested file at the given 0-based indices, read by seeking to each through the line
+    index; {} without an index
+    """
+    offsets = load_offsets(path)
+    lines: Dict[int, str] = {}
+    if offsets is None:
+        return lines
+    with open(path, 'rb') as f:
+        for index in sorted(set(indices)):
+            if 0 <= index < len(offsets) - 1:
+                f.seek(int(offsets[index]))
+                lines[index] = f.read(int(offsets[index + 1]) - int(offsets[index])).decode('utf-8', errors='replace').rstrip('\n')
+    return lines
+
+
+def head(path: str, count: int) -> List[str]:
+    """
+    First count lines of a text file, without reading the rest
+    """
+    lines = []
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if len(lines) >= count:
+                break
+            lines.append(line.rstrip('\n'))
+    return lines
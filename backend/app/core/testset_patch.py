@@ -0,0 +1,363 @@
+import os
+import json
+import shutil
+import logging
+import threading
+import unicodedata
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core import testset_ingest
+
+logger = logging.getLogger(__name__)
+
+# Line-range patches of ingested testset files. A patch is a list of replace/insert/delete edits in
+# the line numbers of the file it was made against; the new file is assembled in a temp file from
+# the unchanged byte ranges of the old one (located through the ingest line index and copied in the
+# kernel with copy_file_range) and the new lines, then renamed over the old file. The line index and
+# statistics are spliced instead of rebuilt, so the work done in Python is proportional to the edit.
+# Each patch bumps the file's revision (kept in its ingest stats) and is stored as a delta with the
+# lines it removed under <testset dir>/deltas/<file name>/<revision>.json, which is enough to undo it.
+
+DELTA_DIR = "deltas"
+EDIT_OPS = ("replace", "insert", "delete")
+
+_CHUNK_SIZE = 1024 * 1024
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+class PatchError(ValueError):
+    """Edits that can not be applied to the file"""
+
+
+class RevisionConflict(Exception):
+    """The file changed since the revision the edits were made against"""
+
+
+class Block(NamedTuple):
+    # Lines [old_start, old_end) of the old file become lines starting at new_start of the new one:
+    # kept as they are when lines is None, else replaced by lines
+    old_start: int
+    old_end: int
+    new_start: int
+    lines: Optional[List[str]]
+
+
+class PatchResult(NamedTuple):
+    ingested: testset_ingest.IngestedFile
+    revision: int
+    plan: List[Block]
+    old_lines: int
+    changed_lines: int
+
+
+def _lock(path: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(path, threading.Lock())
+
+
+def _normalize_line(line: str) -> str:
+    if line.endswith('\r'):
+        line = line[:-1]
+    if '\n' in line or '\r' in line:
+        raise PatchError("Edited lines must not contain line breaks; use one list item per line")
+    return unicodedata.normalize("NFC", line)
+
+
+def normalize_edits(edits: Iterable[Any], line_count: int) -> List[Tuple[int, int, List[str]]]:
+    """
+    Edits (objects or dicts with op/start/end/lines) as sorted, non-overlapping (start, end, lines)
+    replacements; PatchError if they are invalid for a file of line_count lines
+    """
+    normalized = []
+    for edit in edits:
+        get = edit.get if isinstance(edit, dict) else lambda name, default=None: getattr(edit, name, default)
+        op, start, end, lines = get("op"), get("start"), get("end"), list(get("lines") or [])
+        if op not in EDIT_OPS:
+            raise PatchError(f"Unknown edit op '{op}'. Must be one of: {', '.join(EDIT_OPS)}")
+        if op == "insert":
+            end = start
+        elif end is None:
+            raise PatchError(f"'{op}' edits need an end line")
+        if op == "delete":
+            lines = []
+        elif not lines:
+            raise PatchError(f"'{op}' edits need lines")
+        if not 0 <= start <= end <= line_count:
+            raise PatchError(f"Edit range {start}-{end} is outside the file ({line_count} lines)")
+        normalized.append((start, end, [_normalize_line(line) for line in lines]))
+    normalized.sort(key=lambda edit: (edit[0], edit[1]))
+    for previous, current in zip(normalized, normalized[1:]):
+        if current[0] < previous[1] or (current[0] == previous[0] == previous[1] == current[1]):
+            raise PatchError(f"Edits overlap at line {current[0]}")
+    if not normalized:
+        raise PatchError("No edits")
+    return normalized
+
+
+def plan(edits: List[Tuple[int, int, List[str]]], line_count: int) -> List[Block]:
+    """
+    Blocks of the new file for normalized edits
+    """
+    blocks = []
+    cursor = 0
+    new_position = 0
+    for start, end, lines in edits:
+        if start > cursor:
+            blocks.append(Block(cursor, start, new_position, None))
+            new_position += start - cursor
+        blocks.append(Block(start, end, new_position, lines))
+        new_position += len(lines)
+        cursor = end
+    if cursor < line_count:
+        blocks.append(Block(cursor, line_count, new_position, None))
+    return blocks
+
+
+def _copy_range(source: int, destination: int, start: int, length: int) -> None:
+    # Kernel-side copy (a reflink on filesystems that support it), plain reads where unavailable
+    while length > 0:
+        try:
+            copied = os.copy_file_range(source, destination, length, start)
+        except (AttributeError, OSError):
+            copied = 0
+        if copied <= 0:
+            chunk = os.pread(source, min(length, _CHUNK_SIZE), start)
+            if not chunk:
+                raise PatchError("Testset file is shorter than its line index")
+            copied = os.write(destination, chunk)
+        start += copied
+        length -= copied
+
+
+def _rewrite(path: str, offsets: np.ndarray, hashes: np.ndarray, blocks: List[Block]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Write the patched file to path.tmp; returns its line offsets and segment hashes
+    """
+    new_offsets = []
+    new_hashes = []
+    position = 0
+    source = os.open(path, os.O_RDONLY)
+    try:
+        with open(path + ".tmp", 'wb', buffering=0) as out:
+            for block in blocks:
+                if block.lines is None:
+                    start, end = int(offsets[block.old_start]), int(offsets[block.old_end])
+                    _copy_range(source, out.fileno(), start, end - start)
+                    new_offsets.append(np.asarray(offsets[block.old_start:block.old_end], dtype=np.uint64) - np.uint64(start) + np.uint64(position))
+                    new_hashes.append(np.asarray(hashes[block.old_start:block.old_end], dtype=np.uint64))
+                    position += end - start
+                elif block.lines:
+                    data = [line.encode('utf-8') + b'\n' for line in block.lines]
+                    out.write(b''.join(data))
+                    lengths = np.array([len(line) for line in data], dtype=np.uint64)
+                    new_offsets.append(np.uint64(position) + np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.uint64))
+                    new_hashes.append(np.array([testset_ingest.segment_hash(line) for line in block.lines], dtype=np.uint64))
+                    position += int(lengths.sum())
+    finally:
+        os.close(source)
+    new_offsets.append(np.array([position], dtype=np.uint64))
+    return np.concatenate(new_offsets), np.concatenate(new_hashes) if new_hashes else np.zeros(0, dtype=np.uint64)
+
+
+def _line_metrics(line: str) -> Tuple[int, int, bool]:
+    return len(line), len(line.split()), not line.strip()
+
+
+def _patched_stats(stats: Dict[str, Any], path: str, removed: List[str], added: List[str], size: int, lines: int) -> Dict[str, Any]:
+    stats = dict(stats)
+    for sign, texts in ((-1, removed), (1, added)):
+        for text in texts:
+            chars, tokens, empty = _line_metrics(text)
+            stats["chars"] += sign * chars
+            stats["tokens"] += sign * tokens
+            stats["empty_lines"] += sign * int(empty)
+    removed_max = any(_line_metrics(text)[0] >= stats["max_chars"] or _line_metrics(text)[1] >= stats["max_tokens"] for text in removed)
+    if removed_max:
+        # A longest line went away: the only case that needs a pass over the new file
+        stats["max_chars"] = stats["max_tokens"] = 0
+        with open(path + ".tmp", 'r', encoding='utf-8') as f:
+            for line in f:
+                chars, tokens, _ = _line_metrics(line.rstrip('\n'))
+                stats["max_chars"] = max(stats["max_chars"], chars)
+                stats["max_tokens"] = max(stats["max_tokens"], tokens)
+    else:
+        for text in added:
+            chars, tokens, _ = _line_metrics(text)
+            stats["max_chars"] = max(stats["max_chars"], chars)
+            stats["max_tokens"] = max(stats["max_tokens"], tokens)
+    stats["lines"] = lines
+    stats["bytes"] = size
+    # The digest covered the uploaded content; patched files are identified by their revision
+    stats["sha1"] = None
+    return stats
+
+
+def revision(testset, file_type: str) -> int:
+    return testset_ingest.testset_stats(testset).get(file_type, {}).get("revision", 0)
+
+
+def history_dir(path: str) -> str:
+    return os.path.join(os.path.dirname(path), DELTA_DIR, os.path.basename(path))
+
+
+def _delta_path(path: str, revision_number: int) -> str:
+    return os.path.join(history_dir(path), f"{revision_number:08d}.json")
+
+
+def history(path: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    Stored deltas of a file, newest first (without their lines)
+    """
+    if not path or not os.path.isdir(history_dir(path)):
+        return []
+    entries = []
+    for name in sorted(os.listdir(history_dir(path)), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(history_dir(path), name), 'r', encoding='utf-8') as f:
+                delta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        entries.append({
+            "revision": delta["revision"],
+            "created_at": delta.get("created_at"),
+            "username": delta.get("username"),
+            "edits": len(delta["edits"]),
+            "lines_added": sum(len(lines) for _, _, lines in delta["edits"]),
+            "lines_removed": sum(len(lines) for lines in delta["removed"])
+        })
+    return entries
+
+
+def remove_history(path: Optional[str]) -> None:
+    """
+    Drop the deltas of a file that is replaced or deleted
+    """
+    if path and os.path.isdir(history_dir(path)):
+        shutil.rmtree(history_dir(path), ignore_errors=True)
+        try:
+            os.rmdir(os.path.join(os.path.dirname(path), DELTA_DIR))
+        except OSError:
+            pass
+
+
+def _write_delta(path: str, delta: Dict[str, Any]) -> None:
+    directory = history_dir(path)
+    os.makedirs(directory, exist_ok=True)
+    target = _delta_path(path, delta["revision"])
+    with open(target + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(delta, f, ensure_ascii=False)
+    os.replace(target + ".tmp", target)
+    stored = sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+    for name in stored[:max(len(stored) - settings.TESTSET_DELTA_HISTORY, 0)]:
+        os.remove(os.path.join(directory, name))
+
+
+def _ingested_file(testset, file_type: str) -> testset_ingest.IngestedFile:
+    """
+    The current file with its line index, ingesting files uploaded before the ingest pipeline first
+    """
+    path = getattr(testset, f"{file_type}_file_path_on_server")
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError(f"{file_type.capitalize()} file not found")
+    offsets = testset_ingest.load_offsets(path)
+    hashes = testset_ingest.load_hashes(path)
+    stats = testset_ingest.testset_stats(testset).get(file_type)
+    if offsets is None or hashes is None or not testset_ingest.is_normalized(testset, file_type):
+        logger.info(f"Testset {testset.testset_id}: ingesting legacy {file_type} file before patching it")
+        with open(path, 'rb') as f:
+            ingested = testset_ingest.ingest(f, path)
+        testset_ingest.commit(ingested)
+        return ingested
+    return testset_ingest.IngestedFile(path=path, stats=stats, offsets=offsets, hashes=hashes)
+
+
+def _patch(current: testset_ingest.IngestedFile, edits: List[Tuple[int, int, List[str]]]) -> Tuple[testset_ingest.IngestedFile, List[Block], List[List[str]]]:
+    line_count = len(current.offsets) - 1
+    blocks = plan(edits, line_count)
+    removed_text = testset_ingest.read_segments(current.path, [index for start, end, _ in edits for index in range(start, end)])
+    removed = [[removed_text[index] for index in range(start, end)] for start, end, _ in edits]
+    offsets, hashes = _rewrite(current.path, current.offsets, current.hashes, blocks)
+    if len(offsets) == 1:
+        os.remove(current.path + ".tmp")
+        raise PatchError("A testset file can not be empty")
+    try:
+        stats = _patched_stats(
+            current.stats, current.path,
+            [line for lines in removed for line in lines], [line for _, _, lines in edits for line in lines],
+            int(offsets[-1]), len(offsets) - 1
+        )
+    except Exception:
+        os.remove(current.path + ".tmp")
+        raise
+    return testset_ingest.IngestedFile(path=current.path, stats=stats, offsets=offsets, hashes=hashes), blocks, removed
+
+
+def apply(testset, file_type: str, edits: Iterable[Any], base_revision: Optional[int] = None,
+          username: Optional[str] = None) -> PatchResult:
+    """
+    Apply edits to a testset file and record the delta; the caller stores
+    testset_ingest.stats_update(testset, **{file_type: result.ingested}) on the testset
+    """
+    path = getattr(testset, f"{file_type}_file_path_on_server")
+    with _lock(path or ""):
+        current = _ingested_file(testset, file_type)
+        current_revision = current.stats.get("revision", 0)
+        if base_revision is not None and base_revision != current_revision:
+            raise RevisionConflict(f"File is at revision {current_revision}, edits were made against {base_revision}")
+        normalized = normalize_edits(edits, len(current.offsets) - 1)
+        patched, blocks, removed = _patch(current, normalized)
+        patched.stats["revision"] = current_revision + 1
+        _write_delta(path, {
+            "revision": current_revision + 1,
+            "created_at": datetime.utcnow().isoformat(),
+            "username": username,
+            "edits": [[start, end, lines] for start, end, lines in normalized],
+            "removed": removed
+        })
+        testset_ingest.commit(patched)
+    changed = sum(max(end - start, len(lines)) for start, end, lines in normalized)
+    logger.info(f"Testset {testset.testset_id}: patched {file_type} file to revision {current_revision + 1} ({len(normalized)} edits, {changed} lines)")
+    return PatchResult(ingested=patched, revision=current_revision + 1, plan=blocks, old_lines=len(current.offsets) - 1, changed_lines=changed)
+
+
+def undo(testset, file_type: str, to_revision: int) -> List[PatchResult]:
+    """
+    Revert a file to an earlier revision by applying the inverse of each newer delta, newest first;
+    the undone deltas are dropped. Returns one result per undone delta, in order.
+    """
+    path = getattr(testset, f"{file_type}_file_path_on_server")
+    results = []
+    with _lock(path or ""):
+        current = _ingested_file(testset, file_type)
+        current_revision = current.stats.get("revision", 0)
+        if not 0 <= to_revision <= current_revision:
+            raise PatchError(f"Revision must be between 0 and {current_revision}")
+        missing = [number for number in range(to_revision + 1, current_revision + 1) if not os.path.exists(_delta_path(path, number))]
+        if missing:
+            raise PatchError(f"History only goes back to revision {max(missing)}")
+        for number in range(current_revision, to_revision, -1):
+            with open(_delta_path(path, number), 'r', encoding='utf-8') as f:
+                delta = json.load(f)
+            # Positions of the delta's new lines in the file it produced
+            inverse = []
+            shift = 0
+            for (start, end, lines), removed in zip(delta["edits"], delta["removed"]):
+                inverse.append((start + shift, start + shift + len(lines), removed))
+                shift += len(lines) - (end - start)
+            patched, blocks, _ = _patch(current, inverse)
+            patched.stats["revision"] = number - 1
+            testset_ingest.commit(patched)
+            os.remove(_delta_path(path, number))
+            changed = sum(max(end - start, len(lines)) for start, end, lines in inverse)
+            results.append(PatchResult(ingested=patched, revision=number - 1, plan=blocks, old_lines=len(current.offsets) - 1, changed_lines=changed))
+            current = patched
+    logger.info(f"Testset {testset.testset_id}: reverted {file_type} file from revision {current_revision} to {to_revision}")
+    return results
@@ -0,0 +1,249 @@
+import os
+import json
+import math
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import EngineThroughputStat, EvaluationJob, ModelVersion, Testset
+from app.schemas.evaluation import EvaluationStatus
+
+logger = logging.getLogger(__name__)
+
+# Engine throughput history: every completed engine run updates an exponentially weighted average of
+# segments/sec for its (language pair, mode, model size class), plus the job time spent outside the
+# engine. Predictions drive per-run engine timeouts, the ETA shown at submission and shortest-job-first
+# ordering in the scheduler. Without any history the fixed NMT_ENGINE_TIMEOUT_SECONDS still applies.
+
+# Segment counts of testset files, keyed by (path, size, mtime) so replaced files are recounted
+_segment_counts: Dict[Tuple[str, int, float], int] = {}
+_segment_counts_lock = threading.Lock()
+_SEGMENT_COUNT_CACHE_SIZE = 1024
+
+
+def mode_key(mode_type: Optional[str], sub_mode_type: Optional[str]) -> str:
+    return f"{mode_type or ''}/{sub_mode_type or ''}"
+
+
+def model_size_class(model_file: Optional[str]) -> int:
+    """
+    log2 of the model file size in MB (0 for anything up to 2 MB), -1 if the file is missing
+    """
+    try:
+        size_mb = os.path.getsize(model_file) / (1024 * 1024)
+    except (OSError, TypeError):
+        return -1
+    return max(int(math.log2(size_mb)), 0) if size_mb >= 1 else 0
+
+
+def model_types_for(evaluation_model_type: Optional[str]) -> List[str]:
+    evaluation_model_type = evaluation_model_type or "finetuned"
+    return ["base", "finetuned"] if evaluation_model_type == "both" else [evaluation_model_type]
+
+
+def count_segments(path: Optional[str]) -> Optional[int]:
+    """
+    Number of lines of a text file, cached while the file is unchanged
+    """
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    key = (path, stat.st_size, stat.st_mtime)
+    with _segment_counts_lock:
+        if key in _segment_counts:
+            return _segment_counts[key]
+
+    segments = 0
+    last_block = b''
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            segments += block.count(b'\n')
+            last_block = block
+    if last_block and not last_block.endswith(b'\n'):
+        segments += 1
+
+    with _segment_counts_lock:
+        if len(_segment_counts) >= _SEGMENT_COUNT_CACHE_SIZE:
+            _segment_counts.clear()
+        _segment_counts[key] = segments
+    return segments
+
+
+def _lookup(db: Session, lang_pair_id: int, mode: str, size_class: int) -> Optional[Tuple[float, float]]:
+    """
+    (segments/sec, overhead seconds) for the key, falling back to the same language pair and mode at
+    any model size, then the language pair alone, then the model size class across language pairs
+    """
+    fallbacks = [
+        [EngineThroughputStat.lang_pair_id == lang_pair_id, EngineThroughputStat.mode_key == mode, EngineThroughputStat.model_size_class == size_class],
+        [EngineThroughputStat.lang_pair_id == lang_pair_id, EngineThroughputStat.mode_key == mode],
+        [EngineThroughputStat.lang_pair_id == lang_pair_id],
+        [EngineThroughputStat.model_size_class == size_class],
+    ]
+    for conditions in fallbacks:
+        stats = db.query(EngineThroughputStat).filter(*conditions, EngineThroughputStat.samples > 0).all()
+        if stats:
+            total = sum(stat.samples for stat in stats)
+            segments_per_second = sum(stat.segments_per_second * stat.samples for stat in stats) / total
+            overhead_seconds = sum(stat.overhead_seconds * stat.samples for stat in stats) / total
+            return segments_per_second, overhead_seconds
+    return None
+
+
+def expected_segments_per_second(db: Session, *, lang_pair_id: int, mode_type: Optional[str], sub_mode_type: Optional[str],
+                                 model_file: Optional[str]) -> Optional[float]:
+    """
+    Historical engine throughput for running this model in this mode, None without history
+    """
+    found = _lookup(db, lang_pair_id, mode_key(mode_type, sub_mode_type), model_size_class(model_file))
+    return found[0] if found else None
+
+
+def engine_timeout_seconds(segments: Optional[int], segments_per_second: Optional[float]) -> int:
+    """
+    Timeout for one engine run: EVALUATION_TIMEOUT_FACTOR times the expected run time plus
+    EVALUATION_TIMEOUT_SLACK_SECONDS, within [EVALUATION_MIN_ENGINE_TIMEOUT_SECONDS,
+    EVALUATION_MAX_ENGINE_TIMEOUT_SECONDS]. NMT_ENGINE_TIMEOUT_SECONDS without history.
+    """
+    if not settings.EVALUATION_ADAPTIVE_TIMEOUTS_ENABLED or not segments or not segments_per_second or segments_per_second <= 0:
+        return settings.NMT_ENGINE_TIMEOUT_SECONDS
+    expected = segments / segments_per_second
+    timeout = expected * settings.EVALUATION_TIMEOUT_FACTOR + settings.EVALUATION_TIMEOUT_SLACK_SECONDS
+    return int(min(max(timeout, settings.EVALUATION_MIN_ENGINE_TIMEOUT_SECONDS), settings.EVALUATION_MAX_ENGINE_TIMEOUT_SECONDS))
+
+
+def _model_file(model_version: ModelVersion, model_type: str) -> Optional[str]:
+    return model_version.base_model_file_path_on_server if model_type == "base" else model_version.model_file_path_on_server
+
+
+def predict_duration_seconds(db: Session, *, version_id: int, testset_id: int, mode_type: Optional[str] = None,
+                             sub_mode_type: Optional[str] = None, evaluation_model_type: Optional[str] = "finetuned",
+                             segments: Optional[int] = None) -> Optional[float]:
+    """
+    Predicted processing time of an evaluation job, None when there is no usable history.
+    `segments` overrides the testset size for runs translating part of it (sampled or upgraded runs).
+    """
+    model_version = db.query(ModelVersion).filter(ModelVersion.version_id == version_id).first()
+    testset = db.query(Testset).filter(Testset.testset_id == testset_id).first()
+    if not model_version or not testset:
+        return None
+    if segments is None:
+        segments = testset.segments or count_segments(testset.source_file_path_on_server)
+        if not segments:
+            return None
+
+    duration = 0.0
+    overheads = []
+    for model_type in model_types_for(evaluation_model_type):
+        found = _lookup(db, model_version.lang_pair_id, mode_key(mode_type, sub_mode_type), model_size_class(_model_file(model_version, model_type)))
+        if not found:
+            return None
+        segments_per_second, overhead_seconds = found
+        duration += segments / segments_per_second
+        overheads.append(overhead_seconds)
+    return round(duration + sum(overheads) / len(overheads), 1)
+
+
+def _update_stat(db: Session, *, lang_pair_id: int, mode: str, size_class: int, segments_per_second: float,
+                 overhead_seconds: Optional[float]) -> None:
+    for attempt in range(2):
+        stat = db.query(EngineThroughputStat).filter(
+            EngineThroughputStat.lang_pair_id == lang_pair_id,
+            EngineThroughputStat.mode_key == mode,
+            EngineThroughputStat.model_size_class == size_class
+        ).first()
+        if stat is None:
+            stat = EngineThroughputStat(
+                lang_pair_id=lang_pair_id,
+                mode_key=mode,
+                model_size_class=size_class,
+                samples=1,
+                segments_per_second=segments_per_second,
+                overhead_seconds=overhead_seconds or 0.0
+            )
+            db.add(stat)
+        else:
+            # Plain mean over the first samples, then an exponentially weighted average
+            weight = max(settings.EVALUATION_THROUGHPUT_SMOOTHING, 1.0 / (stat.samples + 1))
+            stat.segments_per_second = stat.segments_per_second * (1 - weight) + segments_per_second * weight
+            if overhead_seconds is not None:
+                stat.overhead_seconds = stat.overhead_seconds * (1 - weight) + overhead_seconds * weight
+            stat.samples += 1
+            stat.updated_at = datetime.utcnow()
+        try:
+            db.commit()
+            return
+        except IntegrityError:
+            # Another worker created the row first, update it instead
+            db.rollback()
+    logger.warning(f"Could not record engine throughput for lang pair {lang_pair_id}, mode {mode}")
+
+
+def record_completed_jobs(db: Session, job_ids: Iterable[int]) -> int:
+    """
+    Add the engine runs of completed jobs to the throughput history; returns how many runs were recorded.
+    Shared-engine matrix groups are recorded once, through their leader.
+    """
+    recorded = 0
+    for job in db.query(EvaluationJob).filter(
+        EvaluationJob.job_id.in_(list(job_ids)),
+        EvaluationJob.status == EvaluationStatus.COMPLETED.value,
+        EvaluationJob.stage_timings.isnot(None)
+    ).all():
+        try:
+            stage_timings = json.loads(job.stage_timings)
+        except (TypeError, ValueError):
+            continue
+        shared_engine = stage_timings.get("shared_engine")
+        if shared_engine and shared_engine.get("leader_job_id") != job.job_id:
+            continue
+        model_version = db.query(ModelVersion).filter(ModelVersion.version_id == job.version_id).first()
+        if not model_version:
+            continue
+
+        runs = []
+        for model_type in model_types_for(job.evaluation_model_type):
+            bucket = stage_timings.get(model_type) or {}
+            if bucket.get("segments") and bucket.get("segments_per_second"):
+                runs.append((model_type, bucket["segments"], bucket["segments_per_second"]))
+        if not runs:
+            continue
+
+        overhead_seconds = None
+        if not shared_engine and job.processing_started_at and job.completed_at:
+            engine_seconds = sum(segments / segments_per_second for _, segments, segments_per_second in runs)
+            total_seconds = (job.completed_at - job.processing_started_at).total_seconds()
+            overhead_seconds = max(total_seconds - engine_seconds, 0.0)
+
+        for model_type, segments, segments_per_second in runs:
+            _update_stat(
+                db,
+                lang_pair_id=model_version.lang_pair_id,
+                mode=mode_key(job.mode_type, job.sub_mode_type),
+                size_class=model_size_class(_model_file(model_version, model_type)),
+                segments_per_second=segments_per_second,
+                overhead_seconds=overhead_seconds
+            )
+            recorded += 1
+    return recorded
+
+
+def stats_summary(db: Session) -> List[Dict[str, Any]]:
+    return [
+        {
+            "lang_pair_id": stat.lang_pair_id,
+            "mode": stat.mode_key,
+            "model_size_class": stat.model_size_class,
+            "samples": stat.samples,
+            "segments_per_second": round(stat.segments_per_second, 3),
+            "overhead_seconds": round(stat.overhead_seconds, 1),
+            "updated_at": stat.updated_at
+        }
+        for stat in db.query(EngineThroughputStat).order_by(EngineThroughputStat.lang_pair_id, EngineThroughputStat.mode_key, EngineThroughputStat.model_size_class)
+    ]
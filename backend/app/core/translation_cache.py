@@ -0,0 +1,332 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.core.chunking import file_digest
+from app.core.evaluation import translate_text
+from app.core.metrics import (
+    TRANSLATION_CACHE_LOOKUPS, TRANSLATION_CACHE_HIT_RATIO, TRANSLATION_CACHE_BYTES, TRANSLATION_CACHE_EVICTIONS
+)
+
+logger = logging.getLogger(__name__)
+
+# Per-segment cache of direct translations (POST /evaluations/translate). A segment is one line of the
+# source text, keyed by the content digests of the model and hparams files plus the engine options that
+# reach the command line (see translate_text), so replacing a model's files never serves stale output.
+# Lookups go to an in-memory LRU, then to an LRU SQLite file shared by the API processes on the host;
+# only the missing segments are sent to the engine, once each, and their lines are cached afterwards.
+# Engine output that does not line up with its input is returned as is and not cached.
+
+# Disk eviction goes this far under TRANSLATION_CACHE_DISK_BYTES, so it does not run on every insert
+_DISK_LOW_WATERMARK = 0.9
+_SQL_BATCH = 500
+
+_lock = threading.Lock()
+_memory: "OrderedDict[str, str]" = OrderedDict()
+_memory_bytes = 0
+_disk: Optional[sqlite3.Connection] = None
+_disk_bytes = 0
+_disk_failed = False
+# path -> (size, mtime_ns, sha1), so unchanged model files are hashed once per process
+_digests: Dict[str, Tuple[int, int, str]] = {}
+_lookups = {"memory_hit": 0, "disk_hit": 0, "miss": 0}
+
+
+class CachedTranslation(NamedTuple):
+    translated_text: str
+    segments: int
+    cached_segments: int
+
+
+def model_digest(path: str) -> str:
+    stat = os.stat(path)
+    cached = _digests.get(path)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+    digest = file_digest(path)
+    _digests[path] = (stat.st_size, stat.st_mtime_ns, digest)
+    return digest
+
+
+def key_prefix(model_file_path: str, hparams_file_path: str, mode_type: Optional[str],
+                sub_mode_type: Optional[str], custom_params: Optional[str]) -> List[Any]:
+    # Options translate_text ignores are left out of the key, so they do not split the cache
+    if mode_type not in ("Samsung Note Mode", "Samsung Internet Mode"):
+        sub_mode_type = None
+    if mode_type != "Custom":
+        custom_params = None
+    return [model_digest(model_file_path), model_digest(hparams_file_path), mode_type, sub_mode_type,
+            " ".join(custom_params.split()) if custom_params else None]
+
+
+def segment_key(prefix: List[Any], segment: str) -> str:
+    return hashlib.sha256(json.dumps(prefix + [segment], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _entry_size(key: str, translation: str) -> int:
+    return len(key) + len(translation.encode("utf-8"))
+
+
+def _connection() -> Optional[sqlite3.Connection]:
+    """
+    Disk tier connection (created on first use), None if the disk tier is disabled or unusable; call under _lock
+    """
+    global _disk, _disk_bytes, _disk_failed
+    if _disk is not None or _disk_failed or settings.TRANSLATION_CACHE_DISK_BYTES <= 0:
+        return _disk
+    try:
+        os.makedirs(os.path.dirname(settings.TRANSLATION_CACHE_PATH) or ".", exist_ok=True)
+        connection = sqlite3.connect(settings.TRANSLATION_CACHE_PATH, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS translations "
+            "(key TEXT PRIMARY KEY, translation TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS ix_translations_last_used ON translations (last_used)")
+        connection.commit()
+        _disk_bytes = connection.execute("SELECT COALESCE(SUM(size), 0) FROM translations").fetchone()[0]
+    except sqlite3.Error as e:
+        logger.warning(f"Translation cache file {settings.TRANSLATION_CACHE_PATH} unusable, caching in memory only: {e}")
+        _disk_failed = True
+        return None
+    _disk = connection
+    TRANSLATION_CACHE_BYTES.set(_disk_bytes, tier="disk")
+    return _disk
+
+
+def _disk_error(e: Exception) -> None:
+    global _disk, _disk_failed
+    logger.warning(f"Translation cache file error, caching in memory only: {e}")
+    try:
+        _disk.close()
+    except Exception:
+        pass
+    _disk = None
+    _disk_failed = True
+
+
+def _remember(key: str, translation: str) -> None:
+    global _memory_bytes
+    previous = _memory.pop(key, None)
+    if previous is not None:
+        _memory_bytes -= _entry_size(key, previous)
+    _memory[key] = translation
+    _memory_bytes += _entry_size(key, translation)
+    evicted = 0
+    while _memory_bytes > settings.TRANSLATION_CACHE_MEMORY_BYTES and _memory:
+        old_key, old_translation = _memory.popitem(last=False)
+        _memory_bytes -= _entry_size(old_key, old_translation)
+        evicted += 1
+    if evicted:
+        TRANSLATION_CACHE_EVICTIONS.inc(evicted, tier="memory")
+    TRANSLATION_CACHE_BYTES.set(_memory_bytes, tier="memory")
+
+
+def _evict_disk(connection: sqlite3.Connection) -> None:
+    global _disk_bytes
+    limit = settings.TRANSLATION_CACHE_DISK_BYTES
+    if _disk_bytes <= limit:
+        return
+    # Other processes write to the same file, so start from the real size
+    _disk_bytes = connection.execute("SELECT COALESCE(SUM(size), 0) FROM translations").fetchone()[0]
+    evicted = 0
+    while _disk_bytes > limit * _DISK_LOW_WATERMARK:
+        rows = connection.execute(
+            "SELECT key, size FROM translations ORDER BY last_used LIMIT ?", (_SQL_BATCH,)
+        ).fetchall()
+        if not rows:
+            break
+        for key, size in rows:
+            if _disk_bytes <= limit * _DISK_LOW_WATERMARK:
+                break
+            connection.execute("DELETE FROM translations WHERE key = ?", (key,))
+            _disk_bytes -= size
+            evicted += 1
+    connection.commit()
+    if evicted:
+        TRANSLATION_CACHE_EVICTIONS.inc(evicted, tier="disk")
+        logger.info(f"Evicted {evicted} cached translations from {settings.TRANSLATION_CACHE_PATH}")
+
+
+def lookup(keys: List[str]) -> Dict[str, Tuple[str, str]]:
+    """
+    Cached translations of keys: key -> (translation, "memory_hit" | "disk_hit")
+    """
+    found: Dict[str, Tuple[str, str]] = {}
+    with _lock:
+        for key in keys:
+            if key in _memory and key not in found:
+                _memory.move_to_end(key)
+                found[key] = (_memory[key], "memory_hit")
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        connection = _connection() if missing else None
+        if connection is None:
+            return found
+        try:
+            now = time.time()
+            for start in range(0, len(missing), _SQL_BATCH):
+                batch = missing[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = connection.execute(
+                    f"SELECT key, translation FROM translations WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, translation in rows:
+                    found[key] = (translation, "disk_hit")
+                    _remember(key, translation)
+                connection.executemany("UPDATE translations SET last_used = ? WHERE key = ?", [(now, key) for key, _ in rows])
+            connection.commit()
+        except sqlite3.Error as e:
+            _disk_error(e)
+    return found
+
+
+def store(translations: Dict[str, str]) -> None:
+    """
+    Cache key -> translation in both tiers
+    """
+    global _disk_bytes
+    with _lock:
+        for key, translation in translations.items():
+            _remember(key, translation)
+        connection = _connection()
+        if connection is None:
+            return
+        try:
+            now = time.time()
+            for key, translation in translations.items():
+                size = _entry_size(key, translation)
+                previous = connection.execute("SELECT size FROM translations WHERE key = ?", (key,)).fetchone()
+                connection.execute(
+                    "INSERT OR REPLACE INTO translations (key, translation, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, translation, size, now)
+                )
+                _disk_bytes += size - (previous[0] if previous else 0)
+            connection.commit()
+            _evict_disk(connection)
+        except sqlite3.Error as e:
+            _disk_error(e)
+            return
+        TRANSLATION_CACHE_BYTES.set(_disk_bytes, tier="disk")
+
+
+def record_lookups(results: List[str]) -> None:
+    with _lock:
+        for result in results:
+            _lookups[result] += 1
+            TRANSLATION_CACHE_LOOKUPS.inc(result=result)
+        total = sum(_lookups.values())
+        if total:
+            TRANSLATION_CACHE_HIT_RATIO.set((total - _lookups["miss"]) / total)
+
+
+def _lines(text: str) -> List[str]:
+    return (text[:-1] if text.endswith("\n") else text).split("\n")
+
+
+def translate(
+    source_text: str,
+    model_file_path: str,
+    hparams_file_path: str,
+    mode_type: Optional[str] = None,
+    sub_mode_type: Optional[str] = None,
+    custom_params: Optional[str] = None
+) -> CachedTranslation:
+    """
+    translate_text with cached segments served from the cache and only the rest sent to the engine
+    """
+    engine_options = dict(model_file_path=model_file_path, hparams_file_path=hparams_file_path,
+                          mode_type=mode_type, sub_mode_type=sub_mode_type, custom_params=custom_params)
+    segments = _lines(source_text)
+    if not settings.TRANSLATION_CACHE_ENABLED:
+        return CachedTranslation(translate_text(source_text=source_text, **engine_options), len(segments), 0)
+
+    prefix = key_prefix(model_file_path, hparams_file_path, mode_type, sub_mode_type, custom_params)
+    keys = [segment_key(prefix, segment) for segment in segments]
+    found = lookup(keys)
+    record_lookups([found[key][1] if key in found else "miss" for key in keys])
+    translations = {key: value[0] for key, value in found.items()}
+
+    missing = list(dict.fromkeys(key for key in keys if key not in translations))
+    if missing:
+        missing_segments = dict(zip(keys, segments))
+        trailing_newline = "\n" if source_text.endswith("\n") else ""
+        engine_input = source_text if len(missing) == len(keys) else "\n".join(missing_segments[key] for key in missing) + trailing_newline
+        output = translate_text(source_text=engine_input, **engine_options)
+        output_lines = _lines(output)
+        if len(output_lines) != len(missing):
+            logger.warning(f"Engine returned {len(output_lines)} lines for {len(missing)} segments, translation not cached")
+            if len(missing) == len(keys):
+                return CachedTranslation(output, len(segments), 0)
+            return CachedTranslation(translate_text(source_text=source_text, **engine_options), len(segments), 0)
+        fresh = dict(zip(missing, output_lines))
+        store(fresh)
+        translations.update(fresh)
+        if len(missing) == len(keys):
+            return CachedTranslation(output, len(segments), 0)
+
+    translated_text = "\n".join(translations[key] for key in keys)
+    if source_text.endswith("\n"):
+        translated_text += "\n"
+    cached_segments = sum(1 for key in keys if key in found)
+    return CachedTranslation(translated_text, len(segments), cached_segments)
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        connection = _connection()
+        disk_entries = None
+        if connection is not None:
+            try:
+                disk_entries = connection.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            except sqlite3.Error as e:
+                _disk_error(e)
+        lookups = dict(_lookups)
+        total = sum(lookups.values())
+        return {
+            "enabled": settings.TRANSLATION_CACHE_ENABLED,
+            "lookups": lookups,
+            "hit_ratio": round((total - lookups["miss"]) / total, 4) if total else None,
+            "memory": {
+                "entries": len(_memory),
+                "bytes": _memory_bytes,
+                "max_bytes": settings.TRANSLATION_CACHE_MEMORY_BYTES,
+                "evictions": int(TRANSLATION_CACHE_EVICTIONS.get(tier="memory"))
+            },
+            "disk": {
+                "path": settings.TRANSLATION_CACHE_PATH if _disk is not None else None,
+                "entries": disk_entries,
+                "bytes": _disk_bytes if _disk is not None else 0,
+                "max_bytes": settings.TRANSLATION_CACHE_DISK_BYTES,
+                "evictions": int(TRANSLATION_CACHE_EVICTIONS.get(tier="disk"))
+            }
+        }
+
+
+def clear() -> int:
+    """
+    Drop every cached translation from both tiers; returns the number of entries removed
+    """
+    global _memory_bytes, _disk_bytes
+    with _lock:
+        removed = len(_memory)
+        _memory.clear()
+        _memory_bytes = 0
+        TRANSLATION_CACHE_BYTES.set(0, tier="memory")
+        connection = _connection()
+        if connection is not None:
+            try:
+                removed = max(removed, connection.execute("DELETE FROM translations").rowcount)
+                connection.commit()
+                _disk_bytes = 0
+                TRANSLATION_CACHE_BYTES.set(0, tier="disk")
+            except sqlite3.Error as e:
+                _disk_error(e)
+    logger.info(f"Cleared {removed} cached translations")
+    return removed
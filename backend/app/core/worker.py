@@ -0,0 +1,270 @@
+import os
+import time
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Set, Dict
+
+from app.core.config import settings
+from app.core import scheduler, coalescing, cancellation, throughput
+from app.crud import crud_evaluation_worker
+from app.db.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class EvaluationWorker:
+    """
+    Claims evaluation jobs from the database and runs them on a fixed number of slots.
+
+    One instance runs inside the API process (unless EVALUATION_LOCAL_WORKER_ENABLED=false) and
+    any number of extra hosts can run evaluation_worker.py against the same database. Workers
+    coordinate only through the database: atomic job claims, leases renewed by heartbeats and
+    requeueing of jobs whose worker disappeared.
+    """
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        slots: Optional[int] = None,
+        labels: Optional[List[str]] = None,
+        poll_seconds: Optional[float] = None,
+        heartbeat_seconds: Optional[float] = None
+    ):
+        self.hostname = socket.gethostname()
+        self.worker_id = worker_id or settings.EVALUATION_WORKER_ID or f"{self.hostname}-{os.getpid()}"
+        self.slots = max(1, slots or settings.EVALUATION_WORKER_SLOTS)
+        self.labels = labels if labels is not None else scheduler.worker_labels()
+        self.poll_seconds = poll_seconds if poll_seconds is not None else settings.EVALUATION_WORKER_POLL_SECONDS
+        self.heartbeat_seconds = heartbeat_seconds if heartbeat_seconds is not None else settings.EVALUATION_WORKER_HEARTBEAT_SECONDS
+
+        # Leader job ID -> all job IDs of the run (matrix jobs sharing one engine session run together)
+        self._runs: Dict[int, List[int]] = {}
+        # Translation batches being run (app/core/batch_translation.py), one slot each
+        self._batches: Set[int] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def active_jobs(self) -> Set[int]:
+        with self._lock:
+            return {job_id for job_ids in self._runs.values() for job_id in job_ids}
+
+    @property
+    def active_batches(self) -> Set[int]:
+        with self._lock:
+            return set(self._batches)
+
+    @property
+    def busy_slots(self) -> int:
+        with self._lock:
+            return len(self._runs) + len(self._batches)
+
+    def start(self) -> None:
+        """Register the worker and start the claim loop in a background thread"""
+        db = SessionLocal()
+        try:
+            crud_evaluation_worker.register(
+                db,
+                worker_id=self.worker_id,
+                hostname=self.hostname,
+                pid=os.getpid(),
+                capacity=self.slots,
+                labels=self.labels
+            )
+        finally:
+            db.close()
+        self._executor = ThreadPoolExecutor(max_workers=self.slots, thread_name_prefix=f"eval-{self.worker_id}")
+        self._thread = threading.Thread(target=self._loop, name=f"eval-worker-{self.worker_id}", daemon=True)
+        self._thread.start()
+        logger.info(f"Evaluation worker {self.worker_id} started with {self.slots} slot(s), labels={self.labels}")
+
+    def stop(self, wait: bool = False) -> None:
+        """
+        Stop claiming new jobs. With wait=True, block until running jobs finish; otherwise their
+        leases simply expire and another worker picks them up.
+        """
+        self._stop.set()
+        scheduler.notify_job_submitted()
+        if self._thread:
+            self._thread.join(timeout=30)
+        if self._executor:
+            self._executor.shutdown(wait=wait)
+        db = SessionLocal()
+        try:
+            crud_evaluation_worker.mark_offline(db, worker_id=self.worker_id)
+        except Exception:
+            logger.exception("Exception details:")
+        finally:
+            db.close()
+        logger.info(f"Evaluation worker {self.worker_id} stopped")
+
+    def run_forever(self) -> None:
+        """Start and block until stop() is called (standalone worker entry point)"""
+        self.start()
+        try:
+            while not self._stop.is_set():
+                self._stop.wait(1.0)
+        except KeyboardInterrupt:
+            logger.info("Interrupted, stopping worker after running jobs finish...")
+            self.stop(wait=True)
+
+    def _loop(self) -> None:
+        last_heartbeat = 0.0
+        while not self._stop.is_set():
+            try:
+                now = time.monotonic()
+                if now - last_heartbeat >= self.heartbeat_seconds:
+                    self._heartbeat()
+                    last_heartbeat = now
+                self.check_cancellations()
+                claimed = self._fill_slots()
+            except Exception as e:
+                logger.error(f"Evaluation worker {self.worker_id} loop error: {str(e)}")
+                logger.exception("Exception details:")
+                claimed = 0
+            if not claimed:
+                scheduler.wait_for_submission(self.poll_seconds)
+
+    def check_cancellations(self) -> List[int]:
+        """
+        Stop runs whose jobs were cancelled (POST /evaluations/{job_id}/cancel); returns their leader IDs.
+        A shared-engine group keeps running until every job in it is cancelled. Cancelled translation
+        batches are stopped too.
+        """
+        with self._lock:
+            runs = {leader_id: list(job_ids) for leader_id, job_ids in self._runs.items()}
+            batch_ids = set(self._batches)
+        if not runs and not batch_ids:
+            return []
+        db = SessionLocal()
+        try:
+            cancelled = scheduler.cancelled_jobs(db, job_ids=[job_id for job_ids in runs.values() for job_id in job_ids])
+            cancelled_batches = scheduler.cancelled_batches(db, batch_ids=batch_ids)
+        finally:
+            db.close()
+        if cancelled_batches:
+            from app.core import batch_translation
+        for batch_id in cancelled_batches:
+            logger.info(f"Worker {self.worker_id}: stopping cancelled translation batch {batch_id}")
+            batch_translation.request_cancel(batch_id)
+        stopped = []
+        for leader_id, job_ids in runs.items():
+            if set(job_ids) <= cancelled and not cancellation.is_cancelled(leader_id):
+                logger.info(f"Worker {self.worker_id}: stopping cancelled evaluation job(s) {job_ids}")
+                cancellation.cancel_running(leader_id)
+                stopped.append(leader_id)
+        return stopped
+
+    def _heartbeat(self) -> None:
+        db = SessionLocal()
+        try:
+            # active_jobs on the worker row counts busy slots, a shared-engine group occupies one
+            crud_evaluation_worker.heartbeat(db, worker_id=self.worker_id, active_jobs=self.busy_slots)
+            scheduler.renew_leases(db, worker_id=self.worker_id, job_ids=self.active_jobs)
+            scheduler.renew_batch_leases(db, worker_id=self.worker_id, batch_ids=self.active_batches)
+            scheduler.requeue_expired_leases(db)
+            scheduler.requeue_expired_batches(db)
+            coalescing.resolve_orphans(db)
+            crud_evaluation_worker.mark_stale_offline(db, stale_after_seconds=settings.EVALUATION_LEASE_SECONDS)
+        finally:
+            db.close()
+
+    def _fill_slots(self) -> int:
+        claimed = 0
+        db = SessionLocal()
+        try:
+            while not self._stop.is_set() and self.busy_slots < self.slots:
+                batch_id = scheduler.claim_next_batch(db, worker_id=self.worker_id, labels=self.labels)
+                if batch_id is not None:
+                    with self._lock:
+                        self._batches.add(batch_id)
+                    self._executor.submit(self._run_batch, batch_id)
+                    claimed += 1
+                    continue
+                job_id = scheduler.claim_next_job(db, worker_id=self.worker_id, labels=self.labels)
+                if job_id is None:
+                    break
+                job_ids = scheduler.claim_matrix_siblings(db, worker_id=self.worker_id, job_id=job_id)
+                with self._lock:
+                    self._runs[job_id] = job_ids
+                self._executor.submit(self._run_job, job_id, job_ids)
+                claimed += 1
+        finally:
+            db.close()
+        if claimed:
+            db = SessionLocal()
+            try:
+                crud_evaluation_worker.heartbeat(db, worker_id=self.worker_id, active_jobs=self.busy_slots)
+            finally:
+                db.close()
+        return claimed
+
+    def _run_job(self, job_id: int, job_ids: List[int]) -> None:
+        # Imported here: the evaluation pipeline is heavy and not needed to register the worker
+        from app.core.evaluation import run_evaluation, build_segment_stores
+        from app.core.matrix import run_matrix_group
+        from app.core.segment_regressions import analyze_completed_jobs
+
+        logger.info(f"Worker {self.worker_id}: running evaluation job(s) {job_ids}")
+        try:
+            if len(job_ids) > 1:
+                run_matrix_group(job_ids)
+            else:
+                run_evaluation(job_id)
+        except Exception as e:
+            logger.error(f"Worker {self.worker_id}: evaluation job(s) {job_ids} raised: {str(e)}")
+            logger.exception("Exception details:")
+        finally:
+            with self._lock:
+                self._runs.pop(job_id, None)
+                active_count = len(self._runs) + len(self._batches)
+            db = SessionLocal()
+            try:
+                for finished_job_id in job_ids:
+                    scheduler.release_job(db, job_id=finished_job_id, worker_id=self.worker_id)
+                    coalescing.resolve_followers(db, finished_job_id)
+                crud_evaluation_worker.heartbeat(db, worker_id=self.worker_id, active_jobs=active_count)
+                # Segment stores, chrF and significance of the now completed jobs (and their followers)
+                build_segment_stores(db, job_ids)
+                # Feed engine timeouts, ETAs and shortest-job-first ordering of later jobs
+                throughput.record_completed_jobs(db, job_ids)
+                # Rank segment-level regressions against the previous version's run of the testset
+                analyze_completed_jobs(db, job_ids)
+            except Exception:
+                logger.exception("Exception details:")
+            finally:
+                db.close()
+            cancellation.forget(job_ids)
+            # A slot just freed up, look for more work right away
+            scheduler.notify_job_submitted()
+
+    def _run_batch(self, batch_id: int) -> None:
+        from app.core import batch_translation
+
+        logger.info(f"Worker {self.worker_id}: running translation batch {batch_id}")
+        try:
+            batch_translation.run_batch(batch_id)
+        except Exception as e:
+            logger.error(f"Worker {self.worker_id}: translation batch {batch_id} raised: {str(e)}")
+            logger.exception("Exception details:")
+        finally:
+            with self._lock:
+                self._batches.discard(batch_id)
+                active_count = len(self._runs) + len(self._batches)
+            db = SessionLocal()
+            try:
+                scheduler.release_batch(db, batch_id=batch_id, worker_id=self.worker_id)
+                crud_evaluation_worker.heartbeat(db, worker_id=self.worker_id, active_jobs=active_count)
+            except Exception:
+                logger.exception("Exception details:")
+            finally:
+                db.close()
+            scheduler.notify_job_submitted()
+
+
+# Worker running inside the API process, set on startup
+local_worker: Optional[EvaluationWorker] = None
@@ -1,11 +1,12 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
+import json
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, and_, func
 import logging
 
-from app.db.models import EvaluationJob, ModelVersion, Testset, User
-from app.schemas.evaluation import EvaluationJobCreate, EvaluationStatus
+from app.db.models import EvaluationJob, EvaluationMatrixRun, ModelVersion, Testset, User, SegmentRegression
+from app.schemas.evaluation import EvaluationJobCreate, EvaluationStatus, EvaluationMatrixCreate, EvaluationMode
 
 # Khởi tạo logger cho module này
 logger = logging.getLogger(__name__)
@@ -154,16 +155,41 @@ def get_by_date_range(
         logger.exception("Exception details:")
         raise
 
+def get_ids_by_date_range(
+    db: Session,
+    *,
+    start_date: datetime,
+    end_date: datetime,
+    version_id: Optional[int] = None,
+    status: Optional[EvaluationStatus] = None
+) -> List[int]:
+    """
+    IDs of the evaluation jobs within a date range, without loading the jobs
+    """
+    query = db.query(EvaluationJob.job_id).filter(
+        EvaluationJob.requested_at >= start_date,
+        EvaluationJob.requested_at <= end_date
+    )
+    if version_id is not None:
+        query = query.filter(EvaluationJob.version_id == version_id)
+    if status is not None:
+        query = query.filter(EvaluationJob.status == status)
+    return [job_id for (job_id,) in query]
+
 def create(
     db: Session, 
     *, 
     obj_in: EvaluationJobCreate,
-    user_id: Optional[int] = None
+    user_id: Optional[int] = None,
+    coalesced_into_job_id: Optional[int] = None,
+    predicted_duration_seconds: Optional[float] = None,
+    reuse_translations_from_job_id: Optional[int] = None
 ) -> EvaluationJob:
     """
-    Create a new evaluation job
+    Create a new evaluation job. With coalesced_into_job_id the job is never queued: it shares the run of that job.
+    Sampled jobs (sample_size) are quick looks and never add their scores to the training details.
     """
-    logger.info(f"Creating new evaluation job: version_id={obj_in.version_id}, testset_id={obj_in.testset_id}, user_id={user_id}")
+    logger.info(f"Creating new evaluation job: version_id={obj_in.version_id}, testset_id={obj_in.testset_id}, user_id={user_id}, priority={obj_in.priority.value}")
     
     try:
         db_obj = EvaluationJob(
@@ -171,11 +197,16 @@ def create(
             testset_id=obj_in.testset_id,
             requested_by_user_id=user_id,
             status=EvaluationStatus.PENDING,
-            auto_add_to_details_requested=1 if obj_in.auto_add_to_details else 0,
+            auto_add_to_details_requested=1 if obj_in.auto_add_to_details and not obj_in.sample_size else 0,
             mode_type=obj_in.mode_type,
             sub_mode_type=obj_in.sub_mode_type,
             custom_params=obj_in.custom_params,
-            evaluation_model_type=obj_in.evaluation_model_type or 'finetuned'
+            evaluation_model_type=obj_in.evaluation_model_type or 'finetuned',
+            priority=obj_in.priority.value,
+            coalesced_into_job_id=coalesced_into_job_id,
+            predicted_duration_seconds=predicted_duration_seconds,
+            sample_size=obj_in.sample_size,
+            reuse_translations_from_job_id=reuse_translations_from_job_id
         )
         
         db.add(db_obj)
@@ -190,6 +221,68 @@ def create(
         logger.exception("Exception details:")
         raise
 
+def create_matrix(
+    db: Session,
+    *,
+    obj_in: EvaluationMatrixCreate,
+    cells: List[Tuple[int, int, EvaluationMode, Optional[float]]],
+    user_id: Optional[int] = None
+) -> EvaluationMatrixRun:
+    """
+    Create a matrix run and one PENDING evaluation job per (version, testset, mode, predicted duration) cell in a single transaction
+    """
+    logger.info(f"Creating evaluation matrix run: {len(obj_in.version_ids)} version(s), {len(cells)} job(s), user_id={user_id}, priority={obj_in.priority.value}")
+    
+    try:
+        matrix = EvaluationMatrixRun(
+            requested_by_user_id=user_id,
+            description=obj_in.description,
+            priority=obj_in.priority.value,
+            evaluation_model_type=obj_in.evaluation_model_type or 'finetuned',
+            request=json.dumps(obj_in.model_dump(mode="json"))
+        )
+        db.add(matrix)
+        db.flush()
+        
+        for version_id, testset_id, mode, predicted_duration_seconds in cells:
+            db.add(EvaluationJob(
+                version_id=version_id,
+                testset_id=testset_id,
+                requested_by_user_id=user_id,
+                status=EvaluationStatus.PENDING,
+                auto_add_to_details_requested=1 if obj_in.auto_add_to_details else 0,
+                mode_type=mode.mode_type,
+                sub_mode_type=mode.sub_mode_type,
+                custom_params=mode.custom_params,
+                evaluation_model_type=obj_in.evaluation_model_type or 'finetuned',
+                priority=obj_in.priority.value,
+                matrix_id=matrix.matrix_id,
+                predicted_duration_seconds=predicted_duration_seconds
+            ))
+        
+        db.commit()
+        db.refresh(matrix)
+        
+        logger.info(f"Created evaluation matrix run with ID: {matrix.matrix_id}")
+        return matrix
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error creating evaluation matrix run: {str(e)}")
+        logger.exception("Exception details:")
+        raise
+
+def get_matrix(db: Session, matrix_id: int) -> Optional[EvaluationMatrixRun]:
+    """
+    Get an evaluation matrix run by ID
+    """
+    return db.query(EvaluationMatrixRun).filter(EvaluationMatrixRun.matrix_id == matrix_id).first()
+
+def get_matrix_jobs(db: Session, matrix_id: int) -> List[EvaluationJob]:
+    """
+    Get the evaluation jobs of a matrix run
+    """
+    return db.query(EvaluationJob).filter(EvaluationJob.matrix_id == matrix_id).order_by(EvaluationJob.job_id).all()
+
 def update_status(
     db: Session,
     *,
@@ -211,6 +304,12 @@ def update_status(
             logger.warning(f"Cannot update status: Job {job_id} not found")
             return None
         
+        # A cancelled job keeps its status, whatever the pipeline still running for it reports
+        db.refresh(db_obj)
+        if db_obj.status == EvaluationStatus.CANCELLED.value and status != EvaluationStatus.CANCELLED:
+            logger.info(f"Job {job_id} is cancelled, ignoring status update to {status.value}")
+            return db_obj
+        
         # Update status and log message
         db_obj.status = status
         if log_message is not None:
@@ -221,7 +320,7 @@ def update_status(
             db_obj.processing_started_at = processing_started_at
         if completed_at is not None:
             db_obj.completed_at = completed_at
-        elif status in [EvaluationStatus.COMPLETED, EvaluationStatus.FAILED]:
+        elif status in [EvaluationStatus.COMPLETED, EvaluationStatus.FAILED, EvaluationStatus.CANCELLED]:
             db_obj.completed_at = datetime.now()
         
         # Update additional fields if provided
@@ -244,6 +343,33 @@ def update_status(
         logger.exception("Exception details:")
         raise
 
+def cancel(db: Session, *, job_id: int, log_message: str) -> bool:
+    """
+    Mark a job CANCELLED unless it already finished; returns False if it was not cancellable.
+    Conditional so a job finishing at the same moment is never overwritten.
+    """
+    try:
+        cancelled = db.query(EvaluationJob).filter(
+            EvaluationJob.job_id == job_id,
+            EvaluationJob.status.notin_([
+                EvaluationStatus.COMPLETED.value,
+                EvaluationStatus.FAILED.value,
+                EvaluationStatus.CANCELLED.value
+            ])
+        ).update({
+            EvaluationJob.status: EvaluationStatus.CANCELLED.value,
+            EvaluationJob.log_message: log_message,
+            EvaluationJob.completed_at: datetime.now()
+        }, synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error cancelling job {job_id}: {str(e)}")
+        raise
+    db.expire_all()
+    return bool(cancelled)
+
+
 def get_with_details(db: Session, job_id: int) -> Optional[Dict[str, Any]]:
     """
     Get an evaluation job with additional details from related models
@@ -292,7 +418,21 @@ def get_with_details(db: Session, job_id: int) -> Optional[Dict[str, Any]]:
             "sub_mode_type": result.EvaluationJob.sub_mode_type,
             "custom_params": result.EvaluationJob.custom_params,
             "evaluation_model_type": result.EvaluationJob.evaluation_model_type,
-            "base_model_result": result.EvaluationJob.base_model_result
+            "stage_timings": result.EvaluationJob.stage_timings,
+            "base_model_result": result.EvaluationJob.base_model_result,
+            "priority": result.EvaluationJob.priority,
+            "claimed_by_worker_id": result.EvaluationJob.claimed_by_worker_id,
+            "matrix_id": result.EvaluationJob.matrix_id,
+            "coalesced_into_job_id": result.EvaluationJob.coalesced_into_job_id,
+            "claimed_at": result.EvaluationJob.claimed_at,
+            "predicted_duration_seconds": result.EvaluationJob.predicted_duration_seconds,
+            "sample_size": result.EvaluationJob.sample_size,
+            "sample_result": result.EvaluationJob.sample_result,
+            "reuse_translations_from_job_id": result.EvaluationJob.reuse_translations_from_job_id,
+            "significance": result.EvaluationJob.significance,
+            "segment_regression_summary": result.EvaluationJob.segment_regression_summary,
+            "chrf_score": result.EvaluationJob.chrf_score,
+            "rescored_at": result.EvaluationJob.rescored_at
         }
         
         logger.debug(f"Found detailed evaluation job with ID: {job_id}, status: {result.EvaluationJob.status}")
@@ -331,4 +471,63 @@ def remove(db: Session, *, job_id: int) -> Optional[EvaluationJob]:
     """
     Remove an evaluation job (alias for delete)
     """
-    return delete(db, job_id=job_id) 
\ No newline at end of file
+    return delete(db, job_id=job_id)
+
+# Bound on IN (...) list sizes of the set-based deletes, below SQLite's host parameter limit
+_DELETE_CHUNK_SIZE = 500
+
+def delete_many(db: Session, *, job_ids: List[int]) -> List[Dict[str, Any]]:
+    """
+    Delete evaluation jobs with set-based statements in one transaction. Rows referencing them are
+    handled here as well (their foreign key actions are not enforced on SQLite): segment regressions
+    are deleted, coalescing/reuse/previous-job links are cleared.
+    Returns the deleted jobs with their file paths; files_shared marks jobs whose run is still shared
+    by a coalesced job that is kept, so their files must stay.
+    """
+    ids = sorted(set(job_ids))
+    chunks = [ids[i:i + _DELETE_CHUNK_SIZE] for i in range(0, len(ids), _DELETE_CHUNK_SIZE)]
+    logger.info(f"Deleting {len(ids)} evaluation jobs in {len(chunks)} chunk(s)")
+
+    try:
+        deleted = []
+        for chunk in chunks:
+            deleted.extend({
+                "job_id": job_id,
+                "output_file_path": output_file_path,
+                "base_model_result": base_model_result,
+                "coalesced_into_job_id": coalesced_into_job_id,
+                "files_shared": False
+            } for job_id, output_file_path, base_model_result, coalesced_into_job_id in db.query(
+                EvaluationJob.job_id, EvaluationJob.output_file_path, EvaluationJob.base_model_result, EvaluationJob.coalesced_into_job_id
+            ).filter(EvaluationJob.job_id.in_(chunk)))
+        deleted_ids = {job["job_id"] for job in deleted}
+
+        shared = set()
+        for chunk in chunks:
+            for follower_id, leader_id in db.query(EvaluationJob.job_id, EvaluationJob.coalesced_into_job_id).filter(
+                EvaluationJob.coalesced_into_job_id.in_(chunk)
+            ):
+                if follower_id not in deleted_ids:
+                    shared.add(leader_id)
+        for job in deleted:
+            if job["job_id"] in shared:
+                job["files_shared"] = True
+
+        for chunk in chunks:
+            db.query(SegmentRegression).filter(SegmentRegression.job_id.in_(chunk)).delete(synchronize_session=False)
+            db.query(SegmentRegression).filter(SegmentRegression.previous_job_id.in_(chunk)).update(
+                {SegmentRegression.previous_job_id: None}, synchronize_session=False)
+            for column in (EvaluationJob.coalesced_into_job_id, EvaluationJob.reuse_translations_from_job_id):
+                db.query(EvaluationJob).filter(column.in_(chunk)).update({column: None}, synchronize_session=False)
+            db.query(EvaluationJob).filter(EvaluationJob.job_id.in_(chunk)).delete(synchronize_session=False)
+        db.commit()
+        db.expire_all()
+
+        logger.info(f"Deleted {len(deleted)} evaluation jobs")
+        return deleted
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error deleting {len(ids)} jobs: {str(e)}")
+        logger.exception("Exception details:")
+        raise
+
@@ -0,0 +1,118 @@
+from typing import List, Optional
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+import json
+import logging
+
+from app.db.models import EvaluationWorker
+
+# Khởi tạo logger cho module này
+logger = logging.getLogger(__name__)
+
+def get(db: Session, worker_id: str) -> Optional[EvaluationWorker]:
+    """
+    Get an evaluation worker by ID
+    """
+    return db.query(EvaluationWorker).filter(EvaluationWorker.worker_id == worker_id).first()
+
+def get_multi(db: Session, *, online_only: bool = False) -> List[EvaluationWorker]:
+    """
+    List registered evaluation workers, most recent heartbeat first
+    """
+    query = db.query(EvaluationWorker)
+    if online_only:
+        query = query.filter(EvaluationWorker.status == "online")
+    return query.order_by(EvaluationWorker.last_heartbeat_at.desc()).all()
+
+def register(
+    db: Session,
+    *,
+    worker_id: str,
+    hostname: str,
+    pid: Optional[int],
+    capacity: int,
+    labels: List[str]
+) -> EvaluationWorker:
+    """
+    Register a worker, or refresh its row when a worker with the same ID restarts
+    """
+    logger.info(f"Registering evaluation worker {worker_id} on {hostname}: capacity={capacity}, labels={labels}")
+    try:
+        now = datetime.utcnow()
+        db_obj = get(db, worker_id)
+        if not db_obj:
+            db_obj = EvaluationWorker(worker_id=worker_id)
+        db_obj.hostname = hostname
+        db_obj.pid = pid
+        db_obj.status = "online"
+        db_obj.capacity = capacity
+        db_obj.active_jobs = 0
+        db_obj.labels = json.dumps(sorted(labels))
+        db_obj.started_at = now
+        db_obj.last_heartbeat_at = now
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error registering evaluation worker {worker_id}: {str(e)}")
+        logger.exception("Exception details:")
+        raise
+
+def heartbeat(db: Session, *, worker_id: str, active_jobs: int) -> None:
+    """
+    Record a heartbeat and the number of jobs the worker is currently running
+    """
+    try:
+        db.query(EvaluationWorker).filter(EvaluationWorker.worker_id == worker_id).update(
+            {
+                EvaluationWorker.last_heartbeat_at: datetime.utcnow(),
+                EvaluationWorker.active_jobs: active_jobs,
+                EvaluationWorker.status: "online"
+            },
+            synchronize_session=False
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error recording heartbeat for worker {worker_id}: {str(e)}")
+        raise
+
+def mark_offline(db: Session, *, worker_id: str) -> None:
+    """
+    Mark a worker offline (clean shutdown)
+    """
+    try:
+        db.query(EvaluationWorker).filter(EvaluationWorker.worker_id == worker_id).update(
+            {EvaluationWorker.status: "offline", EvaluationWorker.active_jobs: 0},
+            synchronize_session=False
+        )
+        db.commit()
+        logger.info(f"Evaluation worker {worker_id} marked offline")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error marking worker {worker_id} offline: {str(e)}")
+        raise
+
+def mark_stale_offline(db: Session, *, stale_after_seconds: int) -> int:
+    """
+    Mark workers whose last heartbeat is older than stale_after_seconds as offline
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after_seconds)
+    try:
+        updated = db.query(EvaluationWorker).filter(
+            EvaluationWorker.status == "online",
+            EvaluationWorker.last_heartbeat_at < cutoff
+        ).update(
+            {EvaluationWorker.status: "offline", EvaluationWorker.active_jobs: 0},
+            synchronize_session=False
+        )
+        db.commit()
+        if updated:
+            logger.warning(f"Marked {updated} evaluation worker(s) offline after missing heartbeats")
+        return updated
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error marking stale workers offline: {str(e)}")
+        raise
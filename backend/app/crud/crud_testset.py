@@ -2,11 +2,11 @@ from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 import os
-import shutil
 from fastapi import UploadFile
 from app.db.models import Testset, EvaluationJob, TrainingResult
 from app.schemas.testset import TestsetCreate, TestsetUpdate
 from app.core.config import settings
+from app.core import testset_ingest, segment_index, testset_patch
 
 
 def count_testsets(
@@ -92,6 +92,9 @@ def delete_testset(db: Session, testset_id: int) -> bool:
         return False
     
     # Delete associated files if they exist
+    for path in (db_testset.source_file_path_on_server, db_testset.target_file_path_on_server):
+        testset_ingest.remove_index(path)
+        testset_patch.remove_history(path)
     if db_testset.source_file_path_on_server and os.path.exists(db_testset.source_file_path_on_server):
         try:
             os.remove(db_testset.source_file_path_on_server)
@@ -108,10 +111,14 @@ def delete_testset(db: Session, testset_id: int) -> bool:
     testset_dir = os.path.join(str(settings.testsets_storage_path), str(testset_id))
     if os.path.exists(testset_dir):
         try:
+            index_dir = os.path.join(testset_dir, testset_ingest.INDEX_DIR)
+            if os.path.isdir(index_dir):
+                os.rmdir(index_dir)
             os.rmdir(testset_dir)  # Will only succeed if directory is empty
         except OSError:
             pass  # Directory not empty, ignore
 
+    segment_index.remove(db, testset_id)
     db.delete(db_testset)
     db.commit()
     return True
@@ -119,7 +126,8 @@ def delete_testset(db: Session, testset_id: int) -> bool:
 
 def save_uploaded_file(file: UploadFile, testset_id: int, file_type: str) -> tuple:
     """
-    Save an uploaded file to the appropriate directory and return the filename and path
+    Stream an uploaded file through the ingest pipeline (UTF-8, NFC, statistics, line index) into
+    the testset directory. The file is staged next to its final path until testset_ingest.commit().
     
     Args:
         file: The uploaded file
@@ -127,7 +135,7 @@ def save_uploaded_file(file: UploadFile, testset_id: int, file_type: str) -> tup
         file_type: Either 'source' or 'target'
     
     Returns:
-        tuple: (original_filename, server_path)
+        tuple: (original_filename, ingested file); raises testset_ingest.IngestError for unusable files
     """
     # Use the new testsets storage path
     testsets_dir = str(settings.testsets_storage_path)
@@ -143,8 +151,7 @@ def save_uploaded_file(file: UploadFile, testset_id: int, file_type: str) -> tup
     # Create server path
     server_path = os.path.join(testset_dir, original_filename)
     
-    # Save file
-    with open(server_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Normalize and index in one pass
+    ingested = testset_ingest.ingest(file.file, server_path)
     
-    return original_filename, server_path 
\ No newline at end of file
+    return original_filename, ingested 
\ No newline at end of file
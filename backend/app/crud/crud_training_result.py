@@ -95,6 +95,11 @@ def update_training_result(db: Session, result_id: int, training_result: Trainin
         update_data = training_result
     else:
         update_data = training_result.dict(exclude_unset=True)
+
+    # A significance test only holds for the scores it was computed with
+    score_fields = {"base_model_bleu", "base_model_comet", "finetuned_model_bleu", "finetuned_model_comet"}
+    if score_fields & set(update_data) and "significance" not in update_data:
+        update_data = {**update_data, "significance": None}
         
     return update(db=db, db_obj=db_obj, obj_in=update_data)
 
@@ -0,0 +1,105 @@
+from typing import List, Optional
+from datetime import datetime
+import os
+from sqlalchemy.orm import Session
+import logging
+
+from app.db.models import TranslationBatch
+from app.schemas.evaluation import EvaluationStatus
+from app.core import batch_translation
+from app.core.scheduler import TERMINAL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+
+def get(db: Session, batch_id: int) -> Optional[TranslationBatch]:
+    return db.query(TranslationBatch).filter(TranslationBatch.batch_id == batch_id).first()
+
+
+def get_multi(db: Session, *, user_id: Optional[int] = None, limit: int = 50) -> List[TranslationBatch]:
+    """
+    Most recent batches, of one user if user_id is given
+    """
+    query = db.query(TranslationBatch)
+    if user_id is not None:
+        query = query.filter(TranslationBatch.requested_by_user_id == user_id)
+    return query.order_by(TranslationBatch.batch_id.desc()).limit(limit).all()
+
+
+def create(db: Session, *, version_id: int, user_id: Optional[int], model_type: str, mode_type: Optional[str],
+           sub_mode_type: Optional[str], custom_params: Optional[str], original_filename: Optional[str]) -> TranslationBatch:
+    """
+    Insert a batch with its file paths; the source file is written by the caller before the batch is queued
+    """
+    try:
+        batch = TranslationBatch(
+            version_id=version_id,
+            requested_by_user_id=user_id,
+            model_type=model_type,
+            mode_type=mode_type,
+            sub_mode_type=sub_mode_type,
+            custom_params=custom_params,
+            # Not claimable until the upload is stored
+            status=EvaluationStatus.PREPARING_SETUP.value,
+            original_filename=original_filename,
+            source_file_path="",
+            output_file_path=""
+        )
+        db.add(batch)
+        db.flush()
+        directory = batch_translation.batch_dir(batch.batch_id)
+        batch.source_file_path = os.path.join(directory, batch_translation.SOURCE_FILE)
+        batch.output_file_path = os.path.join(directory, batch_translation.OUTPUT_FILE)
+        db.commit()
+        db.refresh(batch)
+        return batch
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error creating translation batch: {str(e)}")
+        raise
+
+
+def queue(db: Session, batch: TranslationBatch, segments: int) -> TranslationBatch:
+    batch.segments = segments
+    batch.status = EvaluationStatus.PENDING.value
+    batch.requested_at = datetime.utcnow()
+    db.commit()
+    db.refresh(batch)
+    return batch
+
+
+def cancel(db: Session, *, batch_id: int, error_message: str) -> bool:
+    """
+    Mark a batch CANCELLED unless it already finished; conditional like crud_evaluation.cancel
+    """
+    try:
+        cancelled = db.query(TranslationBatch).filter(
+            TranslationBatch.batch_id == batch_id,
+            TranslationBatch.status.notin_(TERMINAL_STATUSES)
+        ).update({
+            TranslationBatch.status: EvaluationStatus.CANCELLED.value,
+            TranslationBatch.error_message: error_message,
+            TranslationBatch.completed_at: datetime.utcnow()
+        }, synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error cancelling translation batch {batch_id}: {str(e)}")
+        raise
+    db.expire_all()
+    return bool(cancelled)
+
+
+def delete(db: Session, batch: TranslationBatch) -> str:
+    """
+    Delete a batch row; returns its folder for the caller to remove
+    """
+    directory = batch_translation.batch_dir(batch.batch_id)
+    try:
+        db.delete(batch)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Database error deleting translation batch {batch.batch_id}: {str(e)}")
+        raise
+    return directory
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, UniqueConstraint, Index, Date, Float, func, Boolean, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, Text, ForeignKey, UniqueConstraint, Index, Date, Float, func, Boolean, DateTime
 from sqlalchemy.orm import relationship
 from .database import Base
 from datetime import datetime
@@ -84,6 +84,10 @@ class Testset(Base):
     source_file_path_on_server = Column(String)
     target_file_path_on_server = Column(String)
     
+    # Upload ingest (app/core/testset_ingest.py): line count and JSON of per-file statistics
+    segments = Column(Integer, nullable=True)
+    ingest_stats = Column(Text, nullable=True)
+    
     created_at = Column(Text, server_default=func.now())
     updated_at = Column(Text, server_default=func.now(), onupdate=func.now())
 
@@ -101,6 +105,8 @@ class TrainingResult(Base):
     base_model_comet = Column(Float)
     finetuned_model_bleu = Column(Float)
     finetuned_model_comet = Column(Float)
+    # JSON: finetuned vs base paired bootstrap / approximate randomization results (app/core/significance.py)
+    significance = Column(Text, nullable=True)
     training_details_notes = Column(Text)
     created_at = Column(Text, server_default=func.now())
     updated_at = Column(Text, server_default=func.now(), onupdate=func.now())
@@ -137,11 +143,14 @@ class EvaluationJob(Base):
     status = Column(String(50), default="PENDING")
     bleu_score = Column(Float, nullable=True)
     comet_score = Column(Float, nullable=True)
+    chrf_score = Column(Float, nullable=True)
     
     # Base model results
     base_model_bleu_score = Column(Float, nullable=True)
     base_model_comet_score = Column(Float, nullable=True)
     base_model_output_file_path = Column(String(500), nullable=True)
+    base_model_result = Column(Text, nullable=True)  # JSON: base model scores/output when evaluation_model_type = 'both'
+    significance = Column(Text, nullable=True)  # JSON: finetuned vs base significance tests when evaluation_model_type = 'both'
     
     output_file_path = Column(String(500), nullable=True)
     log_message = Column(Text, nullable=True)
@@ -158,6 +167,37 @@ class EvaluationJob(Base):
     custom_params = Column(Text, nullable=True)
     evaluation_model_type = Column(String(20), nullable=True)  # 'base', 'finetuned', 'both'
     
+    # Performance instrumentation: JSON of per-stage durations (seconds) and engine throughput
+    stage_timings = Column(Text, nullable=True)
+    
+    # Matrix run this job belongs to; jobs of one matrix sharing a model and mode run through one engine session
+    matrix_id = Column(Integer, ForeignKey("evaluation_matrix_runs.matrix_id", ondelete="SET NULL"), nullable=True, index=True)
+    
+    # Single-flight coalescing: job whose run this one shares instead of running the engine itself
+    coalesced_into_job_id = Column(Integer, ForeignKey("evaluation_jobs.job_id", ondelete="SET NULL"), nullable=True, index=True)
+    
+    # Scheduling: priority class ('interactive', 'release_blocking', 'batch')
+    priority = Column(String(20), nullable=False, default="interactive", index=True)
+    # Predicted processing time at submission, from historical engine throughput (app/core/throughput.py)
+    predicted_duration_seconds = Column(Float, nullable=True)
+    
+    # Sampled quick-look runs (app/core/sampling.py): segments to sample, JSON of sample info and confidence intervals
+    sample_size = Column(Integer, nullable=True)
+    sample_result = Column(Text, nullable=True)
+    # Full run upgraded from a sampled job, reusing the translations that job already produced
+    reuse_translations_from_job_id = Column(Integer, ForeignKey("evaluation_jobs.job_id", ondelete="SET NULL"), nullable=True, index=True)
+    
+    # JSON: segment-level comparison with the previous version's job on the same testset (app/core/segment_regressions.py)
+    segment_regression_summary = Column(Text, nullable=True)
+    
+    # Last historical rescoring of the job's surviving outputs (app/core/rescoring.py)
+    rescored_at = Column(DateTime, nullable=True)
+    
+    # Worker lease: set atomically when a worker claims the job, renewed by its heartbeat
+    claimed_by_worker_id = Column(String(255), nullable=True, index=True)
+    claimed_at = Column(DateTime, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True, index=True)
+    
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -165,6 +205,24 @@ class EvaluationJob(Base):
     model_version = relationship("ModelVersion", back_populates="evaluation_jobs")
     testset = relationship("Testset", back_populates="evaluation_jobs")
     requested_by = relationship("User", foreign_keys=[requested_by_user_id])
+    matrix_run = relationship("EvaluationMatrixRun", back_populates="jobs")
+    segment_regressions = relationship("SegmentRegression", foreign_keys="SegmentRegression.job_id", cascade="all, delete-orphan")
+
+class EvaluationMatrixRun(Base):
+    __tablename__ = "evaluation_matrix_runs"
+    
+    matrix_id = Column(Integer, primary_key=True, index=True)
+    requested_by_user_id = Column(Integer, ForeignKey("users.user_id"), nullable=True)
+    description = Column(Text, nullable=True)
+    priority = Column(String(20), nullable=False, default="batch")
+    evaluation_model_type = Column(String(20), nullable=True)
+    request = Column(Text, nullable=True)  # JSON: submitted versions, testsets and modes
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    jobs = relationship("EvaluationJob", back_populates="matrix_run")
+    requested_by = relationship("User", foreign_keys=[requested_by_user_id])
 
 class SQEResult(Base):
     __tablename__ = "sqe_results"
@@ -194,4 +252,130 @@ class SQEResult(Base):
     tested_by = relationship("User", foreign_keys=[tested_by_user_id])
     
     # Ensure one SQE result per model version
-    __table_args__ = (UniqueConstraint('version_id', name='uq_sqe_result_version'),) 
\ No newline at end of file
+    __table_args__ = (UniqueConstraint('version_id', name='uq_sqe_result_version'),) 
+
+class EvaluationWorker(Base):
+    __tablename__ = "evaluation_workers"
+    
+    worker_id = Column(String(255), primary_key=True, index=True)
+    hostname = Column(String(255), nullable=False)
+    pid = Column(Integer, nullable=True)
+    status = Column(String(20), nullable=False, default="online")  # 'online', 'offline'
+    
+    # Advertised capacity: concurrent evaluation slots and labels (language packs available on the host)
+    capacity = Column(Integer, nullable=False, default=1)
+    active_jobs = Column(Integer, nullable=False, default=0)
+    labels = Column(Text, nullable=True)  # JSON list, "*" accepts every language pair
+    
+    started_at = Column(DateTime, default=datetime.utcnow)
+    last_heartbeat_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class EngineThroughputStat(Base):
+    __tablename__ = "engine_throughput_stats"
+    
+    stat_id = Column(Integer, primary_key=True, index=True)
+    # Key: language pair, mode ("<mode_type>/<sub_mode_type>") and model size class (log2 of the model file size in MB)
+    lang_pair_id = Column(Integer, ForeignKey("language_pairs.lang_pair_id", ondelete="CASCADE"), nullable=False)
+    mode_key = Column(String(255), nullable=False, default="/")
+    model_size_class = Column(Integer, nullable=False, default=-1)
+    
+    # Exponentially weighted averages over completed engine runs
+    samples = Column(Integer, nullable=False, default=0)
+    segments_per_second = Column(Float, nullable=False)
+    overhead_seconds = Column(Float, nullable=False, default=0.0)  # Job time outside the engine (setup, scoring)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint('lang_pair_id', 'mode_key', 'model_size_class', name='uq_engine_throughput_stat_key'),
+    )
+
+class SegmentRegression(Base):
+    __tablename__ = "segment_regressions"
+    
+    regression_id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("evaluation_jobs.job_id", ondelete="CASCADE"), nullable=False)
+    previous_job_id = Column(Integer, ForeignKey("evaluation_jobs.job_id", ondelete="SET NULL"), nullable=True)
+    
+    # 'regression' or 'improvement'; rank 1 is the largest change in that direction
+    kind = Column(String(20), nullable=False)
+    rank = Column(Integer, nullable=False)
+    segment_index = Column(Integer, nullable=False)  # 0-based testset line
+    
+    # Change of the ranking metric ('comet' when both jobs have per-segment COMET, else 'chrf')
+    metric = Column(String(20), nullable=False)
+    delta = Column(Float, nullable=False)
+    chrf = Column(Float, nullable=False)
+    previous_chrf = Column(Float, nullable=False)
+    comet = Column(Float, nullable=True)
+    previous_comet = Column(Float, nullable=True)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ix_segment_regressions_job_kind_rank', 'job_id', 'kind', 'rank'),
+    )
+
+
+class TestsetSegmentHash(Base):
+    __tablename__ = "testset_segment_hashes"
+    
+    # Global index of normalized testset segments (app/core/segment_index.py); empty lines are not indexed
+    testset_id = Column(Integer, ForeignKey("testsets.testset_id", ondelete="CASCADE"), primary_key=True)
+    file_type = Column(String(10), primary_key=True)  # 'source' or 'target'
+    segment_index = Column(Integer, primary_key=True)  # 0-based testset line
+    segment_hash = Column(BigInteger, nullable=False)  # testset_ingest.segment_hash as signed 64-bit
+    
+    __table_args__ = (
+        Index('ix_testset_segment_hashes_hash', 'segment_hash', 'file_type', 'testset_id'),
+    )
+
+
+class TestsetSegmentBucket(Base):
+    __tablename__ = "testset_segment_buckets"
+    
+    # MinHash LSH buckets of the same segments, one per band: segments sharing a bucket are near-duplicate candidates
+    testset_id = Column(Integer, ForeignKey("testsets.testset_id", ondelete="CASCADE"), primary_key=True)
+    file_type = Column(String(10), primary_key=True)
+    segment_index = Column(Integer, primary_key=True)
+    band = Column(Integer, primary_key=True)
+    bucket = Column(BigInteger, nullable=False)
+    
+    __table_args__ = (
+        Index('ix_testset_segment_buckets_bucket', 'bucket', 'file_type', 'testset_id'),
+    )
+
+
+class TranslationBatch(Base):
+    __tablename__ = "translation_batches"
+    
+    # File-based direct translation (app/core/batch_translation.py): queued for the evaluation workers, no testset or job
+    batch_id = Column(Integer, primary_key=True, index=True)
+    version_id = Column(Integer, ForeignKey("model_versions.version_id", ondelete="CASCADE"), nullable=False, index=True)
+    requested_by_user_id = Column(Integer, ForeignKey("users.user_id"), nullable=True, index=True)
+    model_type = Column(String(20), nullable=False, default="finetuned")  # 'base' or 'finetuned'
+    mode_type = Column(String(100), nullable=True)
+    sub_mode_type = Column(String(100), nullable=True)
+    custom_params = Column(Text, nullable=True)
+    
+    status = Column(String(50), nullable=False, default="PENDING", index=True)
+    original_filename = Column(String(255), nullable=True)
+    source_file_path = Column(String(500), nullable=False)
+    output_file_path = Column(String(500), nullable=False)
+    segments = Column(Integer, nullable=False, default=0)
+    # Leading lines of output_file_path that are final; readers stream them while the batch runs
+    translated_segments = Column(Integer, nullable=False, default=0)
+    cached_segments = Column(Integer, nullable=False, default=0)
+    error_message = Column(Text, nullable=True)
+    
+    requested_at = Column(DateTime, default=datetime.utcnow)
+    processing_started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    
+    # Worker lease, as on evaluation_jobs
+    claimed_by_worker_id = Column(String(255), nullable=True, index=True)
+    claimed_at = Column(DateTime, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True, index=True)
+    
+    model_version = relationship("ModelVersion")
+    requested_by = relationship("User", foreign_keys=[requested_by_user_id])
@@ -1,5 +1,6 @@
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import logging
 import os
 import time
@@ -13,10 +14,9 @@ import sys
 
 from app.api.v1.api import api_router
 from app.core.config import settings
-from app.db.database import get_db
-from app.crud import crud_evaluation
-from app.schemas.evaluation import EvaluationStatus
-from app.core.evaluation import run_evaluation
+from app.core import worker as evaluation_worker
+from app.core import file_gc, retention
+from app.core.metrics import registry as metrics_registry, HTTP_REQUEST_DURATION
 
 # Cấu hình logging chuyên nghiệp
 def setup_logging():
@@ -206,14 +206,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """
+    Record HTTP request latency per route template for /metrics
+    """
+    start_time = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - start_time,
+            method=request.method,
+            route=route_path,
+            status_code=status_code
+        )
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 @app.on_event("startup")
 async def startup_event():
     """
-    Process any pending evaluation jobs when server starts
+    Start the local evaluation worker; it picks up PENDING jobs left from before the restart
     """
-    logger.info("Starting server, checking for pending evaluation jobs...")
+    logger.info("Starting server...")
     
     # Setup log cleanup cronjob
     if setup_logs_cleanup_cronjob():
@@ -221,36 +242,47 @@ async def startup_event():
     else:
         logger.warning("Failed to setup log cleanup cronjob")
     
-    background_tasks = BackgroundTasks()
+    # Finish removing the files of jobs deleted before the restart
+    try:
+        file_gc.sweep_tombstones()
+    except Exception as e:
+        logger.warning(f"Failed to sweep file GC tombstones: {str(e)}")
+    
+    if settings.RETENTION_ENABLED:
+        retention.start()
+    
+    if not settings.EVALUATION_LOCAL_WORKER_ENABLED:
+        logger.info("Local evaluation worker disabled, evaluation jobs are run by standalone workers")
+        return
     
-    # Get all PENDING jobs
-    db: Session = next(get_db())
-    pending_jobs = []  # Initialize the variable
     try:
-        pending_jobs = crud_evaluation.get_multi(
-            db=db, 
-            status=EvaluationStatus.PENDING
-        )
-        
-        # Add each job to background tasks
-        if pending_jobs:
-            logger.info(f"Found {len(pending_jobs)} pending evaluation jobs")
-            for job in pending_jobs:
-                logger.info(f"Scheduling processing for job_id: {job.job_id}")
-                background_tasks.add_task(run_evaluation, job.job_id)
-        else:
-            logger.info("No pending evaluation jobs found")
+        evaluation_worker.local_worker = evaluation_worker.EvaluationWorker()
+        evaluation_worker.local_worker.start()
     except Exception as e:
-        logger.error(f"Error processing pending jobs: {str(e)}")
+        logger.error(f"Failed to start local evaluation worker: {str(e)}")
         logger.exception("Details of the error:")
-    finally:
-        db.close()
-    
-    # Execute the background tasks
-    if pending_jobs:
-        await background_tasks()
-        logger.info("All pending jobs have been scheduled for processing")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Stop claiming evaluation jobs; running jobs are requeued by other workers once their lease expires.
+    Stops the retention passes too.
+    """
+    retention.stop()
+    if evaluation_worker.local_worker:
+        evaluation_worker.local_worker.stop(wait=False)
+        evaluation_worker.local_worker = None
 
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to NMT Release Management System API"} 
\ No newline at end of file
+    return {"message": "Welcome to NMT Release Management System API"}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """
+    Prometheus text exposition of pipeline, engine, DB and HTTP metrics
+    """
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,5 +1,5 @@
-from typing import Optional, List
-from pydantic import BaseModel
+from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, Field
 from datetime import datetime
 from enum import Enum
 
@@ -11,6 +11,12 @@ class EvaluationStatus(str, Enum):
     CALCULATING_METRICS = "CALCULATING_METRICS"
     COMPLETED = "COMPLETED"
     FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+
+class EvaluationPriority(str, Enum):
+    INTERACTIVE = "interactive"
+    RELEASE_BLOCKING = "release_blocking"
+    BATCH = "batch"
 
 class EvaluationJobCreate(BaseModel):
     version_id: int
@@ -20,6 +26,9 @@ class EvaluationJobCreate(BaseModel):
     sub_mode_type: Optional[str] = None
     custom_params: Optional[str] = None
     evaluation_model_type: Optional[str] = "finetuned"  # Options: "base", "finetuned", "both"
+    priority: EvaluationPriority = EvaluationPriority.INTERACTIVE
+    allow_coalescing: bool = True  # False forces a fresh engine run even if an identical job exists
+    sample_size: Optional[int] = Field(None, ge=10)  # Quick look: score a stratified sample of this many segments, never added to details
 
 class DirectTranslationRequest(BaseModel):
     version_id: int
@@ -32,13 +41,36 @@ class DirectTranslationRequest(BaseModel):
 class DirectTranslationResponse(BaseModel):
     translated_text: str
     status: str
+    segments: Optional[int] = None
+    cached_segments: Optional[int] = None  # Segments served from the translation cache instead of the engine
+
+# File-based translation batch (app/core/batch_translation.py)
+class TranslationBatchStatus(BaseModel):
+    batch_id: int
+    version_id: int
+    model_type: str
+    mode_type: Optional[str] = None
+    sub_mode_type: Optional[str] = None
+    status: str
+    original_filename: Optional[str] = None
+    segments: int
+    translated_segments: int  # Leading segments already streamable and in the output file
+    cached_segments: int
+    progress_percentage: int
+    queue_position: Optional[int] = None
+    error_message: Optional[str] = None
+    requested_at: Optional[datetime] = None
+    processing_started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
 
 class EvaluationResultData(BaseModel):
     bleu_score: float
     comet_score: float
+    chrf_score: Optional[float] = None
     output_file_generated_path: Optional[str] = None
     added_to_details: bool
     base_model_result: Optional[dict] = None  # To store base model results when both models are evaluated
+    significance: Optional[Dict[str, Any]] = None  # Finetuned vs base: score deltas with CIs and p-values per metric
 
 class EvaluationJobStatus(BaseModel):
     job_id: int
@@ -52,11 +84,26 @@ class EvaluationJobStatus(BaseModel):
     sub_mode_type: Optional[str] = None
     custom_params: Optional[str] = None
     evaluation_model_type: Optional[str] = None
+    stage_timings: Optional[Dict[str, Any]] = None  # Per-stage durations (seconds) and engine throughput
+    priority: Optional[EvaluationPriority] = None
+    matrix_id: Optional[int] = None
+    queue_position: Optional[int] = None  # 1 = next to start, only while PENDING
+    estimated_start_at: Optional[datetime] = None  # UTC, only while PENDING and workers are online
+    predicted_duration_seconds: Optional[float] = None  # From historical engine throughput, None without history
+    estimated_completion_at: Optional[datetime] = None  # UTC, while PENDING or running
+    worker_id: Optional[str] = None
+    coalesced_into_job_id: Optional[int] = None  # Identical job whose run and results this job shares
+    reused_from_history: Optional[bool] = None  # Set on submit: results served from an earlier completed job
+    sample_size: Optional[int] = None
+    sample_result: Optional[Dict[str, Any]] = None  # Sampled runs: sample size and bootstrap confidence intervals per model type
+    reuse_translations_from_job_id: Optional[int] = None  # Sampled job whose translations this full run reuses
+    segment_regression_summary: Optional[Dict[str, Any]] = None  # Segment-level comparison with the previous version's run
 
 class EvaluationJobBase(BaseModel):
     status: EvaluationStatus
     bleu_score: Optional[float] = None
     comet_score: Optional[float] = None
+    chrf_score: Optional[float] = None
     output_file_path: Optional[str] = None
     log_message: Optional[str] = None
     auto_add_to_details_requested: bool
@@ -72,6 +119,17 @@ class EvaluationJobBase(BaseModel):
     base_model_bleu_score: Optional[float] = None
     base_model_comet_score: Optional[float] = None
     base_model_output_file_path: Optional[str] = None
+    stage_timings: Optional[Dict[str, Any]] = None
+    priority: Optional[EvaluationPriority] = None
+    matrix_id: Optional[int] = None
+    coalesced_into_job_id: Optional[int] = None
+    predicted_duration_seconds: Optional[float] = None
+    sample_size: Optional[int] = None
+    sample_result: Optional[Dict[str, Any]] = None
+    reuse_translations_from_job_id: Optional[int] = None
+    significance: Optional[Dict[str, Any]] = None
+    segment_regression_summary: Optional[Dict[str, Any]] = None
+    rescored_at: Optional[datetime] = None
 
 class EvaluationJobInDBBase(EvaluationJobBase):
     job_id: int
@@ -100,6 +158,98 @@ class PaginatedEvaluationJobs(BaseModel):
     size: int
     pages: int
 
+# Matrix runs: versions x testsets x modes
+class EvaluationMode(BaseModel):
+    mode_type: Optional[str] = None
+    sub_mode_type: Optional[str] = None
+    custom_params: Optional[str] = None
+
+class EvaluationMatrixCreate(BaseModel):
+    version_ids: List[int]
+    testset_ids: Optional[List[int]] = None  # Default: every testset of each version's language pair
+    modes: Optional[List[EvaluationMode]] = None  # Default: engine default mode only
+    evaluation_model_type: Optional[str] = "finetuned"  # Options: "base", "finetuned", "both"
+    auto_add_to_details: bool = True
+    priority: EvaluationPriority = EvaluationPriority.BATCH
+    description: Optional[str] = None
+
+class EvaluationMatrixJob(BaseModel):
+    job_id: int
+    version_id: int
+    testset_id: int
+    mode_type: Optional[str] = None
+    sub_mode_type: Optional[str] = None
+    custom_params: Optional[str] = None
+    status: EvaluationStatus
+    bleu_score: Optional[float] = None
+    comet_score: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+class EvaluationMatrixStatus(BaseModel):
+    matrix_id: int
+    description: Optional[str] = None
+    priority: Optional[EvaluationPriority] = None
+    evaluation_model_type: Optional[str] = None
+    created_at: datetime
+    total_jobs: int
+    status_counts: Dict[str, int]
+    engine_groups: int  # Engine sessions needed: one per (version, mode)
+    jobs: List[EvaluationMatrixJob]
+
+# Segment-level metrics of a subset of a job's output (app/core/segment_store.py)
+class SegmentSubsetRequest(BaseModel):
+    model_type: str = "finetuned"  # "finetuned" or "base"
+    indices: Optional[List[int]] = None  # 0-based testset line numbers, all segments if omitted
+
+class SegmentSubsetMetrics(BaseModel):
+    job_id: int
+    model_type: str
+    total_segments: int
+    segments: int
+    bleu_score: Optional[float] = None
+    chrf_score: Optional[float] = None
+    comet_score: Optional[float] = None
+    tokens: Dict[str, int]  # Whitespace token counts of source, hypothesis and reference
+
+# Ranked segment-level changes against the previous version (app/core/segment_regressions.py)
+class SegmentRegressionItem(BaseModel):
+    rank: int
+    kind: str  # 'regression' or 'improvement'
+    segment_index: int
+    metric: str  # 'comet' or 'chrf'
+    delta: float
+    chrf: float
+    previous_chrf: float
+    comet: Optional[float] = None
+    previous_comet: Optional[float] = None
+    source: Optional[str] = None
+    reference: Optional[str] = None
+    output: Optional[str] = None
+    previous_output: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class PaginatedSegmentRegressions(BaseModel):
+    job_id: int
+    previous_job_id: Optional[int] = None
+    summary: Optional[Dict[str, Any]] = None
+    items: List[SegmentRegressionItem]
+    total: int
+    page: int
+    size: int
+    pages: int
+
+# Historical rescoring backfill (app/core/rescoring.py)
+class RescoringRequest(BaseModel):
+    metrics: List[str] = ["bleu", "chrf"]  # Any of "bleu", "chrf", "comet"
+    workers: Optional[int] = Field(None, ge=1)  # Scoring processes, RESCORING_WORKERS if omitted
+    batch_size: Optional[int] = Field(None, ge=1)  # Jobs per checkpointed DB batch
+    max_outputs_per_second: Optional[float] = Field(None, ge=0)  # 0 = unlimited
+    run_id: Optional[str] = None  # Resume this run from its checkpoint
+
 # Admin deletion schemas
 class BulkDeleteRequest(BaseModel):
     job_ids: List[int]
@@ -113,4 +263,6 @@ class DateRangeDeleteRequest(BaseModel):
 class DeleteResponse(BaseModel):
     deleted_count: int
     message: str
-    failed_deletions: Optional[List[dict]] = None  # List of jobs that failed to delete 
\ No newline at end of file
+    failed_deletions: Optional[List[dict]] = None  # List of jobs that failed to delete
+    tombstones: int = 0  # Files and folders of the deleted jobs queued for background removal
+    gc_id: Optional[str] = None  # File GC handle, progress at GET /evaluations/gc/{gc_id} 
\ No newline at end of file
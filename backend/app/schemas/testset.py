@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional, List
+import json
+from pydantic import BaseModel, validator
+from typing import Any, Dict, Optional, List
 
 class TestsetBase(BaseModel):
     lang_pair_id: int
@@ -25,6 +26,18 @@ class TestsetInDBBase(TestsetBase):
     target_file_path_on_server: Optional[str] = None
     created_at: str
     updated_at: str
+    # Set by the ingest pipeline at upload (app/core/testset_ingest.py): line count and per-file statistics
+    segments: Optional[int] = None
+    ingest_stats: Optional[Dict[str, Any]] = None
+
+    @validator('ingest_stats', pre=True)
+    def parse_ingest_stats(cls, value):
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except ValueError:
+                return None
+        return value
 
     class Config:
         from_attributes = True
@@ -32,6 +45,19 @@ class TestsetInDBBase(TestsetBase):
 class Testset(TestsetInDBBase):
     pass 
 
+class TestsetLineEdit(BaseModel):
+    # 'replace' lines [start, end) with lines, 'insert' lines before start, 'delete' lines [start, end);
+    # positions refer to the file at base_revision, before any edit of the patch
+    op: str
+    start: int
+    end: Optional[int] = None
+    lines: List[str] = []
+
+class TestsetPatch(BaseModel):
+    # Revision the edits were made against (409 if the file changed since); None applies to the current one
+    base_revision: Optional[int] = None
+    edits: List[TestsetLineEdit]
+
 # Pagination response
 class PaginatedTestsets(BaseModel):
     items: List[Testset]
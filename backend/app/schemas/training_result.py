@@ -1,5 +1,6 @@
-from pydantic import BaseModel, confloat
-from typing import Optional
+import json
+from pydantic import BaseModel, confloat, validator
+from typing import Any, Dict, Optional
 
 class TrainingResultBase(BaseModel):
     version_id: int
@@ -24,6 +25,17 @@ class TrainingResultInDBBase(TrainingResultBase):
     result_id: int
     created_at: str
     updated_at: str
+    # Paired significance test of finetuned vs base, set when both were scored in the same evaluation
+    significance: Optional[Dict[str, Any]] = None
+
+    @validator('significance', pre=True)
+    def parse_significance(cls, value):
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except ValueError:
+                return None
+        return value
 
     class Config:
         from_attributes = True
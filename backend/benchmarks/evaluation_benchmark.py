@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Evaluation pipeline benchmark
+
+Drives N concurrent evaluation jobs through the real job lifecycle (job creation,
+worker claims and leases, status/DB updates, output file handling and scoring)
+with the deterministic fake engine standing in for Docker. Each scenario runs
+against a throwaway SQLite database and storage directory.
+
+Reports per scenario: jobs/hour, p50/p95 job latency, peak RSS, DB write/lock
+wait time and mean per-stage durations, and saves everything as JSON so runs
+can be compared.
+
+Usage:
+    python3 benchmarks/evaluation_benchmark.py [--sizes 1k,100k] [--jobs 20] [--concurrency 4]
+        [--segment-latency-ms 0.5] [--startup-seconds 0] [--real-metrics]
+        [--output results.json] [--compare previous.json]
+
+Notes:
+    - Must be run from the backend directory (or with it on PYTHONPATH).
+    - --real-metrics scores with sacrebleu (and comet-score if installed) instead
+      of random fake scores, so scoring cost is included.
+    - Under SQLite, time spent in write statements is dominated by waiting for
+      the database write lock, and is reported as db_lock_wait.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import platform
+import resource
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_testsets import generate_testset, parse_size
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("evaluation_benchmark")
+logger.setLevel(logging.INFO)
+
+WRITE_OPERATIONS = ("INSERT", "UPDATE", "DELETE")
+
+def configure_environment(work_dir: str, args: argparse.Namespace) -> None:
+    """
+    Point the app at a scratch database/storage and enable the deterministic fake engine.
+    Must run before anything under app/ is imported (settings are read at import time).
+    """
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(work_dir, 'benchmark.db')}"
+    os.environ["DOCKER_VOLUME_TMP_PATH_HOST"] = os.path.join(work_dir, "tmp")
+    os.environ["MODEL_FILES_STORAGE_PATH"] = os.path.join(work_dir, "models")
+    os.environ["TESTSETS_STORAGE_PATH"] = os.path.join(work_dir, "testsets")
+    os.environ["FAKE_EVALUATION_MODE"] = "true"
+    os.environ["FAKE_ENGINE_OUTPUT"] = "deterministic"
+    os.environ["FAKE_ENGINE_STARTUP_SECONDS"] = str(args.startup_seconds)
+    os.environ["FAKE_ENGINE_SEGMENT_LATENCY_MS"] = str(args.segment_latency_ms)
+    os.environ["FAKE_EVALUATION_REAL_METRICS"] = "true" if args.real_metrics else "false"
+    # All benchmark jobs come from one user; the per-user running cap would otherwise bound concurrency
+    os.environ["EVALUATION_MAX_RUNNING_PER_USER"] = "0"
+
+class RssSampler:
+    """Samples this process' resident set size to find the peak during a scenario"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def current_rss_bytes() -> int:
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        # Fallback: lifetime peak (kilobytes on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, self.current_rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self.current_rss_bytes())
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+def db_write_totals() -> Dict[str, float]:
+    from app.core.metrics import DB_QUERY_DURATION
+    total_seconds = 0.0
+    total_count = 0.0
+    for operation in WRITE_OPERATIONS:
+        snap = DB_QUERY_DURATION.snapshot(operation=operation)
+        total_seconds += snap["sum"]
+        total_count += snap["count"]
+    return {"seconds": total_seconds, "count": total_count}
+
+def seed_database(work_dir: str, testset_paths: Dict[str, Dict[str, str]]) -> Dict[str, Any]:
+    """Create schema, a user, a language pair, a model version and one testset per size"""
+    from app.db.database import Base, engine, SessionLocal
+    from app.db import models
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        models_dir = os.path.join(work_dir, "models")
+        os.makedirs(models_dir, exist_ok=True)
+        model_file = os.path.join(models_dir, "model.bin")
+        hparams_file = os.path.join(models_dir, "hparams.yaml")
+        for path in (model_file, hparams_file):
+            with open(path, "w") as f:
+                f.write("benchmark placeholder\n")
+
+        user = models.User(username="benchmark", password_hash="-", email="benchmark@example.com", role="admin", status="active")
+        language_pair = models.LanguagePair(source_language_code="en", target_language_code="vi", description="benchmark")
+        db.add_all([user, language_pair])
+        db.commit()
+
+        model_version = models.ModelVersion(
+            lang_pair_id=language_pair.lang_pair_id,
+            version_name="benchmark-v1",
+            model_file_path_on_server=model_file,
+            hparams_file_path_on_server=hparams_file,
+            base_model_file_path_on_server=model_file,
+            base_hparams_file_path_on_server=hparams_file
+        )
+        db.add(model_version)
+
+        testsets = {}
+        for size_label, paths in testset_paths.items():
+            testset = models.Testset(
+                lang_pair_id=language_pair.lang_pair_id,
+                testset_name=f"synthetic-{size_label}",
+                source_file_path=paths["source"],
+                target_file_path=paths["target"],
+                source_file_name=os.path.basename(paths["source"]),
+                target_file_name=os.path.basename(paths["target"]),
+                source_file_path_on_server=paths["source"],
+                target_file_path_on_server=paths["target"]
+            )
+            db.add(testset)
+            testsets[size_label] = testset
+        db.commit()
+        return {
+            "user_id": user.user_id,
+            "version_id": model_version.version_id,
+            "testset_ids": {label: testset.testset_id for label, testset in testsets.items()}
+        }
+    finally:
+        db.close()
+
+def run_scenario(size_label: str, seeded: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
+    """Submit args.jobs evaluation jobs for one testset size and run them with args.concurrency workers"""
+    from app.db.database import SessionLocal
+    from app.db.models import EvaluationJob
+    from app.crud import crud_evaluation
+    from app.core.worker import EvaluationWorker
+    from app.core import scheduler
+    from app.schemas.evaluation import EvaluationJobCreate, EvaluationStatus
+
+    logger.info(f"Scenario {size_label}: {args.jobs} jobs, concurrency {args.concurrency}, model type {args.model_type}")
+    db = SessionLocal()
+    submit_times: Dict[int, float] = {}
+    finish_times: Dict[int, float] = {}
+
+    # One in-process worker with a slot per unit of concurrency, polling fast so claim latency stays small
+    worker = EvaluationWorker(worker_id=f"benchmark-{size_label}", slots=args.concurrency, labels=[scheduler.ANY_LABEL], poll_seconds=0.05)
+    terminal = (EvaluationStatus.COMPLETED.value, EvaluationStatus.FAILED.value, EvaluationStatus.CANCELLED.value)
+
+    writes_before = db_write_totals()
+    started = time.perf_counter()
+    with RssSampler() as rss:
+        worker.start()
+        for _ in range(args.jobs):
+            job = crud_evaluation.create(
+                db=db,
+                obj_in=EvaluationJobCreate(
+                    version_id=seeded["version_id"],
+                    testset_id=seeded["testset_ids"][size_label],
+                    auto_add_to_details=False,
+                    evaluation_model_type=args.model_type
+                ),
+                user_id=seeded["user_id"]
+            )
+            submit_times[job.job_id] = time.perf_counter()
+            scheduler.notify_job_submitted()
+        while len(finish_times) < len(submit_times):
+            db.expire_all()
+            pending_ids = [job_id for job_id in submit_times if job_id not in finish_times]
+            for row in db.query(EvaluationJob.job_id, EvaluationJob.status).filter(EvaluationJob.job_id.in_(pending_ids)):
+                if row.status in terminal:
+                    finish_times[row.job_id] = time.perf_counter()
+            time.sleep(0.02)
+        worker.stop(wait=True)
+    wall_seconds = time.perf_counter() - started
+    writes_after = db_write_totals()
+
+    # Collect outcomes and per-stage timings from the jobs themselves
+    db.expire_all()
+    latencies = [finish_times[job_id] - submit_times[job_id] for job_id in submit_times if job_id in finish_times]
+    statuses: Dict[str, int] = {}
+    stage_totals: Dict[str, List[float]] = {}
+    bleu_scores = []
+    for job_id in submit_times:
+        job = crud_evaluation.get(db, job_id)
+        statuses[job.status] = statuses.get(job.status, 0) + 1
+        if job.bleu_score is not None:
+            bleu_scores.append(job.bleu_score)
+        if job.stage_timings:
+            for model_type, stages in json.loads(job.stage_timings).items():
+                for stage, value in stages.items():
+                    if isinstance(value, (int, float)):
+                        stage_totals.setdefault(f"{model_type}.{stage}", []).append(float(value))
+    db.close()
+
+    completed = statuses.get(EvaluationStatus.COMPLETED.value, 0)
+    return {
+        "size": size_label,
+        "jobs": args.jobs,
+        "completed": completed,
+        "statuses": statuses,
+        "wall_seconds": round(wall_seconds, 3),
+        "jobs_per_hour": round(completed / wall_seconds * 3600, 2) if wall_seconds > 0 else None,
+        "job_latency_seconds": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "max": max(latencies) if latencies else None
+        },
+        "peak_rss_mb": round(rss.peak_bytes / (1024 * 1024), 1),
+        "peak_children_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        "db_lock_wait": {
+            "write_statements": int(writes_after["count"] - writes_before["count"]),
+            "seconds_total": round(writes_after["seconds"] - writes_before["seconds"], 4)
+        },
+        "mean_stage_seconds": {stage: round(sum(values) / len(values), 4) for stage, values in sorted(stage_totals.items())},
+        "mean_bleu": round(sum(bleu_scores) / len(bleu_scores), 2) if bleu_scores else None
+    }
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=BACKEND_DIR, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def compare_results(current: Dict[str, Any], previous: Dict[str, Any]) -> None:
+    """Print per-scenario deltas against a previous results file"""
+    previous_by_size = {scenario["size"]: scenario for scenario in previous.get("scenarios", [])}
+    print(f"\nComparison against {previous.get('git_revision') or 'previous run'} ({previous.get('timestamp')}):")
+    for scenario in current["scenarios"]:
+        before = previous_by_size.get(scenario["size"])
+        if not before:
+            print(f"  {scenario['size']}: no previous data")
+            continue
+        for label, now_value, old_value in [
+            ("jobs/hour", scenario["jobs_per_hour"], before.get("jobs_per_hour")),
+            ("p95 latency (s)", scenario["job_latency_seconds"]["p95"], before.get("job_latency_seconds", {}).get("p95")),
+            ("peak RSS (MB)", scenario["peak_rss_mb"], before.get("peak_rss_mb")),
+            ("DB lock wait (s)", scenario["db_lock_wait"]["seconds_total"], before.get("db_lock_wait", {}).get("seconds_total")),
+        ]:
+            if now_value is None or not old_value:
+                continue
+            change = (now_value - old_value) / old_value * 100
+            print(f"  {scenario['size']:>6} {label:<18} {old_value:>12.3f} -> {now_value:>12.3f} ({change:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the evaluation pipeline with a deterministic fake engine")
+    parser.add_argument("--sizes", default="1k,100k", help="Testset sizes to run (1k, 100k, 1m or integers)")
+    parser.add_argument("--jobs", type=int, default=20, help="Jobs per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent jobs")
+    parser.add_argument("--model-type", default="finetuned", choices=["finetuned", "base", "both"])
+    parser.add_argument("--segment-latency-ms", type=float, default=0.5, help="Simulated engine latency per segment")
+    parser.add_argument("--startup-seconds", type=float, default=0.0, help="Simulated engine startup/model load time")
+    parser.add_argument("--real-metrics", action="store_true", help="Score with sacrebleu/comet instead of fake scores")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--cache-dir", default=os.path.join(BACKEND_DIR, "benchmarks", ".cache"), help="Synthetic testset cache")
+    parser.add_argument("--output", help="Results JSON path (default: benchmarks/results/evaluation_<timestamp>.json)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    parser.add_argument("--keep-work-dir", action="store_true", help="Keep the scratch database and outputs")
+    args = parser.parse_args()
+
+    size_labels = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    testset_paths = {label: generate_testset(parse_size(label), args.cache_dir, seed=args.seed) for label in size_labels}
+
+    work_dir = tempfile.mkdtemp(prefix="nmt-benchmark-")
+    configure_environment(work_dir, args)
+    logger.info(f"Scratch work directory: {work_dir}")
+
+    seeded = seed_database(work_dir, testset_paths)
+    scenarios = [run_scenario(label, seeded, args) for label in size_labels]
+
+    results = {
+        "benchmark": "evaluation_pipeline",
+        "timestamp": datetime.utcnow().isoformat(),
+        "git_revision": git_revision(),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "parameters": {
+            "jobs": args.jobs,
+            "concurrency": args.concurrency,
+            "model_type": args.model_type,
+            "segment_latency_ms": args.segment_latency_ms,
+            "startup_seconds": args.startup_seconds,
+            "real_metrics": args.real_metrics,
+            "seed": args.seed
+        },
+        "scenarios": scenarios
+    }
+
+    output_path = args.output or os.path.join(
+        BACKEND_DIR, "benchmarks", "results", f"evaluation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for scenario in scenarios:
+        print(
+            f"{scenario['size']:>6}: {scenario['completed']}/{scenario['jobs']} completed, "
+            f"{scenario['jobs_per_hour']} jobs/h, p95 {scenario['job_latency_seconds']['p95']:.2f}s, "
+            f"peak RSS {scenario['peak_rss_mb']} MB, DB lock wait {scenario['db_lock_wait']['seconds_total']}s"
+        )
+    print(f"Results saved to {output_path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare_results(results, json.load(f))
+
+    if not args.keep_work_dir:
+        import shutil
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
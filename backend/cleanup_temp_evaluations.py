@@ -5,6 +5,10 @@ This should be run manually by admin to prevent storage from filling up with old
 
 IMPORTANT: This script should NOT be run automatically as users may still need access 
 to translation output files. Only run this manually after confirming with users.
+
+Routine retention (compression of idle outputs, LRU eviction above the disk watermark,
+TrainingResult-backed jobs protected) runs automatically in the API server, see
+app/core/retention.py; this script is for one-off manual cleanups.
 """
 
 import os
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Standalone evaluation worker
+
+Runs evaluation jobs on this host, coordinated with the API server and other workers through
+the database. Start one per host to add evaluation capacity; each worker:
+    - registers itself with its slot count and labels (the language packs found under
+      T2T_RESOURCES_BASE_PATH, plus EVALUATION_WORKER_LABELS),
+    - claims PENDING jobs for language pairs it has a language pack for, using atomic leases,
+    - renews the leases of its running jobs on every heartbeat, and requeues jobs whose
+      worker stopped heartbeating.
+
+Requirements for every host:
+    - the same DATABASE_URL as the API server (use a server database rather than SQLite
+      when workers run on more than one host),
+    - model files, testsets and DOCKER_VOLUME_TMP_PATH_HOST mounted at the same paths as on
+      the API server, since job rows store absolute paths,
+    - Docker with the engine image (NMT_ENGINE_DOCKER_IMAGE).
+
+Usage:
+    python3 evaluation_worker.py [--slots 4] [--worker-id gpu-box-1] [--labels enth,then]
+
+Set EVALUATION_LOCAL_WORKER_ENABLED=false on the API server to run evaluations only on
+standalone workers.
+"""
+
+import sys
+import signal
+import logging
+import argparse
+
+# Add app to path
+sys.path.append('.')
+
+from app.core.config import settings
+from app.core.worker import EvaluationWorker
+from app.core import scheduler
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an evaluation worker on this host")
+    parser.add_argument("--worker-id", help="Stable worker ID (default: EVALUATION_WORKER_ID or <hostname>-<pid>)")
+    parser.add_argument("--slots", type=int, default=settings.EVALUATION_WORKER_SLOTS, help="Concurrent evaluation jobs")
+    parser.add_argument("--labels", help="Comma separated labels, replaces language pack discovery ('*' = any language pair)")
+    args = parser.parse_args()
+
+    labels = [label.strip() for label in args.labels.split(",") if label.strip()] if args.labels else scheduler.worker_labels()
+    worker = EvaluationWorker(worker_id=args.worker_id, slots=args.slots, labels=labels)
+
+    def handle_sigterm(signum, frame):
+        logger.info("Received SIGTERM, stopping worker after running jobs finish...")
+        worker.stop(wait=True)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+    logger.info(f"Starting evaluation worker with {args.slots} slot(s), labels: {', '.join(labels)}")
+    worker.run_forever()
+
+if __name__ == "__main__":
+    main()
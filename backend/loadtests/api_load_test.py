@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+API load test and latency regression suite
+
+Seeds a realistic scratch database (thousands of model versions, ~100k evaluation
+jobs, one SQE result per version, training results and testset/output files),
+starts the FastAPI app in-process with uvicorn on a random local port and hits
+the listing, dashboard, analytics, content and export endpoints concurrently.
+
+Per scenario it records p50/p95/p99 latency and error counts, compares p95
+against a stored baseline and exits non-zero when a scenario regresses beyond
+the tolerance or returns errors.
+
+Usage:
+    python3 loadtests/api_load_test.py [--scale full|small] [--concurrency 8]
+        [--requests 200] [--warmup 10] [--baseline loadtests/baseline.json] [--tolerance 0.25]
+        [--update-baseline] [--output results.json]
+
+Notes:
+    - Must be run from the backend directory (or with it on PYTHONPATH).
+    - A baseline is machine specific. When the baseline file does not exist the
+      current run is written as the new baseline and the run passes.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import logging
+import tempfile
+import threading
+import http.client
+from datetime import datetime, date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("api_load_test")
+logger.setLevel(logging.INFO)
+
+SCALES = {
+    "full": {"language_pairs": 6, "model_versions": 3000, "testsets": 120, "evaluation_jobs": 100_000, "results_per_version": 4},
+    "small": {"language_pairs": 3, "model_versions": 300, "testsets": 20, "evaluation_jobs": 5_000, "results_per_version": 2},
+}
+# Terminal statuses only: PENDING jobs would be picked up by the startup re-scheduler
+STATUSES = ["COMPLETED"] * 9 + ["FAILED"]
+MODES = [None, "Interpreter Listening Mode", "Samsung Note Mode", "Keyboard, Voice Recorder Mode"]
+
+def configure_environment(work_dir: str) -> None:
+    """Point the app at a scratch database and storage. Must run before importing app/."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(work_dir, 'loadtest.db')}"
+    os.environ["DOCKER_VOLUME_TMP_PATH_HOST"] = os.path.join(work_dir, "tmp")
+    os.environ["MODEL_FILES_STORAGE_PATH"] = os.path.join(work_dir, "models")
+    os.environ["TESTSETS_STORAGE_PATH"] = os.path.join(work_dir, "testsets")
+    os.environ["FAKE_EVALUATION_MODE"] = "true"
+    os.environ.setdefault("SECRET_KEY", "loadtest-secret")
+
+def seed_database(work_dir: str, scale: Dict[str, int], seed: int) -> Dict[str, Any]:
+    """Bulk-insert a realistic dataset with Core executemany inserts"""
+    from sqlalchemy import insert
+    from app.db.database import Base, engine
+    from app.db import models
+
+    rng = random.Random(seed)
+    Base.metadata.create_all(engine)
+    started = time.perf_counter()
+
+    # Shared content files: testset source/target and one evaluation output per language pair
+    content_dir = os.path.join(work_dir, "content")
+    os.makedirs(content_dir, exist_ok=True)
+    source_path = os.path.join(content_dir, "testset.src")
+    target_path = os.path.join(content_dir, "testset.ref")
+    output_path = os.path.join(content_dir, "output.txt")
+    for path in (source_path, target_path, output_path):
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(2000):
+                f.write(f"segment {i} " + " ".join(f"w{rng.randint(0, 5000)}" for _ in range(rng.randint(5, 30))) + "\n")
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"user_id": 1, "username": "loadtest-admin", "password_hash": "-", "email": "admin@loadtest.local", "role": "admin", "status": "active"},
+            {"user_id": 2, "username": "loadtest-member", "password_hash": "-", "email": "member@loadtest.local", "role": "member", "status": "active"},
+        ])
+        language_pairs = [
+            {"lang_pair_id": i + 1, "source_language_code": f"s{i}", "target_language_code": f"t{i}", "description": f"pair {i}"}
+            for i in range(scale["language_pairs"])
+        ]
+        conn.execute(insert(models.LanguagePair), language_pairs)
+
+        testsets = []
+        for i in range(scale["testsets"]):
+            testsets.append({
+                "testset_id": i + 1,
+                "lang_pair_id": (i % scale["language_pairs"]) + 1,
+                "testset_name": f"testset-{i}",
+                "source_file_path": source_path,
+                "target_file_path": target_path,
+                "source_file_name": "testset.src",
+                "target_file_name": "testset.ref",
+                "source_file_path_on_server": source_path,
+                "target_file_path_on_server": target_path,
+            })
+        conn.execute(insert(models.Testset), testsets)
+
+        versions = []
+        base_date = date(2023, 1, 1)
+        for i in range(scale["model_versions"]):
+            versions.append({
+                "version_id": i + 1,
+                "lang_pair_id": (i % scale["language_pairs"]) + 1,
+                "version_name": f"v{i}",
+                "release_date": base_date + timedelta(days=i // scale["language_pairs"]),
+                "description": f"load test version {i}",
+            })
+        conn.execute(insert(models.ModelVersion), versions)
+
+        testsets_by_pair: Dict[int, List[int]] = {}
+        for testset in testsets:
+            testsets_by_pair.setdefault(testset["lang_pair_id"], []).append(testset["testset_id"])
+
+        training_results = []
+        sqe_results = []
+        for version in versions:
+            pair_testsets = testsets_by_pair.get(version["lang_pair_id"], [])
+            for testset_id in rng.sample(pair_testsets, min(scale["results_per_version"], len(pair_testsets))):
+                training_results.append({
+                    "version_id": version["version_id"],
+                    "testset_id": testset_id,
+                    "base_model_bleu": round(rng.uniform(15, 35), 2),
+                    "finetuned_model_bleu": round(rng.uniform(18, 40), 2),
+                    "base_model_comet": round(rng.uniform(0.6, 0.8), 4),
+                    "finetuned_model_comet": round(rng.uniform(0.62, 0.86), 4),
+                })
+            sqe_results.append({
+                "version_id": version["version_id"],
+                "average_score": round(rng.uniform(1.0, 3.0), 2),
+                "total_test_cases": rng.randint(50, 500),
+                "test_cases_changed": rng.random() < 0.2,
+                "change_percentage": round(rng.uniform(0, 30), 1),
+                "has_one_point_case": rng.random() < 0.1,
+                "tested_by_user_id": 1,
+                "test_date": version["release_date"],
+            })
+        conn.execute(insert(models.TrainingResult), training_results)
+        conn.execute(insert(models.SQEResult), sqe_results)
+
+        batch = []
+        requested_base = datetime(2024, 1, 1)
+        for i in range(scale["evaluation_jobs"]):
+            version = versions[rng.randrange(len(versions))]
+            pair_testsets = testsets_by_pair[version["lang_pair_id"]]
+            status = rng.choice(STATUSES)
+            requested_at = requested_base + timedelta(minutes=i)
+            batch.append({
+                "job_id": i + 1,
+                "version_id": version["version_id"],
+                "testset_id": rng.choice(pair_testsets),
+                "requested_by_user_id": rng.choice([1, 2]),
+                "status": status,
+                "bleu_score": round(rng.uniform(15, 40), 2) if status == "COMPLETED" else None,
+                "comet_score": round(rng.uniform(0.6, 0.86), 4) if status == "COMPLETED" else None,
+                "output_file_path": output_path if status == "COMPLETED" else None,
+                "log_message": "engine failed" if status == "FAILED" else None,
+                "auto_add_to_details_requested": True,
+                "requested_at": requested_at,
+                "processing_started_at": requested_at + timedelta(seconds=5),
+                "completed_at": requested_at + timedelta(minutes=3),
+                "mode_type": rng.choice(MODES),
+                "evaluation_model_type": "finetuned",
+            })
+            if len(batch) >= 5000:
+                conn.execute(insert(models.EvaluationJob), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(models.EvaluationJob), batch)
+
+    logger.info(
+        f"Seeded {len(versions)} model versions, {len(testsets)} testsets, {scale['evaluation_jobs']} evaluation jobs, "
+        f"{len(training_results)} training results, {len(sqe_results)} SQE results in {time.perf_counter() - started:.1f}s"
+    )
+    return {
+        "language_pairs": len(language_pairs),
+        "model_versions": len(versions),
+        "testsets": len(testsets),
+        "evaluation_jobs": scale["evaluation_jobs"],
+    }
+
+def build_scenarios(counts: Dict[str, Any], rng: random.Random) -> Dict[str, Dict[str, Any]]:
+    """Scenario name -> {path factory, requests weight}. Paths are relative to the API prefix."""
+    pairs = counts["language_pairs"]
+    versions = counts["model_versions"]
+    jobs = counts["evaluation_jobs"]
+    testsets = counts["testsets"]
+    job_pages = max(1, jobs // 50)
+
+    return {
+        # Listing
+        "list_evaluations": {"path": lambda: f"/evaluations/?page={rng.randint(1, job_pages)}&size=50", "weight": 1.0},
+        "list_evaluations_filtered": {"path": lambda: f"/evaluations/?version_id={rng.randint(1, versions)}&status=COMPLETED&size=50", "weight": 1.0},
+        "list_model_versions": {"path": lambda: f"/model-versions/?lang_pair_id={rng.randint(1, pairs)}&page={rng.randint(1, 20)}&size=20", "weight": 1.0},
+        "list_testsets": {"path": lambda: "/testsets/?page=1&size=100", "weight": 1.0},
+        "list_sqe_results": {"path": lambda: f"/sqe-results/?page={rng.randint(1, 20)}&size=50", "weight": 1.0},
+        "evaluation_status": {"path": lambda: f"/evaluations/status/{rng.randint(1, jobs)}", "weight": 1.0},
+        # Dashboard
+        "system_status": {"path": lambda: "/system/system/status", "weight": 1.0},
+        "active_evaluations": {"path": lambda: "/system/evaluations/active", "weight": 1.0},
+        "progress_chart": {"path": lambda: f"/visualizations/progress?lang_pair_id={rng.randint(1, pairs)}&metric=bleu", "weight": 1.0},
+        "testset_comparison": {"path": lambda: f"/visualizations/testset-comparison?version_id={rng.randint(1, versions)}&metric=bleu", "weight": 1.0},
+        # Analytics
+        "sqe_analytics_overall": {"path": lambda: "/sqe-results/analytics/overall", "weight": 0.5},
+        "sqe_analytics_distribution": {"path": lambda: f"/sqe-results/analytics/distribution?language_pair_id={rng.randint(1, pairs)}", "weight": 0.5},
+        "sqe_analytics_trends": {"path": lambda: f"/sqe-results/analytics/language-pair/{rng.randint(1, pairs)}", "weight": 0.5},
+        # Content
+        "testset_content": {"path": lambda: f"/testsets/{rng.randint(1, testsets)}/content/source", "weight": 0.5},
+        "reference_content": {"path": lambda: f"/testsets/{rng.randint(1, testsets)}/reference-content", "weight": 0.5},
+        # Export
+        "export_model_versions": {"path": lambda: f"/model-versions/export/{rng.randint(1, pairs)}?format=markdown", "weight": 0.1},
+    }
+
+class InProcessServer:
+    """Runs the FastAPI app with uvicorn in a background thread on a free local port"""
+
+    def __init__(self):
+        import uvicorn
+        from app.main import app
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning", access_log=False)
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        deadline = time.time() + 30
+        while not self.server.started:
+            if time.time() > deadline:
+                raise RuntimeError("Server did not start within 30 seconds")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))]
+
+def run_scenario(name: str, path_factory: Callable[[], str], port: int, token: str, requests: int, concurrency: int, warmup: int = 0) -> Dict[str, Any]:
+    """Fire `requests` GETs at `concurrency` keep-alive connections and collect latencies (after `warmup` unmeasured ones)"""
+    local = threading.local()
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def one_request(_: int) -> None:
+        connection = getattr(local, "connection", None)
+        if connection is None:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+            local.connection = connection
+        path = "/api/v1" + path_factory()
+        started = time.perf_counter()
+        try:
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                # 404s are expected for randomly chosen ids without data
+                if response.status >= 500 or response.status in (401, 403, 422):
+                    errors[str(response.status)] = errors.get(str(response.status), 0) + 1
+        except Exception as e:
+            local.connection = None
+            with lock:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        if warmup:
+            list(executor.map(one_request, range(warmup)))
+            latencies.clear()
+            errors.clear()
+        started = time.perf_counter()
+        list(executor.map(one_request, range(requests)))
+        wall = time.perf_counter() - started
+
+    result = {
+        "scenario": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(requests / wall, 2) if wall > 0 else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+            "p95": round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+            "p99": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        },
+    }
+    logger.info(f"{name:<28} p50 {result['latency_ms']['p50']}ms  p95 {result['latency_ms']['p95']}ms  {result['throughput_rps']} req/s  errors {errors or 0}")
+    return result
+
+def check_against_baseline(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float, slack_ms: float) -> List[str]:
+    """Return human readable failures for p95 regressions and errors"""
+    failures = []
+    baseline_by_name = {scenario["scenario"]: scenario for scenario in baseline.get("scenarios", [])}
+    for result in results:
+        if result["errors"]:
+            failures.append(f"{result['scenario']}: errors {result['errors']}")
+        before = baseline_by_name.get(result["scenario"])
+        if not before or before["latency_ms"]["p95"] is None or result["latency_ms"]["p95"] is None:
+            continue
+        allowed = before["latency_ms"]["p95"] * (1 + tolerance) + slack_ms
+        if result["latency_ms"]["p95"] > allowed:
+            failures.append(
+                f"{result['scenario']}: p95 {result['latency_ms']['p95']}ms exceeds baseline "
+                f"{before['latency_ms']['p95']}ms (allowed {allowed:.1f}ms)"
+            )
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API and check p95 latency against a baseline")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="full", help="Size of the seeded dataset")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario (scaled by scenario weight)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scenarios", help="Comma separated subset of scenarios to run")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per scenario before measuring")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", default=os.path.join(BACKEND_DIR, "loadtests", "baseline.json"))
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative p95 increase")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="Allowed absolute p95 increase, absorbs jitter on fast endpoints")
+    parser.add_argument("--update-baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="nmt-loadtest-")
+    configure_environment(work_dir)
+    logger.info(f"Scratch work directory: {work_dir}")
+
+    counts = seed_database(work_dir, SCALES[args.scale], args.seed)
+    scenarios = build_scenarios(counts, random.Random(args.seed))
+    if args.scenarios:
+        wanted = set(args.scenarios.split(","))
+        scenarios = {name: spec for name, spec in scenarios.items() if name in wanted}
+
+    from app.core.security import create_access_token
+    token = create_access_token(data={"sub": "1", "role": "admin"}, expires_delta=timedelta(hours=2))
+
+    results = []
+    with InProcessServer() as server:
+        for name, spec in scenarios.items():
+            requests = max(args.concurrency, int(args.requests * spec["weight"]))
+            results.append(run_scenario(name, spec["path"], server.port, token, requests, args.concurrency, args.warmup))
+
+    report = {
+        "suite": "api_load_test",
+        "timestamp": datetime.utcnow().isoformat(),
+        "scale": args.scale,
+        "dataset": counts,
+        "concurrency": args.concurrency,
+        "scenarios": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    import shutil
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Baseline written to {args.baseline}")
+        errored = [result["scenario"] for result in results if result["errors"]]
+        if errored:
+            logger.error(f"Scenarios returned errors: {', '.join(errored)}")
+            return 1
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("scale") != args.scale:
+        logger.warning(f"Baseline was recorded at scale '{baseline.get('scale')}', this run used '{args.scale}'")
+    failures = check_against_baseline(results, baseline, args.tolerance, args.slack_ms)
+    if failures:
+        for failure in failures:
+            logger.error(f"REGRESSION: {failure}")
+        return 1
+    logger.info("No p95 regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
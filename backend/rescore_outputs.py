@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Historical rescoring backfill
+
+Recomputes the scores of every completed evaluation job whose outputs still exist under
+DOCKER_VOLUME_TMP_PATH_HOST, without translating anything again: each output's segment store
+is rebuilt and BLEU/chrF (and COMET with --metrics ...,comet) plus the base vs finetuned
+significance tests are written back to the job. Outputs are scored across a pool of niced
+processes (RESCORING_NICE) and the database is updated once per batch.
+
+Progress is checkpointed after every batch to DOCKER_VOLUME_TMP_PATH_HOST/rescoring/<run-id>.json;
+pass --run-id of a stopped or crashed run to resume it. Runs can also be started and followed
+through the admin API (POST/GET /api/v1/evaluations/rescore).
+
+Usage:
+    python3 rescore_outputs.py [--metrics bleu,chrf] [--workers 4] [--batch-size 200]
+                               [--max-outputs-per-second 20] [--run-id <run-id>]
+"""
+
+import sys
+import signal
+import logging
+import argparse
+import threading
+
+# Add app to path
+sys.path.append('.')
+
+from app.core.config import settings
+from app.core import rescoring
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescore the surviving outputs of completed evaluation jobs")
+    parser.add_argument("--metrics", default=",".join(rescoring.DEFAULT_METRICS), help=f"Comma separated metrics out of {','.join(rescoring.METRICS)}")
+    parser.add_argument("--workers", type=int, help="Scoring processes (default: RESCORING_WORKERS, or half the CPUs)")
+    parser.add_argument("--batch-size", type=int, default=settings.RESCORING_BATCH_SIZE, help="Jobs per checkpointed batch")
+    parser.add_argument("--max-outputs-per-second", type=float, default=settings.RESCORING_MAX_OUTPUTS_PER_SECOND, help="Rate limit, 0 = unlimited")
+    parser.add_argument("--run-id", help="Resume this run from its checkpoint")
+    args = parser.parse_args()
+
+    metrics = [metric.strip() for metric in args.metrics.split(",") if metric.strip()]
+    stop_event = threading.Event()
+
+    def handle_sigterm(signum, frame):
+        logger.info("Received SIGTERM, stopping after the current batch...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    signal.signal(signal.SIGINT, handle_sigterm)
+
+    state = rescoring.run(
+        run_id=args.run_id,
+        metrics=metrics,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        max_outputs_per_second=args.max_outputs_per_second,
+        stop_event=stop_event
+    )
+    logger.info(f"Run {state['run_id']} {state['status']}: {state['processed']} jobs processed, {state['rescored']} rescored, "
+                f"{state['missing']} without outputs, {state['mismatched']} mismatched, {state['failed']} failed")
+    sys.exit(0 if state["status"] in ("completed", "stopped") else 1)
+
+if __name__ == "__main__":
+    main()
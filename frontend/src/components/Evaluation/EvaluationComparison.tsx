@@ -1628,6 +1628,34 @@ const EvaluationComparison: React.FC<EvaluationComparisonProps> = ({
                               </Stack>
                             </Card>
                           </Grid>
+                          {jobDetails.result.significance && (
+                            <Grid item xs={12}>
+                              <Card variant="outlined" sx={{ borderRadius: 3, p: 2 }}>
+                                <Typography variant="subtitle1" sx={{ fontWeight: 600, mb: 1 }}>
+                                  Finetuned vs Base Significance
+                                </Typography>
+                                <Stack direction="row" spacing={2} sx={{ flexWrap: 'wrap' }}>
+                                  {(['bleu', 'comet'] as const).map((metric) => {
+                                    const test = jobDetails.result.significance[metric];
+                                    if (!test) return null;
+                                    const decimals = metric === 'bleu' ? 2 : 4;
+                                    return (
+                                      <Chip
+                                        key={metric}
+                                        label={`${metric.toUpperCase()} Δ ${test.delta.toFixed(decimals)} [${test.ci[0].toFixed(decimals)}, ${test.ci[1].toFixed(decimals)}], p=${test.p_value} (AR p=${test.p_value_randomization})`}
+                                        color={test.significant ? (test.delta > 0 ? 'success' : 'error') : 'default'}
+                                        variant="outlined"
+                                        sx={{ fontWeight: 600, borderRadius: 2 }}
+                                      />
+                                    );
+                                  })}
+                                </Stack>
+                                <Typography variant="caption" color="text.secondary" sx={{ display: 'block', mt: 1 }}>
+                                  {Math.round(jobDetails.result.significance.confidence_level * 100)}% intervals from {jobDetails.result.significance.resamples} paired bootstrap resamples over {jobDetails.result.significance.segments} segments
+                                </Typography>
+                              </Card>
+                            </Grid>
+                          )}
                         </>
                       )}
                     </>
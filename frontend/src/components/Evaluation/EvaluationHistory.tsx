@@ -127,6 +127,8 @@ const EvaluationHistory: React.FC<EvaluationHistoryProps> = ({ versionId, onView
         return 'success';
       case EvaluationStatus.FAILED:
         return 'error';
+      case EvaluationStatus.CANCELLED:
+        return 'default';
       case EvaluationStatus.PENDING:
       case EvaluationStatus.PREPARING_SETUP:
       case EvaluationStatus.PREPARING_ENGINE:
@@ -694,6 +696,7 @@ const EvaluationHistory: React.FC<EvaluationHistoryProps> = ({ versionId, onView
                   <MenuItem value="">All Statuses</MenuItem>
                   <MenuItem value="COMPLETED">Completed</MenuItem>
                   <MenuItem value="FAILED">Failed</MenuItem>
+                  <MenuItem value="CANCELLED">Cancelled</MenuItem>
                   <MenuItem value="PENDING">Pending</MenuItem>
                 </Select>
               </FormControl>
@@ -745,7 +748,8 @@ const EvaluationHistory: React.FC<EvaluationHistoryProps> = ({ versionId, onView
               bleu_score: selectedJobForComparison.bleu_score,
               comet_score: selectedJobForComparison.comet_score,
               base_model_bleu_score: selectedJobForComparison.base_model_bleu_score,
-              base_model_comet_score: selectedJobForComparison.base_model_comet_score
+              base_model_comet_score: selectedJobForComparison.base_model_comet_score,
+              significance: selectedJobForComparison.significance
             }
           }}
         />
@@ -101,13 +101,16 @@ const EvaluationProgress: React.FC<EvaluationProgressProps> = ({
         return 'Evaluation completed successfully!';
       case EvaluationStatus.FAILED:
         return 'Evaluation failed.';
+      case EvaluationStatus.CANCELLED:
+        return 'Evaluation cancelled.';
       default:
         return 'Unknown status';
     }
   };
 
   const isEvaluationFinished = jobStatus?.status === EvaluationStatus.COMPLETED || 
-                              jobStatus?.status === EvaluationStatus.FAILED;
+                              jobStatus?.status === EvaluationStatus.FAILED ||
+                              jobStatus?.status === EvaluationStatus.CANCELLED;
 
   return (
     <Dialog 
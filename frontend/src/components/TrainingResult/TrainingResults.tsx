@@ -11,7 +11,8 @@ import {
   Button,
   Card,
   Avatar,
-  Chip
+  Chip,
+  Tooltip
 } from '@mui/material';
 import { 
   Add as AddIcon, 
@@ -19,7 +20,7 @@ import {
   TrendingUp as TrendingUpIcon,
   TrendingDown as TrendingDownIcon
 } from '@mui/icons-material';
-import { TrainingResult, Testset } from '../../types';
+import { TrainingResult, Testset, MetricSignificance } from '../../types';
 
 interface TrainingResultsProps {
   versionId: number;
@@ -48,8 +49,15 @@ const TrainingResults: React.FC<TrainingResultsProps> = ({
     return finetunedScore > baseScore ? 'improved' : finetunedScore < baseScore ? 'declined' : 'same';
   };
 
-  const renderScoreCell = (baseScore: number | null, finetunedScore: number | null, decimals: number = 2) => {
+  const renderScoreCell = (
+    baseScore: number | null,
+    finetunedScore: number | null,
+    decimals: number = 2,
+    significance?: MetricSignificance | null
+  ) => {
     const comparison = getScoreComparison(baseScore, finetunedScore);
+    // Without a significance test every difference is shown; with one, only significant differences count
+    const isSignificant = !significance || significance.significant;
     
     return (
       <Box sx={{ display: 'flex', flexDirection: 'column', gap: 0.5 }}>
@@ -67,13 +75,22 @@ const TrainingResults: React.FC<TrainingResultsProps> = ({
         </Box>
         {comparison && comparison !== 'same' && (
           <Chip
-            label={comparison === 'improved' ? 'Improved' : 'Declined'}
+            label={isSignificant ? (comparison === 'improved' ? 'Improved' : 'Declined') : 'Not significant'}
             size="small"
-            color={comparison === 'improved' ? 'success' : 'error'}
+            color={isSignificant ? (comparison === 'improved' ? 'success' : 'error') : 'default'}
             variant="outlined"
             sx={{ fontSize: '0.7rem', height: 20 }}
           />
         )}
+        {significance && (
+          <Tooltip
+            title={`Paired bootstrap p=${significance.p_value}, approximate randomization p=${significance.p_value_randomization}`}
+          >
+            <Typography variant="caption" color="text.secondary">
+              Δ {significance.delta.toFixed(decimals)} [{significance.ci[0].toFixed(decimals)}, {significance.ci[1].toFixed(decimals)}], p={significance.p_value}
+            </Typography>
+          </Tooltip>
+        )}
       </Box>
     );
   };
@@ -180,10 +197,10 @@ const TrainingResults: React.FC<TrainingResultsProps> = ({
                       </Box>
                     </TableCell>
                     <TableCell>
-                      {renderScoreCell(result.base_model_bleu, result.finetuned_model_bleu, 2)}
+                      {renderScoreCell(result.base_model_bleu, result.finetuned_model_bleu, 2, result.significance?.bleu)}
                     </TableCell>
                     <TableCell>
-                      {renderScoreCell(result.base_model_comet, result.finetuned_model_comet, 4)}
+                      {renderScoreCell(result.base_model_comet, result.finetuned_model_comet, 4, result.significance?.comet)}
                     </TableCell>
                   </TableRow>
                 ))}
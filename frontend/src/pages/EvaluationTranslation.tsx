@@ -397,7 +397,7 @@ const EvaluationTranslation: React.FC = () => {
     let interval: NodeJS.Timeout;
     
     if (evaluationJobId && evaluationStatus && 
-        ![EvaluationStatus.COMPLETED, EvaluationStatus.FAILED].includes(evaluationStatus)) {
+        ![EvaluationStatus.COMPLETED, EvaluationStatus.FAILED, EvaluationStatus.CANCELLED].includes(evaluationStatus)) {
       
       interval = setInterval(async () => {
         try {
@@ -413,6 +413,10 @@ const EvaluationTranslation: React.FC = () => {
             setError(`Evaluation failed: ${statusData.log_message || statusData.error_message || statusData.detail || 'Unknown error'}`);
             setIsEvaluating(false);
             clearInterval(interval);
+          } else if (statusData.status === EvaluationStatus.CANCELLED) {
+            setError(`Evaluation cancelled: ${statusData.error_message || 'Cancelled'}`);
+            setIsEvaluating(false);
+            clearInterval(interval);
           }
         } catch (err) {
           console.error('Error polling evaluation status:', err);
@@ -197,7 +197,8 @@ const Visualizations: React.FC = () => {
           const transformedData = data.testsets?.map((item: any) => ({
             testset_name: item.testset_name,
             base_model: item.base_score || 0,
-            finetuned_model: item.finetuned_score || 0
+            finetuned_model: item.finetuned_score || 0,
+            significance: item.significance
           })) || [];
           console.log('🔄 Transformed Comparison Data:', transformedData);
           
@@ -327,6 +328,12 @@ const Visualizations: React.FC = () => {
               </Typography>
             );
           })}
+          {payload[0].payload?.significance && (
+            <Typography variant="caption" color="text.secondary" sx={{ display: 'block', mt: 1 }}>
+              {`Δ ${formatScoreValue(payload[0].payload.significance.delta)}, p=${payload[0].payload.significance.p_value}`}
+              {payload[0].payload.significance.significant ? ' (significant)' : ' (not significant)'}
+            </Typography>
+          )}
         </Box>
       );
     }
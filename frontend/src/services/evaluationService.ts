@@ -28,6 +28,8 @@ export interface DeleteResponse {
   deleted_count: number;
   message: string;
   failed_deletions?: Array<{ job_id: number; error: string }>;
+  tombstones?: number;
+  gc_id?: string | null;
 }
 
 /**
@@ -101,7 +103,7 @@ export const translateText = async (
     sub_mode_type?: string;
     custom_params?: string;
   }
-): Promise<{ translated_text: string; status: string }> => {
+): Promise<{ translated_text: string; status: string; segments?: number; cached_segments?: number }> => {
   const response = await api.post(`${BASE_URL}/translate`, data);
   return response.data;
 };
@@ -1,3 +1,5 @@
+import { SignificanceResult } from './index';
+
 export enum EvaluationStatus {
   PENDING = "PENDING",
   PREPARING_SETUP = "PREPARING_SETUP",
@@ -5,19 +7,23 @@ export enum EvaluationStatus {
   RUNNING_ENGINE = "RUNNING_ENGINE",
   CALCULATING_METRICS = "CALCULATING_METRICS",
   COMPLETED = "COMPLETED",
-  FAILED = "FAILED"
+  FAILED = "FAILED",
+  CANCELLED = "CANCELLED"
 }
 
 export interface EvaluationResultData {
   bleu_score: number;
   comet_score: number;
+  chrf_score?: number | null;
   output_file_generated_path: string | null;
   added_to_details: boolean;
   base_model_result?: {
     bleu_score: number;
     comet_score: number;
+    chrf_score?: number | null;
     output_file_path?: string;
   };
+  significance?: SignificanceResult | null;
 }
 
 export interface EvaluationJobStatus {
@@ -54,6 +60,8 @@ export interface EvaluationJob {
   status: EvaluationStatus;
   bleu_score?: number;
   comet_score?: number;
+  chrf_score?: number | null;
+  rescored_at?: string | null;
   base_model_bleu_score?: number;
   base_model_comet_score?: number;
   base_model_output_file_path?: string;
@@ -71,4 +79,5 @@ export interface EvaluationJob {
   sub_mode_type?: string;
   custom_params?: string;
   evaluation_model_type?: 'base' | 'finetuned' | 'both';
+  significance?: SignificanceResult | null;
 } 
\ No newline at end of file
@@ -85,10 +85,27 @@ export interface Testset {
   target_file_name: string | null;
   source_file_path_on_server: string | null;
   target_file_path_on_server: string | null;
+  segments?: number | null;
+  ingest_stats?: Record<string, TestsetFileStats> | null;
   created_at: string;
   updated_at: string;
 }
 
+export interface TestsetFileStats {
+  lines: number;
+  empty_lines: number;
+  chars: number;
+  tokens: number;
+  max_chars: number;
+  max_tokens: number;
+  crlf_lines: number;
+  nfc_changed_lines: number;
+  bytes: number;
+  sha1: string;
+  encoding: string;
+  version: number;
+}
+
 export interface TestsetCreate {
   lang_pair_id: number;
   testset_name: string;
@@ -116,9 +133,28 @@ export interface TrainingResult {
   training_details_notes: string | null;
   created_at: string;
   updated_at: string;
+  significance?: SignificanceResult | null;
   testset?: Testset;
 }
 
+// Paired significance test of finetuned vs base for one metric
+export interface MetricSignificance {
+  delta: number;
+  ci: [number, number];
+  p_value: number;
+  p_value_randomization: number;
+  significant: boolean;
+}
+
+export interface SignificanceResult {
+  segments: number;
+  resamples: number;
+  randomization_trials: number;
+  confidence_level: number;
+  bleu: MetricSignificance | null;
+  comet: MetricSignificance | null;
+}
+
 export interface TrainingResultCreate {
   version_id: number;
   testset_id: number;
@@ -161,7 +197,7 @@ export interface ReleaseNoteUpdate {
 }
 
 // Visualization types
-export interface ComparisonDataPoint {
+export interface ComparisonDataPoint extends Partial<MetricSignificance> {
   metric: string;
   base_model: number | null;
   finetuned_model: number | null;